@@ -0,0 +1,63 @@
+"""Benchmark of computing the checksums of data files with isatools.checksums, as done by sra.create_datafile_hashes().
+
+Usage:
+
+    python -m benchmarks.bench_checksums [n_files [file_size_mib]]
+
+Reports the time taken to md5 the given number of random files, reading them 128 bytes at a time one after the other
+(as before the checksums module), in parallel in large blocks, and again from the checksum cache.
+"""
+from __future__ import absolute_import
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from functools import partial
+
+from isatools import checksums
+
+
+def md5_128(path):
+    with open(path, mode='rb') as f:
+        d = hashlib.md5()
+        for buf in iter(partial(f.read, 128), b''):
+            d.update(buf)
+    return d.hexdigest()
+
+
+def bench_checksums(n_files, file_size_mib):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        paths = list()
+        for i in range(n_files):
+            path = os.path.join(tmp_dir, 'run{}.fastq.gz'.format(i))
+            with open(path, 'wb') as fp:
+                for _ in range(file_size_mib):
+                    fp.write(os.urandom(2 ** 20))
+            paths.append(path)
+        cache_path = os.path.join(tmp_dir, 'checksums.json')
+        start = time.perf_counter()
+        expected = {path: md5_128(path) for path in paths}
+        print('{:>8} files of {} MiB, {:>12}: {:8.2f}s'.format(n_files, file_size_mib, '128 B reads',
+                                                              time.perf_counter() - start))
+        for label in ('parallel', 'cached'):
+            start = time.perf_counter()
+            result = checksums.compute_checksums(paths, cache_path=cache_path)
+            print('{:>8} files of {} MiB, {:>12}: {:8.2f}s'.format(n_files, file_size_mib, label,
+                                                                  time.perf_counter() - start))
+            assert result == expected
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def main(argv=None):
+    argv = [int(x) for x in (argv or [])]
+    n_files = argv[0] if len(argv) > 0 else 16
+    file_size_mib = argv[1] if len(argv) > 1 else 64
+    bench_checksums(n_files, file_size_mib)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
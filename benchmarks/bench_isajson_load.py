@@ -0,0 +1,57 @@
+"""Benchmark of loading ISA-JSON with isajson.load().
+
+Usage:
+
+    python -m benchmarks.bench_isajson_load [n_processes ...]
+
+Reports the time taken and the peak memory used to load, with isajson.load() and isajson.stream_load(), a synthetic
+investigation whose assay has the given number of processes, each sample being extracted and then run into a raw data
+file by two processes linked with previousProcess/nextProcess.
+"""
+from __future__ import absolute_import
+import json
+import sys
+import time
+import tracemalloc
+from io import BytesIO, StringIO
+
+from benchmarks.bench_isatab_dump import create_investigation
+from isatools import isajson
+
+
+def create_isajson(n_processes):
+    investigation = create_investigation(max(1, n_processes // 2))
+    study = investigation.studies[0]
+    study.characteristic_categories.append(study.sources[0].characteristics[0].category)
+    for assay in study.assays:
+        for process in assay.process_sequence:
+            if process.executes_protocol.name == 'extraction':
+                assay.samples.extend(process.inputs)
+                assay.other_material.extend(process.outputs)
+            else:
+                assay.data_files.extend(process.outputs)
+    return json.dumps(investigation, cls=isajson.ISAJSONEncoder)
+
+
+def bench_load(n_processes):
+    isa_json = create_isajson(n_processes)
+    for load, fp in ((isajson.load, StringIO(isa_json)), (isajson.stream_load, BytesIO(isa_json.encode('utf-8')))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        investigation = load(fp)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('{:>8} processes, {:>11}: {:8.2f}s, peak {:8.1f} MiB for {:8.1f} MiB of JSON'.format(
+            len(investigation.studies[0].assays[0].process_sequence), load.__name__, elapsed, peak / 2 ** 20,
+            len(isa_json) / 2 ** 20))
+
+
+def main(argv=None):
+    sizes = [int(x) for x in (argv or [1000, 10000, 100000])]
+    for n_processes in sizes:
+        bench_load(n_processes)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,63 @@
+"""Benchmark of the semantic rules of isajson.validate() on a large document.
+
+Usage:
+
+    python -m benchmarks.bench_isajson_rules [n_processes ...]
+
+Reports the time taken by isajson.validate() on a synthetic investigation whose assay has the given number of
+processes, and the part of it spent collecting the identifiers and annotations shared by the semantic rules.
+"""
+from __future__ import absolute_import
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_isajson_load import create_isajson
+from isatools import isajson
+
+ID_COLLECTOR_FUNCS = [
+    isajson.get_source_ids, isajson.get_sample_ids, isajson.get_material_ids, isajson.get_data_file_ids,
+    isajson.get_io_ids_in_process_sequence, isajson.get_study_and_assay_characteristic_category_ids,
+    isajson.get_characteristic_category_ids_in_study_and_assay_materials, isajson.get_study_factor_ids,
+    isajson.get_study_factor_ids_in_sample_factor_values, isajson.get_study_protocols_parameter_ids,
+    isajson.get_parameter_value_parameter_ids, isajson.get_study_and_assay_unit_category_ids,
+    isajson.get_unit_category_ids_in_study_and_assay_materials_and_processes, isajson.get_study_protocol_ids,
+    isajson.get_process_protocol_ids,
+]
+
+
+def bench_rules(n_processes):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        json_path = os.path.join(tmp_dir, 'isa.json')
+        with open(json_path, 'w') as fp:
+            fp.write(create_isajson(n_processes))
+        with open(json_path) as fp:
+            start = time.perf_counter()
+            index = isajson.ISAJSONIndex(json.load(fp))
+            for study_index in index.studies:
+                for id_collector_func in ID_COLLECTOR_FUNCS:
+                    study_index.get(id_collector_func)
+            index.annotations
+            indexed = time.perf_counter() - start
+        with open(json_path) as fp:
+            start = time.perf_counter()
+            isajson.validate(fp)
+            elapsed = time.perf_counter() - start
+        print('{:>8} processes: {:8.2f}s to validate, {:8.2f}s of which to collect identifiers'.format(
+            n_processes, elapsed, indexed))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def main(argv=None):
+    sizes = [int(x) for x in (argv or [1000, 10000])]
+    for n_processes in sizes:
+        bench_rules(n_processes)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,47 @@
+"""Benchmark of validating ISA-JSON against the ISA-JSON schemas, as done by isajson.validate().
+
+Usage:
+
+    python -m benchmarks.bench_isajson_validate [n_documents ...]
+
+Reports the time taken to check a series of small synthetic documents against the core and the default configuration
+schemas, building the schema validators again for every document (as before they were cached) and reusing them.
+"""
+from __future__ import absolute_import
+import json
+import os
+import sys
+import time
+
+from benchmarks.bench_isajson_load import create_isajson
+from isatools import isajson
+
+SCHEMA_PATHS = [
+    os.path.join(isajson.BASE_DIR, 'resources', 'schemas', 'isa_model_version_1_0_schemas', 'core',
+                 'investigation_schema.json'),
+    os.path.join(isajson.default_config_dir, 'schemas', 'investigation_schema.json'),
+]
+
+
+def bench_validate(n_documents):
+    isa_json = json.loads(create_isajson(4))
+    for cached in (False, True):
+        start = time.perf_counter()
+        for _ in range(n_documents):
+            if not cached:
+                isajson._schema_validators.clear()
+            for schema_path in SCHEMA_PATHS:
+                isajson.check_isa_schemas(isa_json, schema_path)
+        elapsed = time.perf_counter() - start
+        print('{:>8} documents, {:>8} validators: {:8.2f}s'.format(
+            n_documents, 'cached' if cached else 'rebuilt', elapsed))
+
+
+def main(argv=None):
+    sizes = [int(x) for x in (argv or [1000])]
+    for n_documents in sizes:
+        bench_validate(n_documents)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,44 @@
+"""Benchmark of loading the XML table configurations used by isatab.validate().
+
+Usage:
+
+    python -m benchmarks.bench_isatab_configs [n_loads ...]
+
+Reports the time taken to load the default configurations the given number of times by parsing the XML files, from
+the cache on disk, and from the configurations already loaded in the process.
+"""
+from __future__ import absolute_import
+import shutil
+import sys
+import tempfile
+import time
+
+from isatools import isatab
+from isatools.io import isatab_configurator
+
+
+def bench_configs(n_loads):
+    cache_dir = tempfile.mkdtemp()
+    try:
+        isatab_configurator.load(isatab.default_config_dir, cache_dir=cache_dir)
+        for source in ('parsed', 'disk cache', 'process'):
+            start = time.perf_counter()
+            for _ in range(n_loads):
+                if source != 'process':
+                    isatab_configurator._registry.clear()
+                isatab_configurator.load(isatab.default_config_dir,
+                                         cache_dir=cache_dir if source == 'disk cache' else None)
+            elapsed = time.perf_counter() - start
+            print('{:>8} loads, {:>10}: {:8.3f}s'.format(n_loads, source, elapsed))
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def main(argv=None):
+    sizes = [int(x) for x in (argv or [100])]
+    for n_loads in sizes:
+        bench_configs(n_loads)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
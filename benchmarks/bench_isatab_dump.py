@@ -0,0 +1,79 @@
+"""Benchmark of writing study and assay tables with isatab.dump().
+
+Usage:
+
+    python -m benchmarks.bench_isatab_dump [n_samples ...]
+
+Reports the time taken to write the table files and the peak memory allocated while writing them, not counting the
+investigation itself.
+"""
+from __future__ import absolute_import
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from isatools import isatab
+from isatools.model import *
+
+
+def create_investigation(n_samples):
+    """Returns an investigation with one study, where each sample comes from its own source, and one mass
+    spectrometry assay where each sample is extracted and then run into a raw data file"""
+    organism = OntologyAnnotation(term='organism')
+    sample_collection = Protocol(name='sample collection')
+    extraction = Protocol(name='extraction', protocol_type=OntologyAnnotation(term='extraction'))
+    mass_spectrometry = Protocol(name='mass spectrometry',
+                                 protocol_type=OntologyAnnotation(term='mass spectrometry'))
+    study = Study(filename='s_study.txt', protocols=[sample_collection, extraction, mass_spectrometry])
+    assay = Assay(filename='a_assay.txt')
+    for i in range(n_samples):
+        source = Source(name='source{}'.format(i), characteristics=[
+            Characteristic(category=organism, value=OntologyAnnotation(term='Homo sapiens'))])
+        sample = Sample(name='sample{}'.format(i), derives_from=[source])
+        extract = Extract(name='extract{}'.format(i))
+        data_file = RawDataFile(filename='sample{}.raw'.format(i))
+        study.sources.append(source)
+        study.samples.append(sample)
+        study.process_sequence.append(Process(executes_protocol=sample_collection, inputs=[source], outputs=[sample]))
+        extraction_process = Process(executes_protocol=extraction, inputs=[sample], outputs=[extract])
+        ms_process = Process(executes_protocol=mass_spectrometry, name='run{}'.format(i), inputs=[extract],
+                             outputs=[data_file])
+        plink(extraction_process, ms_process)
+        assay.process_sequence.extend([extraction_process, ms_process])
+    study.assays.append(assay)
+    return Investigation(studies=[study])
+
+
+def bench_dump(n_samples):
+    investigation = create_investigation(n_samples)
+    for study in investigation.studies:
+        study.graph
+        for assay in study.assays:
+            assay.graph
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        isatab.write_study_table_files(investigation, tmp_dir)
+        isatab.write_assay_table_files(investigation, tmp_dir)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        size = sum(os.path.getsize(os.path.join(tmp_dir, f)) for f in os.listdir(tmp_dir))
+        print('{:>8} samples: {:8.2f}s, peak {:8.1f} MiB for {:8.1f} MiB of tables'.format(
+            n_samples, elapsed, peak / 2 ** 20, size / 2 ** 20))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def main(argv=None):
+    sizes = [int(x) for x in (argv or [1000, 10000, 200000])]
+    for n_samples in sizes:
+        bench_dump(n_samples)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
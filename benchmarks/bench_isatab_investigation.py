@@ -0,0 +1,68 @@
+"""Benchmark of writing and reading back the investigation file with isatab.dump() and isatab.load().
+
+Usage:
+
+    python -m benchmarks.bench_isatab_investigation [n_studies ...]
+
+Reports the time taken to write the investigation file of an investigation with the given number of studies, each
+declaring 20 protocols, contacts, publications, factors, design descriptors and assays, and to read it back into
+section tables.
+"""
+from __future__ import absolute_import
+import sys
+import time
+from io import StringIO
+
+from isatools import isatab
+from isatools.model import *
+
+N_ITEMS = 20
+
+
+def create_investigation(n_studies):
+    obi = OntologySource(name='OBI')
+    investigation = Investigation(identifier='i1', ontology_source_references=[obi])
+    for i in range(n_studies):
+        study = Study(identifier='s{}'.format(i), filename='s_study{}.txt'.format(i))
+        for j in range(N_ITEMS):
+            study.protocols.append(Protocol(
+                name='protocol{}'.format(j),
+                protocol_type=OntologyAnnotation(term='extraction', term_source=obi),
+                parameters=[ProtocolParameter(parameter_name=OntologyAnnotation(term='parameter{}'.format(k)))
+                            for k in range(3)]))
+            study.contacts.append(Person(last_name='last{}'.format(j), first_name='first{}'.format(j),
+                                         roles=[OntologyAnnotation(term='author', term_source=obi)]))
+            study.publications.append(Publication(pubmed_id='{:08d}'.format(j), title='title{}'.format(j),
+                                                  status=OntologyAnnotation(term='published')))
+            study.factors.append(StudyFactor(name='factor{}'.format(j),
+                                             factor_type=OntologyAnnotation(term='dose', term_source=obi)))
+            study.design_descriptors.append(OntologyAnnotation(term='design{}'.format(j), term_source=obi))
+            study.assays.append(Assay(filename='a_study{}_assay{}.txt'.format(i, j),
+                                      measurement_type=OntologyAnnotation(term='metabolite profiling'),
+                                      technology_type=OntologyAnnotation(term='mass spectrometry')))
+        investigation.studies.append(study)
+    return investigation
+
+
+def bench_investigation(n_studies):
+    investigation = create_investigation(n_studies)
+    fp = StringIO()
+    start = time.perf_counter()
+    isatab._write_investigation_file(investigation, fp)
+    elapsed = time.perf_counter() - start
+    print('{:>8} studies: {:8.2f}s to write {:8.1f} KiB'.format(n_studies, elapsed, len(fp.getvalue()) / 2 ** 10))
+    fp.seek(0)
+    start = time.perf_counter()
+    isatab.read_investigation_file(fp)
+    elapsed = time.perf_counter() - start
+    print('{:>8} studies: {:8.2f}s to read'.format(n_studies, elapsed))
+
+
+def main(argv=None):
+    sizes = [int(x) for x in (argv or [100])]
+    for n_studies in sizes:
+        bench_investigation(n_studies)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
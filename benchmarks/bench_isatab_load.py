@@ -0,0 +1,105 @@
+"""Benchmark of isatab.load() on synthetic study and assay tables.
+
+Usage:
+
+    python -m benchmarks.bench_isatab_load [n_rows ...]
+
+Also reports the time taken to open an archive of 40 studies with lazy_load_tables=True and use one of its assays,
+against loading all of its tables, and the time taken to load a study of 40 assays with the assay tables parsed one
+after another and in as many worker processes as there are CPUs, and the time taken to load an archive from its
+snapshot.
+"""
+from __future__ import absolute_import
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from isatools import isatab
+from benchmarks.synthetic import write_archive
+
+
+def bench_load(n_rows):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        i_file_path = write_archive(tmp_dir, n_rows)
+        start = time.perf_counter()
+        with open(i_file_path, encoding='utf-8') as fp:
+            investigation = isatab.load(fp)
+        elapsed = time.perf_counter() - start
+        study = investigation.studies[0]
+        assay = study.assays[0]
+        print('{:>8} rows: {:8.2f}s  ({} study processes, {} assay processes)'.format(
+            n_rows, elapsed, len(study.process_sequence), len(assay.process_sequence)))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def bench_lazy_load(n_rows, n_studies=40):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        i_file_path = write_archive(tmp_dir, n_rows, n_studies=n_studies)
+        timings = list()
+        for lazy_load_tables in (False, True):
+            start = time.perf_counter()
+            with open(i_file_path, encoding='utf-8') as fp:
+                investigation = isatab.load(fp, lazy_load_tables=lazy_load_tables)
+            open_time = time.perf_counter() - start
+            n_processes = len(investigation.studies[n_studies // 2].assays[0].process_sequence)
+            timings.append((open_time, time.perf_counter() - start, n_processes))
+        print('{:>8} rows x {} studies: all tables {:8.2f}s, lazy open {:8.3f}s, lazy open and one assay {:8.2f}s'
+              .format(n_rows, n_studies, timings[0][1], timings[1][0], timings[1][1]))
+        assert timings[0][2] == timings[1][2]
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def bench_parallel_load(n_rows, n_assays=40):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        i_file_path = write_archive(tmp_dir, n_rows, n_assays=n_assays)
+        timings = list()
+        for n_workers in (1, None):
+            start = time.perf_counter()
+            with open(i_file_path, encoding='utf-8') as fp:
+                investigation = isatab.load(fp, n_workers=n_workers)
+            timings.append((time.perf_counter() - start, isatab.dumps(investigation)))
+        print('{:>8} rows x {} assays: serial {:8.2f}s, {} workers {:8.2f}s'.format(
+            n_rows, n_assays, timings[0][0], os.cpu_count(), timings[1][0]))
+        assert timings[0][1] == timings[1][1]
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def bench_snapshot_load(n_rows):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        write_archive(tmp_dir, n_rows, n_studies=2, n_assays=2)
+        snapshot_dir = os.path.join(tmp_dir, 'snapshots')
+        timings = list()
+        for snapshot_dir_option in (None, snapshot_dir, snapshot_dir):
+            start = time.perf_counter()
+            investigation = isatab.load(tmp_dir, snapshot_dir=snapshot_dir_option)
+            timings.append((time.perf_counter() - start, isatab.dumps(investigation)))
+        snapshot_size = sum(os.path.getsize(os.path.join(snapshot_dir, x)) for x in os.listdir(snapshot_dir))
+        print('{:>8} rows x 2 studies x 2 assays: parse {:8.2f}s, parse and snapshot {:8.2f}s, '
+              'from snapshot {:8.2f}s ({:.1f} MB)'.format(n_rows, timings[0][0], timings[1][0], timings[2][0],
+                                                          snapshot_size / 2 ** 20))
+        assert timings[0][1] == timings[1][1] == timings[2][1]
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def main(argv=None):
+    sizes = [int(x) for x in (argv or [1000, 10000, 100000])]
+    for n_rows in sizes:
+        bench_load(n_rows)
+    for n_rows in sizes[:2]:
+        bench_lazy_load(n_rows)
+        bench_parallel_load(n_rows)
+        bench_snapshot_load(n_rows)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,54 @@
+"""Benchmark of building the process graph of a study with many samples.
+
+Usage:
+
+    python -m benchmarks.bench_model_graph [n_samples ...]
+"""
+from __future__ import absolute_import
+import sys
+import time
+
+from isatools.model import *
+
+
+def create_study(n_samples):
+    """Returns a study where each sample is collected from its own characterised source, then extracted"""
+    organism = OntologyAnnotation(term='organism')
+    sample_collection = Protocol(name='sample collection')
+    extraction = Protocol(name='extraction')
+    study = Study(filename='s_study.txt', protocols=[sample_collection, extraction])
+    for i in range(n_samples):
+        source = Source(name='source{}'.format(i), characteristics=[
+            Characteristic(category=organism, value=OntologyAnnotation(term='Homo sapiens'))])
+        sample = Sample(name='sample{}'.format(i), derives_from=[source])
+        extract = Extract(name='extract{}'.format(i))
+        collection_process = Process(executes_protocol=sample_collection, inputs=[source], outputs=[sample])
+        extraction_process = Process(executes_protocol=extraction, inputs=[sample], outputs=[extract])
+        plink(collection_process, extraction_process)
+        study.sources.append(source)
+        study.samples.append(sample)
+        study.process_sequence.extend([collection_process, extraction_process])
+    return study
+
+
+def bench_graph(n_samples):
+    study = create_study(n_samples)
+    start = time.perf_counter()
+    graph = study.graph
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    nodes = set(study.sources) | set(study.samples)
+    hits = sum(1 for n in graph.nodes() if n in nodes)
+    lookup_time = time.perf_counter() - start
+    print('{:>8} samples: graph built in {:6.2f}s, {} node lookups in {:6.2f}s'.format(
+        n_samples, build_time, hits, lookup_time))
+
+
+def main(argv=None):
+    sizes = [int(x) for x in (argv or [1000, 10000])]
+    for n_samples in sizes:
+        bench_graph(n_samples)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,57 @@
+"""Benchmark of building an offline ontology term index and checking terms against it.
+
+Usage:
+
+    python -m benchmarks.bench_ontology_index [n_terms ...]
+
+Reports the time taken to index an OBO file of the given number of terms, and to look up 100,000 accessions in the
+index.
+"""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from isatools.io import ontology_index
+
+N_LOOKUPS = 100000
+
+
+def write_obo(path, n_terms):
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write('format-version: 1.2\nontology: synthetic\n')
+        for i in range(n_terms):
+            fp.write('\n[Term]\nid: SYN:{0:07d}\nname: synthetic term {0}\nis_a: SYN:{1:07d}\n'.format(i, i // 2))
+
+
+def bench_index(n_terms):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(tmp_dir, 'ontologies'))
+        write_obo(os.path.join(tmp_dir, 'ontologies', 'SYN.obo'), n_terms)
+        start = time.perf_counter()
+        index = ontology_index.build_index(os.path.join(tmp_dir, 'terms.db'), os.path.join(tmp_dir, 'ontologies'))
+        build_time = time.perf_counter() - start
+        accessions = ['http://purl.obolibrary.org/obo/SYN_{:07d}'.format(random.randrange(2 * n_terms))
+                      for _ in range(N_LOOKUPS)]
+        start = time.perf_counter()
+        hits = sum(1 for accession in accessions if index.labels('SYN', accession))
+        lookup_time = time.perf_counter() - start
+        index.close()
+        print('{:>9} terms: indexed in {:6.2f}s, {} lookups ({} hits) in {:6.2f}s'.format(
+            n_terms, build_time, N_LOOKUPS, hits, lookup_time))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def main(argv=None):
+    sizes = [int(x) for x in (argv or [100000, 1000000])]
+    for n_terms in sizes:
+        bench_index(n_terms)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,89 @@
+"""Benchmark of exporting a study with many sequencing runs to SRA XML with sra.export().
+
+Usage:
+
+    python -m benchmarks.bench_sra_export [n_runs ...]
+"""
+from __future__ import absolute_import
+import shutil
+import sys
+import tempfile
+import time
+
+from isatools import sra
+from isatools.model import *
+
+
+def create_investigation(n_runs):
+    """Returns an investigation with a genome sequencing assay of n_runs runs, each sequencing a library prepared from
+    the nucleic acids extracted from its own sample, two samples being collected per source"""
+    investigation = Investigation(identifier='i1')
+    study = Study(identifier='s1', title='Synthetic SRA study', description='Synthetic SRA study',
+                  filename='s_study.txt', submission_date='2020-01-01', public_release_date='2020-01-01')
+    study.contacts = [Person(last_name='Doe', first_name='Jane', email='jane.doe@example.com',
+                             roles=[OntologyAnnotation(term='SRA Inform On Status'),
+                                    OntologyAnnotation(term='SRA Inform On Error')])]
+    sample_collection = Protocol(name='sample collection', protocol_type=OntologyAnnotation(term='sample collection'))
+    extraction = Protocol(name='nucleic acid extraction',
+                          protocol_type=OntologyAnnotation(term='nucleic acid extraction'))
+    library_construction = Protocol(
+        name='library construction', protocol_type=OntologyAnnotation(term='library construction'),
+        description='Synthetic library construction', parameters=[
+            ProtocolParameter(parameter_name=OntologyAnnotation(term=name)) for name in (
+                'target_taxon', 'library source', 'library strategy', 'library selection', 'library layout')])
+    sequencing = Protocol(
+        name='nucleic acid sequencing', protocol_type=OntologyAnnotation(term='nucleic acid sequencing'),
+        parameters=[ProtocolParameter(parameter_name=OntologyAnnotation(term='sequencing instrument'))])
+    study.protocols = [sample_collection, extraction, library_construction, sequencing]
+    organism = OntologyAnnotation(term='organism')
+    homo_sapiens = OntologyAnnotation(term='Homo sapiens',
+                                      term_accession='http://purl.obolibrary.org/obo/NCBITaxon_9606')
+    library_pvs = [ParameterValue(category=parameter, value=value) for parameter, value in zip(
+        library_construction.parameters, ('Homo sapiens', 'GENOMIC', 'WGS', 'RANDOM', 'SINGLE'))]
+    sequencing_pvs = [ParameterValue(category=sequencing.parameters[0], value='Illumina HiSeq 2000')]
+    assay = Assay(filename='a_assay.txt', measurement_type=OntologyAnnotation(term='genome sequencing'),
+                  technology_type=OntologyAnnotation(term='nucleotide sequencing'))
+    for i in range(n_runs):
+        if i % 2 == 0:
+            source = Source(name='source{}'.format(i // 2),
+                            characteristics=[Characteristic(category=organism, value=homo_sapiens)])
+            study.sources.append(source)
+        sample = Sample(name='sample{}'.format(i), derives_from=[source])
+        study.samples.append(sample)
+        study.process_sequence.append(
+            Process(executes_protocol=sample_collection, inputs=[source], outputs=[sample]))
+        extract = Extract(name='extract{}'.format(i))
+        library = LabeledExtract(name='library{}'.format(i))
+        data_file = DataFile(filename='run{}.fastq.gz'.format(i), label='Raw Data File')
+        extraction_process = Process(executes_protocol=extraction, inputs=[sample], outputs=[extract])
+        library_process = Process(executes_protocol=library_construction, parameter_values=library_pvs,
+                                  inputs=[extract], outputs=[library])
+        sequencing_process = Process(name='run{}'.format(i), executes_protocol=sequencing,
+                                     parameter_values=sequencing_pvs, inputs=[library], outputs=[data_file])
+        plink(extraction_process, library_process)
+        plink(library_process, sequencing_process)
+        assay.process_sequence.extend([extraction_process, library_process, sequencing_process])
+    study.assays.append(assay)
+    investigation.studies.append(study)
+    return investigation
+
+
+def bench_export(n_runs):
+    investigation = create_investigation(n_runs)
+    export_dir = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        sra.export(investigation, export_dir)
+        print('{:>8} runs: exported in {:8.2f}s'.format(n_runs, time.perf_counter() - start))
+    finally:
+        shutil.rmtree(export_dir)
+
+
+def main(argv=None):
+    sizes = [int(x) for x in (argv or [1000, 5000, 20000])]
+    for n_runs in sizes:
+        bench_export(n_runs)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
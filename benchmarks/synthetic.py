@@ -0,0 +1,78 @@
+"""Synthetic ISA content generators shared by the benchmarks."""
+from __future__ import absolute_import
+import os
+
+from isatools import isatab
+from isatools.model import *
+
+
+STUDY_TABLE_HEADER = ['Source Name', 'Characteristics[organism]', 'Term Source REF', 'Term Accession Number',
+                      'Protocol REF', 'Parameter Value[temperature]', 'Unit', 'Term Source REF',
+                      'Term Accession Number', 'Sample Name', 'Factor Value[dose]']
+
+ASSAY_TABLE_HEADER = ['Sample Name', 'Protocol REF', 'Parameter Value[kit]', 'Extract Name', 'Protocol REF',
+                      'MS Assay Name', 'Raw Data File', 'Protocol REF', 'Derived Spectral Data File']
+
+
+def create_investigation(n_studies=1, n_assays=1):
+    """Returns an Investigation with the protocols and factors used in the synthetic tables, but no process
+    sequences"""
+    investigation = Investigation(identifier='i1', title='Synthetic investigation')
+    ncbitaxon = OntologySource(name='NCBITAXON')
+    uo = OntologySource(name='UO')
+    investigation.ontology_source_references = [ncbitaxon, uo]
+    for i in range(n_studies):
+        study = Study(identifier='s{}'.format(i), title='Synthetic study {}'.format(i),
+                      filename='s_study_{}.txt'.format(i))
+        study.protocols = [
+            Protocol(name='sample collection', protocol_type=OntologyAnnotation(term='sample collection'),
+                     parameters=[ProtocolParameter(parameter_name=OntologyAnnotation(term='temperature'))]),
+            Protocol(name='extraction', protocol_type=OntologyAnnotation(term='extraction'),
+                     parameters=[ProtocolParameter(parameter_name=OntologyAnnotation(term='kit'))]),
+            Protocol(name='mass spectrometry', protocol_type=OntologyAnnotation(term='mass spectrometry')),
+            Protocol(name='data transformation', protocol_type=OntologyAnnotation(term='data transformation'))
+        ]
+        study.factors = [StudyFactor(name='dose', factor_type=OntologyAnnotation(term='dose'))]
+        assay_filenames = ['a_assay_{}.txt'.format(i)] if n_assays == 1 else [
+            'a_assay_{}_{}.txt'.format(i, j) for j in range(n_assays)]
+        study.assays = [Assay(filename=filename,
+                              measurement_type=OntologyAnnotation(term='metabolite profiling'),
+                              technology_type=OntologyAnnotation(term='mass spectrometry'))
+                        for filename in assay_filenames]
+        investigation.studies.append(study)
+    return investigation
+
+
+def study_table_rows(n_rows):
+    """Yields the rows of a study table with n_rows samples, three per source"""
+    yield STUDY_TABLE_HEADER
+    for i in range(n_rows):
+        yield ['source{}'.format(i // 3), 'Homo sapiens', 'NCBITAXON', '9606', 'sample collection',
+               str(4 + i % 2), 'degree Celsius', 'UO', 'UO_0000027', 'sample{}'.format(i),
+               ('low', 'high')[i % 2]]
+
+
+def assay_table_rows(n_rows):
+    """Yields the rows of an assay table with n_rows runs, two per sample"""
+    yield ASSAY_TABLE_HEADER
+    for i in range(n_rows):
+        yield ['sample{}'.format(i // 2), 'extraction', ('kit A', 'kit B')[i % 2], 'extract{}'.format(i),
+               'mass spectrometry', 'assay{}'.format(i), 'raw{}.mzML'.format(i), 'data transformation',
+               'derived{}.txt'.format(i // 10)]
+
+
+def write_table(rows, path):
+    with open(path, 'w', encoding='utf-8') as fp:
+        for row in rows:
+            fp.write('\t'.join('"{}"'.format(x) for x in row) + '\n')
+
+
+def write_archive(output_dir, n_rows, n_studies=1, n_assays=1):
+    """Writes a synthetic ISA-Tab archive whose study and assay tables each have n_rows rows"""
+    investigation = create_investigation(n_studies=n_studies, n_assays=n_assays)
+    isatab.dump(investigation, output_dir, skip_dump_tables=True)
+    for study in investigation.studies:
+        write_table(study_table_rows(n_rows), os.path.join(output_dir, study.filename))
+        for assay in study.assays:
+            write_table(assay_table_rows(n_rows), os.path.join(output_dir, assay.filename))
+    return os.path.join(output_dir, 'i_investigation.txt')
@@ -0,0 +1,148 @@
+"""Runs a validator over a batch of files in a pool of worker processes.
+
+The ISA-Tab and ISA-JSON validators keep their results in module-level lists and attach a logging handler for the
+duration of a run, so two validations can't share a process. Each worker here is a separate process validating one
+file at a time, which gives every validation its own state. A worker that runs past the timeout is terminated and
+replaced by a fresh one, so a single pathological file can't stall the batch.
+"""
+from __future__ import absolute_import
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+from isatools import config
+
+logging.basicConfig(level=config.log_level)
+log = logging.getLogger(__name__)
+
+
+def _work(conn, parent_conn, validate_file):
+    """Worker process loop: validates the files received on conn until it gets None or the parent goes away"""
+    parent_conn.close()
+    while True:
+        try:
+            filename = conn.recv()
+        except EOFError:
+            break
+        if filename is None:
+            break
+        try:
+            conn.send((True, validate_file(filename)))
+        except Exception as e:
+            conn.send((False, "{}: {}".format(type(e).__name__, e)))
+    conn.close()
+
+
+class _Worker(object):
+
+    def __init__(self, validate_file):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_work, args=(child_conn, self.conn, validate_file))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+        self.task = None
+        self.deadline = None
+
+    def submit(self, task, filename, timeout):
+        self.conn.send(filename)
+        self.task = task
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+
+    def stop(self):
+        if self.task is None and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+def failed_report(filename, reason):
+    """Builds the batch report entry of a file whose validation did not finish"""
+    return {
+        "filename": filename,
+        "report": {
+            "errors": [{
+                "message": "Unknown/System Error",
+                "supplemental": "Validation of {} did not finish: {}".format(filename, reason),
+                "code": 0
+            }],
+            "warnings": [],
+            "validation_finished": False
+        }
+    }
+
+
+def imap_validate(validate_file, filenames, n_workers=None, timeout=None):
+    """Validates files in worker processes and yields the batch report entries as they complete
+
+    :param validate_file: Module-level function taking a file name and returning its batch report entry, a dict with
+    the 'filename' and 'report' keys
+    :param filenames: List of files to validate
+    :param n_workers: Number of worker processes, defaults to the number of CPUs
+    :param timeout: Seconds a single file may take to validate, None for no limit
+    :return: Generator of (position of the file in filenames, batch report entry) tuples, in order of completion
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if n_workers < 1:
+        raise ValueError("n_workers must be at least 1, got {}".format(n_workers))
+    tasks = deque(enumerate(filenames))
+    idle = [_Worker(validate_file) for _ in range(min(n_workers, len(tasks)))]
+    busy = list()
+    try:
+        while tasks or busy:
+            while tasks and idle:
+                worker = idle.pop()
+                task, filename = tasks.popleft()
+                log.info("***Validating {}***\n".format(filename))
+                worker.submit(task, filename, timeout)
+                busy.append(worker)
+            deadlines = [w.deadline for w in busy if w.deadline is not None]
+            wait_timeout = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+            ready = wait([w.conn for w in busy] + [w.process.sentinel for w in busy], wait_timeout)
+            finished = list()
+            for worker in list(busy):
+                task = worker.task
+                filename = filenames[task]
+                if worker.conn in ready:
+                    try:
+                        succeeded, result = worker.conn.recv()
+                    except EOFError:
+                        succeeded, result = None, None
+                elif worker.process.sentinel in ready:
+                    succeeded, result = None, None
+                elif worker.deadline is not None and time.monotonic() >= worker.deadline:
+                    succeeded, result = None, "timed out after {} seconds".format(timeout)
+                else:
+                    continue
+                busy.remove(worker)
+                if succeeded is None:
+                    # The worker died or has to be killed, replace it with a new one
+                    worker.stop()
+                    if result is None:
+                        result = "worker process exited with code {}".format(worker.process.exitcode)
+                    log.warning("Validation of {} did not finish: {}".format(filename, result))
+                    finished.append((task, failed_report(filename, result)))
+                    if tasks:
+                        idle.append(_Worker(validate_file))
+                    continue
+                if not succeeded:
+                    log.warning("Validation of {} did not finish: {}".format(filename, result))
+                    result = failed_report(filename, result)
+                worker.task = None
+                idle.append(worker)
+                finished.append((task, result))
+            for entry in finished:
+                yield entry
+    finally:
+        for worker in idle + busy:
+            worker.stop()
@@ -0,0 +1,137 @@
+"""Checksums of data files, as needed for submissions and archive manifests.
+
+Files are read in large blocks and hashed in a pool of threads, hashlib releasing the GIL while it digests a block,
+so several files are read and hashed at once. Checksums are kept in a cache on disk keyed by the path, size and
+modification time of each file, so a file is only hashed again once it changes.
+
+Usage:
+
+    >>> checksums = compute_checksums(['/data/run1.fastq.gz', '/data/run2.fastq.gz'], algorithm='md5')
+    >>> with open('/data/md5sums.txt', 'w') as fp:
+    ...     write_manifest(checksums, fp, root='/data')
+"""
+from __future__ import absolute_import
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from isatools import config
+
+logging.basicConfig(level=config.log_level)
+log = logging.getLogger(__name__)
+
+SUPPORTED_ALGORITHMS = ('md5', 'sha256')
+BLOCK_SIZE = 2 ** 20  # bytes
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.isatools', 'checksums.json')
+
+
+def file_checksum(path, algorithm='md5', block_size=BLOCK_SIZE):
+    """Returns the hex digest of the file at path"""
+    digest = hashlib.new(algorithm)
+    block = bytearray(block_size)
+    view = memoryview(block)
+    with open(path, 'rb', buffering=0) as fp:
+        while True:
+            size = fp.readinto(block)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+class ChecksumCache(object):
+    """Checksums already computed, by algorithm and absolute path, with the size and modification time the file had
+    when it was hashed. Kept in a JSON file."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._entries = dict()
+        try:
+            with open(path) as fp:
+                self._entries = json.load(fp)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable checksum cache %s: %s", path, e)
+
+    @staticmethod
+    def _key(algorithm, path):
+        return '{}:{}'.format(algorithm, path)
+
+    def get(self, algorithm, path, stat):
+        """Returns the cached checksum of path, or None if the file changed since it was hashed"""
+        entry = self._entries.get(self._key(algorithm, path))
+        if entry is None or (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return entry['checksum']
+
+    def set(self, algorithm, path, stat, checksum):
+        self._entries[self._key(algorithm, path)] = {
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'checksum': checksum}
+
+    def save(self):
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(self._entries, fp)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("Could not write checksum cache %s: %s", self.path, e)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def compute_checksums(paths, algorithm='md5', n_workers=None, cache_path=DEFAULT_CACHE_PATH):
+    """Computes the checksums of files, in parallel, reusing those cached for files that have not changed.
+
+    :param paths: Paths of the files to hash
+    :param algorithm: One of SUPPORTED_ALGORITHMS
+    :param n_workers: Number of files hashed at once, by default the number of CPUs
+    :param cache_path: Path of the checksum cache, or None to hash every file
+    :return: dict of hex digests keyed by path, as given in paths
+    """
+    if algorithm not in SUPPORTED_ALGORITHMS:
+        raise ValueError("Unsupported checksum algorithm '{}', use one of {}".format(algorithm, SUPPORTED_ALGORITHMS))
+    stats = dict()
+    for path in paths:
+        if not os.path.isfile(path):
+            raise FileNotFoundError('{} is not a file'.format(path))
+        stats[path] = os.stat(path)
+    cache = ChecksumCache(cache_path) if cache_path is not None else None
+    checksums = dict()
+    to_hash = list()
+    for path, stat in stats.items():
+        checksum = cache.get(algorithm, os.path.abspath(path), stat) if cache is not None else None
+        if checksum is None:
+            to_hash.append(path)
+        else:
+            checksums[path] = checksum
+    log.debug("%s of %s files to hash", len(to_hash), len(stats))
+    if to_hash:
+        try:
+            with ThreadPoolExecutor(max_workers=n_workers or os.cpu_count() or 1) as executor:
+                for path, checksum in zip(to_hash, executor.map(lambda x: file_checksum(x, algorithm), to_hash)):
+                    checksums[path] = checksum
+                    if cache is not None:
+                        cache.set(algorithm, os.path.abspath(path), stats[path], checksum)
+        finally:
+            if cache is not None:
+                cache.save()  # keeps the checksums computed before any error
+    return checksums
+
+
+def write_manifest(checksums, fp, root=None):
+    """Writes checksums to fp in the format of md5sum and sha256sum, one '<checksum>  <path>' line per file sorted by
+    path. Paths are written relative to root if given."""
+    lines = list()
+    for path, checksum in checksums.items():
+        if root is not None:
+            path = os.path.relpath(path, root)
+        lines.append((path, checksum))
+    for path, checksum in sorted(lines):
+        fp.write('{}  {}\n'.format(checksum, path))
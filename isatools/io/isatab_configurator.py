@@ -15,7 +15,11 @@ import warnings as warnings_
 from lxml import etree as etree_
 import os
 import glob
+import hashlib
 import logging
+import pickle
+import tempfile
+import weakref
 
 from isatools import config
 
@@ -23,7 +27,24 @@ logging.basicConfig(level=config.log_level)
 log = logging.getLogger(__name__)
 
 
-def load(config_dir):
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.isatools', 'configs')
+_CACHE_FORMAT = 1
+
+# configurations loaded in this process, by configuration directory, with the signature of the files they came from
+_registry = dict()
+_indexes = weakref.WeakKeyDictionary()
+
+
+def _config_files_signature(config_dir):
+    """Names, modification times and sizes of the XML files in config_dir, which change whenever one of them does"""
+    signature = list()
+    for file in sorted(glob.iglob(os.path.join(config_dir, '*.xml'))):
+        stat = os.stat(file)
+        signature.append((os.path.basename(file), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _parse_config_dir(config_dir):
     config_dict = dict()
     for file in glob.iglob(os.path.join(config_dir, '*.xml')):
         try:
@@ -36,6 +57,96 @@ def load(config_dir):
     return config_dict
 
 
+def _cache_path(cache_dir, config_dir):
+    return os.path.join(cache_dir, hashlib.sha1(config_dir.encode('utf-8')).hexdigest() + '.pickle')
+
+
+def _read_cache(cache_path, signature):
+    try:
+        with open(cache_path, 'rb') as cache_fp:
+            cache_format, cached_signature, config_dict = pickle.load(cache_fp)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.debug("Ignoring unreadable configuration cache %s: %s", cache_path, e)
+        return None
+    if cache_format != _CACHE_FORMAT or cached_signature != signature:
+        return None
+    return config_dict
+
+
+def _write_cache(cache_path, signature, config_dict):
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+        with os.fdopen(fd, 'wb') as cache_fp:
+            pickle.dump((_CACHE_FORMAT, signature, config_dict), cache_fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)  # readers never see a partly written cache
+    except (OSError, pickle.PicklingError) as e:
+        log.debug("Could not write configuration cache %s: %s", cache_path, e)
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load(config_dir, cache_dir=None):
+    """Loads the table configurations in config_dir, keyed by measurement and technology type.
+
+    The XML files are parsed once per process. If cache_dir is given, such as DEFAULT_CACHE_DIR, the parsed
+    configurations are also pickled there so that other processes, like the workers of a batch validation, can skip
+    parsing too. Both are reused until an XML file is added to config_dir, removed from it or modified. The
+    configurations returned are shared and must not be modified.
+
+    :param config_dir: Directory of the XML configuration files
+    :param cache_dir: Directory of the cache on disk, None (the default) to not use one
+    :return: A dict of configurations keyed by (measurement type, technology type)
+    """
+    config_dir = os.path.abspath(config_dir)
+    signature = _config_files_signature(config_dir)
+    registered = _registry.get(config_dir)
+    if registered is None or registered[0] != signature:
+        config_dict = None
+        if cache_dir is not None:
+            config_dict = _read_cache(_cache_path(cache_dir, config_dir), signature)
+        if config_dict is None:
+            config_dict = _parse_config_dir(config_dir)
+            if cache_dir is not None:
+                _write_cache(_cache_path(cache_dir, config_dir), signature, config_dict)
+        registered = signature, config_dict
+        _registry[config_dir] = registered
+    return dict(registered[1])
+
+
+class TableConfigIndex(object):
+    """Lookups over the fields of a table configuration, as needed by the table validation rules"""
+
+    def __init__(self, config_obj):
+        table_config = config_obj.get_isatab_configuration()[0]
+        self.fields = table_config.get_field()
+        self.protocol_fields = table_config.get_protocol_field()
+        fields_by_header = dict()
+        self.fields_by_lower_header = dict()
+        for field in self.fields:
+            fields_by_header.setdefault(field.header, []).append(field)
+            self.fields_by_lower_header.setdefault(field.header.lower(), []).append(field)
+        # headers declared more than once are left out
+        self.fields_by_header = {header: matches[0] for header, matches in fields_by_header.items()
+                                 if len(matches) == 1}
+        self.required_headers = [field.header for field in self.fields if field.is_required]
+        self.unit_fields_by_pos = dict()
+        for unit_field in table_config.get_unit_field():
+            self.unit_fields_by_pos.setdefault(unit_field.pos, []).append(unit_field)
+
+
+def get_index(config_obj):
+    """Returns the TableConfigIndex of a configuration returned by load(), computed on first use"""
+    index = _indexes.get(config_obj)
+    if index is None:
+        index = TableConfigIndex(config_obj)
+        _indexes[config_obj] = index
+    return index
+
+
 def get_config(config_dict, measurement_type=None, technology_type=None):
     try:
         config = config_dict[(measurement_type, technology_type)].isatab_configuration[0]
@@ -0,0 +1,238 @@
+"""On-disk index of ontology terms, to check term accessions and labels without calling an ontology lookup service.
+
+The index is a SQLite database holding the accession and label of each term of the ontologies added to it, with one
+B-tree index on the accessions of each ontology, so a term is found in a few page reads whatever the number of terms
+indexed. The database file is memory-mapped, so lookups read pages straight from the page cache and several processes
+can share one index. Terms are read from OBO files, OWL files in RDF/XML, or dumps of the OLS API terms (JSON lines,
+one term document or page of terms per line), optionally gzipped.
+
+Accessions are compared in a normalised form: 'http://purl.obolibrary.org/obo/NCBITaxon_9606', 'NCBITaxon_9606' and
+'NCBITaxon:9606' all stand for the same term, and an accession without its prefix ('9606') is matched on its local
+identifier within the ontology.
+
+Usage:
+
+    >>> index = build_index('/data/terms.db', '/data/ontologies', ontology_names=['EFO', 'NCBITAXON'])
+    >>> index.labels('NCBITAXON', 'http://purl.obolibrary.org/obo/NCBITaxon_9606')
+    ['Homo sapiens']
+"""
+from __future__ import absolute_import
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import xml.etree.ElementTree as ET
+
+from isatools import config
+
+logging.basicConfig(level=config.log_level)
+log = logging.getLogger(__name__)
+
+MMAP_SIZE = 2 ** 32  # bytes of the database file memory-mapped
+ONTOLOGY_FILE_EXTENSIONS = ('.obo', '.owl', '.rdf', '.jsonl', '.json')
+
+_RDF = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}'
+_RDFS = '{http://www.w3.org/2000/01/rdf-schema#}'
+_OWL = '{http://www.w3.org/2002/07/owl#}'
+_RX_IRI_SEPARATOR = re.compile('[/#]')
+
+
+def normalize_accession(accession):
+    """Returns the lower-cased CURIE of a term accession given as an IRI, CURIE or local identifier, and its local
+    identifier"""
+    curie = _RX_IRI_SEPARATOR.split(accession.strip())[-1].lower()
+    if ':' not in curie and '_' in curie:
+        curie = curie.replace('_', ':', 1)
+    return curie, curie[curie.find(':') + 1:]
+
+
+def read_obo_terms(fp):
+    """Yields the (accession, label) of each [Term] stanza of an OBO file opened in text mode"""
+    in_term = False
+    accession = label = None
+    for line in fp:
+        line = line.strip()
+        if line.startswith('['):
+            if in_term and accession is not None:
+                yield accession, label
+            in_term = line == '[Term]'
+            accession = label = None
+        elif in_term and line.startswith('id:'):
+            accession = line[3:].strip()
+        elif in_term and line.startswith('name:'):
+            label = line[5:].strip()
+    if in_term and accession is not None:
+        yield accession, label
+
+
+def read_owl_terms(fp):
+    """Yields the (IRI, label) of each named owl:Class of an OWL file in RDF/XML opened in binary mode. The file is
+    parsed incrementally, so its document tree is never held in memory as a whole."""
+    depth = 0
+    root = None
+    for event, element in ET.iterparse(fp, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if element.tag == _OWL + 'Class' and depth == 1:
+            iri = element.get(_RDF + 'about')
+            if iri is not None:
+                labels = element.findall(_RDFS + 'label')
+                label = next((x.text for x in labels if x.get('{http://www.w3.org/XML/1998/namespace}lang')
+                              in (None, 'en')), labels[0].text if labels else None)
+                yield iri, label
+        if depth == 1:
+            root.clear()  # drops the top-level elements already read
+
+
+def read_ols_terms(fp):
+    """Yields the (IRI, label) of each term of a dump of the OLS API, in JSON lines of term documents or of pages of
+    the /ontologies/{ontology}/terms endpoint"""
+    for line in fp:
+        if not line.strip():
+            continue
+        J = json.loads(line)
+        for term_json in J['_embedded']['terms'] if '_embedded' in J else [J]:
+            yield term_json.get('iri') or term_json['obo_id'], term_json.get('label')
+
+
+def _open_ontology_file(path):
+    """Returns the terms reader for an ontology file, and the file opened in the mode the reader expects"""
+    name = path[:-3] if path.endswith('.gz') else path
+    _open = gzip.open if path.endswith('.gz') else open
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.obo':
+        return read_obo_terms, _open(path, 'rt', encoding='utf-8')
+    elif extension in ('.owl', '.rdf'):
+        return read_owl_terms, _open(path, 'rb')
+    elif extension in ('.jsonl', '.json'):
+        return read_ols_terms, _open(path, 'rt', encoding='utf-8')
+    raise ValueError("Unsupported ontology file '{}', expected one of {} (optionally gzipped)".format(
+        path, ONTOLOGY_FILE_EXTENSIONS))
+
+
+class TermIndex(object):
+    """Ontology terms kept in a SQLite database at path, by ontology name"""
+
+    def __init__(self, path, read_only=False):
+        """
+        :param path: Path of the database file, created if missing unless read_only
+        :param read_only: If True, open an existing index for lookups only
+        """
+        self.path = path
+        if read_only:
+            self._connection = sqlite3.connect('file:{}?mode=ro'.format(path), uri=True, check_same_thread=False)
+        else:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA mmap_size = {}'.format(MMAP_SIZE))
+        if not read_only:
+            with self._connection:
+                self._connection.execute(
+                    'CREATE TABLE IF NOT EXISTS ontologies (name TEXT PRIMARY KEY, n_terms INTEGER, signature TEXT)')
+                self._connection.execute(
+                    'CREATE TABLE IF NOT EXISTS terms (ontology TEXT NOT NULL, accession TEXT NOT NULL, '
+                    'local_id TEXT NOT NULL, label TEXT)')
+                self._connection.execute('CREATE INDEX IF NOT EXISTS terms_accession ON terms (ontology, accession)')
+                self._connection.execute('CREATE INDEX IF NOT EXISTS terms_local_id ON terms (ontology, local_id)')
+        self._ontologies = self._read_ontologies()
+
+    def _read_ontologies(self):
+        return dict((name, signature) for name, signature in self._connection.execute(
+            'SELECT name, signature FROM ontologies'))
+
+    def __contains__(self, ontology_name):
+        return ontology_name.lower() in self._ontologies
+
+    def ontologies(self):
+        """Returns the lower-cased names of the ontologies in the index"""
+        return set(self._ontologies)
+
+    def add_ontology(self, ontology_name, terms, signature=None):
+        """Replaces the terms of an ontology in the index
+
+        :param ontology_name: Name of the ontology, as used in Term Source REF columns
+        :param terms: Iterable of (accession, label) pairs
+        :param signature: Identifies the source of the terms, see add_file()
+        :return: Number of terms added
+        """
+        name = ontology_name.lower()
+
+        def rows():
+            for accession, label in terms:
+                yield (name,) + normalize_accession(accession) + (label,)
+
+        with self._connection:
+            self._connection.execute('DELETE FROM terms WHERE ontology = ?', (name,))
+            n_terms = self._connection.executemany(
+                'INSERT INTO terms (ontology, accession, local_id, label) VALUES (?, ?, ?, ?)', rows()).rowcount
+            self._connection.execute('INSERT OR REPLACE INTO ontologies (name, n_terms, signature) VALUES (?, ?, ?)',
+                                     (name, n_terms, signature))
+        self._ontologies[name] = signature
+        log.info("Indexed {} terms of {}".format(n_terms, ontology_name))
+        return n_terms
+
+    def add_file(self, ontology_name, path):
+        """Indexes the terms of an ontology file, unless the file did not change since it was last indexed. The file
+        format is told by its extension, one of ONTOLOGY_FILE_EXTENSIONS, optionally followed by '.gz'.
+
+        :return: Number of terms added, or None if the index of the ontology was up to date
+        """
+        stat = os.stat(path)
+        signature = json.dumps([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+        if self._ontologies.get(ontology_name.lower()) == signature:
+            return None
+        reader, fp = _open_ontology_file(path)
+        with fp:
+            return self.add_ontology(ontology_name, reader(fp), signature=signature)
+
+    def labels(self, ontology_name, accession):
+        """Returns the labels of the terms of an ontology matching an accession, an empty list if there are none"""
+        curie, local_id = normalize_accession(accession)
+        if ':' in curie:
+            cursor = self._connection.execute('SELECT label FROM terms WHERE ontology = ? AND accession = ?',
+                                              (ontology_name.lower(), curie))
+        else:
+            cursor = self._connection.execute('SELECT label FROM terms WHERE ontology = ? AND local_id = ?',
+                                              (ontology_name.lower(), local_id))
+        return [label for label, in cursor]
+
+    def close(self):
+        self._connection.close()
+
+
+def find_ontology_files(ontology_dir, ontology_names=None):
+    """Returns the paths of the ontology files in a directory, keyed by ontology name, the name of each file without
+    its extension. If ontology_names is given, only the files of these ontologies are returned, matched regardless of
+    case."""
+    wanted = None if ontology_names is None else set(name.lower() for name in ontology_names)
+    files = dict()
+    for path in sorted(glob.iglob(os.path.join(ontology_dir, '*'))):
+        name = os.path.basename(path)
+        if name.endswith('.gz'):
+            name = name[:-3]
+        name, extension = os.path.splitext(name)
+        if extension.lower() in ONTOLOGY_FILE_EXTENSIONS and (wanted is None or name.lower() in wanted):
+            files.setdefault(name, path)
+    return files
+
+
+def build_index(index_path, ontology_dir, ontology_names=None):
+    """Indexes the ontology files found in ontology_dir, for example the ontologies declared in the ONTOLOGY SOURCE
+    REFERENCE section of an investigation, in the index at index_path. Files indexed before and not changed since are
+    not read again.
+
+    :param index_path: Path of the index database, created if missing
+    :param ontology_dir: Directory of the ontology files, named after their ontology (e.g. EFO.owl, NCBITAXON.obo.gz)
+    :param ontology_names: Names of the ontologies to index, all the files in ontology_dir if None
+    :return: TermIndex
+    """
+    index = TermIndex(index_path)
+    for ontology_name, path in find_ontology_files(ontology_dir, ontology_names).items():
+        index.add_file(ontology_name, path)
+    return index
@@ -10,6 +10,7 @@ import logging
 import os
 import re
 from json import JSONEncoder
+import ijson
 from jsonschema import Draft4Validator, RefResolver, ValidationError
 
 from isatools import config
@@ -30,55 +31,294 @@ _RX_PMCID = re.compile("PMC[0-9]{8}")
 
 
 def load(fp):
+    """Loads an ISA-JSON document into an Investigation.
 
-    def get_comments(j):
-        comments = []
-        if "comments" in j.keys():
-            for comment_json in j["comments"]:
-                name = comment_json["name"]
-                value = comment_json["value"]
-                comment = Comment(name, value)
-                comments.append(comment)
-        return comments
-
-    def get_roles(j):
+    The whole document is parsed with json.load() before the model is built from it. See stream_load() for documents
+    too large to be held in memory next to their model.
+
+    :param fp: A file-like object
+    :return: An Investigation object
+    """
+    return _InvestigationBuilder().load(json.load(fp))
+
+
+def stream_load(fp):
+    """Loads an ISA-JSON document into an Investigation, parsing it as a stream of JSON events.
+
+    Each ontology source, publication, person, protocol, material, data file and process is built as soon as its JSON
+    object has been read, and the JSON object is released after that, so peak memory is about the size of the
+    resulting model. A JSON object read before the objects it depends on (e.g. a sample read before the characteristic
+    categories of its study) is kept until these have been read. Documents written with ISAJSONEncoder declare these
+    first and stream without holding anything back.
+
+    :param fp: A file-like object, preferably opened in binary mode
+    :return: An Investigation object
+    """
+    events = ijson.basic_parse(fp, use_float=True)
+    event, _ = next(events)
+    if event != 'start_map':
+        raise IOError("ISA-JSON document must be a JSON object, not {}".format(event))
+    return _InvestigationBuilder().stream(events)
+
+
+def _get_comments(j):
+    comments = []
+    if "comments" in j.keys():
+        for comment_json in j["comments"]:
+            name = comment_json["name"]
+            value = comment_json["value"]
+            comment = Comment(name, value)
+            comments.append(comment)
+    return comments
+
+
+def _read_value(events, event, value):
+    # builds the JSON value starting with event out of the events that follow it
+    if event not in ('start_map', 'start_array'):
+        return value
+    builder = ijson.ObjectBuilder()
+    builder.event(event, value)
+    depth = 1
+    for event, value in events:
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+            if depth == 0:
+                return builder.value
+
+
+def _skip_value(events, event):
+    # consumes the events of the JSON value starting with event without building it
+    depth = 1 if event in ('start_map', 'start_array') else 0
+    while depth > 0:
+        event, _ = next(events)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+
+
+def _attribute(name):
+    # member handler setting an attribute of the object being built
+    def set_attribute(builder, value):
+        setattr(builder.current, name, value)
+    return set_attribute
+
+
+class _Layout(object):
+    """How to build a model object from the members of an ISA-JSON object.
+
+    members lists (member path, handler, paths of the members it depends on) in the order the members are built in
+    when they all have been read. Members of nested JSON objects have dotted paths (e.g. "materials.sources"). A
+    handler is either called with the builder and each item of the member (or its value, if it is not an array), or is
+    the _Layout of the JSON objects the member is an array of. Members that are not listed are ignored.
+    """
+
+    def __init__(self, begin, end, members):
+        self.begin = begin
+        self.end = end
+        self.paths = [path for path, _, _ in members]
+        self.handlers = {path: handler for path, handler, _ in members}
+        self.dependencies = {path: dependencies for path, _, dependencies in members}
+        self.groups = {path.rsplit('.', 1)[0] for path in self.paths if '.' in path}
+
+
+class _Section(object):
+    """The state of a model object being built from its JSON object."""
+
+    def __init__(self, layout, obj):
+        self.layout = layout
+        self.obj = obj
+        self.read = set()  # members whose JSON has been read
+        self.done = set()  # members read and built
+        self.pending = dict()  # member path -> JSON items read before the members they depend on were built
+
+    def is_ready(self, path):
+        return all(dependency in self.done for dependency in self.layout.dependencies[path])
+
+
+class _InvestigationBuilder(object):
+    """Builds an Investigation from the members of an ISA-JSON document, in the order they are read in.
+
+    load() walks a document parsed with json.load(), stream() reads the JSON events of a document from ijson. Both
+    build each item of a member as it is read, holding it back until the members it depends on have been built.
+    """
+
+    def __init__(self):
+        self.investigation = None
+        self.study = None
+        self.assay = None
+        self.term_source_dict = {"": None}
+        self.registry = dict()  # @id -> object created from the JSON object with that @id
+        # (process, @ids of its inputs, outputs, previous and next processes, types of its inputs and outputs, their
+        # description in errors)
+        self.links = list()
+        self.unresolved = list()  # (characteristic, @id of a category not created yet)
+        self._sections = list()
+
+    @property
+    def current(self):
+        return self._sections[-1].obj
+
+    def load(self, investigation_json):
+        return self._walk(investigation_json, self.INVESTIGATION)
+
+    def stream(self, events):
+        # the start_map event of the investigation has been consumed
+        return self._read(events, self.INVESTIGATION)
+
+    def _enter(self, layout):
+        self._sections.append(_Section(layout, layout.begin(self)))
+
+    def _leave(self):
+        section = self._sections[-1]
+        for path in section.layout.paths:  # members still held back when their dependencies are missing
+            for value in section.pending.pop(path, ()):
+                self._build(path, value)
+        self._sections.pop()
+        section.layout.end(self, section.obj)
+        return section.obj
+
+    def _feed(self, path, value):
+        section = self._sections[-1]
+        if section.is_ready(path):
+            self._build(path, value)
+        else:
+            section.pending.setdefault(path, []).append(value)
+
+    def _build(self, path, value):
+        handler = self._sections[-1].layout.handlers[path]
+        if isinstance(handler, _Layout):
+            self._walk(value, handler)
+        else:
+            handler(self, value)
+
+    def _member_read(self, path):
+        section = self._sections[-1]
+        section.read.add(path)
+        if path not in section.pending:
+            section.done.add(path)
+        flushed = True
+        while flushed:
+            flushed = False
+            for pending_path in [p for p in section.layout.paths if p in section.pending]:
+                if section.is_ready(pending_path):
+                    for value in section.pending.pop(pending_path):
+                        self._build(pending_path, value)
+                    if pending_path in section.read:
+                        section.done.add(pending_path)
+                    flushed = True
+
+    def _walk(self, obj_json, layout):
+        self._enter(layout)
+        self._walk_members(obj_json, '')
+        return self._leave()
+
+    def _walk_members(self, obj_json, prefix):
+        layout = self._sections[-1].layout
+        for name, value in obj_json.items():
+            path = prefix + name
+            if path in layout.groups and isinstance(value, dict):
+                self._walk_members(value, path + '.')
+            elif path in layout.handlers:
+                if isinstance(value, list):
+                    for item in value:
+                        self._feed(path, item)
+                elif value is not None:
+                    self._feed(path, value)
+                self._member_read(path)
+
+    def _read(self, events, layout):
+        self._enter(layout)
+        self._read_members(events, '')
+        return self._leave()
+
+    def _read_members(self, events, prefix):
+        layout = self._sections[-1].layout
+        for event, name in events:
+            if event == 'end_map':
+                return
+            path = prefix + name
+            event, value = next(events)
+            if path in layout.groups and event == 'start_map':
+                self._read_members(events, path + '.')
+            elif path in layout.handlers:
+                if event == 'start_array':
+                    for event, value in events:
+                        if event == 'end_array':
+                            break
+                        self._read_item(events, path, event, value)
+                elif event != 'null':
+                    self._read_item(events, path, event, value)
+                self._member_read(path)
+            else:
+                _skip_value(events, event)
+
+    def _read_item(self, events, path, event, value):
+        section = self._sections[-1]
+        if isinstance(section.layout.handlers[path], _Layout) and event == 'start_map' and section.is_ready(path):
+            self._read(events, section.layout.handlers[path])
+        else:
+            self._feed(path, _read_value(events, event, value))
+
+    def _set_category(self, characteristic, category_id):
+        # categories of study materials may be declared in the assays that follow them
+        try:
+            characteristic.category = self.registry[category_id]
+        except KeyError:
+            self.unresolved.append((characteristic, category_id))
+
+    def _link(self, process, process_json, io_types, io_description):
+        # keeps the @ids only, so that the JSON of the process can be released
+        try:
+            prev_id = process_json["previousProcess"]["@id"]
+        except KeyError:
+            prev_id = None
+        try:
+            next_id = process_json["nextProcess"]["@id"]
+        except KeyError:
+            next_id = None
+        self.links.append((process, [input_json["@id"] for input_json in process_json["inputs"]],
+                           [output_json["@id"] for output_json in process_json["outputs"]], prev_id, next_id,
+                           io_types, io_description))
+
+    def _get_roles(self, j):
         roles = None
         if "roles" in j.keys():
             roles = list()
             for role_json in j["roles"]:
                 term = role_json["annotationValue"]
                 term_accession = role_json["termAccession"]
-                term_source = term_source_dict[role_json["termSource"]]
+                term_source = self.term_source_dict[role_json["termSource"]]
                 role = OntologyAnnotation(term, term_source, term_accession)
                 roles.append(role)
         return roles
 
-    def get_jvalue(dict, key):
-        if key in dict.keys():
-            return dict[key]
-        else:
-            return None
-
-    investigation_json = json.load(fp)
-    investigation = Investigation(
-        identifier=investigation_json["identifier"],
-        title=investigation_json["title"],
-        description=investigation_json["description"],
-        submission_date=investigation_json["submissionDate"],
-        public_release_date=investigation_json["publicReleaseDate"]
-    )
-    investigation.comments = get_comments(investigation_json)
-    term_source_dict = {"": None}
-    for ontologySourceReference_json in investigation_json["ontologySourceReferences"]:
+    def _begin_investigation(self):
+        self.investigation = Investigation()
+        return self.investigation
+
+    def _end_investigation(self, investigation):
+        for characteristic, category_id in self.unresolved:
+            characteristic.category = self.registry[category_id]
+        self.unresolved = list()
+
+    def _add_comment(self, comment_json):
+        self.current.comments.append(Comment(comment_json["name"], comment_json["value"]))
+
+    def _add_ontology_source(self, ontology_source_reference_json):
         ontology_source_reference = OntologySource(
-            name=ontologySourceReference_json["name"],
-            file=ontologySourceReference_json["file"],
-            version=ontologySourceReference_json["version"],
-            description=ontologySourceReference_json["description"]
+            name=ontology_source_reference_json["name"],
+            file=ontology_source_reference_json["file"],
+            version=ontology_source_reference_json["version"],
+            description=ontology_source_reference_json["description"]
         )
-        term_source_dict[ontology_source_reference.name] = ontology_source_reference
-        investigation.ontology_source_references.append(ontology_source_reference)
-    for publication_json in investigation_json["publications"]:
+        self.term_source_dict[ontology_source_reference.name] = ontology_source_reference
+        self.investigation.ontology_source_references.append(ontology_source_reference)
+
+    def _add_publication(self, publication_json):
         publication = Publication(
             pubmed_id=publication_json["pubMedID"],
             doi=publication_json["doi"],
@@ -87,15 +327,13 @@ def load(fp):
             status=OntologyAnnotation(
                 term=publication_json["status"]["annotationValue"],
                 term_accession=publication_json["status"]["termAccession"],
-                term_source=term_source_dict[publication_json["status"]["termSource"]]
+                term_source=self.term_source_dict[publication_json["status"]["termSource"]]
             )
         )
-        try:
-            publication.comments = get_comments(publication_json)
-        except KeyError:
-            pass
-        investigation.publications.append(publication)
-    for person_json in investigation_json["people"]:
+        publication.comments = _get_comments(publication_json)
+        self.current.publications.append(publication)
+
+    def _add_person(self, person_json):
         person = Person(
             last_name=person_json["lastName"],
             first_name=person_json["firstName"],
@@ -105,506 +343,451 @@ def load(fp):
             fax=person_json["fax"],
             address=person_json["address"],
             affiliation=person_json["affiliation"],
-            roles=[]
         )
-        for role_json in person_json["roles"]:
-            role = OntologyAnnotation(
-                term=role_json["annotationValue"],
-                term_accession=role_json["termAccession"],
-                term_source=term_source_dict[role_json["termSource"]]
+        person.roles = self._get_roles(person_json)
+        person.comments = _get_comments(person_json)
+        self.current.contacts.append(person)
+
+    def _begin_study(self):
+        self.study = Study()
+        self.links = list()
+        return self.study
+
+    def _end_study(self, study):
+        # second pass, once all the objects of a study and its assays have been created
+        for process, input_ids, output_ids, prev_id, next_id, io_types, io_description in self.links:
+            for input_id in input_ids:
+                input_ = self.registry.get(input_id)
+                if not isinstance(input_, io_types):
+                    raise IOError("Could not find input node in {} dicts: {}".format(io_description, input_id))
+                process.inputs.append(input_)
+            for output_id in output_ids:
+                output = self.registry.get(output_id)
+                if not isinstance(output, io_types):
+                    raise IOError("Could not find output node in {} dicts: {}".format(io_description, output_id))
+                process.outputs.append(output)
+            if prev_id in self.registry:
+                process.prev_process = self.registry[prev_id]
+            if next_id in self.registry:
+                process.next_process = self.registry[next_id]
+        self.links = list()
+        self.investigation.studies.append(study)
+
+    def _add_characteristic_category(self, characteristic_category_json):
+        # assay characteristic categories are kept with those of their study
+        characteristic_category = OntologyAnnotation(
+            id_=characteristic_category_json["@id"],
+            term=characteristic_category_json["characteristicType"]["annotationValue"],
+            term_source=self.term_source_dict[characteristic_category_json["characteristicType"]["termSource"]],
+            term_accession=characteristic_category_json["characteristicType"]["termAccession"],
+        )
+        self.study.characteristic_categories.append(characteristic_category)
+        self.registry[characteristic_category.id] = characteristic_category
+
+    def _add_unit(self, unit_json):
+        unit = OntologyAnnotation(id_=unit_json["@id"],
+                                  term=unit_json["annotationValue"],
+                                  term_source=self.term_source_dict[unit_json["termSource"]],
+                                  term_accession=unit_json["termAccession"])
+        self.registry[unit.id] = unit
+        self.current.units.append(unit)
+
+    def _add_design_descriptor(self, design_descriptor_json):
+        design_descriptor = OntologyAnnotation(
+            term=design_descriptor_json["annotationValue"],
+            term_accession=design_descriptor_json["termAccession"],
+            term_source=self.term_source_dict[design_descriptor_json["termSource"]]
+        )
+        self.study.design_descriptors.append(design_descriptor)
+
+    def _add_protocol(self, protocol_json):
+        protocol = Protocol(
+            id_=protocol_json["@id"],
+            name=protocol_json["name"],
+            uri=protocol_json["uri"],
+            description=protocol_json["description"],
+            version=protocol_json["version"],
+            protocol_type=OntologyAnnotation(
+                term=protocol_json["protocolType"]["annotationValue"],
+                term_accession=protocol_json["protocolType"]["termAccession"] if "termAccession" in protocol_json["protocolType"].keys() else "",
+                term_source=self.term_source_dict[protocol_json["protocolType"]["termSource"]] if "termSource" in protocol_json["protocolType"].keys() else None,
             )
-            person.roles.append(role)
-        person.comments = get_comments(person_json)
-        investigation.contacts.append(person)
-    samples_dict = dict()
-    sources_dict = dict()
-    categories_dict = dict()
-    protocols_dict = dict()
-    factors_dict = dict()
-    parameters_dict = dict()
-    units_dict = dict()
-
-    # populate assay characteristicCategories first
-    for study_json in investigation_json["studies"]:
-        for assay_json in study_json["assays"]:
-            for assay_characteristics_category_json in assay_json["characteristicCategories"]:
-                characteristic_category = OntologyAnnotation(
-                    id_=assay_characteristics_category_json["@id"],
-                    term=assay_characteristics_category_json["characteristicType"]["annotationValue"],
-                    term_source=term_source_dict[assay_characteristics_category_json["characteristicType"]["termSource"]],
-                    term_accession=assay_characteristics_category_json["characteristicType"]["termAccession"],
-                )
-                # study.characteristic_categories.append(characteristic_category)
-                categories_dict[characteristic_category.id] = characteristic_category
-    for study_json in investigation_json["studies"]:
-        process_dict = dict()
-        study = Study(
-            identifier=study_json["identifier"],
-            title=study_json["title"],
-            description=study_json["description"],
-            submission_date=study_json["submissionDate"],
-            public_release_date=study_json["publicReleaseDate"],
-            filename=study_json["filename"]
         )
-        try:
-            study.comments = get_comments(study_json)
-        except KeyError:
-            pass
-        for study_characteristics_category_json in study_json["characteristicCategories"]:
-            characteristic_category = OntologyAnnotation(
-                id_=study_characteristics_category_json["@id"],
-                term=study_characteristics_category_json["characteristicType"]["annotationValue"],
-                term_source=term_source_dict[study_characteristics_category_json["characteristicType"]["termSource"]],
-                term_accession=study_characteristics_category_json["characteristicType"]["termAccession"],
+        for parameter_json in protocol_json["parameters"]:
+            parameter = ProtocolParameter(
+                id_=parameter_json["@id"],
+                parameter_name=OntologyAnnotation(
+                    term=parameter_json["parameterName"]["annotationValue"],
+                    term_source=self.term_source_dict[parameter_json["parameterName"]["termSource"]],
+                    term_accession=parameter_json["parameterName"]["termAccession"]
+                )
             )
-            study.characteristic_categories.append(characteristic_category)
-            categories_dict[characteristic_category.id] = characteristic_category
-        for study_unit_json in study_json["unitCategories"]:
-            unit = OntologyAnnotation(id_=study_unit_json["@id"],
-                                      term=study_unit_json["annotationValue"],
-                                      term_source=term_source_dict[study_unit_json["termSource"]],
-                                      term_accession=study_unit_json["termAccession"])
-            units_dict[unit.id] = unit
-            study.units.append(unit)
-        for study_publication_json in study_json["publications"]:
-            study_publication = Publication(
-                pubmed_id=study_publication_json["pubMedID"],
-                doi=study_publication_json["doi"],
-                author_list=study_publication_json["authorList"],
-                title=study_publication_json["title"],
-                status=OntologyAnnotation(
-                    term=study_publication_json["status"]["annotationValue"],
-                    term_source=term_source_dict[study_publication_json["status"]["termSource"]],
-                    term_accession=study_publication_json["status"]["termAccession"],
+            protocol.parameters.append(parameter)
+            self.registry[parameter.id] = parameter
+        for component_json in protocol_json["components"]:
+            component = ProtocolComponent(
+                name=component_json["componentName"],
+                component_type=OntologyAnnotation(
+                    term=component_json["componentType"]["annotationValue"],
+                    term_source=self.term_source_dict[component_json["componentType"]["termSource"]],
+                    term_accession=component_json["componentType"]["termAccession"]
                 )
             )
-            try:
-                study_publication.comments = get_comments(study_publication_json)
-            except KeyError:
-                pass
-            study.publications.append(study_publication)
-        for study_person_json in study_json["people"]:
-            study_person = Person(
-                last_name=study_person_json["lastName"],
-                first_name=study_person_json["firstName"],
-                mid_initials=study_person_json["midInitials"],
-                email=study_person_json["email"],
-                phone=study_person_json["phone"],
-                fax=study_person_json["fax"],
-                address=study_person_json["address"],
-                affiliation=study_person_json["affiliation"],
+            protocol.components.append(component)
+        self.study.protocols.append(protocol)
+        self.registry[protocol.id] = protocol
+
+    def _add_factor(self, factor_json):
+        factor = StudyFactor(
+            id_=factor_json["@id"],
+            name=factor_json["factorName"],
+            factor_type=OntologyAnnotation(
+                term=factor_json["factorType"]["annotationValue"],
+                term_accession=factor_json["factorType"]["termAccession"],
+                term_source=self.term_source_dict[factor_json["factorType"]["termSource"]]
             )
-            study_person.roles = get_roles(study_person_json)
+        )
+        self.study.factors.append(factor)
+        self.registry[factor.id] = factor
+
+    def _add_source(self, source_json):
+        source = Source(
+            id_=source_json["@id"],
+            name=source_json["name"][7:],
+        )
+        for characteristic_json in source_json["characteristics"]:
+            value = characteristic_json["value"]
+            unit = None
+            characteristic = Characteristic()
+            self._set_category(characteristic, characteristic_json["category"]["@id"])
+            if isinstance(value, dict):
+                try:
+                    term = characteristic_json["value"]["annotationValue"]
+                    if isinstance(term, (int, float)):
+                        term = str(term)
+                    value = OntologyAnnotation(
+                        term=term,
+                        term_source=self.term_source_dict[characteristic_json["value"]["termSource"]],
+                        term_accession=characteristic_json["value"]["termAccession"])
+                except KeyError:
+                    raise IOError("Can't create value as annotation")
+            elif isinstance(value, (int, float)):
+                try:
+                    unit = self.registry[characteristic_json["unit"]["@id"]]
+                except KeyError:
+                    unit = None
+            elif not isinstance(value, str):
+                raise IOError("Unexpected type in characteristic value")
+            characteristic.value = value
+            characteristic.unit = unit
+            source.characteristics.append(characteristic)
+        self.registry[source.id] = source
+        self.study.sources.append(source)
+
+    def _add_sample(self, sample_json):
+        sample = Sample(
+            id_=sample_json["@id"],
+            name=sample_json["name"][7:]
+        )
+        for characteristic_json in sample_json["characteristics"]:
+            value = characteristic_json["value"]
+            unit = None
+            characteristic = Characteristic()
+            self._set_category(characteristic, characteristic_json["category"]["@id"])
+            if isinstance(value, dict):
+                try:
+                    value = OntologyAnnotation(
+                        term=characteristic_json["value"]["annotationValue"],
+                        term_source=self.term_source_dict[characteristic_json["value"]["termSource"]],
+                        term_accession=characteristic_json["value"]["termAccession"])
+                except KeyError:
+                    raise IOError("Can't create value as annotation")
+            elif isinstance(value, int) or isinstance(value, float):
+                try:
+                    unit = self.registry[characteristic_json["unit"]["@id"]]
+                except KeyError:
+                    raise IOError("Can't create unit annotation")
+            elif not isinstance(value, str):
+                raise IOError("Unexpected type in characteristic value")
+            characteristic.value = value
+            characteristic.unit = unit
+            sample.characteristics.append(characteristic)
+        for factor_value_json in sample_json["factorValues"]:
             try:
-                study_person.comments = get_comments(study_person_json)
-            except KeyError:
-                pass
-            study.contacts.append(study_person)
-        for design_descriptor_json in study_json["studyDesignDescriptors"]:
-            design_descriptor = OntologyAnnotation(
-                term=design_descriptor_json["annotationValue"],
-                term_accession=design_descriptor_json["termAccession"],
-                term_source=term_source_dict[design_descriptor_json["termSource"]]
-            )
-            study.design_descriptors.append(design_descriptor)
-        for protocol_json in study_json["protocols"]:
-            protocol = Protocol(
-                id_=protocol_json["@id"],
-                name=protocol_json["name"],
-                uri=protocol_json["uri"],
-                description=protocol_json["description"],
-                version=protocol_json["version"],
-                protocol_type=OntologyAnnotation(
-                    term=protocol_json["protocolType"]["annotationValue"],
-                    term_accession=protocol_json["protocolType"]["termAccession"] if "termAccession" in protocol_json["protocolType"].keys() else "",
-                    term_source=term_source_dict[protocol_json["protocolType"]["termSource"]] if "termSource" in protocol_json["protocolType"].keys() else None,
-                )
-            )
-            for parameter_json in protocol_json["parameters"]:
-                parameter = ProtocolParameter(
-                    id_=parameter_json["@id"],
-                    parameter_name=OntologyAnnotation(
-                        term=parameter_json["parameterName"]["annotationValue"],
-                        term_source=term_source_dict[parameter_json["parameterName"]["termSource"]],
-                        term_accession=parameter_json["parameterName"]["termAccession"]
-                    )
-                )
-                protocol.parameters.append(parameter)
-                parameters_dict[parameter.id] = parameter
-            for component_json in protocol_json["components"]:
-                component = ProtocolComponent(
-                    name=component_json["componentName"],
-                    component_type=OntologyAnnotation(
-                        term=component_json["componentType"]["annotationValue"],
-                        term_source=term_source_dict[component_json["componentType"]["termSource"]],
-                        term_accession=component_json["componentType"]["termAccession"]
-                    )
+                factor_value = FactorValue(
+                    factor_name=self.registry[factor_value_json["category"]["@id"]],
+                    value=OntologyAnnotation(
+                        term=factor_value_json["value"]["annotationValue"],
+                        term_accession=factor_value_json["value"]["termAccession"],
+                        term_source=self.term_source_dict[factor_value_json["value"]["termSource"]],
+                    ),
+
                 )
-                protocol.components.append(component)
-            study.protocols.append(protocol)
-            protocols_dict[protocol.id] = protocol
-        for factor_json in study_json["factors"]:
-            factor = StudyFactor(
-                id_=factor_json["@id"],
-                name=factor_json["factorName"],
-                factor_type=OntologyAnnotation(
-                    term=factor_json["factorType"]["annotationValue"],
-                    term_accession=factor_json["factorType"]["termAccession"],
-                    term_source=term_source_dict[factor_json["factorType"]["termSource"]]
+            except TypeError:
+                factor_value = FactorValue(
+                    factor_name=self.registry[factor_value_json["category"]["@id"]],
+                    value=factor_value_json["value"],
+                    unit=self.registry[factor_value_json["unit"]["@id"]],
                 )
-            )
-            study.factors.append(factor)
-            factors_dict[factor.id] = factor
-        for source_json in study_json["materials"]["sources"]:
-            source = Source(
-                id_=source_json["@id"],
-                name=source_json["name"][7:],
-            )
-            for characteristic_json in source_json["characteristics"]:
-                value = characteristic_json["value"]
-                unit = None
-                characteristic = Characteristic(category=categories_dict[characteristic_json["category"]["@id"]])
-                if isinstance(value, dict):
-                    try:
-                        term = characteristic_json["value"]["annotationValue"]
-                        if isinstance(term, (int, float)):
-                            term = str(term)
-                        value = OntologyAnnotation(
-                            term=term,
-                            term_source=term_source_dict[characteristic_json["value"]["termSource"]],
-                            term_accession=characteristic_json["value"]["termAccession"])
-                    except KeyError:
-                        raise IOError("Can't create value as annotation")
-                elif isinstance(value, (int, float)):
-                    try:
-                        unit = units_dict[characteristic_json["unit"]["@id"]]
-                    except KeyError:
-                        unit = None
-                elif not isinstance(value, str):
-                    raise IOError("Unexpected type in characteristic value")
-                characteristic.value = value
-                characteristic.unit = unit
-                source.characteristics.append(characteristic)
-            sources_dict[source.id] = source
-            study.sources.append(source)
-        for sample_json in study_json["materials"]["samples"]:
-            sample = Sample(
-                id_=sample_json["@id"],
-                name=sample_json["name"][7:]
-            )
-            for characteristic_json in sample_json["characteristics"]:
-                value = characteristic_json["value"]
-                unit = None
-                characteristic = Characteristic(
-                        category=categories_dict[characteristic_json["category"]["@id"]])
-                if isinstance(value, dict):
-                    try:
-                        value = OntologyAnnotation(
-                            term=characteristic_json["value"]["annotationValue"],
-                            term_source=term_source_dict[characteristic_json["value"]["termSource"]],
-                            term_accession=characteristic_json["value"]["termAccession"])
-                    except KeyError:
-                        raise IOError("Can't create value as annotation")
-                elif isinstance(value, int) or isinstance(value, float):
-                    try:
-                        unit = units_dict[characteristic_json["unit"]["@id"]]
-                    except KeyError:
-                        raise IOError("Can't create unit annotation")
-                elif not isinstance(value, str):
-                    raise IOError("Unexpected type in characteristic value")
-                characteristic.value = value
-                characteristic.unit = unit
-                sample.characteristics.append(characteristic)
-            for factor_value_json in sample_json["factorValues"]:
-                try:
-                    factor_value = FactorValue(
-                        factor_name=factors_dict[factor_value_json["category"]["@id"]],
-                        value=OntologyAnnotation(
-                            term=factor_value_json["value"]["annotationValue"],
-                            term_accession=factor_value_json["value"]["termAccession"],
-                            term_source=term_source_dict[factor_value_json["value"]["termSource"]],
-                        ),
+            sample.factor_values.append(factor_value)
+        self.registry[sample.id] = sample
+        self.study.samples.append(sample)
+        try:
+            for source_id_ref_json in sample_json["derivesFrom"]:
+                sample.derives_from.append(self.registry[source_id_ref_json["@id"]])
+        except KeyError:
+            sample.derives_from = []
 
+    def _add_study_process(self, study_process_json):
+        process = Process(
+            id_=study_process_json["@id"],
+            executes_protocol=self.registry[study_process_json["executesProtocol"]["@id"]],
+        )
+        process.comments = _get_comments(study_process_json)
+        try:
+            process.date = study_process_json["date"]
+        except KeyError:
+            pass
+        try:
+            process.performer = study_process_json["performer"]
+        except KeyError:
+            pass
+        for parameter_value_json in study_process_json["parameterValues"]:
+            if isinstance(parameter_value_json["value"], int) or isinstance(parameter_value_json["value"], float):
+                parameter_value = ParameterValue(
+                    category=self.registry[parameter_value_json["category"]["@id"]],
+                    value=parameter_value_json["value"],
+                    unit=self.registry[parameter_value_json["unit"]["@id"]],
+                )
+                process.parameter_values.append(parameter_value)
+            else:
+                parameter_value = ParameterValue(
+                    category=self.registry[parameter_value_json["category"]["@id"]],
                     )
+                try:
+                    parameter_value.value = OntologyAnnotation(
+                        term=parameter_value_json["value"]["annotationValue"],
+                        term_accession=parameter_value_json["value"]["termAccession"],
+                        term_source=self.term_source_dict[parameter_value_json["value"]["termSource"]],)
                 except TypeError:
-                    factor_value = FactorValue(
-                        factor_name=factors_dict[factor_value_json["category"]["@id"]],
-                        value=factor_value_json["value"],
-                        unit=units_dict[factor_value_json["unit"]["@id"]],
-                    )
-                sample.factor_values.append(factor_value)
-            samples_dict[sample.id] = sample
-            study.samples.append(sample)
-            try:
-                for source_id_ref_json in sample_json["derivesFrom"]:
-                    sample.derives_from.append(sources_dict[source_id_ref_json["@id"]])
-            except KeyError:
-                sample.derives_from = []
-        for study_process_json in study_json["processSequence"]:
-            process = Process(
-                id_=study_process_json["@id"],
-                executes_protocol=protocols_dict[study_process_json["executesProtocol"]["@id"]],
+                    parameter_value.value = parameter_value_json["value"]
+                process.parameter_values.append(parameter_value)
+        self._link(process, study_process_json, (Source, Sample), "sources or samples")
+        self.study.process_sequence.append(process)
+        self.registry[process.id] = process
+
+    def _begin_assay(self):
+        self.assay = Assay()
+        return self.assay
+
+    def _end_assay(self, assay):
+        self.study.assays.append(assay)
+
+    def _set_measurement_type(self, measurement_type_json):
+        self.assay.measurement_type = OntologyAnnotation(
+            term=measurement_type_json["annotationValue"],
+            term_accession=measurement_type_json["termAccession"],
+            term_source=self.term_source_dict[measurement_type_json["termSource"]]
+        )
+
+    def _set_technology_type(self, technology_type_json):
+        self.assay.technology_type = OntologyAnnotation(
+            term=technology_type_json["annotationValue"],
+            term_accession=technology_type_json["termAccession"],
+            term_source=self.term_source_dict[technology_type_json["termSource"]]
+        )
+
+    def _add_data_file(self, data_json):
+        data_file = DataFile(
+            id_=data_json["@id"],
+            filename=data_json["name"],
+            label=data_json["type"],
+        )
+        data_file.comments = _get_comments(data_json)
+        self.registry[data_file.id] = data_file
+        try:
+            data_file.derives_from = self.registry[data_json["derivesFrom"][0]["@id"]]
+        except KeyError:
+            data_file.derives_from = None
+        self.assay.data_files.append(data_file)
+
+    def _add_assay_sample(self, sample_json):
+        self.assay.samples.append(self.registry[sample_json["@id"]])
+
+    def _add_other_material(self, other_material_json):
+        material_name = other_material_json["name"]
+        if material_name.startswith("labeledextract-"):
+            material_name = material_name[15:]
+        else:
+            material_name = material_name[8:]
+        material = Material(
+            id_=other_material_json["@id"],
+            name=material_name,
+            type_=other_material_json["type"],
+        )
+        for characteristic_json in other_material_json["characteristics"]:
+            characteristic = Characteristic(
+                value=OntologyAnnotation(
+                    term=characteristic_json["value"]["annotationValue"],
+                    term_source=self.term_source_dict[characteristic_json["value"]["termSource"]],
+                    term_accession=characteristic_json["value"]["termAccession"],
+                )
             )
-            try:
-                process.comments = get_comments(study_process_json)
-            except KeyError:
-                pass
-            try:
-                process.date = study_process_json["date"]
-            except KeyError:
-                pass
-            try:
-                process.performer = study_process_json["performer"]
-            except KeyError:
-                pass
-            for parameter_value_json in study_process_json["parameterValues"]:
-                if isinstance(parameter_value_json["value"], int) or isinstance(parameter_value_json["value"], float):
+            self._set_category(characteristic, characteristic_json["category"]["@id"])
+            material.characteristics.append(characteristic)
+        self.assay.other_material.append(material)
+        self.registry[material.id] = material
+
+    def _add_assay_process(self, assay_process_json):
+        process = Process(
+            id_=assay_process_json["@id"],
+            executes_protocol=self.registry[assay_process_json["executesProtocol"]["@id"]]
+        )
+        process.comments = _get_comments(assay_process_json)
+        # additional properties, currently hard-coded special cases
+        if process.executes_protocol.protocol_type.term == "data collection" and self.assay.technology_type.term == "DNA microarray":
+            process.name = assay_process_json["name"]
+        elif process.executes_protocol.protocol_type.term == "nucleic acid sequencing":
+            process.name = assay_process_json["name"]
+        elif process.executes_protocol.protocol_type.term == "nucleic acid hybridization":
+            process.name = assay_process_json["name"]
+        elif process.executes_protocol.protocol_type.term == "data transformation":
+            process.name = assay_process_json["name"]
+        elif process.executes_protocol.protocol_type.term == "data normalization":
+            process.name = assay_process_json["name"]
+        self._link(process, assay_process_json, (Sample, Material, DataFile), "samples or materials or data")
+        for parameter_value_json in assay_process_json["parameterValues"]:
+            if "category" in parameter_value_json.keys():
+                if parameter_value_json["category"]["@id"] == "#parameter/Array_Design_REF":  # Special case
+                    process.array_design_ref = parameter_value_json["value"]
+                elif isinstance(parameter_value_json["value"], int) or \
+                        isinstance(parameter_value_json["value"], float):
                     parameter_value = ParameterValue(
-                        category=parameters_dict[parameter_value_json["category"]["@id"]],
+                        category=self.registry[parameter_value_json["category"]["@id"]],
                         value=parameter_value_json["value"],
-                        unit=units_dict[parameter_value_json["unit"]["@id"]],
                     )
+                    if "unit" in parameter_value_json.keys():
+                        parameter_value.unit = self.registry[parameter_value_json["unit"]["@id"]]
                     process.parameter_values.append(parameter_value)
                 else:
                     parameter_value = ParameterValue(
-                        category=parameters_dict[parameter_value_json["category"]["@id"]],
+                        category=self.registry[parameter_value_json["category"]["@id"]],
                         )
                     try:
                         parameter_value.value = OntologyAnnotation(
                             term=parameter_value_json["value"]["annotationValue"],
                             term_accession=parameter_value_json["value"]["termAccession"],
-                            term_source=term_source_dict[parameter_value_json["value"]["termSource"]],)
+                            term_source=self.term_source_dict[parameter_value_json["value"]["termSource"]],)
                     except TypeError:
                         parameter_value.value = parameter_value_json["value"]
                     process.parameter_values.append(parameter_value)
-            for input_json in study_process_json["inputs"]:
-                input_ = None
-                try:
-                    input_ = sources_dict[input_json["@id"]]
-                except KeyError:
-                    pass
-                finally:
-                    try:
-                        input_ = samples_dict[input_json["@id"]]
-                    except KeyError:
-                        pass
-                if input_ is None:
-                    raise IOError("Could not find input node in sources or samples dicts: " + input_json["@id"])
-                process.inputs.append(input_)
-            for output_json in study_process_json["outputs"]:
-                output = None
-                try:
-                    output = sources_dict[output_json["@id"]]
-                except KeyError:
-                    pass
-                finally:
-                    try:
-                        output = samples_dict[output_json["@id"]]
-                    except KeyError:
-                        pass
-                if output is None:
-                    raise IOError("Could not find output node in sources or samples dicts: " + output_json["@id"])
-                process.outputs.append(output)
-            study.process_sequence.append(process)
-            process_dict[process.id] = process
-        for study_process_json in study_json["processSequence"]:  # 2nd pass
-            try:
-                prev_proc = study_process_json["previousProcess"]["@id"]
-                process_dict[study_process_json["@id"]].prev_process = process_dict[prev_proc]
-            except KeyError:
-                pass
+            else:
+                log.warn("warning: parameter category not found for instance {}".format(parameter_value_json))
+        self.assay.process_sequence.append(process)
+        self.registry[process.id] = process
+
+    ASSAY = _Layout(_begin_assay, _end_assay, [
+        ("measurementType", _set_measurement_type, ()),
+        ("technologyType", _set_technology_type, ()),
+        ("technologyPlatform", _attribute("technology_platform"), ()),
+        ("filename", _attribute("filename"), ()),
+        ("unitCategories", _add_unit, ()),
+        ("dataFiles", _add_data_file, ()),
+        ("materials.samples", _add_assay_sample, ()),
+        ("characteristicCategories", _add_characteristic_category, ()),
+        ("materials.otherMaterials", _add_other_material, ("characteristicCategories",)),
+        ("processSequence", _add_assay_process, ("technologyType", "unitCategories")),
+    ])
+
+    STUDY = _Layout(_begin_study, _end_study, [
+        ("identifier", _attribute("identifier"), ()),
+        ("title", _attribute("title"), ()),
+        ("description", _attribute("description"), ()),
+        ("submissionDate", _attribute("submission_date"), ()),
+        ("publicReleaseDate", _attribute("public_release_date"), ()),
+        ("filename", _attribute("filename"), ()),
+        ("comments", _add_comment, ()),
+        ("characteristicCategories", _add_characteristic_category, ()),
+        ("unitCategories", _add_unit, ()),
+        ("publications", _add_publication, ()),
+        ("people", _add_person, ()),
+        ("studyDesignDescriptors", _add_design_descriptor, ()),
+        ("protocols", _add_protocol, ()),
+        ("factors", _add_factor, ()),
+        ("materials.sources", _add_source, ("characteristicCategories", "unitCategories")),
+        ("materials.samples", _add_sample, ("characteristicCategories", "unitCategories", "factors",
+                                            "materials.sources")),
+        ("processSequence", _add_study_process, ("protocols", "unitCategories")),
+        ("assays", ASSAY, ("characteristicCategories", "unitCategories", "protocols", "materials.samples")),
+    ])
+
+    INVESTIGATION = _Layout(_begin_investigation, _end_investigation, [
+        ("identifier", _attribute("identifier"), ()),
+        ("title", _attribute("title"), ()),
+        ("description", _attribute("description"), ()),
+        ("submissionDate", _attribute("submission_date"), ()),
+        ("publicReleaseDate", _attribute("public_release_date"), ()),
+        ("comments", _add_comment, ()),
+        ("ontologySourceReferences", _add_ontology_source, ()),
+        ("publications", _add_publication, ("ontologySourceReferences",)),
+        ("people", _add_person, ("ontologySourceReferences",)),
+        ("studies", STUDY, ("ontologySourceReferences",)),
+    ])
 
-            try:
-                next_proc = study_process_json["nextProcess"]["@id"]
-                process_dict[study_process_json["@id"]].next_process = process_dict[next_proc]
-            except KeyError:
-                pass
 
-        for assay_json in study_json["assays"]:
-            process_dict = dict()
-            assay = Assay(
-                measurement_type=OntologyAnnotation(
-                    term=assay_json["measurementType"]["annotationValue"],
-                    term_accession=assay_json["measurementType"]["termAccession"],
-                    term_source=term_source_dict[assay_json["measurementType"]["termSource"]]
-                ),
-                technology_type=OntologyAnnotation(
-                    term=assay_json["technologyType"]["annotationValue"],
-                    term_accession=assay_json["technologyType"]["termAccession"],
-                    term_source=term_source_dict[assay_json["technologyType"]["termSource"]]
-                ),
-                technology_platform=assay_json["technologyPlatform"],
-                filename=assay_json["filename"]
-            )
-            for assay_unit_json in assay_json["unitCategories"]:
-                unit = OntologyAnnotation(id_=assay_unit_json["@id"],
-                                          term=assay_unit_json["annotationValue"],
-                                          term_source=term_source_dict[assay_unit_json["termSource"]],
-                                          term_accession=assay_unit_json["termAccession"])
-                units_dict[unit.id] = unit
-                assay.units.append(unit)
-            data_dict = dict()
-            for data_json in assay_json["dataFiles"]:
-                data_file = DataFile(
-                    id_=data_json["@id"],
-                    filename=data_json["name"],
-                    label=data_json["type"],
-                )
-                try:
-                    data_file.comments = get_comments(data_json)
-                except KeyError:
-                    pass
-                data_dict[data_file.id] = data_file
-                try:
-                    data_file.derives_from = samples_dict[data_json["derivesFrom"][0]["@id"]]
-                except KeyError:
-                    data_file.derives_from = None
-                assay.data_files.append(data_file)
-            for sample_json in assay_json["materials"]["samples"]:
-                sample = samples_dict[sample_json["@id"]]
-                assay.samples.append(sample)
-            for assay_characteristics_category_json in assay_json["characteristicCategories"]:
-                characteristic_category =OntologyAnnotation(
-                    id_=assay_characteristics_category_json["@id"],
-                    term=assay_characteristics_category_json["characteristicType"]["annotationValue"],
-                    term_source=term_source_dict[assay_characteristics_category_json["characteristicType"]["termSource"]],
-                    term_accession=assay_characteristics_category_json["characteristicType"]["termAccession"],
-                )
-                study.characteristic_categories.append(characteristic_category)
-                categories_dict[characteristic_category.id] = characteristic_category
-            other_materials_dict = dict()
-            for other_material_json in assay_json["materials"]["otherMaterials"]:
-                material_name = other_material_json["name"]
-                if material_name.startswith("labeledextract-"):
-                    material_name = material_name[15:]
-                else:
-                    material_name = material_name[8:]
-                material = Material(
-                    id_=other_material_json["@id"],
-                    name=material_name,
-                    type_=other_material_json["type"],
-                )
-                for characteristic_json in other_material_json["characteristics"]:
-                    characteristic = Characteristic(
-                        category=categories_dict[characteristic_json["category"]["@id"]],
-                        value=OntologyAnnotation(
-                            term=characteristic_json["value"]["annotationValue"],
-                            term_source=term_source_dict[characteristic_json["value"]["termSource"]],
-                            term_accession=characteristic_json["value"]["termAccession"],
-                        )
-                    )
-                    material.characteristics.append(characteristic)
-                assay.other_material.append(material)
-                other_materials_dict[material.id] = material
-            for assay_process_json in assay_json["processSequence"]:
-                process = Process(
-                    id_=assay_process_json["@id"],
-                    executes_protocol=protocols_dict[assay_process_json["executesProtocol"]["@id"]]
-                )
-                try:
-                    process.comments = get_comments(assay_process_json)
-                except KeyError:
-                    pass
-                # additional properties, currently hard-coded special cases
-                if process.executes_protocol.protocol_type.term == "data collection" and assay.technology_type.term == "DNA microarray":
-                    process.name = assay_process_json["name"]
-                elif process.executes_protocol.protocol_type.term == "nucleic acid sequencing":
-                    process.name = assay_process_json["name"]
-                elif process.executes_protocol.protocol_type.term == "nucleic acid hybridization":
-                    process.name = assay_process_json["name"]
-                elif process.executes_protocol.protocol_type.term == "data transformation":
-                    process.name = assay_process_json["name"]
-                elif process.executes_protocol.protocol_type.term == "data normalization":
-                    process.name = assay_process_json["name"]
-                for input_json in assay_process_json["inputs"]:
-                    input_ = None
-                    try:
-                        input_ = samples_dict[input_json["@id"]]
-                    except KeyError:
-                        pass
-                    finally:
-                        try:
-                            input_ = other_materials_dict[input_json["@id"]]
-                        except KeyError:
-                            pass
-                        finally:
-                            try:
-                                input_ = data_dict[input_json["@id"]]
-                            except KeyError:
-                                pass
-                    if input_ is None:
-                        raise IOError("Could not find input node in samples or materials or data dicts: " +
-                                      input_json["@id"])
-                    process.inputs.append(input_)
-                for output_json in assay_process_json["outputs"]:
-                    output = None
-                    try:
-                        output = samples_dict[output_json["@id"]]
-                    except KeyError:
-                        pass
-                    finally:
-                        try:
-                            output = other_materials_dict[output_json["@id"]]
-                        except KeyError:
-                            pass
-                        finally:
-                                try:
-                                    output = data_dict[output_json["@id"]]
-                                except KeyError:
-                                    pass
-                    if output is None:
-                        raise IOError("Could not find output node in samples or materials or data dicts: " +
-                                      output_json["@id"])
-                    process.outputs.append(output)
-                for parameter_value_json in assay_process_json["parameterValues"]:
-                    if "category" in parameter_value_json.keys():
-                        if parameter_value_json["category"]["@id"] == "#parameter/Array_Design_REF":  # Special case
-                            process.array_design_ref = parameter_value_json["value"]
-                        elif isinstance(parameter_value_json["value"], int) or \
-                                isinstance(parameter_value_json["value"], float):
-                            parameter_value = ParameterValue(
-                                category=parameters_dict[parameter_value_json["category"]["@id"]],
-                                value=parameter_value_json["value"],
-                            )
-                            if "unit" in parameter_value_json.keys():
-                                parameter_value.unit = units_dict[parameter_value_json["unit"]["@id"]]
-                            process.parameter_values.append(parameter_value)
-                        else:
-                            parameter_value = ParameterValue(
-                                category=parameters_dict[parameter_value_json["category"]["@id"]],
-                                )
-                            try:
-                                parameter_value.value = OntologyAnnotation(
-                                    term=parameter_value_json["value"]["annotationValue"],
-                                    term_accession=parameter_value_json["value"]["termAccession"],
-                                    term_source=term_source_dict[parameter_value_json["value"]["termSource"]],)
-                            except TypeError:
-                                parameter_value.value = parameter_value_json["value"]
-                            process.parameter_values.append(parameter_value)
-                    else:
-                        log.warn("warning: parameter category not found for instance {}".format(parameter_json))
-                assay.process_sequence.append(process)
-                process_dict[process.id] = process
+"""Everything below here is for the validator"""
 
-                for assay_process_json in assay_json["processSequence"]:  # 2nd pass
-                    try:
-                        prev_proc = assay_process_json["previousProcess"]["@id"]
-                        process_dict[assay_process_json["@id"]].prev_process = process_dict[prev_proc]
-                    except KeyError:
-                        pass
 
-                    try:
-                        next_proc = assay_process_json["nextProcess"]["@id"]
-                        process_dict[assay_process_json["@id"]].next_process = process_dict[next_proc]
-                    except KeyError:
-                        pass
+class StudyIndex(object):
+    """The identifier lists the rules 1002-1022 compare for a study and its assays. Each list is collected by its
+    get_* function the first time a rule asks for it and is then shared by the other rules, so that the study is
+    walked once per list rather than once per rule. As each list is only collected when needed, a document that lacks
+    a key stops validation at the same rule as when every rule collected its own lists.
 
-            study.assays.append(assay)
-        investigation.studies.append(study)
-    return investigation
+    Usage:
 
+        study_index = StudyIndex(study_json)
+        io_ids = study_index.get(get_io_ids_in_process_sequence)
+    """
 
-"""Everything below here is for the validator"""
+    def __init__(self, study_json):
+        self.study_json = study_json
+        self._ids = dict()  # get_* function -> list it returned
+
+    def get(self, id_collector_func):
+        """Returns id_collector_func(study_json), calling it on the first request only. The list is shared and must
+        not be modified."""
+        try:
+            return self._ids[id_collector_func]
+        except KeyError:
+            ids = self._ids[id_collector_func] = id_collector_func(self.study_json)
+            return ids
+
+
+class ISAJSONIndex(object):
+    """A StudyIndex per study of an ISA-JSON document, and the ontology annotations of the whole document, collected
+    on first use for the rules that share them"""
+
+    def __init__(self, isa_json):
+        self.isa_json = isa_json
+        self._studies = None
+        self._annotations = None
+
+    @property
+    def studies(self):
+        """:obj:`list` of StudyIndex, in the order of the studies"""
+        if self._studies is None:
+            self._studies = [StudyIndex(study_json) for study_json in self.isa_json["studies"]]
+        return self._studies
+
+    @property
+    def annotations(self):
+        """:obj:`list` of the ontology annotations found by walk_and_get_annotations()"""
+        if self._annotations is None:
+            annotations = list()
+            walk_and_get_annotations(self.isa_json, annotations)
+            self._annotations = annotations
+        return self._annotations
 
 
 def get_source_ids(study_json):
@@ -642,10 +825,12 @@ def get_io_ids_in_process_sequence(study_json):
                                  all_process_sequences] for elem in iterabl]
 
 
-def check_material_ids_declared_used(study_json, id_collector_func):
+def check_material_ids_declared_used(study_json, id_collector_func, study_index=None):
     """Used for rules 1015-1018"""
-    node_ids = id_collector_func(study_json)
-    io_ids_in_process_sequence = get_io_ids_in_process_sequence(study_json)
+    if study_index is None:
+        study_index = StudyIndex(study_json)
+    node_ids = study_index.get(id_collector_func)
+    io_ids_in_process_sequence = study_index.get(get_io_ids_in_process_sequence)
     is_node_ids_used = set(node_ids).issubset(set(io_ids_in_process_sequence))
     if not is_node_ids_used:
         warnings.append({
@@ -657,11 +842,13 @@ def check_material_ids_declared_used(study_json, id_collector_func):
                                                                                   io_ids_in_process_sequence))
 
 
-def check_material_ids_not_declared_used(study_json):
+def check_material_ids_not_declared_used(study_json, study_index=None):
     """Used for rules 1002-1005"""
-    node_ids = get_source_ids(study_json) + get_sample_ids(study_json) + get_material_ids(study_json) + \
-               get_data_file_ids(study_json)
-    io_ids_in_process_sequence = get_io_ids_in_process_sequence(study_json)
+    if study_index is None:
+        study_index = StudyIndex(study_json)
+    node_ids = study_index.get(get_source_ids) + study_index.get(get_sample_ids) + \
+        study_index.get(get_material_ids) + study_index.get(get_data_file_ids)
+    io_ids_in_process_sequence = study_index.get(get_io_ids_in_process_sequence)
     if len(set(io_ids_in_process_sequence)) - len(set(node_ids)) > 0:
         diff = set(io_ids_in_process_sequence) - set(node_ids)
         errors.append({
@@ -676,7 +863,7 @@ def check_material_ids_not_declared_used(study_json):
 
 def check_process_sequence_links(process_sequence_json):
     """Used for rule 1006"""
-    process_ids = [process["@id"] for process in process_sequence_json]
+    process_ids = set(process["@id"] for process in process_sequence_json)
     for process in process_sequence_json:
         try:
             if process["previousProcess"]["@id"] not in process_ids:
@@ -709,9 +896,8 @@ def get_study_protocol_ids(study_json):
     return [protocol["@id"] for protocol in study_json["protocols"]]
 
 
-def check_process_protocol_ids_usage(study_json):
+def get_process_protocol_ids(study_json):
     """Used for rules 1007 and 1019"""
-    protocol_ids_declared = get_study_protocol_ids(study_json)
     process_sequence = study_json["processSequence"]
     protocol_ids_used = list()
     for process in process_sequence:
@@ -726,6 +912,15 @@ def check_process_protocol_ids_usage(study_json):
                 protocol_ids_used.append(process["executesProtocol"]["@id"])
             except KeyError:
                 pass
+    return protocol_ids_used
+
+
+def check_process_protocol_ids_usage(study_json, study_index=None):
+    """Used for rules 1007 and 1019"""
+    if study_index is None:
+        study_index = StudyIndex(study_json)
+    protocol_ids_declared = study_index.get(get_study_protocol_ids)
+    protocol_ids_used = study_index.get(get_process_protocol_ids)
     if len(set(protocol_ids_used) - set(protocol_ids_declared)) > 0:
         diff = set(protocol_ids_used) - set(protocol_ids_declared)
         errors.append({
@@ -766,10 +961,13 @@ def get_parameter_value_parameter_ids(study_json):
     return study_pv_parameter_ids
 
 
-def check_protocol_parameter_ids_usage(study_json):
+def check_protocol_parameter_ids_usage(study_json, study_index=None):
     """Used for rule 1009 and 1020"""
-    protocols_declared = get_study_protocols_parameter_ids(study_json) + ["#parameter/Array_Design_REF"] # + special case
-    protocols_used = get_parameter_value_parameter_ids(study_json)
+    if study_index is None:
+        study_index = StudyIndex(study_json)
+    protocols_declared = study_index.get(get_study_protocols_parameter_ids) + \
+        ["#parameter/Array_Design_REF"]  # + special case
+    protocols_used = study_index.get(get_parameter_value_parameter_ids)
     if len(set(protocols_used) - set(protocols_declared)) > 0:
         diff = set(protocols_used) - set(protocols_declared)
         errors.append({
@@ -809,19 +1007,31 @@ def get_characteristic_category_ids_in_assay_materials(assay_json):
               assay_json["materials"]["samples"] + assay_json["materials"]["otherMaterials"]] for elem in iterabl]
 
 
-def check_characteristic_category_ids_usage(studies_json):
+def get_study_and_assay_characteristic_category_ids(study_json):
+    """Used for rule 1013"""
+    characteristic_categories_declared = get_characteristic_category_ids(study_json)
+    for assay in study_json["assays"]:
+        characteristic_categories_declared += get_characteristic_category_ids(assay)
+    return characteristic_categories_declared
+
+
+def get_characteristic_category_ids_in_study_and_assay_materials(study_json):
+    """Used for rule 1013"""
+    characteristic_categories_used = get_characteristic_category_ids_in_study_materials(study_json)
+    for assay in study_json["assays"]:
+        characteristic_categories_used += get_characteristic_category_ids_in_assay_materials(assay)
+    return characteristic_categories_used
+
+
+def check_characteristic_category_ids_usage(studies_json, study_indexes=None):
     """Used for rule 1013"""
+    if study_indexes is None:
+        study_indexes = [StudyIndex(study_json) for study_json in studies_json]
     characteristic_categories_declared = list()
     characteristic_categories_used = list()
-    for study_json in studies_json:
-        characteristic_categories_declared += get_characteristic_category_ids(study_json)
-        for assay in study_json["assays"]:
-            characteristic_categories_declared_in_assay = get_characteristic_category_ids(assay)
-            characteristic_categories_declared += characteristic_categories_declared_in_assay
-        characteristic_categories_used += get_characteristic_category_ids_in_study_materials(study_json)
-        for assay in study_json["assays"]:
-            characteristic_categories_used_in_assay = get_characteristic_category_ids_in_assay_materials(assay)
-            characteristic_categories_used += characteristic_categories_used_in_assay
+    for study_index in study_indexes:
+        characteristic_categories_declared += study_index.get(get_study_and_assay_characteristic_category_ids)
+        characteristic_categories_used += study_index.get(get_characteristic_category_ids_in_study_and_assay_materials)
     if len(set(characteristic_categories_used) - set(characteristic_categories_declared)) > 0:
         diff = set(characteristic_categories_used) - set(characteristic_categories_declared)
         errors.append({
@@ -853,10 +1063,12 @@ def get_study_factor_ids_in_sample_factor_values(study_json):
                                  study_json["materials"]["samples"]] for elem in iterabl]
 
 
-def check_study_factor_usage(study_json):
+def check_study_factor_usage(study_json, study_index=None):
     """Used for rules 1008 and 1021"""
-    factors_declared = get_study_factor_ids(study_json)
-    factors_used = get_study_factor_ids_in_sample_factor_values(study_json)
+    if study_index is None:
+        study_index = StudyIndex(study_json)
+    factors_declared = study_index.get(get_study_factor_ids)
+    factors_used = study_index.get(get_study_factor_ids_in_sample_factor_values)
     if len(set(factors_used) - set(factors_declared)) > 0:
         diff = set(factors_used) - set(factors_declared)
         errors.append({
@@ -918,17 +1130,31 @@ def get_assay_unit_category_ids_in_materials_and_processes(assay_json):
     return [x for x in assay_characteristics_units_used + parameter_value_units_used if x is not None]
 
 
-def check_unit_category_ids_usage(study_json):
-    """Used for rules 1014 and 1022"""
-    log.info("Getting units declared...")
+def get_study_and_assay_unit_category_ids(study_json):
+    """Used for rule 1014"""
     units_declared = get_unit_category_ids(study_json)
     for assay in study_json["assays"]:
         units_declared.extend(get_unit_category_ids(assay))
+    return units_declared
+
+
+def get_unit_category_ids_in_study_and_assay_materials_and_processes(study_json):
+    """Used for rule 1014"""
     log.info("Getting units used (study)...")
     units_used = get_study_unit_category_ids_in_materials_and_processes(study_json)
     log.info("Getting units used (assay)...")
     for assay in study_json["assays"]:
         units_used.extend(get_assay_unit_category_ids_in_materials_and_processes(assay))
+    return units_used
+
+
+def check_unit_category_ids_usage(study_json, study_index=None):
+    """Used for rules 1014 and 1022"""
+    if study_index is None:
+        study_index = StudyIndex(study_json)
+    log.info("Getting units declared...")
+    units_declared = study_index.get(get_study_and_assay_unit_category_ids)
+    units_used = study_index.get(get_unit_category_ids_in_study_and_assay_materials_and_processes)
     log.info("Comparing units declared vs units used...")
     if len(set(units_used) - set(units_declared)) > 0:
         diff = set(units_used) - set(units_declared)
@@ -961,14 +1187,81 @@ def check_utf8(fp):
             raise SystemError()
 
 
-def check_isa_schemas(isa_json, investigation_schema_path):
-    """Used for rule 0003 and 4003"""
+_schema_validators = dict()  # absolute path of a JSON schema -> its Draft4Validator
+
+
+def get_schema_validator(schema_path):
+    """Returns a Draft4Validator for a JSON schema. It is built on first use and then reused for the life of the
+    process. Its resolver is preloaded with every schema in the same directory, so $refs are not read from disk again
+    when documents are validated"""
+    schema_path = os.path.abspath(schema_path)
+    try:
+        return _schema_validators[schema_path]
+    except KeyError:
+        pass
+    with open(schema_path) as fp:
+        schema = json.load(fp)
+    store = dict()
+    for path in glob.glob(os.path.join(os.path.dirname(schema_path), "*.json")):
+        with open(path) as fp:
+            store["file://" + path] = json.load(fp)
+    resolver = RefResolver("file://" + schema_path, schema, store=store)
+    validator = Draft4Validator(schema, resolver=resolver)
+    _schema_validators[schema_path] = validator
+    return validator
+
+
+def iter_isa_schema_errors(isa_json, investigation_schema_path):
+    """Validates ISA-JSON against the ISA-JSON schemas one section at a time: the investigation without its studies,
+    then each study without its assays followed by each of its assays, against the study_schema.json and
+    assay_schema.json next to the investigation schema. Errors are yielded as soon as they are found, along with the
+    section they are in (e.g. "studies[0].assays[1]")"""
+    schemas_dir = os.path.dirname(investigation_schema_path)
+    studies_json = isa_json.get("studies") if isinstance(isa_json, dict) else None
+    if not isinstance(studies_json, list):
+        for error in get_schema_validator(investigation_schema_path).iter_errors(isa_json):
+            yield "investigation", error
+        return
+    for error in get_schema_validator(investigation_schema_path).iter_errors(dict(isa_json, studies=[])):
+        yield "investigation", error
+    study_validator = get_schema_validator(os.path.join(schemas_dir, "study_schema.json"))
+    assay_validator = get_schema_validator(os.path.join(schemas_dir, "assay_schema.json"))
+    for i, study_json in enumerate(studies_json):
+        section = "studies[{}]".format(i)
+        assays_json = study_json.get("assays") if isinstance(study_json, dict) else None
+        if not isinstance(assays_json, list):
+            for error in study_validator.iter_errors(study_json):
+                yield section, error
+            continue
+        for error in study_validator.iter_errors(dict(study_json, assays=[])):
+            yield section, error
+        for j, assay_json in enumerate(assays_json):
+            for error in assay_validator.iter_errors(assay_json):
+                yield "{}.assays[{}]".format(section, j), error
+
+
+def check_isa_schemas(isa_json, investigation_schema_path, by_section=False):
+    """Used for rule 0003 and 4003
+
+    Stops at the first error, unless by_section is set: studies and assays are then validated one by one and every
+    error is reported as soon as it is found"""
+    if by_section:
+        n_errors = 0
+        for section, ve in iter_isa_schema_errors(isa_json, investigation_schema_path):
+            errors.append({
+                "message": "Invalid JSON against ISA-JSON schemas",
+                "supplemental": "{}: {}".format(section, ve),
+                "code": 3
+            })
+            log.error("(E) {} does not validate against the provided ISA-JSON schemas: {}".format(section,
+                                                                                                 ve.message))
+            n_errors += 1
+        if n_errors > 0:
+            log.fatal("(F) The JSON does not validate against the provided ISA-JSON schemas!")
+            raise SystemError("(F) The JSON does not validate against the provided ISA-JSON schemas!")
+        return
     try:
-        with open(investigation_schema_path) as fp:
-            investigation_schema = json.load(fp)
-            resolver = RefResolver("file://" + investigation_schema_path, investigation_schema)
-            validator = Draft4Validator(investigation_schema, resolver=resolver)
-            validator.validate(isa_json)
+        get_schema_validator(investigation_schema_path).validate(isa_json)
     except ValidationError as ve:
         errors.append({
             "message": "Invalid JSON against ISA-JSON schemas",
@@ -1160,11 +1453,12 @@ def walk_and_get_annotations(isa_json, collector):
             walk_and_get_annotations(j, collector)
 
 
-def check_term_source_refs(isa_json):
+def check_term_source_refs(isa_json, index=None):
     """Used for rules 3007 and 3009"""
+    if index is None:
+        index = ISAJSONIndex(isa_json)
     term_sources_declared = get_ontology_source_refs(isa_json)
-    collector = list()
-    walk_and_get_annotations(isa_json, collector)
+    collector = index.annotations
     term_sources_used = [annotation["termSource"] for annotation in collector if annotation["termSource"] is not ""]
     if len(set(term_sources_used) - set(term_sources_declared)) > 0:
         diff = set(term_sources_used) - set(term_sources_declared)
@@ -1186,10 +1480,11 @@ def check_term_source_refs(isa_json):
                     .format(list(diff)))
 
 
-def check_term_accession_used_no_source_ref(isa_json):
+def check_term_accession_used_no_source_ref(isa_json, index=None):
     """Used for rule 3010"""
-    collector = list()
-    walk_and_get_annotations(isa_json, collector)
+    if index is None:
+        index = ISAJSONIndex(isa_json)
+    collector = index.annotations
     terms_using_accession_no_source_ref = [annotation for annotation in collector if annotation["termAccession"]
                                            is not "" and annotation["termSource"] is ""]
     if len(terms_using_accession_no_source_ref) > 0:
@@ -1245,6 +1540,9 @@ def check_measurement_technology_types(assay_json, configs):
 def check_study_and_assay_graphs(study_json, configs):
 
     def check_assay_graph(process_sequence_json, config):
+        processes = dict()
+        for process in process_sequence_json:
+            processes.setdefault(process["@id"], process)
         list_of_last_processes_in_sequence = [i for i in process_sequence_json if "nextProcess" not in i.keys()]
         log.info("Checking against assay protocol sequence configuration {}".format(config["description"]))
         config_protocol_sequence = [i["protocol"] for i in config["protocols"]]
@@ -1269,7 +1567,7 @@ def check_study_and_assay_graphs(study_json, configs):
                                 process_graph.append(input_id)
                     process_graph.reverse()
                     assay_graph.append(process_graph)
-                    process = [i for i in process_sequence_json if i["@id"] == process["previousProcess"]["@id"]][0]
+                    process = processes[process["previousProcess"]["@id"]]
                     if process['@id'] == process["previousProcess"]["@id"]:
                         log.fatal("Previous process is same as current process, which forms a loop!!!!! Cannot find start node!!!!!!!")
                         break
@@ -1315,7 +1613,7 @@ default_config_dir = os.path.join(BASE_DIR, "resources", "config", "json", "defa
 
 
 def validate(fp, config_dir=default_config_dir, log_level=config.log_level,
-             base_schemas_dir="isa_model_version_1_0_schemas"):
+             base_schemas_dir="isa_model_version_1_0_schemas", by_section=False):
     if config_dir is None:
         config_dir = default_config_dir
     log.setLevel(log_level)
@@ -1336,26 +1634,30 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level,
         log.info("Validating JSON against schemas using Draft4Validator")
         check_isa_schemas(isa_json=isa_json,
                           investigation_schema_path=os.path.join(BASE_DIR, "resources", "schemas", base_schemas_dir,
-                                                                 "core", "investigation_schema.json"))  # Rule 0003
+                                                                 "core", "investigation_schema.json"),
+                          by_section=by_section)  # Rule 0003
+        log.info("Indexing identifiers, references and annotations...")
+        index = ISAJSONIndex(isa_json)
         log.info("Checking if material IDs used are declared...")
-        for study_json in isa_json["studies"]:
-            check_material_ids_not_declared_used(study_json)  # Rules 1002-1005
-        for study_json in isa_json["studies"]:
-            check_material_ids_declared_used(study_json, get_source_ids)  # Rule 1015
-            check_material_ids_declared_used(study_json, get_sample_ids)  # Rule 1016
-            check_material_ids_declared_used(study_json, get_material_ids)  # Rule 1017
-            check_material_ids_declared_used(study_json, get_data_file_ids)  # Rule 1018
+        for study_index in index.studies:
+            check_material_ids_not_declared_used(study_index.study_json, study_index)  # Rules 1002-1005
+        for study_index in index.studies:
+            study_json = study_index.study_json
+            check_material_ids_declared_used(study_json, get_source_ids, study_index)  # Rule 1015
+            check_material_ids_declared_used(study_json, get_sample_ids, study_index)  # Rule 1016
+            check_material_ids_declared_used(study_json, get_material_ids, study_index)  # Rule 1017
+            check_material_ids_declared_used(study_json, get_data_file_ids, study_index)  # Rule 1018
         log.info("Checking characteristic categories usage...")
-        check_characteristic_category_ids_usage(isa_json["studies"])  # Rules 1013 and 1022
+        check_characteristic_category_ids_usage(isa_json["studies"], index.studies)  # Rules 1013 and 1022
         log.info("Checking study factor usage...")
-        for study_json in isa_json["studies"]:
-            check_study_factor_usage(study_json)  # Rules 1008 and 1021
+        for study_index in index.studies:
+            check_study_factor_usage(study_index.study_json, study_index)  # Rules 1008 and 1021
         log.info("Checking protocol parameter usage...")
-        for study_json in isa_json["studies"]:
-            check_protocol_parameter_ids_usage(study_json)  # Rules 1009 and 1020
+        for study_index in index.studies:
+            check_protocol_parameter_ids_usage(study_index.study_json, study_index)  # Rules 1009 and 1020
         log.info("Checking unit category usage...")
-        for study_json in isa_json["studies"]:
-            check_unit_category_ids_usage(study_json)  # Rules 1014 and 1022
+        for study_index in index.studies:
+            check_unit_category_ids_usage(study_index.study_json, study_index)  # Rules 1014 and 1022
         log.info("Checking process sequences (study)...")
         for study_json in isa_json["studies"]:
             check_process_sequence_links(study_json["processSequence"])  # Rule 1006
@@ -1363,8 +1665,8 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level,
             for assay_json in study_json["assays"]:
                 check_process_sequence_links(assay_json["processSequence"])  # Rule 1006
         log.info("Checking process protocol usage...")
-        for study_json in isa_json["studies"]:
-            check_process_protocol_ids_usage(study_json)  # Rules 1007 and 1019
+        for study_index in index.studies:
+            check_process_protocol_ids_usage(study_index.study_json, study_index)  # Rules 1007 and 1019
         log.info("Checking date formats...")
         check_date_formats(isa_json)  # Rule 3001
         log.info("Checking DOI formats...")
@@ -1382,9 +1684,9 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level,
         log.info("Checking ontology sources...")
         check_ontology_sources(isa_json)  # Rule 3008
         log.info("Checking term source REFs...")
-        check_term_source_refs(isa_json)  # Rules 3007 and 3009
+        check_term_source_refs(isa_json, index)  # Rules 3007 and 3009
         log.info("Checking missing term source REFs...")
-        check_term_accession_used_no_source_ref(isa_json)  # Rule 3010
+        check_term_accession_used_no_source_ref(isa_json, index)  # Rule 3010
         log.info("Loading configurations from " + config_dir)
         configs = load_config(config_dir)  # Rule 4001
         log.info("Checking measurement and technology types...")
@@ -1394,7 +1696,8 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level,
         log.info("Checking against configuration schemas...")
         check_isa_schemas(isa_json=isa_json,
                           investigation_schema_path=os.path.join(config_dir, "schemas",
-                                                                 "investigation_schema.json"))  # Rule 4003
+                                                                 "investigation_schema.json"),
+                          by_section=by_section)  # Rule 4003
         # if all ERRORS are resolved, then try and validate against configuration
         handler.flush()
         if "(E)" in stream.getvalue():
@@ -1430,6 +1733,7 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level,
         log.fatal("(F) Something went very very wrong! :(")
     finally:
         handler.flush()
+        log.removeHandler(handler)
         return {
             "errors": errors,
             "warnings": warnings,
@@ -1437,9 +1741,35 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level,
         }
 
 
-def batch_validate(json_file_list):
+def _validate_json_file(json_file):
+    with open(json_file) as fp:
+        return {
+            "filename": fp.name,
+            "report": validate(fp)
+        }
+
+
+def _imap_validate_json_files(json_file_list, n_workers=None, timeout=None):
+    from isatools.batch import imap_validate
+    # built before the workers are started, so that forked workers inherit them
+    get_schema_validator(os.path.join(BASE_DIR, "resources", "schemas", "isa_model_version_1_0_schemas", "core",
+                                      "investigation_schema.json"))
+    get_schema_validator(os.path.join(default_config_dir, "schemas", "investigation_schema.json"))
+    json_files = list()
+    for json_file in json_file_list:
+        if not os.path.isfile(json_file):
+            log.warning("Could not find ISA-JSON file, skipping {}".format(json_file))
+        else:
+            json_files.append(json_file)
+    return imap_validate(_validate_json_file, json_files, n_workers=n_workers, timeout=timeout)
+
+
+def batch_validate(json_file_list, n_workers=1, timeout=None):
     """ Validate a batch of ISA-JSON files
         :param json_file_list: List of file paths to the ISA-JSON files to validate
+        :param n_workers: Number of worker processes validating files in parallel, None for one per CPU. With the
+        default of 1 and no timeout the files are validated in the calling process
+        :param timeout: Seconds after which the validation of a single file is stopped and reported as unfinished
         :return: Dict of reports
 
         Example:
@@ -1448,26 +1778,41 @@ def batch_validate(json_file_list):
                 "/path/to/study1.json",
                 "/path/to/study2.json"
             ]
-            my_reports = isajson.batch_validate(my_jsons)
+            my_reports = isajson.batch_validate(my_jsons, n_workers=4, timeout=600)
         """
     batch_report = {
         "batch_report": []
     }
-    for json_file in json_file_list:
-        log.info("***Validating {}***\n".format(json_file))
-        if not os.path.isfile(json_file):
-            log.warning("Could not find ISA-JSON file, skipping {}".format(json_file))
-        else:
-            with open(json_file) as fp:
-                batch_report["batch_report"].append(
-                    {
-                        "filename": fp.name,
-                        "report": validate(fp)
-                    }
-                )
+    if n_workers == 1 and timeout is None:
+        for json_file in json_file_list:
+            log.info("***Validating {}***\n".format(json_file))
+            if not os.path.isfile(json_file):
+                log.warning("Could not find ISA-JSON file, skipping {}".format(json_file))
+            else:
+                batch_report["batch_report"].append(_validate_json_file(json_file))
+    else:
+        reports = dict(_imap_validate_json_files(json_file_list, n_workers=n_workers, timeout=timeout))
+        batch_report["batch_report"] = [reports[i] for i in sorted(reports.keys())]
     return batch_report
 
 
+def ibatch_validate(json_file_list, n_workers=None, timeout=None):
+    """ Validate a batch of ISA-JSON files in parallel worker processes, yielding each report as soon as its file is
+        done
+        :param json_file_list: List of file paths to the ISA-JSON files to validate
+        :param n_workers: Number of worker processes, None for one per CPU
+        :param timeout: Seconds after which the validation of a single file is stopped and reported as unfinished
+        :return: Generator of dicts with the 'filename' and 'report' of each validated file, in order of completion
+
+        Example:
+            from isatools import isajson
+            for result in isajson.ibatch_validate(my_jsons, n_workers=8, timeout=600):
+                print(result['filename'], len(result['report']['errors']))
+        """
+    for _, result in _imap_validate_json_files(json_file_list, n_workers=n_workers, timeout=timeout):
+        yield result
+
+
 class ISAJSONEncoder(JSONEncoder):
 
     def default(self, o):
@@ -1710,15 +2055,16 @@ class ISAJSONEncoder(JSONEncoder):
                 "people": get_people(o.contacts),
                 "studyDesignDescriptors": get_ontology_annotations(o.design_descriptors),
                 "protocols": list(map(lambda x: get_protocol(x), o.protocols)),
+                # declared before the materials and processes referring to them, for stream_load()
+                "factors": list(map(lambda x: get_factor(x), o.factors)),
+                "characteristicCategories": get_characteristic_categories(o.characteristic_categories),
+                "unitCategories": get_ontology_annotations(o.units),
                 "materials": {
                     "sources": list(map(lambda x: get_source(x), o.sources)),
                     "samples": get_samples(o.samples),
                     "otherMaterials": get_other_materials(o.other_material)
                 },
                 "processSequence": list(map(lambda x: get_process(x), o.process_sequence)),
-                "factors": list(map(lambda x: get_factor(x), o.factors)),
-                "characteristicCategories": get_characteristic_categories(o.characteristic_categories),
-                "unitCategories": get_ontology_annotations(o.units),
                 "comments": get_comments(o.comments),
                 "assays": list(map(lambda x: get_assay(x), o.assays))
             }
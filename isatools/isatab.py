@@ -4,8 +4,12 @@ Don't forget to read the ISA-Tab spec:
 http://isa-specs.readthedocs.io/en/latest/isatab.html
 """
 from __future__ import absolute_import
+import contextlib
 import csv
+import functools
+import gc
 import glob
+import hashlib
 import io
 import iso8601
 import logging
@@ -13,9 +17,15 @@ import math
 import numpy as np
 import os
 import pandas as pd
+import pickle
 import re
+import tempfile
+import threading
+import zlib
 from bisect import bisect_left
 from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from io import StringIO
 from itertools import tee
 from itertools import zip_longest
@@ -24,10 +34,10 @@ from progressbar import ProgressBar
 from progressbar import SimpleProgress
 from progressbar import Bar
 from progressbar import ETA
-import shutil
-import tempfile
 
+import isatools
 from isatools import config
+from isatools.checksums import file_checksum
 from isatools.model import *
 
 logging.basicConfig(level=config.log_level)
@@ -60,7 +70,32 @@ _LABELS_ASSAY_NODES = ['Assay Name', 'MS Assay Name', 'Hybridization Assay Name'
                        'Data Transformation Name', 'Normalization Name']
 
 
-def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tables=False):
+class _InvestigationSection(object):
+    """Rows of an investigation file section, such as one per protocol in STUDY PROTOCOLS.
+
+    Sections are written transposed: one line per column, starting with the column label and followed by the value
+    of that column in each row. This is what was written by building the section as a DataFrame, transposing it and
+    calling DataFrame.to_csv(), with the same quoting.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.rows = []
+
+    def append(self, row):
+        if len(row) != len(self.columns):
+            raise ValueError("cannot set a row with mismatched columns")
+        self.rows.append(['' if _is_empty_cell(value) else value for value in row])
+
+    def write(self, fp, name):
+        fp.write(name + '\n')
+        writer = csv.writer(fp, delimiter='\t', lineterminator='\n')
+        for i, label in enumerate(self.columns):
+            writer.writerow([label] + [row[i] for row in self.rows])
+
+
+def _write_investigation_file(investigation, fp):
+    """Writes the investigation file of investigation to fp, any writable text stream"""
 
     def _build_roles_str(roles):
         log.debug('building roles from: %s', roles)
@@ -82,28 +117,28 @@ def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tabl
         log.debug('roles_source_refs: %s', roles)
         return roles_names, roles_accession_numbers, roles_source_refs
 
-    def _build_contacts_section_df(prefix='Investigation', contacts=list()):
+    def _build_contacts_section(prefix='Investigation', contacts=list()):
         log.debug('building contacts from: %s', contacts)
-        contacts_df_cols = [prefix + ' Person Last Name',
-                            prefix + ' Person First Name',
-                            prefix + ' Person Mid Initials',
-                            prefix + ' Person Email',
-                            prefix + ' Person Phone',
-                            prefix + ' Person Fax',
-                            prefix + ' Person Address',
-                            prefix + ' Person Affiliation',
-                            prefix + ' Person Roles',
-                            prefix + ' Person Roles Term Accession Number',
-                            prefix + ' Person Roles Term Source REF']
+        contacts_section_cols = [prefix + ' Person Last Name',
+                                 prefix + ' Person First Name',
+                                 prefix + ' Person Mid Initials',
+                                 prefix + ' Person Email',
+                                 prefix + ' Person Phone',
+                                 prefix + ' Person Fax',
+                                 prefix + ' Person Address',
+                                 prefix + ' Person Affiliation',
+                                 prefix + ' Person Roles',
+                                 prefix + ' Person Roles Term Accession Number',
+                                 prefix + ' Person Roles Term Source REF']
         if len(contacts) > 0:
             if contacts[0].comments:
                 for comment in contacts[0].comments:
-                    contacts_df_cols.append('Comment[' + comment.name + ']')
-        contacts_df = pd.DataFrame(columns=tuple(contacts_df_cols))
+                    contacts_section_cols.append('Comment[' + comment.name + ']')
+        contacts_section = _InvestigationSection(columns=tuple(contacts_section_cols))
         for i, contact in enumerate(contacts):
             log.debug('%s iteration, item=%s', i, contact)
             roles_names, roles_accession_numbers, roles_source_refs = _build_roles_str(contact.roles)
-            contacts_df_row = [
+            contacts_section_row = [
                 contact.last_name,
                 contact.first_name,
                 contact.mid_initials,
@@ -118,27 +153,27 @@ def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tabl
             ]
             if contact.comments:
                 for comment in contact.comments:
-                    contacts_df_row.append(comment.value)
-            log.debug('row=%s', contacts_df_row)
-            contacts_df.loc[i] = contacts_df_row
-        return contacts_df.set_index(prefix + ' Person Last Name').T
+                    contacts_section_row.append(comment.value)
+            log.debug('row=%s', contacts_section_row)
+            contacts_section.append(contacts_section_row)
+        return contacts_section
 
-    def _build_publications_section_df(prefix='Investigation', publications=list()):
+    def _build_publications_section(prefix='Investigation', publications=list()):
         log.debug('building contacts from: %s', publications)
-        publications_df_cols = [prefix + ' PubMed ID',
-                                prefix + ' Publication DOI',
-                                prefix + ' Publication Author List',
-                                prefix + ' Publication Title',
-                                prefix + ' Publication Status',
-                                prefix + ' Publication Status Term Accession Number',
-                                prefix + ' Publication Status Term Source REF']
+        publications_section_cols = [prefix + ' PubMed ID',
+                                     prefix + ' Publication DOI',
+                                     prefix + ' Publication Author List',
+                                     prefix + ' Publication Title',
+                                     prefix + ' Publication Status',
+                                     prefix + ' Publication Status Term Accession Number',
+                                     prefix + ' Publication Status Term Source REF']
         if len(publications) > 0:
             try:
                 for comment in publications[0].comments:
-                    publications_df_cols.append('Comment[' + comment.name + ']')
+                    publications_section_cols.append('Comment[' + comment.name + ']')
             except TypeError:
                 pass
-        publications_df = pd.DataFrame(columns=tuple(publications_df_cols))
+        publications_section = _InvestigationSection(columns=tuple(publications_section_cols))
         for i, publication in enumerate(publications):
             log.debug('%s iteration, item=%s', i, publication)
             if publication.status is not None:
@@ -152,7 +187,7 @@ def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tabl
                 status_term = ''
                 status_term_accession = ''
                 status_term_source_name = ''
-            publications_df_row = [
+            publications_section_row = [
                 publication.pubmed_id,
                 publication.doi,
                 publication.author_list,
@@ -163,61 +198,41 @@ def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tabl
             ]
             try:
                 for comment in publication.comments:
-                    publications_df_row.append(comment.value)
+                    publications_section_row.append(comment.value)
             except TypeError:
                 pass
-            log.debug('row=%s', publications_df_row)
-            publications_df.loc[i] = publications_df_row
-        return publications_df.set_index(prefix +' PubMed ID').T
-
-    if not _RX_I_FILE_NAME.match(i_file_name):
-        log.debug('investigation filename=', i_file_name)
-        raise NameError("Investigation file must match pattern i_*.txt")
-
-    if os.path.exists(output_path):
-        fp = open(os.path.join(output_path, i_file_name), 'w')
-    else:
-        log.debug('output_path=', i_file_name)
-        raise FileNotFoundError("Can't find " + output_path)
-
-    if not isinstance(isa_obj, Investigation):
-        log.debug('object type=', type(isa_obj))
-        raise NotImplementedError("Can only dump an Investigation object")
-
-    # Process Investigation object first to write the investigation file
-    investigation = isa_obj
+            log.debug('row=%s', publications_section_row)
+            publications_section.append(publications_section_row)
+        return publications_section
 
     # Write ONTOLOGY SOURCE REFERENCE section
-    ontology_source_references_df = pd.DataFrame(columns=('Term Source Name',
-                                                          'Term Source File',
-                                                          'Term Source Version',
-                                                          'Term Source Description'
-                                                          )
-                                                 )
+    ontology_source_references_section = _InvestigationSection(columns=('Term Source Name',
+                                                                        'Term Source File',
+                                                                        'Term Source Version',
+                                                                        'Term Source Description'
+                                                                       )
+                                                              )
     for i,  ontology_source_reference in enumerate(investigation.ontology_source_references):
         log.debug('%s iteration, item=%s', i, ontology_source_reference)
-        ontology_source_references_df.loc[i] = [
+        ontology_source_references_section.append([
             ontology_source_reference.name,
             ontology_source_reference.file,
             ontology_source_reference.version,
             ontology_source_reference.description
-        ]
-        log.debug('ontology_source_reference=%s', ontology_source_references_df.loc[i])
-    ontology_source_references_df = ontology_source_references_df.set_index('Term Source Name').T
-    fp.write('ONTOLOGY SOURCE REFERENCE\n')
-    ontology_source_references_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8',
-                                         index_label='Term Source Name')  # Need to set index_label as top left cell
+        ])
+        log.debug('ontology_source_reference=%s', ontology_source_reference)
+    ontology_source_references_section.write(fp, 'ONTOLOGY SOURCE REFERENCE')
     #
     #  Write INVESTIGATION section
-    inv_df_cols = ['Investigation Identifier',
-                   'Investigation Title',
-                   'Investigation Description',
-                   'Investigation Submission Date',
-                   'Investigation Public Release Date']
+    inv_section_cols = ['Investigation Identifier',
+                        'Investigation Title',
+                        'Investigation Description',
+                        'Investigation Submission Date',
+                        'Investigation Public Release Date']
     for comment in sorted(investigation.comments, key=lambda x: x.name):
-        inv_df_cols.append('Comment[' + comment.name + ']')
-    investigation_df = pd.DataFrame(columns=tuple(inv_df_cols))
-    inv_df_rows = [
+        inv_section_cols.append('Comment[' + comment.name + ']')
+    investigation_section = _InvestigationSection(columns=tuple(inv_section_cols))
+    inv_section_rows = [
         investigation.identifier,
         investigation.title,
         investigation.description,
@@ -225,38 +240,31 @@ def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tabl
         investigation.public_release_date
     ]
     for comment in sorted(investigation.comments, key=lambda x: x.name):
-        inv_df_rows.append(comment.value)
-    investigation_df.loc[0] = inv_df_rows
-    investigation_df = investigation_df.set_index('Investigation Identifier').T
-    fp.write('INVESTIGATION\n')
-    investigation_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8',
-                            index_label='Investigation Identifier')  # Need to set index_label as top left cell
+        inv_section_rows.append(comment.value)
+    investigation_section.append(inv_section_rows)
+    investigation_section.write(fp, 'INVESTIGATION')
 
     # Write INVESTIGATION PUBLICATIONS section
-    investigation_publications_df = _build_publications_section_df(publications=investigation.publications)
-    fp.write('INVESTIGATION PUBLICATIONS\n')
-    investigation_publications_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8',
-                                         index_label='Investigation PubMed ID')
+    investigation_publications_section = _build_publications_section(publications=investigation.publications)
+    investigation_publications_section.write(fp, 'INVESTIGATION PUBLICATIONS')
 
     # Write INVESTIGATION CONTACTS section
-    investigation_contacts_df = _build_contacts_section_df(contacts=investigation.contacts)
-    fp.write('INVESTIGATION CONTACTS\n')
-    investigation_contacts_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8',
-                                     index_label='Investigation Person Last Name')
+    investigation_contacts_section = _build_contacts_section(contacts=investigation.contacts)
+    investigation_contacts_section.write(fp, 'INVESTIGATION CONTACTS')
 
     # Write STUDY sections
     for study in investigation.studies:
-        study_df_cols = ['Study Identifier',
-                         'Study Title',
-                         'Study Description',
-                         'Study Submission Date',
-                         'Study Public Release Date',
-                         'Study File Name']
+        study_section_cols = ['Study Identifier',
+                              'Study Title',
+                              'Study Description',
+                              'Study Submission Date',
+                              'Study Public Release Date',
+                              'Study File Name']
         if study.comments is not None:
             for comment in sorted(study.comments, key=lambda x: x.name):
-                study_df_cols.append('Comment[' + comment.name + ']')
-        study_df = pd.DataFrame(columns=tuple(study_df_cols))
-        study_df_row = [
+                study_section_cols.append('Comment[' + comment.name + ']')
+        study_section = _InvestigationSection(columns=tuple(study_section_cols))
+        study_section_row = [
             study.identifier,
             study.title,
             study.description,
@@ -266,41 +274,35 @@ def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tabl
         ]
         if study.comments is not None:
             for comment in sorted(study.comments, key=lambda x: x.name):
-                study_df_row.append(comment.value)
-        study_df.loc[0] = study_df_row
-        study_df = study_df.set_index('Study Identifier').T
-        fp.write('STUDY\n')
-        study_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8', index_label='Study Identifier')
+                study_section_row.append(comment.value)
+        study_section.append(study_section_row)
+        study_section.write(fp, 'STUDY')
 
         # Write STUDY DESIGN DESCRIPTORS section
-        study_design_descriptors_df = pd.DataFrame(columns=('Study Design Type',
-                                                            'Study Design Type Term Accession Number',
-                                                            'Study Design Type Term Source REF'
-                                                            )
-                                                   )
+        study_design_descriptors_section = _InvestigationSection(columns=('Study Design Type',
+                                                                          'Study Design Type Term Accession Number',
+                                                                          'Study Design Type Term Source REF'
+                                                                         )
+                                                                )
         for i, design_descriptor in enumerate(study.design_descriptors):
-            study_design_descriptors_df.loc[i] = [
+            study_design_descriptors_section.append([
                 design_descriptor.term,
                 design_descriptor.term_accession,
                 design_descriptor.term_source.name if design_descriptor.term_source else ''
-            ]
-        study_design_descriptors_df = study_design_descriptors_df.set_index('Study Design Type').T
-        fp.write('STUDY DESIGN DESCRIPTORS\n')
-        study_design_descriptors_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8',
-                                           index_label='Study Design Type')
+            ])
+        study_design_descriptors_section.write(fp, 'STUDY DESIGN DESCRIPTORS')
 
         # Write STUDY PUBLICATIONS section
-        study_publications_df = _build_publications_section_df(prefix='Study', publications=study.publications)
-        fp.write('STUDY PUBLICATIONS\n')
-        study_publications_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8', index_label='Study PubMed ID')
+        study_publications_section = _build_publications_section(prefix='Study', publications=study.publications)
+        study_publications_section.write(fp, 'STUDY PUBLICATIONS')
 
         # Write STUDY FACTORS section
-        study_factors_df = pd.DataFrame(columns=('Study Factor Name',
-                                                 'Study Factor Type',
-                                                 'Study Factor Type Term Accession Number',
-                                                 'Study Factor Type Term Source REF'
-                                                 )
-                                        )
+        study_factors_section = _InvestigationSection(columns=('Study Factor Name',
+                                                               'Study Factor Type',
+                                                               'Study Factor Type Term Accession Number',
+                                                               'Study Factor Type Term Source REF'
+                                                              )
+                                                     )
         for i, factor in enumerate(study.factors):
             if factor.factor_type is not None:
                 factor_type_term = factor.factor_type.term
@@ -313,31 +315,28 @@ def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tabl
                 factor_type_term = ''
                 factor_type_term_accession = ''
                 factor_type_term_term_source_name = ''
-            study_factors_df.loc[i] = [
+            study_factors_section.append([
                 factor.name,
                 factor_type_term,
                 factor_type_term_accession,
                 factor_type_term_term_source_name
-            ]
-        study_factors_df = study_factors_df.set_index('Study Factor Name').T
-        fp.write('STUDY FACTORS\n')
-        study_factors_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8',
-                                index_label='Study Factor Name')
+            ])
+        study_factors_section.write(fp, 'STUDY FACTORS')
 
         # Write STUDY ASSAYS section
-        study_assays_df = pd.DataFrame(columns=(
-                                                'Study Assay File Name',
-                                                'Study Assay Measurement Type',
-                                                'Study Assay Measurement Type Term Accession Number',
-                                                'Study Assay Measurement Type Term Source REF',
-                                                'Study Assay Technology Type',
-                                                'Study Assay Technology Type Term Accession Number',
-                                                'Study Assay Technology Type Term Source REF',
-                                                'Study Assay Technology Platform',
-                                                )
-                                       )
+        study_assays_section = _InvestigationSection(columns=(
+                                                              'Study Assay File Name',
+                                                              'Study Assay Measurement Type',
+                                                              'Study Assay Measurement Type Term Accession Number',
+                                                              'Study Assay Measurement Type Term Source REF',
+                                                              'Study Assay Technology Type',
+                                                              'Study Assay Technology Type Term Accession Number',
+                                                              'Study Assay Technology Type Term Source REF',
+                                                              'Study Assay Technology Platform',
+                                                             )
+                                                    )
         for i, assay in enumerate(study.assays):
-            study_assays_df.loc[i] = [
+            study_assays_section.append([
                 assay.filename,
                 assay.measurement_type.term,
                 assay.measurement_type.term_accession,
@@ -346,29 +345,26 @@ def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tabl
                 assay.technology_type.term_accession,
                 assay.technology_type.term_source.name if assay.technology_type.term_source else '',
                 assay.technology_platform
-            ]
-        study_assays_df = study_assays_df.set_index('Study Assay File Name').T
-        fp.write('STUDY ASSAYS\n')
-        study_assays_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8',
-                               index_label='Study Assay File Name')
+            ])
+        study_assays_section.write(fp, 'STUDY ASSAYS')
 
         # Write STUDY PROTOCOLS section
-        study_protocols_df = pd.DataFrame(columns=('Study Protocol Name',
-                                                   'Study Protocol Type',
-                                                   'Study Protocol Type Term Accession Number',
-                                                   'Study Protocol Type Term Source REF',
-                                                   'Study Protocol Description',
-                                                   'Study Protocol URI',
-                                                   'Study Protocol Version',
-                                                   'Study Protocol Parameters Name',
-                                                   'Study Protocol Parameters Name Term Accession Number',
-                                                   'Study Protocol Parameters Name Term Source REF',
-                                                   'Study Protocol Components Name',
-                                                   'Study Protocol Components Type',
-                                                   'Study Protocol Components Type Term Accession Number',
-                                                   'Study Protocol Components Type Term Source REF',
-                                                   )
-                                          )
+        study_protocols_section = _InvestigationSection(columns=('Study Protocol Name',
+                                                                 'Study Protocol Type',
+                                                                 'Study Protocol Type Term Accession Number',
+                                                                 'Study Protocol Type Term Source REF',
+                                                                 'Study Protocol Description',
+                                                                 'Study Protocol URI',
+                                                                 'Study Protocol Version',
+                                                                 'Study Protocol Parameters Name',
+                                                                 'Study Protocol Parameters Name Term Accession Number',
+                                                                 'Study Protocol Parameters Name Term Source REF',
+                                                                 'Study Protocol Components Name',
+                                                                 'Study Protocol Components Type',
+                                                                 'Study Protocol Components Type Term Accession Number',
+                                                                 'Study Protocol Components Type Term Source REF',
+                                                                )
+                                                       )
         for i, protocol in enumerate(study.protocols):
             parameters_names = ''
             parameters_accession_numbers = ''
@@ -403,7 +399,7 @@ def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tabl
                 protocol_type_term_accession = protocol.protocol_type.term_accession
                 if protocol.protocol_type.term_source:
                     protocol_type_term_source_name = protocol.protocol_type.term_source.name
-            study_protocols_df.loc[i] = [
+            study_protocols_section.append([
                 protocol.name,
                 protocol_type_term,
                 protocol_type_term_accession,
@@ -418,24 +414,38 @@ def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tabl
                 component_types,
                 component_types_accession_numbers,
                 component_types_source_refs
-            ]
-        study_protocols_df = study_protocols_df.set_index('Study Protocol Name').T
-        fp.write('STUDY PROTOCOLS\n')
-        study_protocols_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8',
-                                  index_label='Study Protocol Name')
+            ])
+        study_protocols_section.write(fp, 'STUDY PROTOCOLS')
 
         # Write STUDY CONTACTS section
-        study_contacts_df = _build_contacts_section_df(prefix='Study', contacts=study.contacts)
-        fp.write('STUDY CONTACTS\n')
-        study_contacts_df.to_csv(path_or_buf=fp, mode='a', sep='\t', encoding='utf-8',
-                                 index_label='Study Person Last Name')
+        study_contacts_section = _build_contacts_section(prefix='Study', contacts=study.contacts)
+        study_contacts_section.write(fp, 'STUDY CONTACTS')
+
+
+def dump(isa_obj, output_path, i_file_name='i_investigation.txt', skip_dump_tables=False):
+
+    if not _RX_I_FILE_NAME.match(i_file_name):
+        log.debug('investigation filename=', i_file_name)
+        raise NameError("Investigation file must match pattern i_*.txt")
+
+    if not os.path.exists(output_path):
+        log.debug('output_path=', i_file_name)
+        raise FileNotFoundError("Can't find " + output_path)
+
+    if not isinstance(isa_obj, Investigation):
+        log.debug('object type=', type(isa_obj))
+        raise NotImplementedError("Can only dump an Investigation object")
+
+    # Process Investigation object first to write the investigation file
+    investigation = isa_obj
+    with open(os.path.join(output_path, i_file_name), 'w') as fp:
+        _write_investigation_file(investigation, fp)
     if skip_dump_tables:
         pass
     else:
         write_study_table_files(investigation, output_path)
         write_assay_table_files(investigation, output_path)
 
-    fp.close()
     return investigation
 
 
@@ -456,54 +466,371 @@ def _get_start_end_nodes(G):
     return start_nodes, end_nodes
 
 
+def _path_node_weight(n):
+    """Number of columns a node contributes to a table row, used to pick the path the table layout is built from"""
+    weight = 1
+    if isinstance(n, Source):
+        weight += len(n.characteristics)
+    elif isinstance(n, Sample):
+        weight += (len(n.characteristics) + len(n.factor_values))
+    elif isinstance(n, Material):
+        weight += (len(n.characteristics))
+    elif isinstance(n, Process):
+        weight += len([o for o in n.outputs if isinstance(o, DataFile)])
+    if n.comments is not None:
+        weight += len(n.comments)
+    return weight
+
+
 def _longest_path_and_attrs(paths):
     longest = (0, None)
     for path in paths:
-        length = len(path)
-        for n in path:
-            if isinstance(n, Source):
-                length += len(n.characteristics)
-            elif isinstance(n, Sample):
-                length += (len(n.characteristics) + len(n.factor_values))
-            elif isinstance(n, Material):
-                length += (len(n.characteristics))
-            elif isinstance(n, Process):
-                length += len([o for o in n.outputs if isinstance(o, DataFile)])
-            if n.comments is not None:
-                length += len(n.comments)
+        length = sum(_path_node_weight(n) for n in path)
         if length > longest[0]:
             longest = (length, path)
     return longest[1]
 
 
-def _all_end_to_end_paths(G, start_nodes):  # we know graphs start with Source or Sample and end with Process
-    paths = []
-    num_start_nodes = len(start_nodes)
-    message = 'Calculating for paths for {} start nodes: '.format(num_start_nodes)
-    if isinstance(start_nodes[0], Source):
-        message = 'Calculating for paths for {} sources: '.format(num_start_nodes)
-    elif isinstance(start_nodes[0], Sample):
-        message = 'Calculating for paths for {} samples: '.format(num_start_nodes)
+class EndToEndPaths(object):
+    """End-to-end paths of an ISA process graph, the rows of the study and assay tables.
+
+    Paths starting at a Source end at the Samples with no outgoing edges, and paths starting at a Sample end at the
+    Processes with no next_process. The paths are walked depth-first from each start node, so paths sharing a prefix
+    share its traversal and are generated lazily one at a time. On a DAG, the number of paths from each node is first
+    counted in one pass in reverse topological order; the walk then never enters a branch that leads to no end, and
+    path counts and the longest path are computed from these counts without enumerating any path.
+
+    Usage:
+
+        paths = EndToEndPaths(assay.graph)
+        n_rows = paths.count(samples)
+        for path in paths.iter(samples):
+            ...
+    """
+
+    def __init__(self, G):
+        self.G = G
+        self._succ = G.succ
+        # topological order of the nodes, None if the graph has a cycle and simple paths have to be walked instead
+        indegree = dict((x, len(G.pred[x])) for x in G)
+        ready = [x for x, d in indegree.items() if d == 0]
+        order = list()
+        while ready:
+            x = ready.pop()
+            order.append(x)
+            for y in G.succ[x]:
+                indegree[y] -= 1
+                if indegree[y] == 0:
+                    ready.append(y)
+        self._order = order if len(order) == len(indegree) else None
+        self._counts = dict()
+
+    @staticmethod
+    def _end_kind(start):
+        if isinstance(start, Source):
+            return Source
+        elif isinstance(start, Sample):
+            return Sample
+        return None
+
+    def _is_end(self, kind, x):
+        if kind is Source:
+            return isinstance(x, Sample) and len(self._succ[x]) == 0
+        return isinstance(x, Process) and x.next_process is None
+
+    def _path_counts(self, kind):
+        """Number of paths from each node to an end of the kind of start node, None if the graph has a cycle"""
+        if self._order is None:
+            return None
+        counts = self._counts.get(kind)
+        if counts is None:
+            counts = dict()
+            for x in reversed(self._order):
+                counts[x] = int(self._is_end(kind, x)) + sum(counts[y] for y in self._succ[x])
+            self._counts[kind] = counts
+        return counts
+
+    def iter(self, start_nodes):
+        """Lazily yields the end-to-end paths, as lists of nodes, start node by start node
+
+        :param start_nodes: Source or Sample nodes of the graph, other nodes are skipped
+        """
+        for start in start_nodes:
+            kind = self._end_kind(start)
+            if kind is None:
+                continue
+            counts = self._path_counts(kind)
+            if counts is not None and counts[start] == 0:
+                continue
+            path = [start]
+            on_path = {start}
+            stack = [iter(self._succ[start])]
+            while stack:
+                for x in stack[-1]:
+                    if counts is not None:
+                        if counts[x] == 0:
+                            continue
+                    elif x in on_path:
+                        continue
+                    path.append(x)
+                    on_path.add(x)
+                    if self._is_end(kind, x):
+                        yield list(path)
+                    stack.append(iter(self._succ[x]))
+                    break
+                else:
+                    stack.pop()
+                    on_path.discard(path.pop())
+
+    def count(self, start_nodes):
+        """Number of end-to-end paths from the start nodes, without generating the paths on a DAG"""
+        total = 0
+        for start in start_nodes:
+            kind = self._end_kind(start)
+            if kind is None:
+                continue
+            counts = self._path_counts(kind)
+            if counts is None:
+                total += sum(1 for _ in self.iter([start]))
+            else:
+                total += counts[start]
+        return total
+
+    def longest(self, start_nodes, weight=_path_node_weight):
+        """The heaviest end-to-end path by the sum of its node weights, the first one generated by iter() on a tie
+
+        :param start_nodes: Source or Sample nodes of the graph
+        :param weight: Function of a node returning its weight, at least 1
+        :return: List of nodes, or None if there is no path
+        """
+        if self._order is None:
+            longest = (0, None)
+            for path in self.iter(start_nodes):
+                length = sum(weight(x) for x in path)
+                if length > longest[0]:
+                    longest = (length, path)
+            return longest[1]
+        best = dict()  # kind of start -> {node: (heaviest weight of a path from it to an end, next node on that path)}
+        longest = (0, None)
+        for start in start_nodes:
+            kind = self._end_kind(start)
+            if kind is None:
+                continue
+            counts = self._path_counts(kind)
+            if kind not in best:
+                best[kind] = dict()
+                for x in reversed(self._order):
+                    if counts[x] == 0:
+                        continue
+                    # candidates in the order iter() generates them: the path ending here, then each successor
+                    candidate = (0 if self._is_end(kind, x) else None, None)
+                    for y in self._succ[x]:
+                        if counts[y] and (candidate[0] is None or best[kind][y][0] > candidate[0]):
+                            candidate = (best[kind][y][0], y)
+                    best[kind][x] = (weight(x) + candidate[0], candidate[1])
+            if counts[start] and best[kind][start][0] > longest[0]:
+                longest = (best[kind][start][0], start)
+        if longest[1] is None:
+            return None
+        path = [longest[1]]
+        best_kind = best[self._end_kind(longest[1])]
+        while best_kind[path[-1]][1] is not None:
+            path.append(best_kind[path[-1]][1])
+        return path
+
+
+def _is_empty_cell(value):
+    return value is None or (isinstance(value, str) and value == '') or (isinstance(value, float) and math.isnan(value))
+
+
+def _iter_unique_rows(rows, columns):
+    """Projects the row dicts generated by rows onto columns and drops the rows seen before. Rows are remembered by
+    digest rather than by value so that memory stays small however wide the table is."""
+    known = set(columns)
+    seen = set()
+    for row in rows:
+        if not known.issuperset(row):
+            raise KeyError(next(label for label in row if label not in known))
+        values = tuple(row.get(label, '') for label in columns)
+        # numbers compare equal across int and float, like they do in a DataFrame
+        key = hashlib.md5(repr(tuple(float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else v
+                                     for v in values)).encode('utf-8')).digest()
+        if key not in seen:
+            seen.add(key)
+            yield values
+
+
+@contextlib.contextmanager
+def _kept_open(fp):
+    """Context manager of fp that leaves it open, for writing a table to a StringIO with _write_table()"""
+    yield fp
+
+
+def _write_table(open_out_fp, columns, header, rows):
+    """Streams a study or assay table to the writable text stream returned by open_out_fp. Rows are written out as
+    they are generated from the study or assay graph, so the table is never held in memory.
+
+    :param open_out_fp: Callable returning the stream as a context manager. It is only called once the first pass
+        over the rows is done, so a row that cannot be built does not truncate an existing file.
+    :param columns: Column labels the row dicts are keyed by, in table order
+    :param header: Column headers written to the file, one per label in columns
+    :param rows: Callable returning a fresh generator of row dicts, it is called twice
+
+    The first pass over the rows counts the unique rows, finds the columns without any value, which are left out,
+    and the columns holding only numbers. As when the table was built as a DataFrame, numbers in a column that also
+    has empty cells or floats are written as floats. The second pass writes the unique rows.
+    """
+    has_value = [False] * len(columns)
+    numeric = [True] * len(columns)
+    as_float = [False] * len(columns)
+    num_rows = 0
+    for values in _iter_unique_rows(rows(), columns):
+        num_rows += 1
+        for i, value in enumerate(values):
+            if _is_empty_cell(value):
+                as_float[i] = True
+            else:
+                has_value[i] = True
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    numeric[i] = False
+                elif isinstance(value, float):
+                    as_float[i] = True
+    log.info("Writing {} rows".format(num_rows))
+
+    def format_cell(value, to_float):
+        if _is_empty_cell(value):
+            return ''
+        if to_float:
+            return repr(float(value))
+        return str(value)
+
+    kept = [i for i in range(len(columns)) if has_value[i]]
+    to_float = [numeric[i] and as_float[i] for i in kept]
     if config.show_pbars:
-        pbar = ProgressBar(min_value=0, max_value=num_start_nodes, widgets=[message,
-                                                                            SimpleProgress(),
-                                                                            Bar(left=" |", right="| "), ETA()]).start()
+        pbar = ProgressBar(min_value=0, max_value=num_rows, widgets=['Writing {} rows: '.format(num_rows),
+                                                                     SimpleProgress(),
+                                                                     Bar(left=" |", right="| "), ETA()]).start()
     else:
         pbar = lambda x: x
-    for start in pbar(start_nodes):
-        # Find ends
-        if isinstance(start, Source):  # only look for Sample ends if start is a Source
-            for end in [x for x in nx.algorithms.descendants(G, start) if
-                        isinstance(x, Sample) and len(G.out_edges(x)) == 0]:
-                paths += list(nx.algorithms.all_simple_paths(G, start, end))
-        elif isinstance(start, Sample):  # only look for Process ends if start is a Sample
-            for end in [x for x in nx.algorithms.descendants(G, start) if
-                        isinstance(x, Process) and x.next_process is None]:
-                paths += list(nx.algorithms.all_simple_paths(G, start, end))
-    log.info("Found {} paths!".format(len(paths)))
-    if len(paths) == 0:
-        log.debug([x.name for x in start_nodes])
-    return paths
+    with open_out_fp() as out_fp:
+        writer = csv.writer(out_fp, delimiter='\t', lineterminator='\n')
+        writer.writerow([header[i] for i in kept])
+        for values in pbar(_iter_unique_rows(rows(), columns)):
+            writer.writerow([format_cell(values[i], f) for i, f in zip(kept, to_float)])
+    if isinstance(pbar, ProgressBar):  pbar.finish()
+
+
+def _study_table_columns(longest_path):
+    flatten = lambda l: [item for sublist in l for item in sublist]
+    columns = []
+    sample_in_path_count = 0
+    for node in longest_path:
+        if isinstance(node, Source):
+            olabel = "Source Name"
+            columns.append(olabel)
+            columns += flatten(map(lambda x: get_characteristic_columns(olabel, x), node.characteristics))
+        elif isinstance(node, Process):
+            olabel = "Protocol REF.{}".format(node.executes_protocol.name)
+            columns.append(olabel)
+            if node.date is not None:
+                columns.append(olabel + ".Date")
+            if node.performer is not None:
+                columns.append(olabel + ".Performer")
+            columns += flatten(map(lambda x: get_pv_columns(olabel, x), node.parameter_values))
+
+        elif isinstance(node, Sample):
+            olabel = "Sample Name.{}".format(sample_in_path_count)
+            columns.append(olabel)
+            sample_in_path_count += 1
+            columns += flatten(map(lambda x: get_characteristic_columns(olabel, x), node.characteristics))
+            columns += flatten(map(lambda x: get_fv_columns(olabel, x), node.factor_values))
+    return columns
+
+
+def _study_table_header(columns):
+    columns = list(columns)
+    for dup_item in set([x for x in columns if columns.count(x) > 1]):
+        for j, each in enumerate([i for i, x in enumerate(columns) if x == dup_item]):
+            columns[each] = dup_item + str(j)
+
+    for i, col in enumerate(columns):
+        if col.endswith("Term Source REF"):
+            columns[i] = "Term Source REF"
+        elif col.endswith("Term Accession Number"):
+            columns[i] = "Term Accession Number"
+        elif col.endswith("Unit"):
+            columns[i] = "Unit"
+        elif "Characteristics[" in col:
+            if "material type" in col.lower():
+                columns[i] = "Material Type"
+            else:
+                columns[i] = col[col.rindex(".") + 1:]
+        elif "Factor Value[" in col:
+            columns[i] = col[col.rindex(".") + 1:]
+        elif "Parameter Value[" in col:
+            columns[i] = col[col.rindex(".") + 1:]
+        elif col.endswith("Date"):
+            columns[i] = "Date"
+        elif col.endswith("Performer"):
+            columns[i] = "Performer"
+        elif "Protocol REF" in col:
+            columns[i] = "Protocol REF"
+        elif col.startswith("Sample Name."):
+            columns[i] = "Sample Name"
+    return columns
+
+
+def _study_table_row(path):
+    row = dict()
+    sample_in_path_count = 0
+    for node in path:
+        if isinstance(node, Source):
+            olabel = "Source Name"
+            row[olabel] = node.name
+            for c in node.characteristics:
+                clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
+                _set_value_columns(row, clabel, c)
+
+        elif isinstance(node, Process):
+            olabel = "Protocol REF.{}".format(node.executes_protocol.name)
+            row[olabel] = node.executes_protocol.name
+            if node.date is not None:
+                row[olabel + ".Date"] = node.date
+            if node.performer is not None:
+                row[olabel + ".Performer"] = node.performer
+            for pv in node.parameter_values:
+                pvlabel = "{0}.Parameter Value[{1}]".format(olabel, pv.category.parameter_name.term)
+                _set_value_columns(row, pvlabel, pv)
+
+        elif isinstance(node, Sample):
+            olabel = "Sample Name.{}".format(sample_in_path_count)
+            sample_in_path_count += 1
+            row[olabel] = node.name
+            for c in node.characteristics:
+                clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
+                _set_value_columns(row, clabel, c)
+            for fv in node.factor_values:
+                fvlabel = "{0}.Factor Value[{1}]".format(olabel, fv.factor_name.name)
+                _set_value_columns(row, fvlabel, fv)
+    return row
+
+
+def _iter_study_tables(inv_obj):
+    """Yields the file name, the columns, the header and the rows callable of each study table of inv_obj, as taken
+    by _write_table()"""
+    for study_obj in inv_obj.studies:
+        if study_obj.graph is None: break
+        start_nodes = [x for x in study_obj.graph.nodes() if isinstance(x, Source)]
+        paths = EndToEndPaths(study_obj.graph)
+        longest_path = paths.longest(start_nodes)
+        if longest_path is None:
+            log.info("No paths found, skipping writing study file")
+            continue
+        columns = _study_table_columns(longest_path)
+        # rows are sorted on Source Name by walking the sources in order
+        start_nodes.sort(key=lambda x: x.name or '')
+        yield study_obj.filename, columns, _study_table_header(columns), \
+            lambda paths=paths, start_nodes=start_nodes: (_study_table_row(path) for path in paths.iter(start_nodes))
 
 
 def write_study_table_files(inv_obj, output_dir):
@@ -516,142 +843,170 @@ def write_study_table_files(inv_obj, output_dir):
         [ FactorValue[], ... ]
 
         which should be equivalent to studySample.xml in default config
-
     """
 
     if not isinstance(inv_obj, Investigation):
         raise NotImplementedError
-    for study_obj in inv_obj.studies:
-        if study_obj.graph is None: break
-        protrefcount = 0
-        protnames = dict()
-
-        flatten = lambda l: [item for sublist in l for item in sublist]
-        columns = []
-
-        # start_nodes, end_nodes = _get_start_end_nodes(study_obj.graph)
-        paths = _all_end_to_end_paths(study_obj.graph, [x for x in study_obj.graph.nodes() if isinstance(x, Source)])
-        sample_in_path_count = 0
-        for node in _longest_path_and_attrs(paths):
-            if isinstance(node, Source):
-                olabel = "Source Name"
-                columns.append(olabel)
-                columns += flatten(map(lambda x: get_characteristic_columns(olabel, x), node.characteristics))
-            elif isinstance(node, Process):
-                olabel = "Protocol REF.{}".format(node.executes_protocol.name)
-                columns.append(olabel)
-                if node.date is not None:
-                    columns.append(olabel + ".Date")
-                if node.performer is not None:
-                    columns.append(olabel + ".Performer")
-                columns += flatten(map(lambda x: get_pv_columns(olabel, x), node.parameter_values))
-                if node.executes_protocol.name not in protnames.keys():
-                    protnames[node.executes_protocol.name] = protrefcount
-                    protrefcount += 1
-
-            elif isinstance(node, Sample):
-                olabel = "Sample Name.{}".format(sample_in_path_count)
-                columns.append(olabel)
-                sample_in_path_count += 1
-                columns += flatten(map(lambda x: get_characteristic_columns(olabel, x), node.characteristics))
-                columns += flatten(map(lambda x: get_fv_columns(olabel, x), node.factor_values))
-
-        omap = get_object_column_map(columns, columns)
-        # load into dictionary
-        df_dict = dict(map(lambda k: (k, []), flatten(omap)))
-        if config.show_pbars:
-            pbar = ProgressBar(min_value=0, max_value=len(paths), widgets=['Writing {} paths: '.format(len(paths)),
-                                                                           SimpleProgress(),
-                                                                           Bar(left=" |", right="| "), ETA()]).start()
-        else:
-            pbar = lambda x: x
-        for path in pbar(paths):
-            for k in df_dict.keys():  # add a row per path
-                df_dict[k].extend([""])
-
-            sample_in_path_count = 0
-            for node in path:
-                if isinstance(node, Source):
-                    olabel = "Source Name"
-                    df_dict[olabel][-1] = node.name
-                    for c in node.characteristics:
-                        clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
-                        write_value_columns(df_dict, clabel, c)
-
-                elif isinstance(node, Process):
-                    olabel = "Protocol REF.{}".format(node.executes_protocol.name)
-                    df_dict[olabel][-1] = node.executes_protocol.name
-                    if node.date is not None:
-                        df_dict[olabel + ".Date"][-1] = node.date
-                    if node.performer is not None:
-                        df_dict[olabel + ".Performer"][-1] = node.performer
-                    for pv in node.parameter_values:
-                        pvlabel = "{0}.Parameter Value[{1}]".format(olabel, pv.category.parameter_name.term)
-                        write_value_columns(df_dict, pvlabel, pv)
-
-                elif isinstance(node, Sample):
-                    olabel = "Sample Name.{}".format(sample_in_path_count)
-                    sample_in_path_count += 1
-                    df_dict[olabel][-1] = node.name
-                    for c in node.characteristics:
-                        clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
-                        write_value_columns(df_dict, clabel, c)
-                    for fv in node.factor_values:
-                        fvlabel = "{0}.Factor Value[{1}]".format(olabel, fv.factor_name.name)
-                        write_value_columns(df_dict, fvlabel, fv)
-        if isinstance(pbar, ProgressBar):  pbar.finish()
-
-        DF = pd.DataFrame(columns=columns)
-        DF = DF.from_dict(data=df_dict)
-        DF = DF[columns]  # reorder columns
-        DF = DF.sort_values(by=DF.columns[0], ascending=True)  # arbitrary sort on column 0
-
-        for dup_item in set([x for x in columns if columns.count(x) > 1]):
-            for j, each in enumerate([i for i, x in enumerate(columns) if x == dup_item]):
-                columns[each] = dup_item + str(j)
-
-        DF.columns = columns  # reset columns after checking for dups
-
-        for i, col in enumerate(columns):
-            if col.endswith("Term Source REF"):
-                columns[i] = "Term Source REF"
-            elif col.endswith("Term Accession Number"):
-                columns[i] = "Term Accession Number"
-            elif col.endswith("Unit"):
-                columns[i] = "Unit"
-            elif "Characteristics[" in col:
-                if "material type" in col.lower():
-                    columns[i] = "Material Type"
-                else:
-                    columns[i] = col[col.rindex(".") + 1:]
-            elif "Factor Value[" in col:
-                columns[i] = col[col.rindex(".") + 1:]
-            elif "Parameter Value[" in col:
-                columns[i] = col[col.rindex(".") + 1:]
-            elif col.endswith("Date"):
-                columns[i] = "Date"
-            elif col.endswith("Performer"):
-                columns[i] = "Performer"
-            elif "Protocol REF" in col:
-                columns[i] = "Protocol REF"
-            elif col.startswith("Sample Name."):
-                columns[i] = "Sample Name"
+    for filename, columns, header, rows in _iter_study_tables(inv_obj):
+        _write_table(functools.partial(open, os.path.join(output_dir, filename), 'w'), columns, header, rows)
+
+
+def _assay_table_oname_label(protocol_type):
+    oname_label = None
+    if protocol_type.term == "nucleic acid sequencing":
+        oname_label = "Assay Name"
+    elif protocol_type.term == "data collection":
+        oname_label = "Scan Name"
+    elif protocol_type.term == "mass spectrometry":
+        oname_label = "MS Assay Name"
+    elif protocol_type.term == "data transformation":
+        oname_label = "Data Transformation Name"
+    elif protocol_type.term == "sequence analysis data transformation":
+        oname_label = "Normalization Name"
+    elif protocol_type.term == "normalization":
+        oname_label = "Normalization Name"
+    if protocol_type.term == "unknown protocol":
+        oname_label = "Unknown Protocol Name"
+    return oname_label
+
+
+def _assay_table_columns(longest_path):
+    flatten = lambda l: [item for sublist in l for item in sublist]
+    columns = []
+    for node in longest_path:
+        if isinstance(node, Sample):
+            olabel = "Sample Name"
+            columns.append(olabel)
+
+        elif isinstance(node, Process):
+            olabel = "Protocol REF.{}".format(node.executes_protocol.name)
+            columns.append(olabel)
+            if node.date is not None:
+                columns.append(olabel + ".Date")
+            if node.performer is not None:
+                columns.append(olabel + ".Performer")
+            if node.executes_protocol.protocol_type:
+                oname_label = _assay_table_oname_label(node.executes_protocol.protocol_type)
+                if oname_label is not None:
+                    columns.append(oname_label)
+                elif node.executes_protocol.protocol_type.term == "nucleic acid hybridization":
+                    columns.extend(["Hybridization Assay Name", "Array Design REF"])
+
+            columns += flatten(map(lambda x: get_pv_columns(olabel, x), node.parameter_values))
+
+            for output in [x for x in node.outputs if isinstance(x, DataFile)]:
+                columns.append(output.label)
+                columns += flatten(map(lambda x: get_comment_column(output.label, x), output.comments))
+
+        elif isinstance(node, Material):
+            olabel = node.type
+            columns.append(olabel)
+            columns += flatten(map(lambda x: get_characteristic_columns(olabel, x), node.characteristics))
+
+        elif isinstance(node, DataFile):
+            pass  # handled in process
+    return columns
 
-        log.info("Rendered {} paths".format(len(DF.index)))
 
-        DF_no_dups = DF.drop_duplicates()
-        if len(DF.index) > len(DF_no_dups.index):
-            log.info("Dropping duplicates...")
-            DF = DF_no_dups
+def _assay_table_header(columns):
+    columns = list(columns)
+    for dup_item in set([x for x in columns if columns.count(x) > 1]):
+        for j, each in enumerate([i for i, x in enumerate(columns) if x == dup_item]):
+            columns[each] = ".".join([dup_item, str(j)])
+
+    for i, col in enumerate(columns):
+        if col.endswith("Term Source REF"):
+            columns[i] = "Term Source REF"
+        elif col.endswith("Term Accession Number"):
+            columns[i] = "Term Accession Number"
+        elif col.endswith("Unit"):
+            columns[i] = "Unit"
+        elif "Characteristics[" in col:
+            if "material type" in col.lower():
+                columns[i] = "Material Type"
+            elif "label" in col.lower():
+                columns[i] = "Label"
+            else:
+                columns[i] = col[col.rindex(".") + 1:]
+        elif "Factor Value[" in col:
+            columns[i] = col[col.rindex(".") + 1:]
+        elif "Parameter Value[" in col:
+            columns[i] = col[col.rindex(".") + 1:]
+        elif col.endswith("Date"):
+            columns[i] = "Date"
+        elif col.endswith("Performer"):
+            columns[i] = "Performer"
+        elif "Comment[" in col:
+            columns[i] = col[col.rindex(".") + 1:]
+        elif "Protocol REF" in col:
+            columns[i] = "Protocol REF"
+        elif "." in col:
+                columns[i] = col[:col.rindex(".")]
+    return columns
 
-        log.info("Writing {} rows".format(len(DF.index)))
-        # reset columns, replace nan with empty string, drop empty columns
-        DF.columns = columns
-        DF = DF.replace('', np.nan)
-        DF = DF.dropna(axis=1, how='all')
 
-        with open(os.path.join(output_dir, study_obj.filename), 'w') as out_fp:
-            DF.to_csv(path_or_buf=out_fp, index=False, sep='\t', encoding='utf-8')
+def _assay_table_row(path):
+    row = dict()
+    for node in path:
+
+        if isinstance(node, Process):
+            olabel = "Protocol REF.{}".format(node.executes_protocol.name)
+            row[olabel] = node.executes_protocol.name
+            if node.date is not None:
+                row[olabel + ".Date"] = node.date
+            if node.performer is not None:
+                row[olabel + ".Performer"] = node.performer
+            for pv in node.parameter_values:
+                pvlabel = "{0}.Parameter Value[{1}]".format(olabel, pv.category.parameter_name.term)
+                _set_value_columns(row, pvlabel, pv)
+            if node.executes_protocol.protocol_type:
+                oname_label = _assay_table_oname_label(node.executes_protocol.protocol_type)
+                if oname_label is not None:
+                    row[oname_label] = node.name
+                elif node.executes_protocol.protocol_type.term == "nucleic acid hybridization":
+                    row["Hybridization Assay Name"] = node.name
+                    row["Array Design REF"] = node.array_design_ref
+            for output in [x for x in node.outputs if isinstance(x, DataFile)]:
+                olabel = output.label
+                row[olabel] = output.filename
+                for co in output.comments:
+                    colabel = "{0}.Comment[{1}]".format(olabel, co.name)
+                    row[colabel] = co.value
+
+        elif isinstance(node, Sample):
+            olabel = "Sample Name"
+            row[olabel] = node.name
+
+        elif isinstance(node, Material):
+            olabel = node.type
+            row[olabel] = node.name
+            for c in node.characteristics:
+                clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
+                _set_value_columns(row, clabel, c)
+
+        elif isinstance(node, DataFile):
+            pass  # handled in process
+    return row
+
+
+def _iter_assay_tables(inv_obj):
+    """Yields the file name, the columns, the header and the rows callable of each assay table of inv_obj, as taken
+    by _write_table()"""
+    for study_obj in inv_obj.studies:
+        for assay_obj in study_obj.assays:
+            if assay_obj.graph is None: break
+            start_nodes = [x for x in assay_obj.graph.nodes() if isinstance(x, Sample)]
+            paths = EndToEndPaths(assay_obj.graph)
+            longest_path = paths.longest(start_nodes)
+            if longest_path is None:
+                log.info("No paths found, skipping writing assay file")
+                continue
+            columns = _assay_table_columns(longest_path)
+            # rows are sorted on Sample Name by walking the samples in order
+            start_nodes.sort(key=lambda x: x.name or '')
+            yield assay_obj.filename, columns, _assay_table_header(columns), \
+                lambda paths=paths, start_nodes=start_nodes: (_assay_table_row(path)
+                                                              for path in paths.iter(start_nodes))
 
 
 def write_assay_table_files(inv_obj, output_dir):
@@ -662,203 +1017,12 @@ def write_assay_table_files(inv_obj, output_dir):
         Protocol Ref: 'sample collection', [ ParameterValue[], ... ],
         Material Name, [ Characteristics[], ... ]
         [ FactorValue[], ... ]
-
-
     """
 
     if not isinstance(inv_obj, Investigation):
         raise NotImplementedError
-    for study_obj in inv_obj.studies:
-        for assay_obj in study_obj.assays:
-            if assay_obj.graph is None: break
-            protrefcount = 0
-            protnames = dict()
-
-            flatten = lambda l: [item for sublist in l for item in sublist]
-            columns = []
-
-            # start_nodes, end_nodes = _get_start_end_nodes(assay_obj.graph)
-            paths = _all_end_to_end_paths(assay_obj.graph, [x for x in assay_obj.graph.nodes() if isinstance(x, Sample)])
-            if len(paths) == 0:
-                log.info("No paths found, skipping writing assay file")
-                continue
-            if _longest_path_and_attrs(paths) is None:
-                raise IOError("Could not find any valid end-to-end paths in assay graph")
-            for node in _longest_path_and_attrs(paths):
-                if isinstance(node, Sample):
-                    olabel = "Sample Name"
-                    columns.append(olabel)
-
-                elif isinstance(node, Process):
-                    olabel = "Protocol REF.{}".format(node.executes_protocol.name)
-                    columns.append(olabel)
-                    if node.date is not None:
-                        columns.append(olabel + ".Date")
-                    if node.performer is not None:
-                        columns.append(olabel + ".Performer")
-                    oname_label = None
-                    if node.executes_protocol.protocol_type:
-                        if node.executes_protocol.protocol_type.term == "nucleic acid sequencing":
-                            oname_label = "Assay Name"
-                        elif node.executes_protocol.protocol_type.term == "data collection":
-                            oname_label = "Scan Name"
-                        elif node.executes_protocol.protocol_type.term == "mass spectrometry":
-                            oname_label = "MS Assay Name"
-                        elif node.executes_protocol.protocol_type.term == "data transformation":
-                            oname_label = "Data Transformation Name"
-                        elif node.executes_protocol.protocol_type.term == "sequence analysis data transformation":
-                            oname_label = "Normalization Name"
-                        elif node.executes_protocol.protocol_type.term == "normalization":
-                            oname_label = "Normalization Name"
-                        if node.executes_protocol.protocol_type.term == "unknown protocol":
-                            oname_label = "Unknown Protocol Name"
-                        if oname_label is not None:
-                            columns.append(oname_label)
-                        elif node.executes_protocol.protocol_type.term == "nucleic acid hybridization":
-                            columns.extend(["Hybridization Assay Name", "Array Design REF"])
-
-                    columns += flatten(map(lambda x: get_pv_columns(olabel, x), node.parameter_values))
-                    if node.executes_protocol.name not in protnames.keys():
-                        protnames[node.executes_protocol.name] = protrefcount
-                        protrefcount += 1
-
-                    for output in [x for x in node.outputs if isinstance(x, DataFile)]:
-                        columns.append(output.label)
-                        columns += flatten(map(lambda x: get_comment_column(output.label, x), output.comments))
-
-                elif isinstance(node, Material):
-                    olabel = node.type
-                    columns.append(olabel)
-                    columns += flatten(map(lambda x: get_characteristic_columns(olabel, x), node.characteristics))
-
-                elif isinstance(node, DataFile):
-                    pass  # handled in process
-
-            omap = get_object_column_map(columns, columns)
-
-            # load into dictionary
-            df_dict = dict(map(lambda k: (k, []), flatten(omap)))
-
-            if config.show_pbars:
-                pbar = ProgressBar(min_value=0, max_value=len(paths), widgets=['Writing {} paths: '.format(len(paths)),
-                                                                               SimpleProgress(),
-                                                                               Bar(left=" |", right="| "), ETA()]).start()
-            else:
-                pbar = lambda x: x
-            for path in pbar(paths):
-                for k in df_dict.keys():  # add a row per path
-                    df_dict[k].extend([""])
-
-                for node in path:
-
-                    if isinstance(node, Process):
-                        olabel = "Protocol REF.{}".format(node.executes_protocol.name)
-                        df_dict[olabel][-1] = node.executes_protocol.name
-                        if node.date is not None:
-                            df_dict[olabel + ".Date"][-1] = node.date
-                        if node.performer is not None:
-                            df_dict[olabel + ".Performer"][-1] = node.performer
-                        for pv in node.parameter_values:
-                            pvlabel = "{0}.Parameter Value[{1}]".format(olabel, pv.category.parameter_name.term)
-                            write_value_columns(df_dict, pvlabel, pv)
-                        oname_label = None
-                        if node.executes_protocol.protocol_type:
-                            if node.executes_protocol.protocol_type.term == "nucleic acid sequencing":
-                                oname_label = "Assay Name"
-                            elif node.executes_protocol.protocol_type.term == "data collection":
-                                oname_label = "Scan Name"
-                            elif node.executes_protocol.protocol_type.term == "mass spectrometry":
-                                oname_label = "MS Assay Name"
-                            elif node.executes_protocol.protocol_type.term == "data transformation":
-                                oname_label = "Data Transformation Name"
-                            elif node.executes_protocol.protocol_type.term == "sequence analysis data transformation":
-                                oname_label = "Normalization Name"
-                            elif node.executes_protocol.protocol_type.term == "normalization":
-                                oname_label = "Normalization Name"
-                            if node.executes_protocol.protocol_type.term == "unknown protocol":
-                                oname_label = "Unknown Protocol Name"
-                            if oname_label is not None:
-                                df_dict[oname_label][-1] = node.name
-                            elif node.executes_protocol.protocol_type.term == "nucleic acid hybridization":
-                                df_dict["Hybridization Assay Name"][-1] = node.name
-                                df_dict["Array Design REF"][-1] = node.array_design_ref
-                        for output in [x for x in node.outputs if isinstance(x, DataFile)]:
-                            olabel = output.label
-                            df_dict[olabel][-1] = output.filename
-                            for co in output.comments:
-                                colabel = "{0}.Comment[{1}]".format(olabel, co.name)
-                                df_dict[colabel][-1] = co.value
-
-                    elif isinstance(node, Sample):
-                        olabel = "Sample Name"
-                        df_dict[olabel][-1] = node.name
-
-                    elif isinstance(node, Material):
-                        olabel = node.type
-                        df_dict[olabel][-1] = node.name
-                        for c in node.characteristics:
-                            clabel = "{0}.Characteristics[{1}]".format(olabel, c.category.term)
-                            write_value_columns(df_dict, clabel, c)
-
-                    elif isinstance(node, DataFile):
-                        pass  # handled in process
-
-            if isinstance(pbar, ProgressBar):  pbar.finish()
-
-            DF = pd.DataFrame(columns=columns)
-            DF = DF.from_dict(data=df_dict)
-            DF = DF[columns]  # reorder columns
-            DF = DF.sort_values(by=DF.columns[0], ascending=True)  # arbitrary sort on column 0
-
-            for dup_item in set([x for x in columns if columns.count(x) > 1]):
-                for j, each in enumerate([i for i, x in enumerate(columns) if x == dup_item]):
-                    columns[each] = ".".join([dup_item, str(j)])
-
-            DF.columns = columns
-
-            for i, col in enumerate(columns):
-                if col.endswith("Term Source REF"):
-                    columns[i] = "Term Source REF"
-                elif col.endswith("Term Accession Number"):
-                    columns[i] = "Term Accession Number"
-                elif col.endswith("Unit"):
-                    columns[i] = "Unit"
-                elif "Characteristics[" in col:
-                    if "material type" in col.lower():
-                        columns[i] = "Material Type"
-                    elif "label" in col.lower():
-                        columns[i] = "Label"
-                    else:
-                        columns[i] = col[col.rindex(".") + 1:]
-                elif "Factor Value[" in col:
-                    columns[i] = col[col.rindex(".") + 1:]
-                elif "Parameter Value[" in col:
-                    columns[i] = col[col.rindex(".") + 1:]
-                elif col.endswith("Date"):
-                    columns[i] = "Date"
-                elif col.endswith("Performer"):
-                    columns[i] = "Performer"
-                elif "Comment[" in col:
-                    columns[i] = col[col.rindex(".") + 1:]
-                elif "Protocol REF" in col:
-                    columns[i] = "Protocol REF"
-                elif "." in col:
-                        columns[i] = col[:col.rindex(".")]
-
-            log.info("Rendered {} paths".format(len(DF.index)))
-            if len(DF.index) > 1:
-                if len(DF.index) > len(DF.drop_duplicates().index):
-                    log.debug("Dropping duplicates...")
-                    DF = DF.drop_duplicates()
-
-            log.info("Writing {} rows".format(len(DF.index)))
-            # reset columns, replace nan with empty string, drop empty columns
-            DF.columns = columns
-            DF = DF.replace('', np.nan)
-            DF = DF.dropna(axis=1, how='all')
-
-            with open(os.path.join(output_dir, assay_obj.filename), 'w') as out_fp:
-                DF.to_csv(path_or_buf=out_fp, index=False, sep='\t', encoding='utf-8')
+    for filename, columns, header, rows in _iter_assay_tables(inv_obj):
+        _write_table(functools.partial(open, os.path.join(output_dir, filename), 'w'), columns, header, rows)
 
 
 def get_value_columns(label, x):
@@ -891,22 +1055,29 @@ def get_comment_column(label, c):
     return columns
 
 
-def write_value_columns(df_dict, label, x):
+def _set_value_columns(row, label, x):
     if isinstance(x.value, (int, float)) and x.unit:
         if isinstance(x.unit, OntologyAnnotation):
-            df_dict[label][-1] = x.value
-            df_dict[label + ".Unit"][-1] = x.unit.term
-            df_dict[label + ".Unit.Term Source REF"][-1] = x.unit.term_source.name if x.unit.term_source else ""
-            df_dict[label + ".Unit.Term Accession Number"][-1] = x.unit.term_accession
+            row[label] = x.value
+            row[label + ".Unit"] = x.unit.term
+            row[label + ".Unit.Term Source REF"] = x.unit.term_source.name if x.unit.term_source else ""
+            row[label + ".Unit.Term Accession Number"] = x.unit.term_accession
         else:
-            df_dict[label][-1] = x.value
-            df_dict[label + ".Unit"][-1] = x.unit
+            row[label] = x.value
+            row[label + ".Unit"] = x.unit
     elif isinstance(x.value, OntologyAnnotation):
-        df_dict[label][-1] = x.value.term
-        df_dict[label + ".Term Source REF"][-1] = x.value.term_source.name if x.value.term_source else ""
-        df_dict[label + ".Term Accession Number"][-1] = x.value.term_accession
+        row[label] = x.value.term
+        row[label + ".Term Source REF"] = x.value.term_source.name if x.value.term_source else ""
+        row[label + ".Term Accession Number"] = x.value.term_accession
     else:
-        df_dict[label][-1] = x.value
+        row[label] = x.value
+
+
+def write_value_columns(df_dict, label, x):
+    row = dict()
+    _set_value_columns(row, label, x)
+    for k, v in row.items():
+        df_dict[k][-1] = v
 
 
 def get_pv_columns(label, pv):
@@ -919,119 +1090,70 @@ def get_pv_columns(label, pv):
     return columns
 
 
+# Investigation file sections in the order they come, with the key of their table in read_investigation_file()
+_I_FILE_SECTIONS = [('ontology_sources', 'ONTOLOGY SOURCE REFERENCE'), ('investigation', 'INVESTIGATION'),
+                    ('i_publications', 'INVESTIGATION PUBLICATIONS'), ('i_contacts', 'INVESTIGATION CONTACTS')]
+_I_FILE_STUDY_SECTIONS = [('studies', 'STUDY'), ('s_design_descriptors', 'STUDY DESIGN DESCRIPTORS'),
+                          ('s_publications', 'STUDY PUBLICATIONS'), ('s_factors', 'STUDY FACTORS'),
+                          ('s_assays', 'STUDY ASSAYS'), ('s_protocols', 'STUDY PROTOCOLS'),
+                          ('s_contacts', 'STUDY CONTACTS')]
+
+# cells read as empty, as pandas does by default
+_NA_VALUES = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', 'N/A', 'NA',
+              'NULL', 'NaN', 'n/a', 'nan', 'null'}
+
+
+def _build_i_file_section_df(lines):
+    """Builds the table of an investigation file section from its lines, each holding a label followed by one value
+    per record. Records become rows and labels columns. The first column, labelled 0, holds the position of the record
+    in the section; records without any value are left out."""
+    rows = [row for row in csv.reader((line.rstrip() + '\n' for line in lines), delimiter='\t')
+            if len(row) > 1 or (len(row) == 1 and row[0].strip())]
+    rows = [['' if cell in _NA_VALUES else cell for cell in row] for row in rows]
+    width = max([len(row) for row in rows] or [0])
+    kept = [i for i in range(width) if any(i < len(row) and row[i] for row in rows)]
+    if not kept:
+        return pd.DataFrame()
+    columns = [[i] + [row[i] if i < len(row) else '' for row in rows] for i in kept]
+    return pd.DataFrame(columns[1:], columns=columns[0], index=range(1, len(columns)))
+
+
 def read_investigation_file(fp):
+    """Reads an investigation file into a dict of DataFrames, one per section, and one list of DataFrames per study
+    section holding the section of each study in turn. The file is read in a single pass, splitting it into sections
+    on the section headers.
 
-    def _peek(f):
-        position = f.tell()
-        l = f.readline()
-        f.seek(position)
-        return l
+    :param fp: A file-like object or any iterable of lines
+    :return: The section tables keyed as in _I_FILE_SECTIONS and _I_FILE_STUDY_SECTIONS
+    """
+    lines = [line for line in fp if not line.lstrip().startswith('#')]
+    position = 0
 
-    def _read_tab_section(f, sec_key, next_sec_key=None):
-        line = f.readline()
-        normed_line = line.rstrip()
-        if normed_line[0] == '"':
+    def _read_tab_section(sec_key, next_sec_key):
+        nonlocal position
+        normed_line = lines[position].rstrip() if position < len(lines) else ''
+        if normed_line.startswith('"'):
             normed_line = normed_line[1:]
-        if normed_line[len(normed_line)-1] == '"':
-            normed_line = normed_line[:len(normed_line)-1]
+        if normed_line.endswith('"'):
+            normed_line = normed_line[:-1]
         if not normed_line == sec_key:
             raise IOError("Expected: " + sec_key + " section, but got: " + normed_line)
-        memf = io.StringIO()
-        while not _peek(f=f).rstrip() == next_sec_key:
-            line = f.readline()
-            if not line:
-                break
-            memf.write(line.rstrip() + '\n')
-        memf.seek(0)
-        return memf
-
-    def _build_section_df(f):
-        df = pd.read_csv(f, names=range(0, 128), sep='\t', engine='python', encoding='utf-8',
-                         comment='#').dropna(axis=1, how='all')
-        df = df.T
-        df.replace(np.nan, '', regex=True, inplace=True)  # Strip out the nan entries
-        df.reset_index(inplace=True)  # Reset index so it is accessible as column
-        df.columns = df.iloc[0]  # If all was OK, promote this row to the column headers
-        df = df.reindex(df.index.drop(0))  # Reindex the DataFrame
-        return df
-
-    memf = io.StringIO()
-    while True:
-        line = fp.readline()
-        if not line:
-            break
-        if not line.lstrip().startswith('#'):
-            memf.write(line)
-    memf.seek(0)
+        position += 1
+        start = position
+        while position < len(lines) and not lines[position].rstrip() == next_sec_key:
+            position += 1
+        return _build_i_file_section_df(lines[start:position])
 
     df_dict = dict()
-
-    # Read in investigation file into DataFrames first
-    df_dict['ontology_sources'] = _build_section_df(_read_tab_section(
-        f=memf,
-        sec_key='ONTOLOGY SOURCE REFERENCE',
-        next_sec_key='INVESTIGATION'
-    ))
-    # assert({'Term Source Name', 'Term Source File', 'Term Source Version', 'Term Source Description'}
-    #        .issubset(set(ontology_sources_df.columns.values)))  # Check required labels are present
-    df_dict['investigation'] = _build_section_df(_read_tab_section(
-        f=memf,
-        sec_key='INVESTIGATION',
-        next_sec_key='INVESTIGATION PUBLICATIONS'
-    ))
-    df_dict['i_publications'] = _build_section_df(_read_tab_section(
-        f=memf,
-        sec_key='INVESTIGATION PUBLICATIONS',
-        next_sec_key='INVESTIGATION CONTACTS'
-    ))
-    df_dict['i_contacts'] = _build_section_df(_read_tab_section(
-        f=memf,
-        sec_key='INVESTIGATION CONTACTS',
-        next_sec_key='STUDY'
-    ))
-    df_dict['studies'] = list()
-    df_dict['s_design_descriptors'] = list()
-    df_dict['s_publications'] = list()
-    df_dict['s_factors'] = list()
-    df_dict['s_assays'] = list()
-    df_dict['s_protocols'] = list()
-    df_dict['s_contacts'] = list()
-    while _peek(memf):  # Iterate through STUDY blocks until end of file
-        df_dict['studies'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY',
-            next_sec_key='STUDY DESIGN DESCRIPTORS'
-        )))
-        df_dict['s_design_descriptors'] .append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY DESIGN DESCRIPTORS',
-            next_sec_key='STUDY PUBLICATIONS'
-        )))
-        df_dict['s_publications'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY PUBLICATIONS',
-            next_sec_key='STUDY FACTORS'
-        )))
-        df_dict['s_factors'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY FACTORS',
-            next_sec_key='STUDY ASSAYS'
-        )))
-        df_dict['s_assays'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY ASSAYS',
-            next_sec_key='STUDY PROTOCOLS'
-        )))
-        df_dict['s_protocols'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY PROTOCOLS',
-            next_sec_key='STUDY CONTACTS'
-        )))
-        df_dict['s_contacts'].append(_build_section_df(_read_tab_section(
-            f=memf,
-            sec_key='STUDY CONTACTS',
-            next_sec_key='STUDY'
-        )))
+    next_sec_keys = [sec_key for _, sec_key in _I_FILE_SECTIONS[1:] + _I_FILE_STUDY_SECTIONS]
+    for (key, sec_key), next_sec_key in zip(_I_FILE_SECTIONS, next_sec_keys):
+        df_dict[key] = _read_tab_section(sec_key, next_sec_key)
+    for key, _ in _I_FILE_STUDY_SECTIONS:
+        df_dict[key] = list()
+    while position < len(lines):  # Iterate through STUDY blocks until end of file
+        next_sec_keys = [sec_key for _, sec_key in _I_FILE_STUDY_SECTIONS[1:] + _I_FILE_STUDY_SECTIONS[:1]]
+        for (key, sec_key), next_sec_key in zip(_I_FILE_STUDY_SECTIONS, next_sec_keys):
+            df_dict[key].append(_read_tab_section(sec_key, next_sec_key))
     return df_dict
 
 
@@ -1361,19 +1483,17 @@ def check_samples_not_declared_in_study_used_in_assay(i_df, dir_context):
         study_filename = study_df.iloc[0]['Study File Name']
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    study_samples = set(study_df['Sample Name'])
+                study_df = _read_table_file(os.path.join(dir_context, study_filename))
+                study_samples = set(study_df['Sample Name'])
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        assay_samples = set(assay_df['Sample Name'])
-                        if not assay_samples.issubset(study_samples):
-                            log.error("(E) Some samples in an assay file {} are not declared in the study file {}: {}".format(assay_filename, study_filename, list(assay_samples - study_samples)))
+                    assay_df = _read_table_file(os.path.join(dir_context, assay_filename))
+                    assay_samples = set(assay_df['Sample Name'])
+                    if not assay_samples.issubset(study_samples):
+                        log.error("(E) Some samples in an assay file {} are not declared in the study file {}: {}".format(assay_filename, study_filename, list(assay_samples - study_samples)))
                 except FileNotFoundError:
                     pass
 
@@ -1387,10 +1507,30 @@ def check_protocol_usage(i_df, dir_context):
         if study_filename is not '':
             try:
                 protocol_refs_used = set()
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    for protocol_ref_col in [i for i in study_df.columns if i.startswith('Protocol REF')]:
-                        protocol_refs_used = protocol_refs_used.union(study_df[protocol_ref_col])
+                study_df = _read_table_file(os.path.join(dir_context, study_filename))
+                for protocol_ref_col in [i for i in study_df.columns if i.startswith('Protocol REF')]:
+                    protocol_refs_used = protocol_refs_used.union(study_df[protocol_ref_col])
+                protocol_refs_used = set([r for r in protocol_refs_used if pd.notnull(r)])
+                diff = list(protocol_refs_used - protocols_declared)
+                if len(diff) > 0:
+                    errors.append({
+                        "message": "Missing Protocol declaration",
+                        "supplemental": "protocols in study file {} are not declared in the investigation file: "
+                                        "{}".format(study_filename, diff),
+                        "code": 1007
+                    })
+                    log.error(
+                        "(E) Some protocols used in a study file {} are not declared in the investigation file: "
+                        "{}".format(study_filename, diff))
+            except FileNotFoundError:
+                pass
+        for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
+            if assay_filename is not '':
+                try:
+                    protocol_refs_used = set()
+                    assay_df = _read_table_file(os.path.join(dir_context, assay_filename))
+                    for protocol_ref_col in [i for i in assay_df.columns if i.startswith('Protocol REF')]:
+                        protocol_refs_used = protocol_refs_used.union(assay_df[protocol_ref_col])
                     protocol_refs_used = set([r for r in protocol_refs_used if pd.notnull(r)])
                     diff = list(protocol_refs_used - protocols_declared)
                     if len(diff) > 0:
@@ -1400,49 +1540,25 @@ def check_protocol_usage(i_df, dir_context):
                                             "{}".format(study_filename, diff),
                             "code": 1007
                         })
-                        log.error(
-                            "(E) Some protocols used in a study file {} are not declared in the investigation file: "
-                            "{}".format(study_filename, diff))
-            except FileNotFoundError:
-                pass
-        for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
-            if assay_filename is not '':
-                try:
-                    protocol_refs_used = set()
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        for protocol_ref_col in [i for i in assay_df.columns if i.startswith('Protocol REF')]:
-                            protocol_refs_used = protocol_refs_used.union(assay_df[protocol_ref_col])
-                        protocol_refs_used = set([r for r in protocol_refs_used if pd.notnull(r)])
-                        diff = list(protocol_refs_used - protocols_declared)
-                        if len(diff) > 0:
-                            errors.append({
-                                "message": "Missing Protocol declaration",
-                                "supplemental": "protocols in study file {} are not declared in the investigation file: "
-                                                "{}".format(study_filename, diff),
-                                "code": 1007
-                            })
-                            log.error("(E) Some protocols used in an assay file {} are not declared in the "
-                                         "investigation file: {}".format(assay_filename, diff))
+                        log.error("(E) Some protocols used in an assay file {} are not declared in the "
+                                     "investigation file: {}".format(assay_filename, diff))
                 except FileNotFoundError:
                     pass
         # now collect all protocols in all assays to compare to declared protocols
         protocol_refs_used = set()
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    for protocol_ref_col in [i for i in study_df.columns if i.startswith('Protocol REF')]:
-                        protocol_refs_used = protocol_refs_used.union(study_df[protocol_ref_col])
+                study_df = _read_table_file(os.path.join(dir_context, study_filename))
+                for protocol_ref_col in [i for i in study_df.columns if i.startswith('Protocol REF')]:
+                    protocol_refs_used = protocol_refs_used.union(study_df[protocol_ref_col])
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        for protocol_ref_col in [i for i in assay_df.columns if i.startswith('Protocol REF')]:
-                            protocol_refs_used = protocol_refs_used.union(assay_df[protocol_ref_col])
+                    assay_df = _read_table_file(os.path.join(dir_context, assay_filename))
+                    for protocol_ref_col in [i for i in assay_df.columns if i.startswith('Protocol REF')]:
+                        protocol_refs_used = protocol_refs_used.union(assay_df[protocol_ref_col])
                 except FileNotFoundError:
                     pass
         diff = protocols_declared - protocol_refs_used
@@ -1470,6 +1586,26 @@ def load_table(fp):
     return df
 
 
+# Tables already parsed during the current validate() run, keyed by absolute file path. None outside of validation.
+_table_cache = None
+
+
+def _read_table_file(table_path):
+    """Loads a study or assay table file with load_table(). While validating, each file is parsed only once and the
+    same DataFrame is handed to every rule that asks for it, so callers must not modify it."""
+    key = os.path.abspath(table_path)
+    if _table_cache is not None and key in _table_cache:
+        return _table_cache[key]
+    with open(table_path, encoding='utf-8') as fp:
+        header = list(next(csv.reader(fp, dialect='excel-tab'), []))
+        fp.seek(0)
+        df = load_table(fp)
+    df.isatab_header = header
+    if _table_cache is not None:
+        _table_cache[key] = df
+    return df
+
+
 def load_table_checks(fp):
 
     df = load_table(fp)
@@ -1591,54 +1727,50 @@ def check_study_factor_usage(i_df, dir_context):
         if study_filename is not '':
             try:
                 study_factors_used = set()
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    study_factor_ref_cols = [i for i in study_df.columns if _RX_FACTOR_VALUE.match(i)]
-                    for col in study_factor_ref_cols:
-                        fv = _RX_FACTOR_VALUE.findall(col)
-                        study_factors_used = study_factors_used.union(set(fv))
-                    if not study_factors_used.issubset(study_factors_declared):
-                        log.error(
-                            "(E) Some factors used in an study file {} are not declared in the investigation file: {}".format(
-                                study_filename, list(study_factors_used - study_factors_declared)))
+                study_df = _read_table_file(os.path.join(dir_context, study_filename))
+                study_factor_ref_cols = [i for i in study_df.columns if _RX_FACTOR_VALUE.match(i)]
+                for col in study_factor_ref_cols:
+                    fv = _RX_FACTOR_VALUE.findall(col)
+                    study_factors_used = study_factors_used.union(set(fv))
+                if not study_factors_used.issubset(study_factors_declared):
+                    log.error(
+                        "(E) Some factors used in an study file {} are not declared in the investigation file: {}".format(
+                            study_filename, list(study_factors_used - study_factors_declared)))
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
                     study_factors_used = set()
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        study_factor_ref_cols = set([i for i in assay_df.columns if _RX_FACTOR_VALUE.match(i)])
-                        for col in study_factor_ref_cols:
-                            fv = _RX_FACTOR_VALUE.findall(col)
-                            study_factors_used = study_factors_used.union(set(fv))
-                        if not study_factors_used.issubset(study_factors_declared):
-                            log.error(
-                                "(E) Some factors used in an assay file {} are not declared in the investigation file: {}".format(
-                                    assay_filename, list(study_factors_used - study_factors_declared)))
+                    assay_df = _read_table_file(os.path.join(dir_context, assay_filename))
+                    study_factor_ref_cols = set([i for i in assay_df.columns if _RX_FACTOR_VALUE.match(i)])
+                    for col in study_factor_ref_cols:
+                        fv = _RX_FACTOR_VALUE.findall(col)
+                        study_factors_used = study_factors_used.union(set(fv))
+                    if not study_factors_used.issubset(study_factors_declared):
+                        log.error(
+                            "(E) Some factors used in an assay file {} are not declared in the investigation file: {}".format(
+                                assay_filename, list(study_factors_used - study_factors_declared)))
                 except FileNotFoundError:
                     pass
         study_factors_used = set()
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    study_factor_ref_cols = [i for i in study_df.columns if _RX_FACTOR_VALUE.match(i)]
-                    for col in study_factor_ref_cols:
-                        fv = _RX_FACTOR_VALUE.findall(col)
-                        study_factors_used = study_factors_used.union(set(fv))
+                study_df = _read_table_file(os.path.join(dir_context, study_filename))
+                study_factor_ref_cols = [i for i in study_df.columns if _RX_FACTOR_VALUE.match(i)]
+                for col in study_factor_ref_cols:
+                    fv = _RX_FACTOR_VALUE.findall(col)
+                    study_factors_used = study_factors_used.union(set(fv))
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        study_factor_ref_cols = set([i for i in assay_df.columns if _RX_FACTOR_VALUE.match(i)])
-                        for col in study_factor_ref_cols:
-                            fv = _RX_FACTOR_VALUE.findall(col)
-                            study_factors_used = study_factors_used.union(set(fv))
+                    assay_df = _read_table_file(os.path.join(dir_context, assay_filename))
+                    study_factor_ref_cols = set([i for i in assay_df.columns if _RX_FACTOR_VALUE.match(i)])
+                    for col in study_factor_ref_cols:
+                        fv = _RX_FACTOR_VALUE.findall(col)
+                        study_factors_used = study_factors_used.union(set(fv))
                 except FileNotFoundError:
                     pass
         if len(study_factors_declared - study_factors_used) > 0:
@@ -1660,55 +1792,51 @@ def check_protocol_parameter_usage(i_df, dir_context):
         if study_filename is not '':
             try:
                 protocol_parameters_used = set()
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    parameter_value_cols = [i for i in study_df.columns if _RX_PARAMETER_VALUE.match(i)]
-                    for col in parameter_value_cols:
-                        pv = _RX_PARAMETER_VALUE.findall(col)
-                        protocol_parameters_used = protocol_parameters_used.union(set(pv))
-                    if not protocol_parameters_used.issubset(protocol_parameters_declared):
-                        log.error(
-                            "(E) Some protocol parameters referenced in an study file {} are not declared in the investigation file: {}".format(
-                                study_filename, list(protocol_parameters_used - protocol_parameters_declared)))
+                study_df = _read_table_file(os.path.join(dir_context, study_filename))
+                parameter_value_cols = [i for i in study_df.columns if _RX_PARAMETER_VALUE.match(i)]
+                for col in parameter_value_cols:
+                    pv = _RX_PARAMETER_VALUE.findall(col)
+                    protocol_parameters_used = protocol_parameters_used.union(set(pv))
+                if not protocol_parameters_used.issubset(protocol_parameters_declared):
+                    log.error(
+                        "(E) Some protocol parameters referenced in an study file {} are not declared in the investigation file: {}".format(
+                            study_filename, list(protocol_parameters_used - protocol_parameters_declared)))
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
                     protocol_parameters_used = set()
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        parameter_value_cols = [i for i in assay_df.columns if _RX_PARAMETER_VALUE.match(i)]
-                        for col in parameter_value_cols:
-                            pv = _RX_PARAMETER_VALUE.findall(col)
-                            protocol_parameters_used = protocol_parameters_used.union(set(pv))
-                        if not protocol_parameters_used.issubset(protocol_parameters_declared):
-                            log.error(
-                                "(E) Some protocol parameters referenced in an assay file {} are not declared in the investigation file: {}".format(
-                                    assay_filename, list(protocol_parameters_used - protocol_parameters_declared)))
+                    assay_df = _read_table_file(os.path.join(dir_context, assay_filename))
+                    parameter_value_cols = [i for i in assay_df.columns if _RX_PARAMETER_VALUE.match(i)]
+                    for col in parameter_value_cols:
+                        pv = _RX_PARAMETER_VALUE.findall(col)
+                        protocol_parameters_used = protocol_parameters_used.union(set(pv))
+                    if not protocol_parameters_used.issubset(protocol_parameters_declared):
+                        log.error(
+                            "(E) Some protocol parameters referenced in an assay file {} are not declared in the investigation file: {}".format(
+                                assay_filename, list(protocol_parameters_used - protocol_parameters_declared)))
                 except FileNotFoundError:
                     pass
         # now collect all protocol parameters in all assays to compare to declared protocol parameters
         protocol_parameters_used = set()
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    study_df = load_table(s_fp)
-                    parameter_value_cols = [i for i in study_df.columns if _RX_PARAMETER_VALUE.match(i)]
-                    for col in parameter_value_cols:
-                        pv = _RX_PARAMETER_VALUE.findall(col)
-                        protocol_parameters_used = protocol_parameters_used.union(set(pv))
+                study_df = _read_table_file(os.path.join(dir_context, study_filename))
+                parameter_value_cols = [i for i in study_df.columns if _RX_PARAMETER_VALUE.match(i)]
+                for col in parameter_value_cols:
+                    pv = _RX_PARAMETER_VALUE.findall(col)
+                    protocol_parameters_used = protocol_parameters_used.union(set(pv))
             except FileNotFoundError:
                 pass
         for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
             if assay_filename is not '':
                 try:
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        assay_df = load_table(a_fp)
-                        parameter_value_cols = [i for i in assay_df.columns if _RX_PARAMETER_VALUE.match(i)]
-                        for col in parameter_value_cols:
-                            pv = _RX_PARAMETER_VALUE.findall(col)
-                            protocol_parameters_used = protocol_parameters_used.union(set(pv))
+                    assay_df = _read_table_file(os.path.join(dir_context, assay_filename))
+                    parameter_value_cols = [i for i in assay_df.columns if _RX_PARAMETER_VALUE.match(i)]
+                    for col in parameter_value_cols:
+                        pv = _RX_PARAMETER_VALUE.findall(col)
+                        protocol_parameters_used = protocol_parameters_used.union(set(pv))
                 except FileNotFoundError:
                     pass
         if len(protocol_parameters_declared - protocol_parameters_used) > 0:
@@ -1786,95 +1914,93 @@ def check_term_source_refs_in_assay_tables(i_df, dir_context):
         study_filename = study_df.iloc[0]['Study File Name']
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    df = load_table(s_fp)
-                    columns = df.columns
-                    object_index = [i for i, x in enumerate(columns) if x.startswith('Term Source REF')]
-                    prev_i = object_index[0]
-                    object_columns_list = [columns[prev_i]]
-                    for curr_i in object_index:  # collect each object's columns
-                        if prev_i == curr_i:
-                            pass  # skip if there's no diff, i.e. first one
-                        else:
-                            object_columns_list.append(columns[curr_i])
-                        prev_i = curr_i
-                    for x, col in enumerate(object_columns_list):
-                        for y, row in enumerate(df[col]):
-                            if row not in ontology_sources_list:
-                                if isinstance(row, float):
-                                    if not math.isnan(row):
-                                        warnings.append({
-                                            "message": "Missing Term Source",
-                                            "supplemental": "Ontology sources missing {} at column position {} and row {} "
-                                                            "in {} not declared in ontology "
-                                                            "sources {}".format(row+1, object_index[x], y+1, study_filename,
-                                                                                list(ontology_sources_list)),
-                                            "code": 3009
-                                        })
-                                        log.warning("(W) Term Source REF {} at column position {} and row {} in {} not "
-                                                    "declared in ontology sources {}".format(row+1, object_index[x], y+1,
-                                                                                             study_filename,
-                                                                                             list(ontology_sources_list)))
-                                else:
+                df = _read_table_file(os.path.join(dir_context, study_filename))
+                columns = df.columns
+                object_index = [i for i, x in enumerate(columns) if x.startswith('Term Source REF')]
+                prev_i = object_index[0]
+                object_columns_list = [columns[prev_i]]
+                for curr_i in object_index:  # collect each object's columns
+                    if prev_i == curr_i:
+                        pass  # skip if there's no diff, i.e. first one
+                    else:
+                        object_columns_list.append(columns[curr_i])
+                    prev_i = curr_i
+                for x, col in enumerate(object_columns_list):
+                    for y, row in enumerate(df[col]):
+                        if row not in ontology_sources_list:
+                            if isinstance(row, float):
+                                if not math.isnan(row):
                                     warnings.append({
                                         "message": "Missing Term Source",
                                         "supplemental": "Ontology sources missing {} at column position {} and row {} "
                                                         "in {} not declared in ontology "
-                                                        "sources {}".format(row + 1, object_index[x], y + 1, study_filename,
+                                                        "sources {}".format(row+1, object_index[x], y+1, study_filename,
                                                                             list(ontology_sources_list)),
                                         "code": 3009
                                     })
-                                    log.warning("(W) Term Source REF {} at column position {} and row {} in {} not in "
-                                                "declared ontology sources {}"
-                                                .format(row+1, object_index[x], y+1, study_filename,
-                                                        list(ontology_sources_list)))
+                                    log.warning("(W) Term Source REF {} at column position {} and row {} in {} not "
+                                                "declared in ontology sources {}".format(row+1, object_index[x], y+1,
+                                                                                         study_filename,
+                                                                                         list(ontology_sources_list)))
+                            else:
+                                warnings.append({
+                                    "message": "Missing Term Source",
+                                    "supplemental": "Ontology sources missing {} at column position {} and row {} "
+                                                    "in {} not declared in ontology "
+                                                    "sources {}".format(row + 1, object_index[x], y + 1, study_filename,
+                                                                        list(ontology_sources_list)),
+                                    "code": 3009
+                                })
+                                log.warning("(W) Term Source REF {} at column position {} and row {} in {} not in "
+                                            "declared ontology sources {}"
+                                            .format(row+1, object_index[x], y+1, study_filename,
+                                                    list(ontology_sources_list)))
             except FileNotFoundError:
                 pass
             for j, assay_filename in enumerate(i_df['s_assays'][i]['Study Assay File Name'].tolist()):
                 if assay_filename is not '':
                     try:
-                        with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                            df = load_table(a_fp)
-                            columns = df.columns
-                            object_index = [i for i, x in enumerate(columns) if x.startswith('Term Source REF')]
-                            prev_i = object_index[0]
-                            object_columns_list = [columns[prev_i]]
-                            for curr_i in object_index:  # collect each object's columns
-                                if prev_i == curr_i:
-                                    pass  # skip if there's no diff, i.e. first one
-                                else:
-                                    object_columns_list.append(columns[curr_i])
-                                prev_i = curr_i
-                            for x, col in enumerate(object_columns_list):
-                                for y, row in enumerate(df[col]):
-                                    if row not in ontology_sources_list:
-                                        if isinstance(row, float):
-                                            if not math.isnan(row):
-                                                warnings.append({
-                                                    "message": "Missing Term Source",
-                                                    "supplemental": "Ontology sources missing {} at column position {} and "
-                                                                    "row {} in {} not declared in ontology sources {}"
-                                                        .format(row + 1, object_index[x], y + 1, study_filename,
-                                                                list(ontology_sources_list)),
-                                                    "code": 3009
-                                                })
-                                                log.warning("(W) Term Source REF {} at column position {} and row {} in {} "
-                                                            "not declared in ontology sources {}"
-                                                            .format(row+1, object_index[x], y+1, study_filename,
-                                                                    list(ontology_sources_list)))
-                                        else:
+                        df = _read_table_file(os.path.join(dir_context, assay_filename))
+                        columns = df.columns
+                        object_index = [i for i, x in enumerate(columns) if x.startswith('Term Source REF')]
+                        prev_i = object_index[0]
+                        object_columns_list = [columns[prev_i]]
+                        for curr_i in object_index:  # collect each object's columns
+                            if prev_i == curr_i:
+                                pass  # skip if there's no diff, i.e. first one
+                            else:
+                                object_columns_list.append(columns[curr_i])
+                            prev_i = curr_i
+                        for x, col in enumerate(object_columns_list):
+                            for y, row in enumerate(df[col]):
+                                if row not in ontology_sources_list:
+                                    if isinstance(row, float):
+                                        if not math.isnan(row):
                                             warnings.append({
                                                 "message": "Missing Term Source",
-                                                "supplemental": "Ontology sources missing {} at column position {} and row "
-                                                                "{} in {} not declared in ontology sources {}"
+                                                "supplemental": "Ontology sources missing {} at column position {} and "
+                                                                "row {} in {} not declared in ontology sources {}"
                                                     .format(row + 1, object_index[x], y + 1, study_filename,
                                                             list(ontology_sources_list)),
                                                 "code": 3009
                                             })
-                                            log.warning("(W) Term Source REF {} at column position {} and row {} in {} not "
-                                                        "in declared ontology sources {}"
+                                            log.warning("(W) Term Source REF {} at column position {} and row {} in {} "
+                                                        "not declared in ontology sources {}"
                                                         .format(row+1, object_index[x], y+1, study_filename,
                                                                 list(ontology_sources_list)))
+                                    else:
+                                        warnings.append({
+                                            "message": "Missing Term Source",
+                                            "supplemental": "Ontology sources missing {} at column position {} and row "
+                                                            "{} in {} not declared in ontology sources {}"
+                                                .format(row + 1, object_index[x], y + 1, study_filename,
+                                                        list(ontology_sources_list)),
+                                            "code": 3009
+                                        })
+                                        log.warning("(W) Term Source REF {} at column position {} and row {} in {} not "
+                                                    "in declared ontology sources {}"
+                                                    .format(row+1, object_index[x], y+1, study_filename,
+                                                            list(ontology_sources_list)))
                     except FileNotFoundError:
                         pass
 
@@ -1884,12 +2010,12 @@ def check_term_source_refs_usage(i_df, dir_context):
     check_term_source_refs_in_assay_tables(i_df, dir_context)
 
 
-def load_config(config_dir):
+def load_config(config_dir, cache_dir=None):
     """Rule 4001"""
     from isatools.io import isatab_configurator
     configs = None
     try:
-        configs = isatab_configurator.load(config_dir)
+        configs = isatab_configurator.load(config_dir, cache_dir=cache_dir)
     except FileNotFoundError:
         errors.append({
             "message": "Configurations could not be loaded",
@@ -1984,7 +2110,7 @@ def check_investigation_against_config(i_df, configs):
                                     "(W) A property value in {} of investigation file at column {} is required".format(
                                         col, x + 1))
 
-    required_fields = [i.header for i in configs[('[investigation]', '')].get_isatab_configuration()[0].get_field() if i.is_required]
+    required_fields = _config_index(configs[('[investigation]', '')]).required_headers
     check_section_against_required_fields_one_value(i_df['investigation'], required_fields)
     check_section_against_required_fields_one_value(i_df['i_publications'], required_fields)
     check_section_against_required_fields_one_value(i_df['i_contacts'], required_fields)
@@ -2090,7 +2216,7 @@ def cell_has_value(cell):
 def check_assay_table_with_config(df, config, filename, protocol_names_and_types):
     columns = list(df.columns)
     # Get required headers from config and check if they are present in the table; Rule 4010
-    required_fields = [i.header for i in config.get_isatab_configuration()[0].get_field() if i.is_required]
+    required_fields = _config_index(config).required_headers
     for required_field in required_fields:
         if required_field not in columns:
             warnings.append({
@@ -2139,11 +2265,10 @@ def check_study_assay_tables_against_config(i_df, dir_context, configs):
         protocol_names_and_types = dict(zip(protocol_names, protocol_types))
         if study_filename is not '':
             try:
-                with open(os.path.join(dir_context, study_filename)) as s_fp:
-                    df = load_table(s_fp)
-                    config = configs[('[Sample]', '')]
-                    log.info("Checking study file {} against default study table configuration...".format(study_filename))
-                    check_assay_table_with_config(df, config, study_filename, protocol_names_and_types)
+                df = _read_table_file(os.path.join(dir_context, study_filename))
+                config = configs[('[Sample]', '')]
+                log.info("Checking study file {} against default study table configuration...".format(study_filename))
+                check_assay_table_with_config(df, config, study_filename, protocol_names_and_types)
             except FileNotFoundError:
                 pass
         for j, assay_df in enumerate(i_df['s_assays']):
@@ -2152,13 +2277,12 @@ def check_study_assay_tables_against_config(i_df, dir_context, configs):
             technology_type = assay_df['Study Assay Technology Type'].tolist()[0]
             if assay_filename is not '':
                 try:
-                    with open(os.path.join(dir_context, assay_filename)) as a_fp:
-                        df = load_table(a_fp)
-                        config = configs[(measurement_type, technology_type)]
-                        log.info(
-                            "Checking assay file {} against default table configuration ({}, {})...".format(assay_filename, measurement_type, technology_type))
-                        check_assay_table_with_config(df, config, assay_filename, protocol_names_and_types)
-                        # check_assay_table_with_config(df, protocols, config, assay_filename)
+                    df = _read_table_file(os.path.join(dir_context, assay_filename))
+                    config = configs[(measurement_type, technology_type)]
+                    log.info(
+                        "Checking assay file {} against default table configuration ({}, {})...".format(assay_filename, measurement_type, technology_type))
+                    check_assay_table_with_config(df, config, assay_filename, protocol_names_and_types)
+                    # check_assay_table_with_config(df, protocols, config, assay_filename)
                 except FileNotFoundError:
                     pass
         # TODO: Check protocol usage - Rule 4009
@@ -2179,8 +2303,11 @@ def check_factor_value_presence(table):
 
 
 def check_required_fields(table, cfg):
-    for fheader in [i.header for i in cfg.get_isatab_configuration()[0].get_field() if i.is_required]:
-        found_field = [i for i in table.columns if i.lower() == fheader.lower()]
+    columns_by_lower_header = dict()
+    for column in table.columns:
+        columns_by_lower_header.setdefault(column.lower(), []).append(column)
+    for fheader in _config_index(cfg).required_headers:
+        found_field = columns_by_lower_header.get(fheader.lower(), [])
         if len(found_field) == 0:
             warnings.append({
                 "message": "A required column in assay table is not present",
@@ -2214,115 +2341,164 @@ def check_sample_names(study_sample_table, assay_tables=[]):
                                 .format(assay_sample, assay_table.filename, study_sample_table.filename))
 
 
+# Config field data types that check_field_values() validates cell by cell
+_FIELD_VALUE_TYPES = ['boolean', 'date', 'integer', 'float', 'list']
+
+
+def _config_index(cfg):
+    """Returns the lookups over the fields of a table configuration, computed once per configuration"""
+    from isatools.io import isatab_configurator
+    return isatab_configurator.get_index(cfg)
+
+
+def _cell_has_value_mask(column):
+    """Applies cell_has_value() to a whole table column"""
+    nulls = column.isnull()
+    text = column.where(~nulls, '').astype(str)
+    return nulls | ((text.str.strip() != '') & ~text.str.contains('Unnamed: ', regex=False))
+
+
+def _is_iso8601_date(value):
+    try:
+        iso8601.parse_date(value)
+    except iso8601.ParseError:
+        return False
+    return True
+
+
+def _is_integer(value):
+    try:
+        int(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_float(value):
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _invalid_values_mask(values, cfield, data_type):
+    """Flags the values of a column that are not valid for the data type of their config field. The vectorized checks
+    decide most values; those they cannot decide are parsed once per distinct value."""
+    if data_type == 'boolean':
+        return ~values.str.strip().isin(['true', 'false'])
+    if data_type == 'list':
+        list_values = [i.lower() for i in (cfield.list_values or '').split(',')]
+        return ~values.str.lower().isin(list_values)
+    if data_type == 'integer':
+        invalid = ~values.str.match(r'\s*[+-]?[0-9]+\s*$')
+        is_valid_value = _is_integer
+    elif data_type == 'float':
+        invalid = pd.to_numeric(values, errors='coerce').isnull()
+        is_valid_value = _is_float
+    else:
+        # ISO8601 dates always start with a four digit year, anything else is rejected without parsing
+        invalid = pd.Series(True, index=values.index)
+        candidates = values.str.match(r'[0-9]{4}')
+        invalid[candidates] = False
+        invalid[candidates] = ~values[candidates].map(
+            {value: _is_iso8601_date(value) for value in values[candidates].unique()}).astype(bool)
+        return invalid
+    if invalid.any():
+        undecided = values[invalid]
+        invalid[invalid] = ~undecided.map(
+            {value: is_valid_value(value) for value in undecided.unique()}).astype(bool)
+    return invalid
+
+
 def check_field_values(table, cfg):
-    def check_single_field(cell_value, cfg_field):
-        # First check if the value is required by config
-        if isinstance(cell_value, float):
-            if math.isnan(cell_value):
-                if cfg_field.is_required:
-                    warnings.append({
-                        "message": "A required column in assay table is not present",
-                        "supplemental": "Missing value for the required field '" + cfg_field.header
-                                        + "' in the file '" + table.filename + "'",
-                        "code": 4010
-                    })
-                    log.warning("(W) Missing value for the required field '" + cfg_field.header + "' in the file '" +
-                                table.filename + "'")
-                return True
-        elif isinstance(cell_value, str):
-            value = cell_value.strip()
-            if value == '':
-                if cfg_field.is_required:
-                    warnings.append({
-                        "message": "A required cell value is missing",
-                        "supplemental": "Missing value for the required field '" + cfg_field.header + "' in the file '" +
-                                table.filename + "'",
-                        "code": 4012
-                    })
-                    log.warning("(W) Missing value for the required field '" + cfg_field.header + "' in the file '" +
-                                table.filename + "'")
-                return True
-        is_valid_value = True
-        data_type = cfg_field.data_type.lower().strip()
-        if data_type in ['', 'string']:
-            return True
-        if 'boolean' == data_type:
-            is_valid_value = 'true' == cell_value.strip() or 'false' == cell_value.strip()
-        elif 'date' == data_type:
-            try:
-                iso8601.parse_date(cell_value)
-            except iso8601.ParseError:
-                is_valid_value = False
-        elif 'integer' == data_type:
-            try:
-                int(cell_value)
-            except ValueError:
-                is_valid_value = False
-        elif 'float' == data_type:
-            try:
-                float(cell_value)
-            except ValueError:
-                is_valid_value = False
-        elif data_type == 'list':
-            list_values = [i.lower() for i in cfg_field.list_values.split(',')]
-            if cell_value.lower() not in list_values:
-                is_valid_value = False
-        elif data_type in ['ontology-term', 'ontology term']:
-            return True  # Structure and values checked in check_ontology_fields()
+    def report_missing_value(cfield, nan_value):
+        if nan_value:
+            warnings.append({
+                "message": "A required column in assay table is not present",
+                "supplemental": "Missing value for the required field '" + cfield.header
+                                + "' in the file '" + table.filename + "'",
+                "code": 4010
+            })
         else:
+            warnings.append({
+                "message": "A required cell value is missing",
+                "supplemental": "Missing value for the required field '" + cfield.header + "' in the file '" +
+                                table.filename + "'",
+                "code": 4012
+            })
+        log.warning("(W) Missing value for the required field '" + cfield.header + "' in the file '" +
+                    table.filename + "'")
+
+    def report_invalid_value(cell_value, cfield):
+        data_type = cfield.data_type.lower().strip()
+        if data_type not in _FIELD_VALUE_TYPES:
             warnings.append({
                 "message": "Unknown data type found",
-                "supplemental": "Unknown data type '" + data_type + "' for field '" + cfg_field.header +
+                "supplemental": "Unknown data type '" + data_type + "' for field '" + cfield.header +
                                 "' in the file '" + table.filename + "'",
                 "code": 4011
             })
-            log.warning("(W) Unknown data type '" + data_type + "' for field '" + cfg_field.header +
+            log.warning("(W) Unknown data type '" + data_type + "' for field '" + cfield.header +
                         "' in the file '" + table.filename + "'")
-            return False
-        if not is_valid_value:
-            warnings.append({
-                "message": "A value does not correspond to the correct data type",
-                "supplemental": "Invalid value '" + cell_value + "' for type '" + data_type + "' of the field '"
-                                + cfg_field.header + "'",
-                "code": 4011
-            })
-            log.warning("(W) Invalid value '" + cell_value + "' for type '" + data_type + "' of the field '" +
-                        cfg_field.header + "'")
-            if data_type == 'list':
-                log.warning("(W) Value must be one of: " + cfg_field.list_values)
-        return is_valid_value
-
-    result = True
-    for irow in range(len(table.index)):
-        ncols = len(table.columns)
-        for icol in range(0, ncols):
-            cfields = [i for i in cfg.get_isatab_configuration()[0].get_field() if i.header == table.columns[icol]]
-            if len(cfields) == 1:
-                cfield = cfields[0]
-                result = result and check_single_field(table.iloc[irow][cfield.header], cfield)
-    return result
+            return
+        warnings.append({
+            "message": "A value does not correspond to the correct data type",
+            "supplemental": "Invalid value '" + cell_value + "' for type '" + data_type + "' of the field '"
+                            + cfield.header + "'",
+            "code": 4011
+        })
+        log.warning("(W) Invalid value '" + cell_value + "' for type '" + data_type + "' of the field '" +
+                    cfield.header + "'")
+        if data_type == 'list':
+            log.warning("(W) Value must be one of: " + (cfield.list_values or ''))
+
+    fields = _config_index(cfg).fields_by_header
+    columns = [(header, fields[header]) for header in table.columns if header in fields]
+    # One cell per row and configured column: 1 flags a missing (NaN) required value, 2 a blank required value
+    missing = np.zeros((len(table.index), len(columns)), dtype=np.int8)
+    invalid = np.zeros((len(table.index), len(columns)), dtype=bool)
+    for icol, (header, cfield) in enumerate(columns):
+        column = table[header]
+        nulls = column.isnull()
+        text = column.where(~nulls, '').astype(str)
+        blanks = ~nulls & (text.str.strip() == '')
+        if cfield.is_required:
+            missing[nulls.values, icol] = 1
+            missing[blanks.values, icol] = 2
+        present = ~(nulls | blanks)
+        data_type = cfield.data_type.lower().strip()
+        if data_type in ['', 'string', 'ontology-term', 'ontology term'] or not present.any():
+            continue  # Ontology term structure and values are checked in check_ontology_fields()
+        if data_type in _FIELD_VALUE_TYPES:
+            invalid[present.values, icol] = _invalid_values_mask(text[present], cfield, data_type).values
+        else:
+            invalid[present.values, icol] = True
+
+    # Cells are reported row by row, and the checks stop at the first invalid value
+    failures = np.flatnonzero(invalid)
+    stop = failures[0] if len(failures) > 0 else invalid.size
+    for cell in np.flatnonzero(missing.ravel()[:stop]):
+        irow, icol = divmod(cell, len(columns))
+        report_missing_value(columns[icol][1], missing[irow, icol] == 1)
+    if len(failures) > 0:
+        irow, icol = divmod(stop, len(columns))
+        header, cfield = columns[icol]
+        report_invalid_value(table[header].iat[irow], cfield)
+        return False
+    return True
 
 
 def check_unit_field(table, cfg):
-    def check_unit_value(cell_value, unit_value, cfield, filename):
-        if cell_has_value(cell_value) or cell_has_value(unit_value):
-            warnings.append({
-                "message": "Cell found has unit but no value",
-                "supplemental": "Field '" + cfield.header + "' has a unit but not a value in the file '" + filename
-                                + "'",
-                "code": 4999
-            })
-            log.warning("(W) Field '" + cfield.header + "' has a unit but not a value in the file '" + filename + "'")
-            return False
-        return True
+    fields = _config_index(cfg).fields_by_header
+    unit_fields = _config_index(cfg).unit_fields_by_pos
 
     result = True
     for icol, header in enumerate(table.columns):
-        cfields = [i for i in cfg.get_isatab_configuration()[0].get_field() if i.header == header]
-        if len(cfields) != 1:
+        cfield = fields.get(header)
+        if cfield is None:
             continue
-        cfield = cfields[0]
-        ucfields = [i for i in cfg.get_isatab_configuration()[0].get_unit_field() if i.pos == cfield.pos + 1]
+        ucfields = unit_fields.get(cfield.pos + 1, [])
         if len(ucfields) != 1:
             continue
         ucfield = ucfields[0]
@@ -2341,10 +2517,17 @@ def check_unit_field(table, cfg):
                 log.warning("(W) The field '" + header + "' in the file '" + table.filename +
                             "' misses a required 'Unit' column")
                 result = False
-            else:
-                for irow in range(len(table.index)):
-                    result = result and check_unit_value(table.iloc[irow][icol], table.iloc[irow][rindx],
-                                                         cfield, table.filename)
+            elif result and (_cell_has_value_mask(table.iloc[:, icol])
+                             | _cell_has_value_mask(table.iloc[:, rindx])).any():
+                warnings.append({
+                    "message": "Cell found has unit but no value",
+                    "supplemental": "Field '" + cfield.header + "' has a unit but not a value in the file '"
+                                    + table.filename + "'",
+                    "code": 4999
+                })
+                log.warning("(W) Field '" + cfield.header + "' has a unit but not a value in the file '" +
+                            table.filename + "'")
+                result = False
     return result
 
 
@@ -2378,18 +2561,18 @@ def check_protocol_fields(table, cfg, proto_map):
         last_mat_or_dat_indx = table.columns.get_loc(field_headers[len(field_headers) - 1])
         if last_proto_indx > last_mat_or_dat_indx:
             log.warning("(W) Protocol REF column without output in file '" + table.filename + "'")
+        cfg_index = _config_index(cfg)
         for left, right in pairwise(field_headers):
             cleft = None
             cright = None
-            clefts = [i for i in cfg.get_isatab_configuration()[0].get_field() if i.header.lower() == left.lower()]
+            clefts = cfg_index.fields_by_lower_header.get(left.lower(), [])
             if len(clefts) == 1:
                 cleft = clefts[0]
-            crights = [i for i in cfg.get_isatab_configuration()[0].get_field() if
-                       i.header.lower() == right.lower()]
+            crights = cfg_index.fields_by_lower_header.get(right.lower(), [])
             if len(crights) == 1:
                 cright = crights[0]
             if cleft is not None and cright is not None:
-                cprotos = [i.protocol_type for i in cfg.get_isatab_configuration()[0].get_protocol_field() if
+                cprotos = [i.protocol_type for i in cfg_index.protocol_fields if
                            cleft.pos < i.pos and cright.pos > i.pos]
                 fprotos_headers = [i for i in table.columns[
                                               table.columns.get_loc(cleft.header):table.columns.get_loc(
@@ -2429,29 +2612,13 @@ def check_protocol_fields(table, cfg, proto_map):
 
 
 def check_ontology_fields(table, cfg):
-    def check_single_field(cell_value, source, acc, cfield, filename):
-        if cell_has_value(cell_value) or cell_has_value(source) or cell_has_value(acc):
-            warnings.append({
-                "message": "Missing Term Source REF in annotation or missing Term Source Name",
-                "supplemental": "Incomplete values for ontology headers, for the field '"
-                                + cfield.header + "' in the file '"
-                                + filename + "'. Check that all the label/accession/source are provided.",
-                "code": 3008
-            })
-            log.warning(
-                "(W) Incomplete values for ontology headers, for the field '" + cfield.header + "' in the file '" +
-                filename + "'. Check that all the label/accession/source are provided.")
-            return False
-        # TODO: Implement check against declared ontology sources in investigation file
-        return True
-
+    fields = _config_index(cfg).fields_by_header
     result = True
     nfields = len(table.columns)
     for icol, header in enumerate(table.columns):
-        cfields = [i for i in cfg.get_isatab_configuration()[0].get_field() if i.header == header]
-        if len(cfields) != 1:
+        cfield = fields.get(header)
+        if cfield is None:
             continue
-        cfield = cfields[0]
         if cfield.get_recommended_ontologies() is None:
             continue
         rindx = icol + 1
@@ -2468,10 +2635,60 @@ def check_ontology_fields(table, cfg):
             result = False
             continue
 
-        for irow in range(len(table.index)):
-            result = result and check_single_field(table.iloc[irow][icol], table.iloc[irow][rindx],
-                                                   table.iloc[irow][rrindx], cfield, table.filename)
+        if result and (_cell_has_value_mask(table.iloc[:, icol]) | _cell_has_value_mask(table.iloc[:, rindx])
+                       | _cell_has_value_mask(table.iloc[:, rrindx])).any():
+            warnings.append({
+                "message": "Missing Term Source REF in annotation or missing Term Source Name",
+                "supplemental": "Incomplete values for ontology headers, for the field '"
+                                + cfield.header + "' in the file '"
+                                + table.filename + "'. Check that all the label/accession/source are provided.",
+                "code": 3008
+            })
+            log.warning(
+                "(W) Incomplete values for ontology headers, for the field '" + cfield.header + "' in the file '" +
+                table.filename + "'. Check that all the label/accession/source are provided.")
+            # TODO: Implement check against declared ontology sources in investigation file
+            result = False
+
+    return result
+
 
+def check_ontology_terms(table, term_index, term_sources):
+    """Used for rules 3004 and 3006: checks the accession and label of each ontology annotation of a table against an
+    offline TermIndex. Only annotations whose Term Source REF is declared in term_sources and indexed are checked, once
+    per distinct (label, source, accession) in each column."""
+    sources = set(name for name in term_sources if name in term_index)
+    result = True
+    columns = table.columns
+    for icol in range(len(columns) - 2):
+        if 'term source ref' not in columns[icol + 1].lower() \
+                or 'term accession number' not in columns[icol + 2].lower():
+            continue
+        header = columns[icol]
+        for label, source, accession in table.iloc[:, icol:icol + 3].drop_duplicates().itertuples(index=False):
+            if source not in sources or accession.strip() == '':
+                continue
+            labels = term_index.labels(source, accession)
+            if len(labels) == 0:
+                warnings.append({
+                    "message": "Term accession not found in ontology",
+                    "supplemental": "Accession '{}' of '{}' in column '{}' of the file '{}' is not a term of {}".format(
+                        accession, label, header, table.filename, source),
+                    "code": 3004
+                })
+                log.warning("(W) Accession '{}' of '{}' in column '{}' of the file '{}' is not a term of {}".format(
+                    accession, label, header, table.filename, source))
+                result = False
+            elif label.strip() != '' and label.strip().lower() not in [x.lower() for x in labels if x is not None]:
+                warnings.append({
+                    "message": "Term label does not match accession",
+                    "supplemental": "Term '{}' in column '{}' of the file '{}' has accession '{}', labelled {} in "
+                                    "{}".format(label, header, table.filename, accession, labels, source),
+                    "code": 3006
+                })
+                log.warning("(W) Term '{}' in column '{}' of the file '{}' has accession '{}', labelled {} in "
+                            "{}".format(label, header, table.filename, accession, labels, source))
+                result = False
     return result
 
 
@@ -2479,11 +2696,22 @@ BASE_DIR = os.path.dirname(__file__)
 default_config_dir = os.path.join(BASE_DIR, 'resources', 'config', 'xml')
 
 
-def validate(fp, config_dir=default_config_dir, log_level=config.log_level):
+def validate(fp, config_dir=default_config_dir, log_level=config.log_level, term_index=None, config_cache_dir=None):
+    """Validates an ISA-Tab archive, given the file object of its investigation file.
+
+    If term_index is given, as a TermIndex from isatools.io.ontology_index or the path of one, the ontology terms of
+    the study and assay tables are also checked against it, offline, for the ontology sources declared in the
+    investigation file and found in the index.
+
+    The configurations in config_dir are parsed once per process. If config_cache_dir is given, such as
+    isatab_configurator.DEFAULT_CACHE_DIR, they are also cached on disk there for other processes to reuse.
+    """
     global errors
     global warnings
+    global _table_cache
     errors = list()
     warnings = list()
+    _table_cache = dict()
     log.setLevel(log_level)
     log.info("ISA tab Validator from ISA tools API v0.6")
     from io import StringIO
@@ -2491,6 +2719,7 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level):
     handler = logging.StreamHandler(stream)
     log.addHandler(handler)
     validation_finished = False
+    opened_term_index = None
     try:
         # check_utf8(fp)  # skip as does not correctly report right now
         log.info("Loading... {}".format(fp.name))
@@ -2510,9 +2739,13 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level):
         check_protocol_parameter_names(i_df)  # Rule 1011
         check_study_factor_names(i_df)  # Rule 1012
         check_ontology_sources(i_df)  # Rule 3008
+        term_sources = i_df['ontology_sources']['Term Source Name'].tolist()
+        if isinstance(term_index, str):
+            from isatools.io.ontology_index import TermIndex
+            term_index = opened_term_index = TermIndex(term_index, read_only=True)
         log.info("Finished prechecks...")
         log.info("Loading configurations found in {}".format(config_dir))
-        configs = load_config(config_dir)  # Rule 4001
+        configs = load_config(config_dir, cache_dir=config_cache_dir)  # Rule 4001
         if configs is None:
             raise SystemError("No configuration to load so cannot proceed with validation!")
         log.info("Using configurations found in {}".format(config_dir))
@@ -2530,33 +2763,37 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level):
                 protocol_names_and_types = dict(zip(protocol_names, protocol_types))
                 try:
                     log.info("Loading... {}".format(study_filename))
-                    with open(os.path.join(os.path.dirname(fp.name), study_filename), encoding='utf-8') as s_fp:
-                        study_sample_table = load_table(s_fp)
-                        study_sample_table.filename = study_filename
-                        config = configs[('[Sample]', '')]
-                        log.info(
-                            "Validating {} against default study table configuration".format(study_filename))
-                        log.info("Checking Factor Value presence...")
-                        check_factor_value_presence(study_sample_table)  # Rule 4007
-                        log.info("Checking required fields...")
-                        check_required_fields(study_sample_table, config)  # Rule 4003-8, 4010
-                        log.info("Checking generic fields...")
-                        if not check_field_values(study_sample_table, config):  # Rule 4011
-                            log.warning("(W) There are some field value inconsistencies in {} against {} "
-                                        "configuration".format(study_sample_table.filename, 'Study Sample'))
-                        log.info("Checking unit fields...")
-                        if not check_unit_field(study_sample_table, config):
-                            log.warning("(W) There are some unit value inconsistencies in {} against {} "
-                                        "configuration".format(study_sample_table.filename, 'Study Sample'))
-                        log.info("Checking protocol fields...")
-                        if not check_protocol_fields(study_sample_table, config, protocol_names_and_types):  # Rule 4009
-                            log.warning("(W) There are some protocol inconsistencies in {} against {} "
-                                        "configuration".format(study_sample_table.filename, 'Study Sample'))
-                        log.info("Checking ontology fields...")
-                        if not check_ontology_fields(study_sample_table, config):  # Rule 3010
-                            log.warning("(W) There are some ontology annotation inconsistencies in {} against {} "
-                                        "configuration".format(study_sample_table.filename, 'Study Sample'))
-                        log.info("Finished validation on {}".format(study_filename))
+                    study_sample_table = _read_table_file(os.path.join(os.path.dirname(fp.name), study_filename))
+                    study_sample_table.filename = study_filename
+                    config = configs[('[Sample]', '')]
+                    log.info(
+                        "Validating {} against default study table configuration".format(study_filename))
+                    log.info("Checking Factor Value presence...")
+                    check_factor_value_presence(study_sample_table)  # Rule 4007
+                    log.info("Checking required fields...")
+                    check_required_fields(study_sample_table, config)  # Rule 4003-8, 4010
+                    log.info("Checking generic fields...")
+                    if not check_field_values(study_sample_table, config):  # Rule 4011
+                        log.warning("(W) There are some field value inconsistencies in {} against {} "
+                                    "configuration".format(study_sample_table.filename, 'Study Sample'))
+                    log.info("Checking unit fields...")
+                    if not check_unit_field(study_sample_table, config):
+                        log.warning("(W) There are some unit value inconsistencies in {} against {} "
+                                    "configuration".format(study_sample_table.filename, 'Study Sample'))
+                    log.info("Checking protocol fields...")
+                    if not check_protocol_fields(study_sample_table, config, protocol_names_and_types):  # Rule 4009
+                        log.warning("(W) There are some protocol inconsistencies in {} against {} "
+                                    "configuration".format(study_sample_table.filename, 'Study Sample'))
+                    log.info("Checking ontology fields...")
+                    if not check_ontology_fields(study_sample_table, config):  # Rule 3010
+                        log.warning("(W) There are some ontology annotation inconsistencies in {} against {} "
+                                    "configuration".format(study_sample_table.filename, 'Study Sample'))
+                    if term_index is not None:
+                        log.info("Checking ontology terms...")
+                        if not check_ontology_terms(study_sample_table, term_index, term_sources):  # Rules 3004, 3006
+                            log.warning("(W) There are some unknown ontology terms in {}".format(
+                                study_sample_table.filename))
+                    log.info("Finished validation on {}".format(study_filename))
                 except FileNotFoundError:
                     pass
                 assay_df = i_df['s_assays'][i]
@@ -2577,36 +2814,40 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level):
                         else:
                             try:
                                 log.info("Loading... {}".format(assay_filename))
-                                with open(os.path.join(os.path.dirname(fp.name), assay_filename), encoding='utf-8') as a_fp:
-                                    assay_table = load_table(a_fp)
-                                    assay_table.filename = assay_filename
-                                    assay_tables.append(assay_table)
-                                    log.info(
-                                        "Validating {} against assay table configuration ({}, {})...".format(
-                                            assay_filename, measurement_type, technology_type))
-                                    log.info("Checking Factor Value presence...")
-                                    check_factor_value_presence(assay_table)  # Rule 4007
-                                    log.info("Checking required fields...")
-                                    check_required_fields(assay_table, config)  # Rule 4003-8, 4010
-                                    log.info("Checking generic fields...")
-                                    if not check_field_values(assay_table, config):  # Rule 4011
-                                        log.warning(
-                                            "(W) There are some field value inconsistencies in {} against {} configuration".format(
-                                                assay_table.filename, (measurement_type, technology_type)))
-                                    log.info("Checking unit fields...")
-                                    if not check_unit_field(assay_table, config):
-                                        log.warning(
-                                            "(W) There are some unit value inconsistencies in {} against {} configuration".format(
-                                                assay_table.filename, (measurement_type, technology_type)))
-                                    log.info("Checking protocol fields...")
-                                    if not check_protocol_fields(assay_table, config, protocol_names_and_types):  # Rule 4009
-                                        log.warning("(W) There are some protocol inconsistencies in {} against {} "
-                                                    "configuration".format(assay_table.filename, (measurement_type, technology_type)))
-                                    log.info("Checking ontology fields...")
-                                    if not check_ontology_fields(assay_table, config):  # Rule 3010
-                                        log.warning("(W) There are some ontology annotation inconsistencies in {} against {} "
-                                                    "configuration".format(assay_table.filename, (measurement_type, technology_type)))
-                                    log.info("Finished validation on {}".format(assay_filename))
+                                assay_table = _read_table_file(os.path.join(os.path.dirname(fp.name), assay_filename))
+                                assay_table.filename = assay_filename
+                                assay_tables.append(assay_table)
+                                log.info(
+                                    "Validating {} against assay table configuration ({}, {})...".format(
+                                        assay_filename, measurement_type, technology_type))
+                                log.info("Checking Factor Value presence...")
+                                check_factor_value_presence(assay_table)  # Rule 4007
+                                log.info("Checking required fields...")
+                                check_required_fields(assay_table, config)  # Rule 4003-8, 4010
+                                log.info("Checking generic fields...")
+                                if not check_field_values(assay_table, config):  # Rule 4011
+                                    log.warning(
+                                        "(W) There are some field value inconsistencies in {} against {} configuration".format(
+                                            assay_table.filename, (measurement_type, technology_type)))
+                                log.info("Checking unit fields...")
+                                if not check_unit_field(assay_table, config):
+                                    log.warning(
+                                        "(W) There are some unit value inconsistencies in {} against {} configuration".format(
+                                            assay_table.filename, (measurement_type, technology_type)))
+                                log.info("Checking protocol fields...")
+                                if not check_protocol_fields(assay_table, config, protocol_names_and_types):  # Rule 4009
+                                    log.warning("(W) There are some protocol inconsistencies in {} against {} "
+                                                "configuration".format(assay_table.filename, (measurement_type, technology_type)))
+                                log.info("Checking ontology fields...")
+                                if not check_ontology_fields(assay_table, config):  # Rule 3010
+                                    log.warning("(W) There are some ontology annotation inconsistencies in {} against {} "
+                                                "configuration".format(assay_table.filename, (measurement_type, technology_type)))
+                                if term_index is not None:
+                                    log.info("Checking ontology terms...")
+                                    if not check_ontology_terms(assay_table, term_index, term_sources):  # Rules 3004, 3006
+                                        log.warning("(W) There are some unknown ontology terms in {}".format(
+                                            assay_table.filename))
+                                log.info("Finished validation on {}".format(assay_filename))
                             except FileNotFoundError:
                                 pass
                         if study_sample_table is not None:
@@ -2657,7 +2898,11 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level):
         log.fatal("(F) Something went very very wrong! :(")
         log.fatal(e)
     finally:
+        _table_cache = None
+        if opened_term_index is not None:
+            opened_term_index.close()
         handler.flush()
+        log.removeHandler(handler)
         return {
             "errors": errors,
             "warnings": warnings,
@@ -2665,9 +2910,37 @@ def validate(fp, config_dir=default_config_dir, log_level=config.log_level):
         }
 
 
-def batch_validate(tab_dir_list):
+def _validate_i_file(i_file, config_cache_dir=None):
+    with open(i_file, encoding='utf-8') as fp:
+        return {
+            "filename": fp.name,
+            "report": validate(fp, config_cache_dir=config_cache_dir)
+        }
+
+
+def _find_i_file(tab_dir):
+    i_files = glob.glob(os.path.join(tab_dir, 'i_*.txt'))
+    if len(i_files) != 1:
+        log.warning("Could not find an investigation file, skipping {}".format(tab_dir))
+        return None
+    return i_files[0]
+
+
+def _imap_validate_tab_dirs(tab_dir_list, n_workers=None, timeout=None, config_cache_dir=None):
+    from isatools.batch import imap_validate
+    i_files = [i_file for i_file in (_find_i_file(tab_dir) for tab_dir in tab_dir_list) if i_file is not None]
+    return imap_validate(functools.partial(_validate_i_file, config_cache_dir=config_cache_dir), i_files,
+                         n_workers=n_workers, timeout=timeout)
+
+
+def batch_validate(tab_dir_list, n_workers=1, timeout=None, config_cache_dir=None):
     """ Validate a batch of ISA-Tab archives
     :param tab_dir_list: List of file paths to the ISA-Tab archives to validate
+    :param n_workers: Number of worker processes validating archives in parallel, None for one per CPU. With the
+    default of 1 and no timeout the archives are validated in the calling process
+    :param timeout: Seconds after which the validation of a single archive is stopped and reported as unfinished
+    :param config_cache_dir: Directory to cache the parsed configurations in, so that worker processes don't each
+    parse them, e.g. isatab_configurator.DEFAULT_CACHE_DIR. None to not cache them on disk
     :return: batch report as JSON
 
     Example:
@@ -2676,69 +2949,324 @@ def batch_validate(tab_dir_list):
             '/path/to/study1/',
             '/path/to/study2/'
         ]
-        batch_report = isatab.batch_validate(my_tabs, '/path/to/report.txt')
+        batch_report = isatab.batch_validate(my_tabs, n_workers=4, timeout=600)
     """
     batch_report = {
         "batch_report": []
     }
-    for tab_dir in tab_dir_list:
-        log.info("***Validating {}***\n".format(tab_dir))
-        i_files = glob.glob(os.path.join(tab_dir, 'i_*.txt'))
-        if len(i_files) != 1:
-            log.warning("Could not find an investigation file, skipping {}".format(tab_dir))
-        else:
-            with open(i_files[0], encoding='utf-8') as fp:
-                batch_report['batch_report'].append(
-                    {
-                        "filename": fp.name,
-                        "report": validate(fp)
-                    }
-                )
+    if n_workers == 1 and timeout is None:
+        for tab_dir in tab_dir_list:
+            log.info("***Validating {}***\n".format(tab_dir))
+            i_file = _find_i_file(tab_dir)
+            if i_file is not None:
+                batch_report['batch_report'].append(_validate_i_file(i_file, config_cache_dir=config_cache_dir))
+    else:
+        reports = dict(_imap_validate_tab_dirs(tab_dir_list, n_workers=n_workers, timeout=timeout,
+                                               config_cache_dir=config_cache_dir))
+        batch_report['batch_report'] = [reports[i] for i in sorted(reports.keys())]
     return batch_report
 
 
+def ibatch_validate(tab_dir_list, n_workers=None, timeout=None, config_cache_dir=None):
+    """ Validate a batch of ISA-Tab archives in parallel worker processes, yielding each report as soon as its
+    archive is done
+    :param tab_dir_list: List of file paths to the ISA-Tab archives to validate
+    :param n_workers: Number of worker processes, None for one per CPU
+    :param timeout: Seconds after which the validation of a single archive is stopped and reported as unfinished
+    :param config_cache_dir: Directory to cache the parsed configurations in, None to not cache them on disk
+    :return: Generator of dicts with the 'filename' and 'report' of each validated archive, in order of completion
+
+    Example:
+        from isatools import isatab
+        for result in isatab.ibatch_validate(my_tabs, n_workers=8, timeout=600):
+            print(result['filename'], result['report']['validation_finished'])
+    """
+    for _, result in _imap_validate_tab_dirs(tab_dir_list, n_workers=n_workers, timeout=timeout,
+                                             config_cache_dir=config_cache_dir):
+        yield result
+
+
+def _dump_to_strings(isa_obj, i_file_name='i_investigation.txt', skip_dump_tables=False):
+    """Writes the files dump() would write into memory, returning their contents by file name: the investigation file
+    first, then the study and the assay tables"""
+    if not isinstance(isa_obj, Investigation):
+        log.debug('object type=', type(isa_obj))
+        raise NotImplementedError("Can only dump an Investigation object")
+    files = OrderedDict()
+    i_fp = StringIO()
+    _write_investigation_file(isa_obj, i_fp)
+    files[i_file_name] = i_fp.getvalue()
+    if not skip_dump_tables:
+        for tables in (_iter_study_tables(isa_obj), _iter_assay_tables(isa_obj)):
+            for filename, columns, header, rows in tables:
+                table_fp = StringIO()
+                _write_table(functools.partial(_kept_open, table_fp), columns, header, rows)
+                files[filename] = table_fp.getvalue()
+    return files
+
+
 def dumps(isa_obj, skip_dump_tables=False):
-    tmp = None
     output = str()
-    try:
-        tmp = tempfile.mkdtemp()
-        dump(isa_obj=isa_obj, output_path=tmp, skip_dump_tables=skip_dump_tables)
-        with open(os.path.join(tmp, 'i_investigation.txt'), encoding='utf-8') as i_fp:
-            output += os.path.join(tmp, 'i_investigation.txt') + '\n'
-            output += i_fp.read()
-        for s_file in glob.iglob(os.path.join(tmp, 's_*')):
-            with open(s_file, encoding='utf-8') as s_fp:
-                output += "--------\n"
-                output += s_file + '\n'
-                output += s_fp.read()
-        for a_file in glob.iglob(os.path.join(tmp, 'a_*')):
-            with open(a_file, encoding='utf-8') as a_fp:
-                output += "--------\n"
-                output += a_file + '\n'
-                output += a_fp.read()
-    finally:
-        if tmp is not None:
-            shutil.rmtree(tmp)
+    for i, (filename, contents) in enumerate(_dump_to_strings(isa_obj, skip_dump_tables=skip_dump_tables).items()):
+        if i > 0:
+            output += "--------\n"
+        output += filename + '\n'
+        output += contents
     return output
 
 
 def dump_tables_to_dataframes(isa_obj):
-    tmp = None
     output = dict()
+    for filename, contents in _dump_to_strings(isa_obj).items():
+        if filename.startswith(('s_', 'a_')):
+            output[filename] = _read_tfile_fp(StringIO(contents))
+    return output
+
+
+def _lazy_table_property(base_property):
+    """Returns a property reading the tables of a LazyStudy or LazyAssay before getting or setting base_property"""
+    def fget(self):
+        self._load_tables()
+        return base_property.fget(self)
+
+    def fset(self, val):
+        self._load_tables()
+        base_property.fset(self, val)
+
+    return property(fget, fset, doc=base_property.__doc__)
+
+
+class _LazyTablesMixin(object):
+    """Reads the table of a Study or Assay loaded by load(lazy_load_tables=True) the first time the attributes it fills
+    are used. The investigation file metadata is set from the start. Other threads using these attributes while the
+    table is read wait for it to be read."""
+
+    _tables_loader = None  # called with the Study or Assay to read its table, None once read
+    _tables_loading = False  # True while the loader runs, as it sets the lazy attributes itself
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tables_lock = threading.RLock()
+
+    def _load_tables(self):
+        if self._tables_loader is None:
+            return
+        with self._tables_lock:  # other threads wait here until the table has been read
+            loader = self._tables_loader
+            if loader is None or self._tables_loading:
+                return
+            self._tables_loading = True
+            try:
+                loader(self)
+                self._tables_loader = None
+            finally:
+                self._tables_loading = False
+
+    @property
+    def tables_loaded(self):
+        """:obj:`bool`: whether the table has been read"""
+        return self._tables_loader is None
+
+    def __getstate__(self):
+        self._load_tables()
+        state = super().__getstate__()
+        del state['_tables_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._tables_lock = threading.RLock()
+
+
+class LazyStudy(_LazyTablesMixin, Study):
+    """Study whose study table is only read when its materials, process sequence, graph, characteristic categories
+    or units are first used.
+
+    Reading the study table does not read the assay tables. Characteristics and comments that an assay table adds
+    to the study samples, in columns following Sample Name, are only added to them when that assay table is read.
+    """
+
+    sources = _lazy_table_property(Study.sources)
+    samples = _lazy_table_property(Study.samples)
+    process_sequence = _lazy_table_property(Study.process_sequence)
+    characteristic_categories = _lazy_table_property(Study.characteristic_categories)
+    units = _lazy_table_property(Study.units)
+
+
+class LazyAssay(_LazyTablesMixin, Assay):
+    """Assay whose assay table is only read when its materials, data files, process sequence, graph, characteristic
+    categories or units are first used. Reading it reads the study table first."""
+
+    samples = _lazy_table_property(Assay.samples)
+    other_material = _lazy_table_property(Assay.other_material)
+    data_files = _lazy_table_property(Assay.data_files)
+    process_sequence = _lazy_table_property(Assay.process_sequence)
+    characteristic_categories = _lazy_table_property(Assay.characteristic_categories)
+    units = _lazy_table_property(Assay.units)
+
+
+def _assay_shared_objects(ontology_sources, study_samples, study_protocols, study_factors):
+    """Returns the objects of an investigation that the graph built from one of its assay tables refers to, in the
+    order _parse_assay_table() numbers them"""
+    shared = list(ontology_sources) + list(study_samples) + list(study_factors) + list(study_protocols)
+    for protocol in study_protocols:
+        shared.extend(protocol.parameters)
+    return shared
+
+
+def _parse_assay_table(tfile_path, ontology_sources, study_samples, study_protocols, study_factors):
+    """Builds the graph of an assay table in a worker process of load(n_workers=...).
+
+    The study objects passed in are copies of those of the main process, so they are pickled in the result as their
+    index in _assay_shared_objects(), for _read_assay_table_result() to put back the originals. The characteristics,
+    factor values and comments the assay table adds to the study samples are returned alongside the graph.
+
+    :return: Pickled ((sources, samples, other, data, processes, characteristic categories, unit categories),
+        [(study sample, characteristics, factor values, comments added), ...])
+    """
+    sample_lengths = [(len(x.characteristics), len(x.factor_values), len(x.comments)) for x in study_samples]
+    tables = ProcessSequenceFactory(
+        ontology_sources=ontology_sources,
+        study_samples=study_samples,
+        study_protocols=study_protocols,
+        study_factors=study_factors).create_from_df(read_tfile(tfile_path))
+    sample_additions = [(sample, sample.characteristics[n_characteristics:], sample.factor_values[n_factor_values:],
+                         sample.comments[n_comments:])
+                        for sample, (n_characteristics, n_factor_values, n_comments)
+                        in zip(study_samples, sample_lengths)
+                        if (len(sample.characteristics), len(sample.factor_values), len(sample.comments))
+                        != (n_characteristics, n_factor_values, n_comments)]
+    shared_index = dict((id(x), i) for i, x in enumerate(
+        _assay_shared_objects(ontology_sources, study_samples, study_protocols, study_factors)))
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = lambda obj: shared_index.get(id(obj))
+    pickler.dump((tables, sample_additions))
+    return buffer.getvalue()
+
+
+def _read_assay_table_result(data, shared):
+    """Unpickles the result of _parse_assay_table(), given the objects returned by _assay_shared_objects() for the
+    arguments it was called with, and adds the characteristics, factor values and comments of the assay table to the
+    study samples. Comments are only added to a sample that has none of the same name, as ProcessSequenceFactory
+    does.
+
+    :return: The tuple of dicts returned by ProcessSequenceFactory.create_from_df()
+    """
+    unpickler = pickle.Unpickler(io.BytesIO(data))
+    unpickler.persistent_load = lambda pid: shared[pid]
+    tables, sample_additions = unpickler.load()
+    for sample, characteristics, factor_values, comments in sample_additions:
+        sample.characteristics.extend(characteristics)
+        sample.factor_values.extend(factor_values)
+        for comment in comments:
+            if comment.name not in [x.name for x in sample.comments]:
+                sample.comments.append(comment)
+    return tables
+
+
+SNAPSHOT_FORMAT = 1  # to be incremented when a change to the model classes makes older snapshots unusable
+# Snapshots are also keyed on isatools.__version__, so a new release never reads those of an older one
+_SNAPSHOT_MAGIC = b'ISATAB-SNAPSHOT\n'
+_SNAPSHOT_HEADER_SIZE = len(_SNAPSHOT_MAGIC) + 64  # magic, archive digest, digest of the zlib-compressed pickle
+
+
+def _snapshot_key(i_file_path, table_filenames, skip_load_tables):
+    """Returns the SHA-256 hex digest identifying the content of an archive, from the digests of its investigation
+    file and of the study and assay files it lists, in the order they are listed, and the version of isatools"""
+    digest = hashlib.sha256('{}:{}:{}'.format(isatools.__version__, SNAPSHOT_FORMAT,
+                                              int(bool(skip_load_tables))).encode('utf-8'))
+    dir_name = os.path.dirname(i_file_path)
+    for path in [i_file_path] + [os.path.join(dir_name, filename) for filename in table_filenames]:
+        digest.update(bytes.fromhex(file_checksum(path, algorithm='sha256')))
+    return digest.hexdigest()
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """Pauses the garbage collector, which would otherwise go over the objects of an Investigation being pickled or
+    unpickled again and again"""
+    gc_enabled = gc.isenabled()
+    gc.disable()
     try:
-        tmp = tempfile.mkdtemp()
-        dump(isa_obj=isa_obj, output_path=tmp, skip_dump_tables=False)
-        for s_file in glob.iglob(os.path.join(tmp, 's_*')):
-            output[os.path.basename(s_file)] = read_tfile(s_file)
-        for a_file in glob.iglob(os.path.join(tmp, 'a_*')):
-            output[os.path.basename(a_file)] = read_tfile(a_file)
+        yield
     finally:
-        if tmp is not None:
-            shutil.rmtree(tmp)
-    return output
+        if gc_enabled:
+            gc.enable()
 
 
-def load(isatab_path_or_ifile, skip_load_tables=False):  # from DF of investigation file
+def _read_snapshot(snapshot_path, key):
+    """Returns the Investigation in the snapshot at snapshot_path, or None if there is none or it is not a valid
+    snapshot of the archive identified by key"""
+    try:
+        with open(snapshot_path, 'rb') as fp:
+            data = fp.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        log.warning("Ignoring unreadable ISA-Tab snapshot %s: %s", snapshot_path, e)
+        return None
+    payload = memoryview(data)[_SNAPSHOT_HEADER_SIZE:]
+    if data[:_SNAPSHOT_HEADER_SIZE] != _SNAPSHOT_MAGIC + bytes.fromhex(key) + hashlib.sha256(payload).digest():
+        log.warning("Ignoring stale or corrupted ISA-Tab snapshot %s", snapshot_path)
+        return None
+    try:
+        with _gc_paused():
+            investigation = pickle.loads(zlib.decompress(payload))
+    except Exception as e:
+        log.warning("Ignoring ISA-Tab snapshot %s that could not be read back: %s", snapshot_path, e)
+        return None
+    if not isinstance(investigation, Investigation):
+        log.warning("Ignoring ISA-Tab snapshot %s that does not hold an Investigation", snapshot_path)
+        return None
+    return investigation
+
+
+def _write_snapshot(snapshot_path, key, investigation):
+    """Writes a snapshot of investigation at snapshot_path, replacing the file once the snapshot is complete. The
+    snapshot is only a cache, so failing to write it is logged rather than raised."""
+    tmp_path = None
+    try:
+        with _gc_paused():
+            payload = zlib.compress(pickle.dumps(investigation, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        snapshot_dir = os.path.dirname(os.path.abspath(snapshot_path))
+        os.makedirs(snapshot_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=snapshot_dir)
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(_SNAPSHOT_MAGIC + bytes.fromhex(key) + hashlib.sha256(payload).digest())
+            fp.write(payload)
+        os.replace(tmp_path, snapshot_path)
+    except Exception as e:
+        log.warning("Could not write ISA-Tab snapshot %s: %s", snapshot_path, e)
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def load(isatab_path_or_ifile, skip_load_tables=False, lazy_load_tables=False,
+         n_workers=1, snapshot_dir=None):  # from DF of investigation file
+    """Loads an ISA-Tab archive into an Investigation.
+
+    :param isatab_path_or_ifile: Directory of the archive, or file object of its investigation file
+    :param skip_load_tables: If True, only load the investigation file
+    :param lazy_load_tables: If True, the study and assay tables are each only read the first time the materials,
+        process sequence or other attribute they fill of their Study or Assay is used (see LazyStudy and LazyAssay),
+        so the investigation is returned once the investigation file is read. The characteristics and comments an
+        assay table adds to the study samples are only there once that assay table has been read.
+    :param n_workers: Number of worker processes parsing the assay tables, None for the number of CPUs. The study
+        tables are read first, then the assay tables in parallel, and the graph of each assay is merged into its study
+        on the calling process in the order of the investigation file, so the Investigation is the same as when the
+        tables are read one after another. Ignored if lazy_load_tables is True.
+    :param snapshot_dir: Directory in which to keep a binary snapshot of each Investigation loaded, for instance the
+        directory of the archive, or None not to use snapshots. The snapshot of an archive is named after the SHA-256
+        digest of its investigation, study and assay files, and is read instead of the archive as long as none of
+        these files changes. Snapshots that are stale, truncated or otherwise unreadable are ignored and written
+        again. They are pickles, so only use a directory that no one else can write to. Ignored if lazy_load_tables
+        is True.
+    :return: Investigation object
+    """
 
     def get_ontology_source(term_source_ref):
         try:
@@ -2832,6 +3360,51 @@ def load(isatab_path_or_ifile, skip_load_tables=False):  # from DF of investigat
             comments.append(comment)
         return comments
 
+    def set_executed_protocols(processes, study, protocol_map):
+        for process in processes:
+            try:
+                process.executes_protocol = protocol_map[process.executes_protocol]
+            except KeyError:
+                try:
+                    unknown_protocol = protocol_map['unknown']
+                except KeyError:
+                    protocol_map['unknown'] = Protocol(
+                        name="unknown protocol",
+                        description="This protocol was auto-generated where a protocol could not be determined.")
+                    unknown_protocol = protocol_map['unknown']
+                    study.protocols.append(unknown_protocol)
+                process.executes_protocol = unknown_protocol
+
+    def load_study_tables(study, protocol_map):
+        study_tfile_df = read_tfile(os.path.join(dir_name, study.filename))
+        sources, samples, _, __, processes, characteristic_categories, unit_categories = ProcessSequenceFactory(
+            ontology_sources=investigation.ontology_source_references, study_protocols=study.protocols,
+            study_factors=study.factors).create_from_df(study_tfile_df)
+        study.sources = list(sources.values())
+        study.samples = list(samples.values())
+        study.process_sequence = list(processes.values())
+        study.characteristic_categories = list(characteristic_categories.values())
+        study.units = list(unit_categories.values())
+        set_executed_protocols(study.process_sequence, study, protocol_map)
+
+    def load_assay_tables(assay, study, protocol_map):
+        assay_tfile_df = read_tfile(os.path.join(dir_name, assay.filename))
+        set_assay_tables(assay, study, protocol_map, ProcessSequenceFactory(
+            ontology_sources=investigation.ontology_source_references,
+            study_samples=study.samples,
+            study_protocols=study.protocols,
+            study_factors=study.factors).create_from_df(assay_tfile_df))
+
+    def set_assay_tables(assay, study, protocol_map, tables):
+        _, samples, other, data, processes, characteristic_categories, unit_categories = tables
+        assay.samples = list(samples.values())
+        assay.other_material = list(other.values())
+        assay.data_files = list(data.values())
+        assay.process_sequence = list(processes.values())
+        assay.characteristic_categories = list(characteristic_categories.values())
+        assay.units = list(unit_categories.values())
+        set_executed_protocols(assay.process_sequence, study, protocol_map)
+
     FP = None
 
     if isinstance(isatab_path_or_ifile, str):
@@ -2845,8 +3418,29 @@ def load(isatab_path_or_ifile, skip_load_tables=False):  # from DF of investigat
         raise IOError("Cannot resolve input file")
 
     df_dict = read_investigation_file(FP)
+    dir_name = os.path.dirname(FP.name)
+
+    snapshot_path = None
+    if snapshot_dir is not None and not lazy_load_tables:
+        table_filenames = list()
+        if not skip_load_tables:
+            for study_df, assays_df in zip(df_dict['studies'], df_dict['s_assays']):
+                table_filenames.append(study_df.iloc[0]['Study File Name'])
+                table_filenames.extend(assays_df['Study Assay File Name'])
+        try:
+            key = _snapshot_key(FP.name, table_filenames, skip_load_tables)
+        except OSError as e:
+            log.debug("Not using an ISA-Tab snapshot: %s", e)
+        else:
+            snapshot_path = os.path.join(snapshot_dir, 'isatab-{}.snapshot'.format(key))
+            investigation = _read_snapshot(snapshot_path, key)
+            if investigation is not None:
+                return investigation
 
     investigation = Investigation()
+    parse_in_workers = not skip_load_tables and not lazy_load_tables and n_workers != 1 and sum(
+        len(assays_df.index) for assays_df in df_dict['s_assays']) > 1
+    assay_jobs = list()  # (assay, study, protocol_map, arguments of _parse_assay_table) if parse_in_workers
 
     for _, row in df_dict['ontology_sources'].iterrows():
         ontology_source = OntologySource(name=row['Term Source Name'],
@@ -2870,7 +3464,7 @@ def load(isatab_path_or_ifile, skip_load_tables=False):  # from DF of investigat
 
     for i in range(0, len(df_dict['studies'])):
         row = df_dict['studies'][i].iloc[0]
-        study = Study()
+        study = LazyStudy() if lazy_load_tables else Study()
         study.identifier = row['Study Identifier']
         study.title = row['Study Title']
         study.description = row['Study Description']
@@ -2919,34 +3513,13 @@ def load(isatab_path_or_ifile, skip_load_tables=False):  # from DF of investigat
         study.protocols = list(protocol_map.values())
         if skip_load_tables:
             pass
+        elif lazy_load_tables:
+            study._tables_loader = functools.partial(load_study_tables, protocol_map=protocol_map)
         else:
-            study_tfile_df = read_tfile(os.path.join(os.path.dirname(FP.name), study.filename))
-            sources, samples, _, __, processes, characteristic_categories, unit_categories = ProcessSequenceFactory(
-                ontology_sources=investigation.ontology_source_references, study_protocols=study.protocols,
-                study_factors=study.factors).create_from_df(study_tfile_df)
-            study.sources = list(sources.values())
-            study.samples = list(samples.values())
-            study.samples = list(samples.values())
-            study.process_sequence = list(processes.values())
-            study.characteristic_categories = list(characteristic_categories.values())
-            study.units = list(unit_categories.values())
-
-            for process in study.process_sequence:
-                try:
-                    process.executes_protocol = protocol_map[process.executes_protocol]
-                except KeyError:
-                    try:
-                        unknown_protocol = protocol_map['unknown']
-                    except KeyError:
-                        protocol_map['unknown'] = Protocol(
-                            name="unknown protocol",
-                            description="This protocol was auto-generated where a protocol could not be determined.")
-                        unknown_protocol = protocol_map['unknown']
-                        study.protocols.append(unknown_protocol)
-                    process.executes_protocol = unknown_protocol
+            load_study_tables(study, protocol_map)
 
         for _, row in df_dict['s_assays'][i].iterrows():
-            assay = Assay()
+            assay = LazyAssay() if lazy_load_tables else Assay()
             assay.filename = row['Study Assay File Name']
             assay.measurement_type = get_oa(
                 row['Study Assay Measurement Type'],
@@ -2961,36 +3534,29 @@ def load(isatab_path_or_ifile, skip_load_tables=False):  # from DF of investigat
             assay.technology_platform = row['Study Assay Technology Platform']
             if skip_load_tables:
                 pass
+            elif lazy_load_tables:
+                assay._tables_loader = functools.partial(load_assay_tables, study=study, protocol_map=protocol_map)
+            elif parse_in_workers:
+                assay_jobs.append((assay, study, protocol_map, (
+                    os.path.join(dir_name, assay.filename), list(investigation.ontology_source_references),
+                    list(study.samples), list(study.protocols), list(study.factors))))
             else:
-                assay_tfile_df = read_tfile(os.path.join(os.path.dirname(FP.name), assay.filename))
-                _, samples, other, data, processes, characteristic_categories, unit_categories = ProcessSequenceFactory(
-                    ontology_sources=investigation.ontology_source_references,
-                    study_samples=study.samples,
-                    study_protocols=study.protocols,
-                    study_factors=study.factors).create_from_df(assay_tfile_df)
-                assay.samples = list(samples.values())
-                assay.other_material = list(other.values())
-                assay.data_files = list(data.values())
-                assay.process_sequence = list(processes.values())
-                assay.characteristic_categories = list(characteristic_categories.values())
-                assay.units = list(unit_categories.values())
-
-                for process in assay.process_sequence:
-                    try:
-                        process.executes_protocol = protocol_map[process.executes_protocol]
-                    except KeyError:
-                        try:
-                            unknown_protocol = protocol_map['unknown']
-                        except KeyError:
-                            protocol_map['unknown'] = Protocol(
-                                name="unknown protocol",
-                                description="This protocol was auto-generated where a protocol could not be determined.")
-                            unknown_protocol = protocol_map['unknown']
-                            study.protocols.append(unknown_protocol)
-                        process.executes_protocol = unknown_protocol
+                load_assay_tables(assay, study, protocol_map)
 
             study.assays.append(assay)
         investigation.studies.append(study)
+
+    if assay_jobs:
+        with ProcessPoolExecutor(max_workers=min(n_workers or os.cpu_count() or 1, len(assay_jobs))) as executor:
+            futures = [executor.submit(_parse_assay_table, *args) for _, __, ___, args in assay_jobs]
+            # waits for all the assays before merging any, as the study samples are still being sent to the workers
+            results = [future.result() for future in futures]
+        for (assay, study, protocol_map, args), result in zip(assay_jobs, results):
+            set_assay_tables(assay, study, protocol_map,
+                             _read_assay_table_result(result, _assay_shared_objects(*args[1:])))
+
+    if snapshot_path is not None:
+        _write_snapshot(snapshot_path, key, investigation)
     return investigation
 
 
@@ -3051,6 +3617,58 @@ def process_keygen(protocol_ref, column_group, object_label_index, all_columns,
     return process_key
 
 
+def process_keygen_df(column_group, object_label_index, all_columns, DF):
+    """Columnar version of process_keygen(), computing the process keys of every row of a Protocol REF column group
+    in one go. Returns a Series aligned with DF.index holding, for each row, the key process_keygen() would build.
+    """
+    name_column_hits = [n for n in column_group if n in _LABELS_ASSAY_NODES]
+    if len(name_column_hits) == 1:
+        return DF[name_column_hits[0]]
+
+    protocol_refs = DF[column_group[0]].astype(str)
+    node_cols = [i for i, c in enumerate(all_columns) if c in _LABELS_MATERIAL_NODES + _LABELS_DATA_NODES]
+
+    output_node_index = find_gt(node_cols, object_label_index)
+    if output_node_index > -1:
+        output_node_values = DF[all_columns[output_node_index]].astype(str)
+    else:
+        output_node_values = pd.Series('', index=DF.index)
+
+    input_node_index = find_lt(node_cols, object_label_index)
+    if input_node_index > -1:
+        input_node_values = DF[all_columns[input_node_index]].astype(str)
+    else:
+        input_node_values = pd.Series('', index=DF.index)
+
+    # these only depend on the column group, so are computed once rather than once per row
+    input_nodes_with_prot_keys = DF[[all_columns[object_label_index], all_columns[input_node_index]]].drop_duplicates()
+    output_nodes_with_prot_keys = DF[[all_columns[object_label_index], all_columns[output_node_index]]].drop_duplicates()
+
+    if len(input_nodes_with_prot_keys) > len(output_nodes_with_prot_keys):
+        node_keys = output_node_values
+    else:
+        node_keys = input_node_values
+
+    pv_cols = [c for c in column_group if c.startswith('Parameter Value[')]
+    if len(pv_cols) > 0:
+        pv_values = DF[pv_cols[0]].astype(str)
+        for pv_col in pv_cols[1:]:
+            pv_values = pv_values + '/' + DF[pv_col].astype(str)
+        process_keys = node_keys + ':' + protocol_refs + ':' + pv_values
+    else:
+        process_keys = node_keys + '/' + protocol_refs
+
+    date_col_hits = [c for c in column_group if c.startswith('Date')]
+    if len(date_col_hits) == 1:
+        process_keys = process_keys + ':' + DF[date_col_hits[0]]
+
+    performer_col_hits = [c for c in column_group if c.startswith('Performer')]
+    if len(performer_col_hits) == 1:
+        process_keys = process_keys + ':' + DF[performer_col_hits[0]]
+
+    return process_keys
+
+
 def get_value(object_column, column_group, object_series, ontology_source_map, unit_categories):
 
     cell_value = object_series[object_column]
@@ -3129,19 +3747,32 @@ def pairwise(iterable):
     return zip(a, b)
 
 
+def _read_tfile_fp(tfile_fp, index_col=None):
+    log.debug("Reading file header")
+    reader = csv.reader(tfile_fp, dialect='excel-tab')
+    header = list(next(reader))
+    tfile_fp.seek(0)
+    log.debug("Reading file into DataFrame")
+    tfile_fp = strip_comments(tfile_fp)
+    tfile_df = pd.read_csv(tfile_fp, dtype=str, sep='\t', index_col=index_col,
+                           encoding='utf-8').fillna('')
+    log.debug("Setting isatab_header")
+    tfile_df.isatab_header = header
+    return tfile_df
+
+
 def read_tfile(tfile_path, index_col=None, factor_filter=None):
+    if _table_cache is not None and index_col is None and os.path.abspath(tfile_path) in _table_cache:
+        log.debug("Reusing %s already loaded during validation", tfile_path)
+        cached_df = _table_cache[os.path.abspath(tfile_path)]
+        tfile_df = cached_df.copy()
+        tfile_df.isatab_header = list(cached_df.isatab_header)
+        if factor_filter:
+            return tfile_df[tfile_df['Factor Value[{}]'.format(factor_filter[0])] == factor_filter[1]]
+        return tfile_df
     log.debug("Opening %s", tfile_path)
     with open(tfile_path) as tfile_fp:
-        log.debug("Reading file header")
-        reader = csv.reader(tfile_fp, dialect='excel-tab')
-        header = list(next(reader))
-        tfile_fp.seek(0)
-        log.debug("Reading file into DataFrame")
-        tfile_fp = strip_comments(tfile_fp)
-        tfile_df = pd.read_csv(tfile_fp, dtype=str, sep='\t', index_col=index_col, memory_map=True,
-                               encoding='utf-8').fillna('')
-        log.debug("Setting isatab_header")
-        tfile_df.isatab_header = header
+        tfile_df = _read_tfile_fp(tfile_fp, index_col=index_col)
     if factor_filter:
         log.debug("Filtering DataFrame contents on Factor Value %s", factor_filter)
         return tfile_df[tfile_df['Factor Value[{}]'.format(factor_filter[0])] == factor_filter[1]]
@@ -3356,6 +3987,8 @@ class ProcessSequenceFactory:
                 n = data[lk]
             return n
 
+        process_key_columns = []
+
         for _cg, column_group in enumerate(object_column_map):
             # for each object, parse column group
 
@@ -3460,74 +4093,29 @@ class ProcessSequenceFactory:
 
             elif object_label.startswith('Protocol REF'):
                 object_label_index = list(DF.columns).index(object_label)
+                process_keys = process_keygen_df(column_group, _cg, DF.columns, DF)
+                process_key_columns.append(process_keys)
+                protocol_refs = DF[object_label].astype(str)
+
+                # create each process from the first row it appears in
+                first_rows = ~process_keys.duplicated()
                 if config.show_pbars:
-                    pbar = ProgressBar(min_value=0, max_value=len(DF.index), widgets=['Generating process objects: ',
-                                                                                      SimpleProgress(),
-                                                                                      Bar(left=" |", right="| "),
-                                                                                      ETA()]).start()
+                    pbar = ProgressBar(min_value=0, max_value=int(first_rows.sum()),
+                                       widgets=['Generating process objects: ',
+                                                SimpleProgress(),
+                                                Bar(left=" |", right="| "),
+                                                ETA()]).start()
                 else:
                     pbar = lambda x: x
-                for _, object_series in pbar(DF.iterrows()):  # don't drop duplicates
-                    # if _ == 0:
-                    #     print('processing: ', object_series[object_label])
-                    protocol_ref = str(object_series[object_label])
-                    process_key = process_keygen(protocol_ref, column_group, _cg, DF.columns, object_series, _, DF)
-
-                    # TODO: Keep process key sequence here to reduce number of passes on Protocol REF columns?
-
+                for (_, object_series), process_key, protocol_ref in pbar(zip(DF[first_rows].iterrows(),
+                                                                          process_keys[first_rows],
+                                                                          protocol_refs[first_rows])):
                     try:
                         process = processes[process_key]
                     except KeyError:
                         process = Process(executes_protocol=protocol_ref)
                         processes.update(dict([(process_key, process)]))
 
-                    output_node_index = find_gt(node_cols, object_label_index)
-                    output_proc_index = find_gt(proc_cols, object_label_index)
-
-                    if output_proc_index < output_node_index > -1:
-
-                        output_node_label = DF.columns[output_node_index]
-                        output_node_value = str(object_series[output_node_label])
-
-                        node_key = output_node_value
-
-                        output_node = None
-
-                        try:
-                            output_node = get_node_by_label_and_key(output_node_label, node_key)
-                        except KeyError:
-                            pass  # skip if object not found
-
-                        if output_node is not None and output_node not in process.outputs:
-                            # print(process_key, 'output', output_node_label, node_key)
-                            process.outputs.append(output_node)
-
-                    input_node_index = find_lt(node_cols, object_label_index)
-                    input_proc_index = find_lt(proc_cols, object_label_index)
-
-                    if input_proc_index < input_node_index > -1:
-
-                        input_node_label = DF.columns[input_node_index]
-                        input_node_value = str(object_series[input_node_label])
-
-                        node_key = input_node_value
-
-                        input_node = None
-
-                        try:
-                            input_node = get_node_by_label_and_key(input_node_label, node_key)
-                        except KeyError:
-                            pass  # skip if object not found
-
-                        if input_node is not None and input_node not in process.inputs:
-                            # print(process_key, 'input', input_node_label, node_key)
-                            process.inputs.append(input_node)
-
-                    name_column_hits = [n for n in column_group if n in _LABELS_ASSAY_NODES]
-
-                    if len(name_column_hits) == 1:
-                        process.name = str(object_series[name_column_hits[0]])
-
                     for pv_column in [c for c in column_group if c.startswith('Parameter Value[')]:
 
                         category_key = pv_column[16:-1]
@@ -3560,59 +4148,130 @@ class ProcessSequenceFactory:
                             process.comments.append(Comment(name=comment_column[8:-1],
                                                     value=str(object_series[comment_column])))
 
-        # now go row by row pulling out processes and linking them accordingly
-        if config.show_pbars:
-            pbar = ProgressBar(min_value=0, max_value=len(DF.index), widgets=['Linking processes and other nodes in paths: ',
-                                                                              SimpleProgress(),
-                                                                              Bar(left=" |", right="| "),
-                                                                              ETA()]).start()
-        else:
-            pbar = lambda x: x
-        for _, object_series in pbar(DF.iterrows()):  # don't drop duplicates
-            process_key_sequence = list()
-            source_node_context = None
-            sample_node_context = None
-            for _cg, column_group in enumerate(object_column_map):
-                # for each object, parse column group
-                object_label = column_group[0]
-
-                if object_label.startswith('Source Name'):
-                    try:
-                        source_node_context = get_node_by_label_and_key(object_label, str(object_series[object_label]))
-                    except KeyError:
-                        pass  # skip if object not found
+                # a process takes the name found in the last row it appears in
+                name_column_hits = [n for n in column_group if n in _LABELS_ASSAY_NODES]
 
-                if object_label.startswith('Sample Name'):
-                    try:
-                        sample_node_context = get_node_by_label_and_key(object_label, str(object_series[object_label]))
-                    except KeyError:
-                        pass  # skip if object not found
-                    if source_node_context is not None:
-                        if source_node_context not in sample_node_context.derives_from:
-                            sample_node_context.derives_from.append(source_node_context)
+                if len(name_column_hits) == 1:
+                    last_rows = ~process_keys.duplicated(keep='last')
+                    for process_key, name in zip(process_keys[last_rows], DF.loc[last_rows, name_column_hits[0]]):
+                        processes[process_key].name = str(name)
 
-                if object_label.startswith('Protocol REF'):
-                    protocol_ref = str(object_series[object_label])
-                    process_key = process_keygen(protocol_ref, column_group, _cg, DF.columns, object_series, _, DF)
-                    process_key_sequence.append(process_key)
+                # link each distinct (process, node) pair, in the order the pairs first appear
+                output_node_index = find_gt(node_cols, object_label_index)
+                output_proc_index = find_gt(proc_cols, object_label_index)
 
-                if object_label.endswith(' File'):
-                    data_node = None
-                    try:
-                        data_node = get_node_by_label_and_key(object_label, str(object_series[object_label]))
-                    except KeyError:
-                        pass  # skip if object not found
-                    if sample_node_context is not None and data_node is not None:
-                        if sample_node_context not in data_node.generated_from:
-                            data_node.generated_from.append(sample_node_context)
+                if output_proc_index < output_node_index > -1:
+
+                    output_node_label = DF.columns[output_node_index]
+                    process_output_pairs = pd.DataFrame({
+                        'process_key': process_keys,
+                        'node_key': DF[output_node_label].astype(str)
+                    }).drop_duplicates()
+
+                    for process_key, node_key in process_output_pairs.itertuples(index=False):
 
-            # print('key sequence = ', process_key_sequence)
+                        output_node = None
+
+                        try:
+                            output_node = get_node_by_label_and_key(output_node_label, node_key)
+                        except KeyError:
+                            pass  # skip if object not found
+
+                        process = processes[process_key]
 
-            # Link the processes in each sequence
-            for pair in pairwise(process_key_sequence):
-                l = processes[pair[0]]  # get process on left of pair
-                r = processes[pair[1]]  # get process on right of pair
-                plink(l, r)
+                        if output_node is not None and output_node not in process.outputs:
+                            process.outputs.append(output_node)
+
+                input_node_index = find_lt(node_cols, object_label_index)
+                input_proc_index = find_lt(proc_cols, object_label_index)
+
+                if input_proc_index < input_node_index > -1:
+
+                    input_node_label = DF.columns[input_node_index]
+                    process_input_pairs = pd.DataFrame({
+                        'process_key': process_keys,
+                        'node_key': DF[input_node_label].astype(str)
+                    }).drop_duplicates()
+
+                    for process_key, node_key in process_input_pairs.itertuples(index=False):
+
+                        input_node = None
+
+                        try:
+                            input_node = get_node_by_label_and_key(input_node_label, node_key)
+                        except KeyError:
+                            pass  # skip if object not found
+
+                        process = processes[process_key]
+
+                        if input_node is not None and input_node not in process.inputs:
+                            process.inputs.append(input_node)
+
+        # now link the nodes and processes along each path. Rows sharing the same nodes produce the same links, so
+        # only distinct rows are visited: sample/data derivation links keep the order in which they first appear,
+        # while process links are replayed in the order of their last appearance so the final plink() calls match
+        # those of a full row by row pass.
+        node_link_labels = [column_group[0] for column_group in object_column_map
+                            if column_group[0].startswith('Source Name') or column_group[0].startswith('Sample Name')
+                            or column_group[0].endswith(' File')]
+
+        if len(node_link_labels) > 0:
+            node_link_rows = DF[node_link_labels].astype(str).drop_duplicates()
+            if config.show_pbars:
+                pbar = ProgressBar(min_value=0, max_value=len(node_link_rows.index),
+                                   widgets=['Linking nodes in paths: ',
+                                            SimpleProgress(),
+                                            Bar(left=" |", right="| "),
+                                            ETA()]).start()
+            else:
+                pbar = lambda x: x
+            for node_link_row in pbar(node_link_rows.itertuples(index=False)):
+                source_node_context = None
+                sample_node_context = None
+                for object_label, node_name in zip(node_link_labels, node_link_row):
+
+                    if object_label.startswith('Source Name'):
+                        try:
+                            source_node_context = get_node_by_label_and_key(object_label, node_name)
+                        except KeyError:
+                            pass  # skip if object not found
+
+                    if object_label.startswith('Sample Name'):
+                        try:
+                            sample_node_context = get_node_by_label_and_key(object_label, node_name)
+                        except KeyError:
+                            pass  # skip if object not found
+                        if source_node_context is not None:
+                            if source_node_context not in sample_node_context.derives_from:
+                                sample_node_context.derives_from.append(source_node_context)
+
+                    if object_label.endswith(' File'):
+                        data_node = None
+                        try:
+                            data_node = get_node_by_label_and_key(object_label, node_name)
+                        except KeyError:
+                            pass  # skip if object not found
+                        if sample_node_context is not None and data_node is not None:
+                            if sample_node_context not in data_node.generated_from:
+                                data_node.generated_from.append(sample_node_context)
+
+        if len(process_key_columns) > 1:
+            process_key_sequences = pd.concat(process_key_columns, axis=1, ignore_index=True)\
+                .drop_duplicates(keep='last')
+            if config.show_pbars:
+                pbar = ProgressBar(min_value=0, max_value=len(process_key_sequences.index),
+                                   widgets=['Linking processes in paths: ',
+                                            SimpleProgress(),
+                                            Bar(left=" |", right="| "),
+                                            ETA()]).start()
+            else:
+                pbar = lambda x: x
+            for process_key_sequence in pbar(process_key_sequences.itertuples(index=False)):
+                # Link the processes in each sequence
+                for pair in pairwise(process_key_sequence):
+                    l = processes[pair[0]]  # get process on left of pair
+                    r = processes[pair[1]]  # get process on right of pair
+                    plink(l, r)
 
         return sources, samples, other_material, data, processes, characteristic_categories, unit_categories
 
@@ -325,7 +325,13 @@ def write_sdrf_table_files(i, output_path):
     for study in i.studies:
         for assay in [x for x in study.assays if x.technology_type.term.lower() == "dna microarray"]:
             sdrf_filename = study.filename[2:-3] + assay.filename[2:-3] + "sdrf.txt"
-            log.debug("Writing {}".format(sdrf_filename))
+            n_rows = 0
+            if assay.graph is not None:
+                n_rows = isatab.EndToEndPaths(assay.graph).count(
+                    [x for x in assay.graph.nodes() if isinstance(x, Sample)])
+            if n_rows == 0:
+                raise IOError("Assay {} has no paths from samples to write into SDRF".format(assay.filename))
+            log.debug("Writing {} from {} assay paths".format(sdrf_filename, n_rows))
             try:
                 isatab.merge_study_with_assay_tables(os.path.join(tmp, study.filename),
                                                      os.path.join(tmp, assay.filename),
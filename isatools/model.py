@@ -20,6 +20,73 @@ import warnings
 from isatools.errors import ISAModelAttributeError
 
 
+# Incremented on every change to process sequences, process inputs and outputs,
+# process links or the names that graph nodes are hashed on, so that cached
+# graphs can tell when they are stale.
+_process_graph_version = 0
+
+
+def _process_graph_changed():
+    global _process_graph_version
+    _process_graph_version += 1
+
+
+class _ProcessGraphList(list):
+    """A list of graph members (processes, process inputs or process outputs)
+    that invalidates cached experimental graphs whenever it is modified."""
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        _process_graph_changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        _process_graph_changed()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        _process_graph_changed()
+        return result
+
+    def __imul__(self, other):
+        result = super().__imul__(other)
+        _process_graph_changed()
+        return result
+
+    def append(self, obj):
+        super().append(obj)
+        _process_graph_changed()
+
+    def extend(self, iterable):
+        super().extend(iterable)
+        _process_graph_changed()
+
+    def insert(self, index, obj):
+        super().insert(index, obj)
+        _process_graph_changed()
+
+    def remove(self, obj):
+        super().remove(obj)
+        _process_graph_changed()
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        _process_graph_changed()
+        return result
+
+    def clear(self):
+        super().clear()
+        _process_graph_changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        _process_graph_changed()
+
+    def reverse(self):
+        super().reverse()
+        _process_graph_changed()
+
+
 def _build_assay_graph(process_sequence=list()):
     """:obj:`networkx.DiGraph` Returns a directed graph object based on a
     given ISA process sequence."""
@@ -86,7 +153,7 @@ class Comment(object):
         return 'Comment[{0.name}]\t{0.value}'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.name)
 
     def __eq__(self, other):
         return isinstance(other, Comment) \
@@ -488,7 +555,7 @@ class Investigation(Commentable, MetadataMixin, object):
                'studies={0.studies}, comments={0.comments})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.identifier)
 
     def __eq__(self, other):
         return isinstance(other, Investigation) \
@@ -592,7 +659,7 @@ class OntologySource(Commentable):
                'comments={0.comments})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.name)
 
     def __eq__(self, other):
         return isinstance(other, OntologySource) \
@@ -675,7 +742,7 @@ class OntologyAnnotation(Commentable):
                 .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.term)
 
     def __eq__(self, other):
         return isinstance(other, OntologyAnnotation) \
@@ -790,7 +857,7 @@ class Publication(Commentable):
                'status={0.status}, comments={0.comments})'.format(self)
     
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.title)
     
     def __eq__(self, other):
         return isinstance(other, Publication) \
@@ -979,7 +1046,7 @@ class Person(Commentable):
                'roles={0.roles}, comments={0.comments})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.last_name)
 
     def __eq__(self, other):
         return isinstance(other, Person) \
@@ -1040,9 +1107,12 @@ class StudyAssayMixin(metaclass=abc.ABCMeta):
             self.__units = units
 
         if process_sequence is None:
-            self.__process_sequence = []
+            self.__process_sequence = _ProcessGraphList()
         else:
-            self.__process_sequence = process_sequence
+            self.__process_sequence = _ProcessGraphList(process_sequence)
+
+        self.__graph = None
+        self.__graph_version = None
 
         if characteristic_categories is None:
             self.__characteristic_categories = []
@@ -1387,7 +1457,8 @@ class StudyAssayMixin(metaclass=abc.ABCMeta):
     def process_sequence(self, val):
         if val is not None and hasattr(val, '__iter__'):
             if val == [] or all(isinstance(x, Process) for x in val):
-                self.__process_sequence = list(val)
+                self.__process_sequence = _ProcessGraphList(val)
+                _process_graph_changed()
         else:
             raise ISAModelAttributeError(
                 '{}.process_sequence must be iterable containing Processes'
@@ -1412,9 +1483,17 @@ class StudyAssayMixin(metaclass=abc.ABCMeta):
     @property
     def graph(self):
         """:obj:`networkx.DiGraph` A graph representation of the study's 
-        process sequence"""
+        process sequence. The graph is built on first access and reused until
+        the process sequence, the inputs, outputs or links of a process, or the
+        name of one of its nodes are changed. It is frozen, as it is shared;
+        copy it with networkx.DiGraph(graph) to modify it."""
         if len(self.process_sequence) > 0:
-            return _build_assay_graph(self.process_sequence)
+            if self.__graph is None \
+                    or self.__graph_version != _process_graph_version:
+                self.__graph = nx.freeze(
+                    _build_assay_graph(self.process_sequence))
+                self.__graph_version = _process_graph_version
+            return self.__graph
         else:
             return None
 
@@ -1423,6 +1502,14 @@ class StudyAssayMixin(metaclass=abc.ABCMeta):
         raise ISAModelAttributeError('{}.graph is not settable'
                                      .format(type(self).__name__))
 
+    def __getstate__(self):
+        # the cached graph is only checked against the graph version of
+        # this process, so it is not pickled
+        state = self.__dict__.copy()
+        state['_StudyAssayMixin__graph'] = None
+        state['_StudyAssayMixin__graph_version'] = None
+        return state
+
 
 class Study(Commentable, StudyAssayMixin, MetadataMixin, object):
     """Study is the central unit, containing information on the subject under 
@@ -1640,7 +1727,7 @@ class Study(Commentable, StudyAssayMixin, MetadataMixin, object):
                'comments={0.comments}, units={0.units})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.identifier)
 
     def __eq__(self, other):
         return isinstance(other, Study) \
@@ -1724,7 +1811,7 @@ class StudyFactor(Commentable):
                'comments={0.comments})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.name)
 
     def __eq__(self, other):
         return isinstance(other, StudyFactor) \
@@ -1860,7 +1947,7 @@ class Assay(Commentable, StudyAssayMixin, object):
                'comments={0.comments}, units={0.units})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, Assay) \
@@ -2055,7 +2142,7 @@ class Protocol(Commentable):
                'comments={0.comments})'.format(self)
     
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.name)
 
     def __eq__(self, other):
         return isinstance(other, Protocol) \
@@ -2108,7 +2195,7 @@ class ProtocolParameter(Commentable):
                'comments={0.comments})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.parameter_name)
 
     def __eq__(self, other):
         return isinstance(other, ProtocolParameter) \
@@ -2188,7 +2275,7 @@ class ParameterValue(object):
                'unit={0.unit})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.category)
 
     def __eq__(self, other):
         return isinstance(other, ParameterValue) \
@@ -2254,7 +2341,7 @@ class ProtocolComponent(Commentable):
                .format(self)
     
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.name)
     
     def __eq__(self, other):
         return isinstance(other, ProtocolComponent) \
@@ -2299,6 +2386,7 @@ class Source(Commentable):
                 .format(val, type(val)))
         else:
             self.__name = val
+            _process_graph_changed()  # the name is the hash of graph nodes
 
     @property
     def characteristics(self):
@@ -2335,7 +2423,7 @@ class Source(Commentable):
                'comments={0.comments})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.name)
 
     def __eq__(self, other):
         return isinstance(other, Source) \
@@ -2423,7 +2511,7 @@ class Characteristic(Commentable):
                'unit={0.unit}, comments={0.comments})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.category)
 
     def __eq__(self, other):
         return isinstance(other, Characteristic) \
@@ -2484,6 +2572,7 @@ class Sample(Commentable):
                 .format(val, type(val)))
         else:
             self.__name = val
+            _process_graph_changed()  # the name is the hash of graph nodes
 
     @property
     def factor_values(self):
@@ -2553,7 +2642,7 @@ class Sample(Commentable):
                 .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.name)
 
     def __eq__(self, other):
         return isinstance(other, Sample) \
@@ -2596,6 +2685,7 @@ class Material(Commentable, metaclass=abc.ABCMeta):
                 .format(type(self).__name__, val, type(val)))
         else:
             self.__name = val
+            _process_graph_changed()  # the name is the hash of graph nodes
 
     @property
     def type(self):
@@ -2644,7 +2734,7 @@ class Extract(Material):
                .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.name)
 
     def __eq__(self, other):
         return isinstance(other, Extract) \
@@ -2671,7 +2761,7 @@ class LabeledExtract(Material):
             .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.name)
 
     def __eq__(self, other):
         return isinstance(other, Extract) \
@@ -2750,7 +2840,7 @@ class FactorValue(Commentable):
                'unit={0.unit})'.format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.factor_name)
 
     def __eq__(self, other):
         return isinstance(other, FactorValue) \
@@ -2806,14 +2896,14 @@ class Process(Commentable):
             self.__parameter_values = parameter_values
             
         if inputs is None:
-            self.__inputs = []
+            self.__inputs = _ProcessGraphList()
         else:
-            self.__inputs = inputs
+            self.__inputs = _ProcessGraphList(inputs)
 
         if outputs is None:
-            self.__outputs = []
+            self.__outputs = _ProcessGraphList()
         else:
-            self.__outputs = outputs
+            self.__outputs = _ProcessGraphList(outputs)
 
         self.__prev_process = None
         self.__next_process = None
@@ -2827,6 +2917,7 @@ class Process(Commentable):
     def name(self, val):
         if val is not None and isinstance(val, str):
             self.__name = val
+            _process_graph_changed()
         else:
             raise ISAModelAttributeError('Process.name must be a string')
 
@@ -2898,7 +2989,8 @@ class Process(Commentable):
                     isinstance(x, (Material, Source, Sample, DataFile)) for
                     x in
                     val):
-                self.__inputs = list(val)
+                self.__inputs = _ProcessGraphList(val)
+                _process_graph_changed()
         else:
             raise ISAModelAttributeError(
                 'Process.inputs must be iterable containing objects of types '
@@ -2916,7 +3008,8 @@ class Process(Commentable):
             if val == [] or all(
                     isinstance(x, (Material, Source, Sample, DataFile)) for
                     x in val):
-                self.__outputs = list(val)
+                self.__outputs = _ProcessGraphList(val)
+                _process_graph_changed()
         else:
             raise ISAModelAttributeError(
                 'Process.outputs must be iterable containing objects of types '
@@ -2936,6 +3029,7 @@ class Process(Commentable):
                 'or None; got {0}:{1}'.format(val, type(val)))
         else:
             self.__prev_process = val
+            _process_graph_changed()
 
     @property
     def next_process(self):
@@ -2951,6 +3045,7 @@ class Process(Commentable):
                 'or None; got {0}:{1}'.format(val, type(val)))
         else:
             self.__next_process = val
+            _process_graph_changed()
 
     # def __repr__(self):
     #     return 'Process(name="{0.name}", ' \
@@ -3010,6 +3105,7 @@ class DataFile(Commentable):
                 .format(type(self).__name__, val, type(val)))
         else:
             self.__filename = val
+            _process_graph_changed()  # the filename is the hash of graph nodes
 
     @property
     def label(self):
@@ -3047,7 +3143,7 @@ class DataFile(Commentable):
                .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, DataFile) \
@@ -3074,7 +3170,7 @@ class RawDataFile(DataFile):
                .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, RawDataFile) \
@@ -3100,7 +3196,7 @@ class DerivedDataFile(DataFile):
                .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, DerivedDataFile) \
@@ -3126,7 +3222,7 @@ class RawSpectralDataFile(DataFile):
             .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, RawSpectralDataFile) \
@@ -3152,7 +3248,7 @@ class DerivedArrayDataFile(DataFile):
             .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, DerivedArrayDataFile) \
@@ -3178,7 +3274,7 @@ class ArrayDataFile(DataFile):
             .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, ArrayDataFile) \
@@ -3204,7 +3300,7 @@ class DerivedSpectralDataFile(DataFile):
             .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, DerivedSpectralDataFile) \
@@ -3230,7 +3326,7 @@ class ProteinAssignmentFile(DataFile):
             .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, ProteinAssignmentFile) \
@@ -3256,7 +3352,7 @@ class PeptideAssignmentFile(DataFile):
             .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, PeptideAssignmentFile) \
@@ -3282,7 +3378,7 @@ class DerivedArrayDataMatrixFile(DataFile):
             .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, DerivedArrayDataMatrixFile) \
@@ -3310,7 +3406,7 @@ class PostTranslationalModificationAssignmentFile(DataFile):
             .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, PostTranslationalModificationAssignmentFile) \
@@ -3336,7 +3432,7 @@ class AcquisitionParameterDataFile(DataFile):
                .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, AcquisitionParameterDataFile) \
@@ -3362,7 +3458,7 @@ class FreeInductionDecayDataFile(DataFile):
             .format(self)
 
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.filename)
 
     def __eq__(self, other):
         return isinstance(other, FreeInductionDecayDataFile) \
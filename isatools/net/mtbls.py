@@ -5,14 +5,21 @@ MetaboLights database. If you have problems with it, check that
 it's working at http://www.ebi.ac.uk/metabolights/
 """
 from __future__ import absolute_import
+import copy
 import ftplib
 import glob
+import json
 import logging
 import os
 import pandas as pd
 import tempfile
 import shutil
+import queue
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from isatools import config
 from isatools import isatab
@@ -23,6 +30,9 @@ from isatools.model import OntologyAnnotation
 EBI_FTP_SERVER = 'ftp.ebi.ac.uk'
 MTBLS_BASE_DIR = '/pub/databases/metabolights/studies/public'
 INVESTIGATION_FILENAME = 'i_Investigation.txt'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.isatools', 'mtbls')
+DEFAULT_CACHE_SIZE = 2 ** 30  # bytes
+MIRROR_MANIFEST_FILENAME = 'mirror_manifest.jsonl'
 
 logging.basicConfig(level=config.log_level)
 log = logging.getLogger(__name__)
@@ -57,22 +67,11 @@ def get(mtbls_study_id, target_dir=None):
             with open(os.path.join(target_dir, INVESTIGATION_FILENAME), 'wb') as out_file:
                 logging.info("Retrieving file '{}'".format(EBI_FTP_SERVER + MTBLS_BASE_DIR + '/' + mtbls_study_id + '/' + INVESTIGATION_FILENAME))
                 ftp.retrbinary('RETR ' + INVESTIGATION_FILENAME, out_file.write)
-            with open(out_file.name, encoding='utf-8') as i_fp:
-                i_bytes = i_fp.read()
-                lines = i_bytes.splitlines()
-                s_filenames = [l.split('\t')[1][1:-1] for l in lines if 'Study File Name' in l]
-                for s_filename in s_filenames:
-                    with open(os.path.join(target_dir, s_filename), 'wb') as out_file:
-                        logging.info("Retrieving file '{}'".format(
-                            EBI_FTP_SERVER + MTBLS_BASE_DIR + '/' + mtbls_study_id + '/' + s_filename))
-                        ftp.retrbinary('RETR ' + s_filename, out_file.write)
-                a_filenames_lines = [l.split('\t') for l in lines if 'Study Assay File Name' in l]
-                for a_filename_line in a_filenames_lines:
-                    for a_filename in [f[1:-1] for f in a_filename_line[1:]]:
-                        with open(os.path.join(target_dir, a_filename), 'wb') as out_file:
-                            logging.info("Retrieving file '{}'".format(
-                                EBI_FTP_SERVER + MTBLS_BASE_DIR + '/' + mtbls_study_id + '/' + a_filename))
-                            ftp.retrbinary('RETR ' + a_filename, out_file.write)
+            for table_filename in _table_filenames(out_file.name):
+                with open(os.path.join(target_dir, table_filename), 'wb') as out_file:
+                    logging.info("Retrieving file '{}'".format(
+                        EBI_FTP_SERVER + MTBLS_BASE_DIR + '/' + mtbls_study_id + '/' + table_filename))
+                    ftp.retrbinary('RETR ' + table_filename, out_file.write)
         except ftplib.error_perm as ftperr:
             log.fatal("Could not retrieve MetaboLights study '{study}': {error}".format(study=mtbls_study_id, error=ftperr))
         finally:
@@ -83,6 +82,254 @@ def get(mtbls_study_id, target_dir=None):
         raise ConnectionError("There was a problem connecting to MetaboLights: " + response)
 
 
+def _table_filenames(i_file_path):
+    """Names of the study and assay files listed in an investigation file"""
+    with open(i_file_path, encoding='utf-8') as i_fp:
+        lines = i_fp.read().splitlines()
+    filenames = [l.split('\t')[1].strip('"') for l in lines if 'Study File Name' in l]
+    for a_filename_line in [l.split('\t') for l in lines if 'Study Assay File Name' in l]:
+        filenames.extend(f.strip('"') for f in a_filename_line[1:])
+    return [f for f in filenames if f != '']
+
+
+def _connect(host, port):
+    ftp = ftplib.FTP()
+    ftp.connect(host, port)
+    response = ftp.login()
+    if '230' not in response:  # 230 means Login successful
+        ftp.close()
+        raise ConnectionError("There was a problem connecting to MetaboLights: " + response)
+    return ftp
+
+
+def _remote_stat(ftp, filename):
+    """Size and modification time of a file on the FTP site, None for what the server doesn't report"""
+    try:
+        size = ftp.size(filename)
+    except ftplib.error_perm:
+        size = None
+    try:
+        mtime = ftp.sendcmd('MDTM ' + filename)[4:].strip()
+    except ftplib.error_perm:
+        mtime = None
+    return {'size': size, 'mtime': mtime}
+
+
+def _fetch_file(ftp, study_dir, filename, cached, stats=None):
+    """Downloads a file from the FTP working directory unless the copy in study_dir has the same remote size and
+    modification time as recorded in cached
+
+    :return: Remote size and modification time of the file
+    """
+    stat = _remote_stat(ftp, filename)
+    file_path = os.path.join(study_dir, filename)
+    if cached is not None and (stat['size'], stat['mtime']) != (None, None) \
+            and (cached['size'], cached['mtime']) == (stat['size'], stat['mtime']) and os.path.isfile(file_path):
+        if stats is not None:
+            stats.add(files_skipped=1)
+        return cached
+    log.info("Retrieving file '{}'".format(ftp.pwd() + '/' + filename))
+    try:
+        with open(file_path + '.part', 'wb') as out_file:
+            ftp.retrbinary('RETR ' + filename, out_file.write)
+        os.replace(file_path + '.part', file_path)
+    except BaseException:
+        try:
+            os.remove(file_path + '.part')
+        except FileNotFoundError:
+            pass
+        raise
+    if stats is not None:
+        stats.add(files_downloaded=1, bytes_downloaded=os.path.getsize(file_path))
+    return stat
+
+
+def _sync_study(ftp, base_dir, mtbls_study_id, study_dir, cached, stats=None):
+    """Brings the ISA-Tab files of a study in study_dir up to date with the FTP site
+
+    :param cached: Remote size and modification time of the files already in study_dir, by file name
+    :return: Remote size and modification time of the files of the study, by file name
+    """
+    log.info("Looking for study '{}'".format(mtbls_study_id))
+    ftp.cwd('{base_dir}/{study}'.format(base_dir=base_dir, study=mtbls_study_id))
+    ftp.voidcmd('TYPE I')
+    files = dict()
+    files[INVESTIGATION_FILENAME] = _fetch_file(ftp, study_dir, INVESTIGATION_FILENAME,
+                                                cached.get(INVESTIGATION_FILENAME), stats)
+    for filename in _table_filenames(os.path.join(study_dir, INVESTIGATION_FILENAME)):
+        files[filename] = _fetch_file(ftp, study_dir, filename, cached.get(filename), stats)
+    for filename in set(cached) - set(files):
+        try:
+            os.remove(os.path.join(study_dir, filename))
+        except FileNotFoundError:
+            pass
+    return files
+
+
+class StudyCache(object):
+    """Local cache of the ISA-Tab files of MetaboLights studies.
+
+    Each study is kept in its own directory under cache_dir, next to a manifest recording the remote size and
+    modification time of each of its files. A cached study is checked against the FTP site at most every max_age
+    seconds, and only the files whose remote size or modification time changed are downloaded again. When the cache
+    grows over max_size bytes, the least recently used studies are evicted. In offline mode the FTP site is never
+    contacted and only studies already in the cache can be used.
+
+    Investigations parsed by load() are kept in memory until the files of their study change, so repeated queries on
+    a study are not parsed again. load() returns a copy of the kept Investigation, which the caller may modify.
+
+    Usage:
+
+        mtbls.set_cache(mtbls.StudyCache('/data/mtbls', offline=True))
+        factors = mtbls.get_factor_names('MTBLS1')
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size=DEFAULT_CACHE_SIZE, max_age=300, offline=False,
+                 host=EBI_FTP_SERVER, port=21, base_dir=MTBLS_BASE_DIR):
+        """
+        :param cache_dir: Directory to keep the studies in
+        :param max_size: Size in bytes the cached files may take up, None for no limit
+        :param max_age: Seconds for which a cached study is used without checking the FTP site for changes
+        :param offline: If True, only use studies already in the cache
+        :param host: FTP server to download from
+        :param port: Port of the FTP server
+        :param base_dir: Directory holding the studies on the FTP server
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        self.offline = offline
+        self.host = host
+        self.port = port
+        self.base_dir = base_dir
+        self._investigations = dict()  # study id -> (key of the study's files, Investigation)
+
+    def _manifest_path(self, mtbls_study_id):
+        return os.path.join(self.cache_dir, mtbls_study_id + '.json')
+
+    def study_dir(self, mtbls_study_id):
+        return os.path.join(self.cache_dir, mtbls_study_id)
+
+    def _read_manifest(self, mtbls_study_id):
+        try:
+            with open(self._manifest_path(mtbls_study_id), encoding='utf-8') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, mtbls_study_id, manifest):
+        tmp_path = self._manifest_path(mtbls_study_id) + '.part'
+        with open(tmp_path, 'w', encoding='utf-8') as fp:
+            json.dump(manifest, fp)
+        os.replace(tmp_path, self._manifest_path(mtbls_study_id))
+
+    def _fetch(self, mtbls_study_id, manifest):
+        """Downloads the files of a study that are missing from the cache or changed on the FTP site"""
+        os.makedirs(self.study_dir(mtbls_study_id), exist_ok=True)
+        log.info("Setting up ftp with {}".format(self.host))
+        ftp = _connect(self.host, self.port)
+        try:
+            files = _sync_study(ftp, self.base_dir, mtbls_study_id, self.study_dir(mtbls_study_id),
+                                manifest['files'] if manifest is not None else dict())
+        except ftplib.error_perm as ftperr:
+            raise IOError("Could not retrieve MetaboLights study '{study}': {error}".format(
+                study=mtbls_study_id, error=ftperr))
+        finally:
+            ftp.close()
+        return {'files': files, 'checked': time.time()}
+
+    def _get(self, mtbls_study_id):
+        manifest = self._read_manifest(mtbls_study_id)
+        if manifest is None or (not self.offline and time.time() - manifest['checked'] >= self.max_age):
+            if self.offline:
+                raise IOError("MetaboLights study {} is not in the cache at {} and offline mode is on".format(
+                    mtbls_study_id, self.cache_dir))
+            manifest = self._fetch(mtbls_study_id, manifest)
+        manifest['accessed'] = time.time()
+        self._write_manifest(mtbls_study_id, manifest)
+        self._evict(mtbls_study_id)
+        return manifest
+
+    def get(self, mtbls_study_id):
+        """Returns the directory holding the ISA-Tab files of a study, downloading the ones missing or out of date
+
+        :param mtbls_study_id: Study identifier for MetaboLights study to get, as a str (e.g. MTBLS1)
+        :return: Path of the study directory in the cache, which must not be modified
+        """
+        self._get(mtbls_study_id)
+        return self.study_dir(mtbls_study_id)
+
+    def load(self, mtbls_study_id):
+        """Returns the Investigation of a study, parsing it again only if its files changed
+
+        :param mtbls_study_id: Study identifier for MetaboLights study to get, as a str (e.g. MTBLS1)
+        :return: Investigation object, a copy of the one kept in memory
+        """
+        return copy.deepcopy(self._load_shared(mtbls_study_id))
+
+    def _load_shared(self, mtbls_study_id):
+        """Returns the Investigation of a study kept in memory, which must not be modified"""
+        key = json.dumps(self._get(mtbls_study_id)['files'], sort_keys=True)
+        cached = self._investigations.get(mtbls_study_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with open(os.path.join(self.study_dir(mtbls_study_id), INVESTIGATION_FILENAME), encoding='utf-8') as fp:
+            investigation = isatab.load(fp)
+        self._investigations[mtbls_study_id] = (key, investigation)
+        return investigation
+
+    def remove(self, mtbls_study_id):
+        """Removes a study from the cache"""
+        self._investigations.pop(mtbls_study_id, None)
+        shutil.rmtree(self.study_dir(mtbls_study_id), ignore_errors=True)
+        try:
+            os.remove(self._manifest_path(mtbls_study_id))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep):
+        """Removes the least recently used studies but keep until the cache fits in max_size"""
+        if self.max_size is None:
+            return
+        studies = list()
+        total_size = 0
+        for manifest_path in glob.iglob(os.path.join(self.cache_dir, '*.json')):
+            mtbls_study_id = os.path.basename(manifest_path)[:-5]
+            manifest = self._read_manifest(mtbls_study_id)
+            size = 0
+            for filename in (manifest or dict()).get('files', dict()):
+                try:
+                    size += os.path.getsize(os.path.join(self.study_dir(mtbls_study_id), filename))
+                except OSError:
+                    pass
+            studies.append(((manifest or dict()).get('accessed', 0), mtbls_study_id, size))
+            total_size += size
+        for _, mtbls_study_id, size in sorted(studies):
+            if total_size <= self.max_size:
+                break
+            if mtbls_study_id != keep:
+                log.info("Evicting study {} from the cache".format(mtbls_study_id))
+                self.remove(mtbls_study_id)
+                total_size -= size
+
+
+_cache = None
+
+
+def get_cache():
+    """Returns the StudyCache used by the functions of this module, creating the default one on first use"""
+    global _cache
+    if _cache is None:
+        _cache = StudyCache()
+    return _cache
+
+
+def set_cache(cache):
+    """Sets the StudyCache used by the functions of this module"""
+    global _cache
+    _cache = cache
+
+
 def getj(mtbls_study_id):
     """
     This function downloads the specified MetaboLights study and returns an ISA JSON representation of it
@@ -93,24 +340,15 @@ def getj(mtbls_study_id):
     Example usage:
         isa_json = MTBLS.load('MTBLS1')
     """
-    tmp_dir = get(mtbls_study_id)
-    if tmp_dir is None:
-        raise IOError("There was a problem retrieving the study ", mtbls_study_id)
-    isa_json = isatab2json.convert(tmp_dir, identifier_type=isatab2json.IdentifierType.name,
+    study_dir = get_cache().get(mtbls_study_id)
+    isa_json = isatab2json.convert(study_dir, identifier_type=isatab2json.IdentifierType.name,
                                    validate_first=False,
                                    use_new_parser=True)
-    shutil.rmtree(tmp_dir)
     return isa_json
 
 
 def get_data_files(mtbls_study_id, factor_selection=None):
-    tmp_dir = get(mtbls_study_id)
-    if tmp_dir is None:
-        raise IOError("There was a problem retrieving study {}. Does it exist?".format(mtbls_study_id))
-    else:
-        result = slice_data_files(tmp_dir, factor_selection=factor_selection)
-    shutil.rmtree(tmp_dir)
-    return result
+    return slice_data_files(get_cache().get(mtbls_study_id), factor_selection=factor_selection)
 
 
 def slice_data_files(dir, factor_selection=None):
@@ -141,7 +379,7 @@ def slice_data_files(dir, factor_selection=None):
     """
     results = list()
     # first collect matching samples
-    for table_file in glob.iglob(os.path.join(dir, '[a|s]_*')):
+    for table_file in glob.iglob(os.path.join(dir, '[as]_*.txt')):
         log.info("Loading {}".format(table_file))
         with open(table_file, encoding='utf-8') as fp:
             df = isatab.load_table(fp)
@@ -177,7 +415,7 @@ def slice_data_files(dir, factor_selection=None):
     # now collect the data files relating to the samples
     for result in results:
         sample_name = result['sample']
-        for table_file in glob.iglob(os.path.join(dir, 'a_*')):
+        for table_file in glob.iglob(os.path.join(dir, 'a_*.txt')):
             with open(table_file, encoding='utf-8') as fp:
                 df = isatab.load_table(fp)
                 data_files = list()
@@ -201,10 +439,10 @@ def get_factor_names(mtbls_study_id):
     Example usage:
         factor_names = get_factor_names('MTBLS1')
     """
-    tmp_dir = get(mtbls_study_id)
+    study_dir = get_cache().get(mtbls_study_id)
     factors = set()
-    for table_file in glob.iglob(os.path.join(tmp_dir, '[a|s]_*')):
-        with open(os.path.join(tmp_dir, table_file), encoding='utf-8') as fp:
+    for table_file in glob.iglob(os.path.join(study_dir, '[as]_*.txt')):
+        with open(os.path.join(study_dir, table_file), encoding='utf-8') as fp:
             df = isatab.load_table(fp)
             factors_headers = [header for header in list(df.columns.values) if _RX_FACTOR_VALUE.match(header)]
             for header in factors_headers:
@@ -223,10 +461,10 @@ def get_factor_values(mtbls_study_id, factor_name):
     Example usage:
         factor_values = get_factor_values('MTBLS1', 'genotype')
     """
-    tmp_dir = get(mtbls_study_id)
+    study_dir = get_cache().get(mtbls_study_id)
     fvs = set()
-    for table_file in glob.iglob(os.path.join(tmp_dir, '[a|s]_*')):
-        with open(os.path.join(tmp_dir, table_file), encoding='utf-8') as fp:
+    for table_file in glob.iglob(os.path.join(study_dir, '[as]_*.txt')):
+        with open(os.path.join(study_dir, table_file), encoding='utf-8') as fp:
             df = isatab.load_table(fp)
             if 'Factor Value[{}]'.format(factor_name) in list(df.columns.values):
                 for _, match in df['Factor Value[{}]'.format(factor_name)].iteritems():
@@ -237,18 +475,23 @@ def get_factor_values(mtbls_study_id, factor_name):
                     if isinstance(match, (str, int, float)):
                         if str(match) != 'nan':
                             fvs.add(match)
-    shutil.rmtree(tmp_dir)
     return fvs
 
 
 def load(mtbls_study_id):
-    tmp_dir = get(mtbls_study_id)
-    if tmp_dir is None:
-        raise IOError("There was a problem retrieving the study ", mtbls_study_id)
-    with open(glob.glob(os.path.join(tmp_dir, 'i_*.txt'))[0], encoding='utf-8') as f:
-        ISA = isatab.load(f)
-        shutil.rmtree(tmp_dir)
-        return ISA
+    """
+    This function gets the Investigation of a MetaboLights study from the cache, see StudyCache.load()
+
+    :param mtbls_study_id: Accession number of the MetaboLights study
+    :return: Investigation object
+    """
+    return get_cache().load(mtbls_study_id)
+
+
+def _load_shared(mtbls_study_id):
+    """Returns the Investigation of a MetaboLights study kept in memory by the cache, for the summary functions below
+    that only read it"""
+    return get_cache()._load_shared(mtbls_study_id)
 
 
 def get_factors_summary(mtbls_study_id):
@@ -277,7 +520,7 @@ def get_factors_summary(mtbls_study_id):
 
 
     """
-    ISA = load(mtbls_study_id=mtbls_study_id)
+    ISA = _load_shared(mtbls_study_id=mtbls_study_id)
     all_samples = []
     for study in ISA.studies:
         all_samples.extend(study.samples)
@@ -319,7 +562,7 @@ def get_study_groups_samples_sizes(mtbls_study_id):
 
 
 def get_sources_for_sample(mtbls_study_id, sample_name):
-    ISA = load(mtbls_study_id=mtbls_study_id)
+    ISA = _load_shared(mtbls_study_id=mtbls_study_id)
     hits = []
     for study in ISA.studies:
         for sample in study.samples:
@@ -331,7 +574,7 @@ def get_sources_for_sample(mtbls_study_id, sample_name):
 
 
 def get_data_for_sample(mtbls_study_id, sample_name):
-    ISA = load(mtbls_study_id=mtbls_study_id)
+    ISA = _load_shared(mtbls_study_id=mtbls_study_id)
     hits = []
     for study in ISA.studies:
         for assay in study.assays:
@@ -370,7 +613,7 @@ def get_characteristics_summary(mtbls_study_id):
 
 
         """
-    ISA = load(mtbls_study_id=mtbls_study_id)
+    ISA = _load_shared(mtbls_study_id=mtbls_study_id)
     all_samples = []
     for study in ISA.studies:
         all_samples.extend(study.samples)
@@ -405,7 +648,7 @@ def get_characteristics_summary(mtbls_study_id):
 #         Note: it only returns a summary of parameter values with variable values.
 #
 #         """
-#     ISA = load(mtbls_study_id=mtbls_study_id)
+#     ISA = _load_shared(mtbls_study_id=mtbls_study_id)
 #     all_samples = []
 #     for study in ISA.studies:
 #         all_samples.extend(study.samples)
@@ -446,7 +689,7 @@ def get_characteristics_summary(mtbls_study_id):
 
 
 def get_study_variable_summary(mtbls_study_id):
-    ISA = load(mtbls_study_id=mtbls_study_id)
+    ISA = _load_shared(mtbls_study_id=mtbls_study_id)
     all_samples = []
     for study in ISA.studies:
         all_samples.extend(study.samples)
@@ -503,11 +746,9 @@ def get_study_variable_summary(mtbls_study_id):
 
 def get_study_group_factors(mtbls_study_id):
     factors_list = []
-    tmp_dir = get(mtbls_study_id)
-    if tmp_dir is None:
-        raise FileNotFoundError("Could not download {}".format(mtbls_study_id))
-    for table_file in glob.iglob(os.path.join(tmp_dir, '[a|s]_*')):
-        with open(os.path.join(tmp_dir, table_file), encoding='utf-8') as fp:
+    study_dir = get_cache().get(mtbls_study_id)
+    for table_file in glob.iglob(os.path.join(study_dir, '[as]_*.txt')):
+        with open(os.path.join(study_dir, table_file), encoding='utf-8') as fp:
             df = isatab.load_table(fp)
             factor_columns = [x for x in df.columns if x.startswith("Factor Value")]
             if len(factor_columns) > 0:
@@ -528,9 +769,9 @@ def get_filtered_df_on_factors_list(mtbls_study_id):
                 query_str.append("{0} == '{1}' and ".format(k, v))
         query_str = ''.join(query_str)[:-4]
         queries.append(query_str)
-    tmp_dir = get(mtbls_study_id)
-    for table_file in glob.iglob(os.path.join(tmp_dir, '[a|s]_*')):
-        with open(os.path.join(tmp_dir, table_file), encoding='utf-8') as fp:
+    study_dir = get_cache().get(mtbls_study_id)
+    for table_file in glob.iglob(os.path.join(study_dir, '[as]_*.txt')):
+        with open(os.path.join(study_dir, table_file), encoding='utf-8') as fp:
             df = isatab.load_table(fp)
             cols = df.columns
             cols = cols.map(lambda x: x.replace(' ', '_') if isinstance(x, str) else x)
@@ -573,12 +814,193 @@ def get_mtbls_list():
     return mtbls_list
 
 
-def dl_all_mtbls_isatab(target_dir):
-    download_count = 0
-    for i, mtblsid in enumerate(get_mtbls_list()):
-        target_mtbls_subdir = os.path.join(target_dir, mtblsid)
-        if not os.path.exists(target_mtbls_subdir):
-            os.makedirs(target_mtbls_subdir)
-        get(mtblsid, target_mtbls_subdir)
-        download_count = i
-    print("Downloaded {} ISA-Tab studies from MetaboLights".format(download_count))
\ No newline at end of file
+class MirrorStats(object):
+    """Counts of what a mirror run did, updated by the threads syncing the studies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.studies_synced = 0
+        self.studies_resumed = 0
+        self.files_downloaded = 0
+        self.files_skipped = 0
+        self.bytes_downloaded = 0
+        self.failed = list()
+        self.elapsed = 0.0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    @property
+    def throughput(self):
+        """Bytes downloaded per second"""
+        return self.bytes_downloaded / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return "{0.studies_synced} studies synced, {0.studies_resumed} already synced, {1} failed; " \
+               "{0.files_downloaded} files downloaded ({2:.1f} MiB at {3:.2f} MiB/s), {0.files_skipped} unchanged; " \
+               "{0.elapsed:.1f}s".format(self, len(self.failed), self.bytes_downloaded / 2 ** 20,
+                                         self.throughput / 2 ** 20)
+
+
+class _FTPPool(object):
+    """At most size logged in FTP sessions, handed out one at a time and kept open between uses"""
+
+    def __init__(self, host, port, size):
+        self.host = host
+        self.port = port
+        self._semaphore = threading.BoundedSemaphore(size)
+        self._sessions = queue.LifoQueue()
+
+    @contextmanager
+    def session(self):
+        with self._semaphore:
+            try:
+                ftp = self._sessions.get_nowait()
+            except queue.Empty:
+                log.info("Setting up ftp with {}".format(self.host))
+                ftp = _connect(self.host, self.port)
+            try:
+                yield ftp
+            except ftplib.error_perm:
+                self._sessions.put(ftp)  # the server refused a command, the session itself is fine
+                raise
+            except BaseException:
+                ftp.close()
+                raise
+            self._sessions.put(ftp)
+
+    def close(self):
+        while True:
+            try:
+                ftp = self._sessions.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                ftp.quit()
+            except ftplib.all_errors:
+                ftp.close()
+
+
+def _read_mirror_manifest(manifest_path):
+    """Replays the journal of the mirror runs in a directory
+
+    :return: Remote size and modification time of the files of each mirrored study, by study and file name, and
+    the set of studies synced by the last run if it was interrupted, otherwise an empty set
+    """
+    studies = dict()
+    resumed = set()
+    try:
+        with open(manifest_path, encoding='utf-8') as fp:
+            for line in fp:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # the last line of an interrupted run may have been cut short
+                if entry.get('run') == 'started':
+                    resumed = set()
+                elif entry.get('run') == 'finished':
+                    resumed = set()
+                elif 'study' in entry:
+                    studies[entry['study']] = entry['files']
+                    resumed.add(entry['study'])
+    except FileNotFoundError:
+        pass
+    return studies, resumed
+
+
+def mirror(target_dir, n_connections=4, host=EBI_FTP_SERVER, port=21, base_dir=MTBLS_BASE_DIR, studies=None):
+    """
+    This function mirrors the ISA-Tab files of MetaboLights studies into a directory, one subdirectory per study.
+
+    Studies are synced concurrently over a pool of FTP sessions that stay logged in between studies, and only the
+    files whose remote size or modification time changed since the last run are downloaded. Each synced study is
+    recorded in a journal in target_dir, so a run that was interrupted resumes where it stopped.
+
+    :param target_dir: Path to mirror the studies to
+    :param n_connections: Number of FTP sessions, and so of studies synced at the same time
+    :param host: FTP server to download from
+    :param port: Port of the FTP server
+    :param base_dir: Directory holding the studies on the FTP server
+    :param studies: List of study identifiers to mirror, all the studies on the FTP server if None
+    :return: MirrorStats of the run
+
+    Example usage:
+        stats = mirror('/data/mtbls', n_connections=8)
+    """
+    if n_connections < 1:
+        raise ValueError("n_connections must be at least 1, got {}".format(n_connections))
+    start = time.monotonic()
+    os.makedirs(target_dir, exist_ok=True)
+    manifest_path = os.path.join(target_dir, MIRROR_MANIFEST_FILENAME)
+    mirrored, resumed = _read_mirror_manifest(manifest_path)
+    if resumed:
+        log.info("Resuming interrupted run, {} studies already synced".format(len(resumed)))
+    else:
+        # start a new run from a compacted journal
+        with open(manifest_path + '.part', 'w', encoding='utf-8') as fp:
+            for mtbls_study_id, files in sorted(mirrored.items()):
+                fp.write(json.dumps({'study': mtbls_study_id, 'files': files}) + '\n')
+            fp.write(json.dumps({'run': 'started'}) + '\n')
+        os.replace(manifest_path + '.part', manifest_path)
+    stats = MirrorStats()
+    pool = _FTPPool(host, port, n_connections)
+    lock = threading.Lock()
+
+    def sync(journal, mtbls_study_id):
+        if mtbls_study_id in resumed:
+            stats.add(studies_resumed=1)
+            return
+        study_dir = os.path.join(target_dir, mtbls_study_id)
+        os.makedirs(study_dir, exist_ok=True)
+        for attempt in range(2):
+            try:
+                with pool.session() as ftp:
+                    files = _sync_study(ftp, base_dir, mtbls_study_id, study_dir,
+                                        mirrored.get(mtbls_study_id, dict()), stats)
+                break
+            except ftplib.error_perm as ftperr:
+                log.error("Could not retrieve MetaboLights study '{study}': {error}".format(
+                    study=mtbls_study_id, error=ftperr))
+                stats.add(failed=[mtbls_study_id])
+                return
+            except ftplib.all_errors as e:
+                # a session may have been dropped by the server while idle, retry once on a new one
+                if attempt == 1:
+                    log.error("Could not retrieve MetaboLights study '{study}': {error}".format(
+                        study=mtbls_study_id, error=e))
+                    stats.add(failed=[mtbls_study_id])
+                    return
+        with lock:
+            journal.write(json.dumps({'study': mtbls_study_id, 'files': files}) + '\n')
+            journal.flush()
+        stats.add(studies_synced=1)
+
+    try:
+        if studies is None:
+            with pool.session() as ftp:
+                studies = [os.path.basename(x) for x in ftp.nlst(base_dir)]
+        with open(manifest_path, 'a', encoding='utf-8') as journal:
+            with ThreadPoolExecutor(max_workers=n_connections) as executor:
+                for _ in executor.map(lambda x: sync(journal, x), studies):
+                    pass
+            journal.write(json.dumps({'run': 'finished'}) + '\n')
+    finally:
+        pool.close()
+        stats.elapsed = time.monotonic() - start
+    log.info("Mirrored MetaboLights to {}: {}".format(target_dir, stats))
+    return stats
+
+
+def dl_all_mtbls_isatab(target_dir, n_connections=4):
+    """
+    This function downloads the ISA-Tab files of all the MetaboLights studies, see mirror()
+
+    :param target_dir: Path to mirror the studies to
+    :param n_connections: Number of FTP sessions, and so of studies downloaded at the same time
+    :return: MirrorStats of the run
+    """
+    stats = mirror(target_dir, n_connections=n_connections)
+    print("Downloaded {} ISA-Tab studies from MetaboLights ({})".format(stats.studies_synced, stats))
+    return stats
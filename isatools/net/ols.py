@@ -7,76 +7,222 @@ http://www.ebi.ac.uk/ols/
 from __future__ import absolute_import
 import json
 import logging
-from urllib.request import urlopen
-from urllib.parse import urlencode
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
 
 from isatools import config
 from isatools.model import OntologySource, OntologyAnnotation
 
 OLS_API_BASE_URI = "http://www.ebi.ac.uk/ols/api"
 OLS_PAGINATION_SIZE = 500
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.isatools', 'ols_cache.jsonl')
 
 logging.basicConfig(level=config.log_level)
 log = logging.getLogger(__name__)
 
 
+class OLSClient(object):
+    """Client of the OLS API keeping the ontologies and term searches it looked up in a cache.
+
+    Requests go through a single HTTP session whose pool holds at most max_connections connections, which are kept
+    alive between requests. Ontology metadata and search results are cached in memory and in a JSON lines file at
+    cache_path, one line being appended per lookup, and are looked up again once older than max_age seconds.
+    search_many() resolves many terms with at most max_connections requests in flight.
+
+    Usage:
+
+        ols.set_client(ols.OLSClient(max_age=7 * 24 * 3600))
+        annotations = ols.search_ols_terms(['cell type', 'organism part'], 'efo')
+    """
+
+    def __init__(self, base_uri=OLS_API_BASE_URI, cache_path=DEFAULT_CACHE_PATH, max_age=24 * 3600,
+                 max_connections=8, timeout=60):
+        """
+        :param base_uri: Base URI of the OLS API
+        :param cache_path: Path of the cache file, or None to only cache in memory
+        :param max_age: Seconds for which a cached lookup is used
+        :param max_connections: Number of connections to OLS, and of requests in flight in search_many()
+        :param timeout: Seconds to wait for OLS to respond
+        """
+        self.base_uri = base_uri
+        self.cache_path = cache_path
+        self.max_age = max_age
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self._entries = self._read_cache()  # cache key -> {'time': ..., 'value': ...}
+
+    def _read_cache(self):
+        """Returns the unexpired entries of the cache file, rewriting it without the stale lines if it has any"""
+        entries = dict()
+        if self.cache_path is None:
+            return entries
+        n_lines = 0
+        try:
+            with open(self.cache_path, encoding='utf-8') as fp:
+                for line in fp:
+                    n_lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # line cut short by an interrupted write
+                    entries[entry['key']] = entry
+        except FileNotFoundError:
+            return entries
+        except OSError as e:
+            log.warning("Ignoring unreadable OLS cache %s: %s", self.cache_path, e)
+            return entries
+        now = time.time()
+        entries = dict((key, entry) for key, entry in entries.items() if now - entry['time'] < self.max_age)
+        if len(entries) < n_lines:
+            tmp_path = self.cache_path + '.part'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as fp:
+                    for entry in entries.values():
+                        fp.write(json.dumps(entry) + '\n')
+                os.replace(tmp_path, self.cache_path)
+            except OSError as e:
+                log.warning("Could not compact OLS cache %s: %s", self.cache_path, e)
+        return entries
+
+    def _cached(self, key, lookup):
+        """Returns the cached value of key, calling lookup() to get it if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and time.time() - entry['time'] < self.max_age:
+            return entry['value']
+        entry = {'key': key, 'time': time.time(), 'value': lookup()}
+        with self._lock:
+            self._entries[key] = entry
+            if self.cache_path is not None:
+                try:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+                    with open(self.cache_path, 'a', encoding='utf-8') as fp:
+                        fp.write(json.dumps(entry) + '\n')
+                except OSError as e:
+                    log.warning("Could not write OLS cache %s: %s", self.cache_path, e)
+        return entry['value']
+
+    def _get_json(self, path, params=None):
+        """Returns the JSON response of OLS to a GET request, or None if the resource is not found"""
+        url = self.base_uri + path
+        log.debug("%s %s", url, params)
+        response = self._session.get(url, params=params, timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _ontology_record(ontology_source_json):
+        return {
+            'name': ontology_source_json["ontologyId"],
+            'version': ontology_source_json["config"]["version"],
+            'description': ontology_source_json["config"]["title"],
+            'href': ontology_source_json['_links']['self']['href']
+        }
+
+    def get_ontologies(self):
+        """Returns the OntologySource of each ontology in OLS"""
+        def lookup():
+            J = self._get_json("/ontologies", params={'size': OLS_PAGINATION_SIZE})
+            return [self._ontology_record(ontology_source_json)
+                    for ontology_source_json in J["_embedded"]["ontologies"]]
+
+        return [OntologySource(name=record['name'], version=record['version'], description=record['description'],
+                               file={'href': record['href']})
+                for record in self._cached('ontologies', lookup)]
+
+    def get_ontology(self, ontology_name):
+        """Returns the OntologySource of an ontology in OLS, or None if OLS does not have it"""
+        def lookup():
+            J = self._get_json("/ontologies/{}".format(ontology_name))
+            return self._ontology_record(J) if J is not None else None
+
+        record = self._cached('ontology:{}'.format(ontology_name), lookup)
+        if record is None or record['name'] != ontology_name:
+            return None
+        return OntologySource(name=record['name'], version=record['version'], description=record['description'],
+                              file=record['href'])
+
+    def search(self, term, ontology_source):
+        """Returns the OntologyAnnotation of each term labelled term in ontology_source, given as an OntologySource or
+        the name of the ontology"""
+        if isinstance(ontology_source, str):
+            os_search = ontology_source
+        elif isinstance(ontology_source, OntologySource):
+            os_search = ontology_source.name
+        else:
+            os_search = None
+
+        def lookup():
+            J = self._get_json("/search", params=[
+                ('q', term), ('queryFields', 'label'), ('ontology', os_search), ('exact', 'True')])
+            return [(search_result_json["label"], search_result_json["iri"])
+                    for search_result_json in J["response"]["docs"]]
+
+        return [OntologyAnnotation(
+                    term=label, term_accession=iri,
+                    term_source=ontology_source if isinstance(ontology_source, OntologySource) else None)
+                for label, iri in self._cached('search:{}:{}'.format(os_search, term), lookup)]
+
+    def search_many(self, terms, ontology_source):
+        """Searches each of terms in ontology_source, concurrently
+
+        :param terms: Iterable of the term strings to search
+        :param ontology_source: OntologySource or name of the ontology to search in
+        :return: dict of the lists of OntologyAnnotation found, keyed by term
+        """
+        terms = list(dict.fromkeys(terms))
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            results = executor.map(lambda x: self.search(x, ontology_source), terms)
+            return dict(zip(terms, results))
+
+    def close(self):
+        """Closes the connections to OLS"""
+        self._session.close()
+
+
+_client = None
+
+
+def get_client():
+    """Returns the OLSClient used by the functions of this module, creating the default one on first use"""
+    global _client
+    if _client is None:
+        _client = OLSClient()
+    return _client
+
+
+def set_client(client):
+    """Sets the OLSClient used by the functions of this module"""
+    global _client
+    _client = client
+
+
 def get_ols_ontologies():
     """Returns a list of OntologySource objects according to what's in OLS"""
-    ontologiesUri = OLS_API_BASE_URI + "/ontologies?size=" + str(OLS_PAGINATION_SIZE)
-    log.debug(ontologiesUri)
-    J = json.loads(urlopen(ontologiesUri).read().decode("utf-8"))
-    ontology_sources = []
-    for ontology_source_json in J["_embedded"]["ontologies"]:
-        ontology_sources.append(OntologySource(
-            name=ontology_source_json["ontologyId"],
-            version=ontology_source_json["config"]["version"],
-            description=ontology_source_json["config"]["title"],
-            file=ontology_source_json['_links']['self']
-        ))
-    return ontology_sources
+    return get_client().get_ontologies()
 
 
 def get_ols_ontology(ontology_name):
     """Returns a single OntologySource objects according to what's in OLS"""
-    ontologiesUri = OLS_API_BASE_URI + "/ontologies?size=" + str(OLS_PAGINATION_SIZE)
-    log.debug(ontologiesUri)
-    J = json.loads(urlopen(ontologiesUri).read().decode("utf-8"))
-    ontology_sources = []
-    for ontology_source_json in J["_embedded"]["ontologies"]:
-        ontology_sources.append(OntologySource(
-            name=ontology_source_json["ontologyId"],
-            version=ontology_source_json["config"]["version"],
-            description=ontology_source_json["config"]["title"],
-            file=ontology_source_json['_links']['self']['href']
-        ))
-    hits = [o for o in ontology_sources if o.name == ontology_name]
-    if len(hits) == 1:
-        return hits[0]
-    else:
-        return None
+    return get_client().get_ontology(ontology_name)
 
 
 def search_ols(term, ontology_source):
     """Returns a list of OntologyAnnotation objects according to what's returned by OLS search"""
-    url = OLS_API_BASE_URI + "/search"
-    if isinstance(ontology_source, str):
-        os_search = ontology_source
-    elif isinstance(ontology_source, OntologySource):
-        os_search = ontology_source.name
-    else:
-        os_search = None
-    query = "{0}&queryFields=label&ontology={1}&exact=True".format(term, os_search)
-    url += '?q={}'.format(query)
-    log.debug(url)
-    import requests
-    req = requests.get(url)
-    J = json.loads(req.text)
-    ontology_annotations = []
-    for search_result_json in J["response"]["docs"]:
-        ontology_annotations.append(
-            OntologyAnnotation(
-                term=search_result_json["label"],
-                term_accession=search_result_json["iri"],
-                term_source=ontology_source if isinstance(ontology_source, OntologySource) else None
-            ))
-    return ontology_annotations
+    return get_client().search(term, ontology_source)
+
+
+def search_ols_terms(terms, ontology_source):
+    """Returns a dict of the lists of OntologyAnnotation objects returned by OLS search for each of terms"""
+    return get_client().search_many(terms, ontology_source)
@@ -1,16 +1,16 @@
 """Functions for reading and writing SRA-XML."""
 import datetime
-import hashlib
 import html
 import iso8601
 import jinja2
 import logging
 import os
 import xml.dom.minidom
-from functools import partial
 from lxml import etree
 
 from isatools import config
+from isatools.checksums import DEFAULT_CACHE_PATH
+from isatools.checksums import compute_checksums
 from isatools.model import DataFile
 from isatools.model import OntologyAnnotation
 from isatools.model import Sample
@@ -32,6 +32,40 @@ sra_submission_action = 'ADD'
 sra_center_prj_name = None
 
 
+class StudyLineageIndex(object):
+    """The process producing each sample of a study, collected once per study so the source of every run is found
+    without scanning the study process sequence"""
+
+    def __init__(self, study):
+        self.process_by_sample = dict()  # first study process outputting each Sample
+        for process in study.process_sequence:
+            for output in process.outputs:
+                if isinstance(output, Sample):
+                    self.process_by_sample.setdefault(output, process)
+
+    def source_of(self, sample):
+        """Returns the single input of the study process that produced sample, or None"""
+        process = self.process_by_sample.get(sample)
+        if process is not None and len(process.inputs) == 1:
+            return process.inputs[0]
+        return None
+
+    @staticmethod
+    def lineage(process):
+        """Returns the first Sample found in the inputs of process and its previous processes, and the processes of
+        the chain other than its first one, by protocol type, the furthest upstream of each type taking precedence"""
+        sample = None
+        processes_by_type = dict()
+        curr_process = process
+        while curr_process is not None:
+            if sample is None:
+                sample = next((m for m in curr_process.inputs if isinstance(m, Sample)), None)
+            if curr_process.prev_process is not None:
+                processes_by_type[curr_process.executes_protocol.protocol_type.term] = curr_process
+            curr_process = curr_process.prev_process
+        return sample, processes_by_type
+
+
 def export(investigation, export_path, sra_settings=None, datafilehashes=None):
 
     def get_comment(assay, name):
@@ -44,15 +78,6 @@ def export(investigation, export_path, sra_settings=None, datafilehashes=None):
         else:
             return hits[0]
 
-    def get_sample(process):
-        materials = process.inputs
-        sample = None
-        for material in materials:
-            if isinstance(material, Sample):
-                sample = material
-                break
-        return sample
-
     def get_pv(process, name):
         hits = [pv for pv in process.parameter_values if
                 pv.category.parameter_name.term.lower().replace('_', ' ')
@@ -146,6 +171,7 @@ def export(investigation, export_path, sra_settings=None, datafilehashes=None):
         xproj = xproj_template.render(
             study=istudy, sra_center_name=sra_center_name)
 
+        lineage_index = StudyLineageIndex(istudy)
         assays_to_export = list()
         for iassay in istudy.assays:
             if (iassay.measurement_type.term, iassay.technology_type.term) in \
@@ -165,11 +191,12 @@ def export(investigation, export_path, sra_settings=None, datafilehashes=None):
                         log.debug('NO EXPORT COMMENT FOUND')
                     log.debug('Perform export? '.format(str(do_export)))
                     if do_export:
-                        sample = None
-                        curr_process = assay_seq_process
-                        while sample is None:
-                            sample = get_sample(curr_process)
-                            curr_process = curr_process.prev_process
+                        sample, processes_by_type = lineage_index.lineage(
+                            assay_seq_process)
+                        if sample is None:
+                            raise AttributeError(
+                                "No sample found upstream of process "
+                                "'{}'".format(assay_seq_process.name))
                         assay_to_export = \
                             {
                                 'sample': sample,
@@ -199,12 +226,7 @@ def export(investigation, export_path, sra_settings=None, datafilehashes=None):
                             'filetype': filetype,
                             'checksum': checksum
                         }
-                        source = None
-                        matching_sources = [
-                            p.inputs for p in istudy.process_sequence
-                            if sample in p.outputs]
-                        if len(matching_sources[0]) == 1:
-                            source = matching_sources[0][0]
+                        source = lineage_index.source_of(sample)
                         assay_to_export['source'] = {
                             'name': source.name,
                             'characteristics': source.characteristics,
@@ -216,15 +238,7 @@ def export(investigation, export_path, sra_settings=None, datafilehashes=None):
                             organism_charac.value.term_accession.index('_')+1:]
                         assay_to_export['source']['scientific_name'] = \
                             organism_charac.value.term
-                        curr_process = assay_seq_process
-                        while curr_process.prev_process is not None:
-                            assay_to_export[
-                                curr_process.executes_protocol.protocol_type
-                                    .term] = curr_process
-                            try:
-                                curr_process = curr_process.prev_process
-                            except AttributeError:
-                                pass
+                        assay_to_export.update(processes_by_type)
                         target_taxon = get_pv(
                             assay_to_export['library construction'],
                             'target_taxon')
@@ -501,11 +515,10 @@ def export(investigation, export_path, sra_settings=None, datafilehashes=None):
                                             sra_center_name=sra_center_name,
                                             sra_broker_name=sra_broker_name)
         samples_to_export = list()
+        sample_aliases = set()
         for assay_to_export in assays_to_export:
-            if len([s for s in samples_to_export if
-                    s['sample_alias'] == assay_to_export['sample_alias']]) > 0:
-                pass
-            else:
+            if assay_to_export['sample_alias'] not in sample_aliases:
+                sample_aliases.add(assay_to_export['sample_alias'])
                 samples_to_export.append(assay_to_export)
         xsample_set_template = env.get_template('sample_set.xml')
         xsample_set = xsample_set_template.render(
@@ -569,12 +582,18 @@ def export(investigation, export_path, sra_settings=None, datafilehashes=None):
                 "export path '{}' is not a directory".format(export_path))
 
 
-def create_datafile_hashes(fileroot, filenames):
+def create_datafile_hashes(fileroot, filenames, algorithm='md5', n_workers=None, cache_path=DEFAULT_CACHE_PATH):
     """
     Create md5 file dict for files in a directory with a particular extension
 
+    Files are hashed in parallel, and checksums of files unchanged since they were last hashed are taken from the cache
+    at cache_path (see isatools.checksums).
+
     :param fileroot: Root to directory containing files (assumes all in same dir)
     :param filenames: List of filenames of files to md5, assumed in fileroot
+    :param algorithm: 'md5' or 'sha256'
+    :param n_workers: Number of files hashed at once, by default the number of CPUs
+    :param cache_path: Path of the checksum cache, or None to hash every file
     :return: dict containing filenames and md5s
 
     Usage:
@@ -582,19 +601,7 @@ def create_datafile_hashes(fileroot, filenames):
     >>> create_datafile_hashes(fileroot='/path/to/my/files', filenames=filesnames)
     { 'myfile1.gz': 'd41d8cd98f00b204e9800998ecf8427e', 'myfile2.gz': 'd41d8cd98f00b204e9800998ecf8427e' }
     """
-    def md5sum(filename):
-        with open(filename, mode='rb') as f:
-            d = hashlib.md5()
-            for buf in iter(partial(f.read, 128), b''):
-                d.update(buf)
-        return d.hexdigest()
-
-    from os.path import isfile, join
-    datafilehashes = dict()
-    for file in filenames:
-        if isfile(join(fileroot, file)):
-            datafilehashes[file] = md5sum(filename=join(fileroot, file))
-        else:
-            raise FileNotFoundError(
-                '{} is not a file'.format(join(fileroot, file)))
-    return datafilehashes
+    from os.path import join
+    paths = dict((join(fileroot, file), file) for file in filenames)
+    checksums = compute_checksums(list(paths.keys()), algorithm=algorithm, n_workers=n_workers, cache_path=cache_path)
+    return dict((paths[path], checksum) for path, checksum in checksums.items())
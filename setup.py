@@ -1,10 +1,15 @@
 #!/usr/bin/env python
 
+import os
+import re
 from setuptools import setup
 
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'isatools', '__init__.py')) as fp:
+    version = re.search(r"^__version__ = '([^']+)'", fp.read(), re.MULTILINE).group(1)
+
 setup(
     name='isatools',
-    version='0.9.2',
+    version=version,
     packages=['isatools',
               'isatools.convert',
               'isatools.create',
@@ -47,6 +52,7 @@ setup(
     install_requires=[
         'numpy',
         'jsonschema',
+        'ijson>=3.1',
         'pandas',
         'networkx',
         'lxml',
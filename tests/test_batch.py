@@ -0,0 +1,59 @@
+"""Tests on isatools.batch module"""
+from __future__ import absolute_import
+import os
+import time
+import unittest
+
+from isatools import batch
+
+
+def _validate_file(filename):
+    if filename == 'slow.txt':
+        time.sleep(60)
+    elif filename == 'crash.txt':
+        os._exit(3)
+    elif filename == 'broken.txt':
+        raise ValueError("cannot read {}".format(filename))
+    return {
+        "filename": filename,
+        "report": {
+            "errors": [],
+            "warnings": [],
+            "validation_finished": True,
+            "pid": os.getpid()
+        }
+    }
+
+
+class TestImapValidate(unittest.TestCase):
+
+    def test_yields_every_file_once(self):
+        filenames = ['{}.txt'.format(i) for i in range(10)]
+        results = list(batch.imap_validate(_validate_file, filenames, n_workers=3))
+        self.assertEqual(sorted(task for task, _ in results), list(range(10)))
+        for task, result in results:
+            self.assertEqual(result['filename'], filenames[task])
+        self.assertLessEqual(len(set(result['report']['pid'] for _, result in results)), 3)
+        self.assertNotIn(os.getpid(), [result['report']['pid'] for _, result in results])
+
+    def test_timeout(self):
+        start = time.monotonic()
+        results = dict(batch.imap_validate(_validate_file, ['a.txt', 'slow.txt', 'b.txt'], n_workers=2, timeout=1))
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertFalse(results[1]['report']['validation_finished'])
+        self.assertIn('timed out', results[1]['report']['errors'][0]['supplemental'])
+        self.assertTrue(results[0]['report']['validation_finished'])
+        self.assertTrue(results[2]['report']['validation_finished'])
+
+    def test_worker_failures_are_reported(self):
+        results = dict(batch.imap_validate(_validate_file, ['crash.txt', 'broken.txt', 'a.txt', 'b.txt'],
+                                           n_workers=1))
+        self.assertEqual(sorted(results.keys()), [0, 1, 2, 3])
+        self.assertIn('exited with code 3', results[0]['report']['errors'][0]['supplemental'])
+        self.assertIn('ValueError: cannot read broken.txt', results[1]['report']['errors'][0]['supplemental'])
+        self.assertTrue(results[2]['report']['validation_finished'])
+        self.assertTrue(results[3]['report']['validation_finished'])
+
+    def test_invalid_worker_count(self):
+        with self.assertRaises(ValueError):
+            list(batch.imap_validate(_validate_file, ['a.txt'], n_workers=0))
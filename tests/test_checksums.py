@@ -0,0 +1,72 @@
+"""Tests on isatools.checksums module"""
+from __future__ import absolute_import
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from unittest import mock
+
+from isatools import checksums
+
+
+class TestComputeChecksums(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._cache_path = os.path.join(self._tmp_dir, 'cache', 'checksums.json')
+        self._contents = {
+            'empty.fastq': b'',
+            'small.fastq': b'@read1\nACGT\n+\nIIII\n',
+            'large.fastq': os.urandom(3 * checksums.BLOCK_SIZE + 17),
+        }
+        self._paths = list()
+        for filename, content in self._contents.items():
+            path = os.path.join(self._tmp_dir, filename)
+            with open(path, 'wb') as fp:
+                fp.write(content)
+            self._paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_md5_and_sha256(self):
+        for algorithm in checksums.SUPPORTED_ALGORITHMS:
+            result = checksums.compute_checksums(self._paths, algorithm=algorithm, n_workers=2, cache_path=None)
+            self.assertEqual(result, {os.path.join(self._tmp_dir, filename): hashlib.new(algorithm, content).hexdigest()
+                                      for filename, content in self._contents.items()})
+
+    def test_unsupported_algorithm(self):
+        with self.assertRaises(ValueError):
+            checksums.compute_checksums(self._paths, algorithm='crc32', cache_path=None)
+
+    def test_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            checksums.compute_checksums(self._paths + [os.path.join(self._tmp_dir, 'missing.fastq')],
+                                        cache_path=None)
+
+    def test_unchanged_files_not_hashed_again(self):
+        expected = checksums.compute_checksums(self._paths, cache_path=self._cache_path)
+        with mock.patch.object(checksums, 'file_checksum') as file_checksum:
+            self.assertEqual(checksums.compute_checksums(self._paths, cache_path=self._cache_path), expected)
+            file_checksum.assert_not_called()
+
+    def test_changed_file_hashed_again(self):
+        checksums.compute_checksums(self._paths, cache_path=self._cache_path)
+        path = os.path.join(self._tmp_dir, 'small.fastq')
+        with open(path, 'wb') as fp:
+            fp.write(b'@read2\nTTTT\n+\nIIII\n')
+        os.utime(path, ns=(0, 0))
+        result = checksums.compute_checksums(self._paths, cache_path=self._cache_path)
+        self.assertEqual(result[path], hashlib.md5(b'@read2\nTTTT\n+\nIIII\n').hexdigest())
+        # cached checksums are kept per algorithm
+        result = checksums.compute_checksums(self._paths, algorithm='sha256', cache_path=self._cache_path)
+        self.assertEqual(result[path], hashlib.sha256(b'@read2\nTTTT\n+\nIIII\n').hexdigest())
+
+    def test_write_manifest(self):
+        fp = StringIO()
+        checksums.write_manifest(checksums.compute_checksums(self._paths, cache_path=None), fp, root=self._tmp_dir)
+        self.assertEqual(fp.getvalue(), ''.join('{}  {}\n'.format(hashlib.md5(self._contents[filename]).hexdigest(),
+                                                                  filename)
+                                                for filename in sorted(self._contents)))
@@ -3,6 +3,9 @@ from isatools import isajson
 import json
 from tests import utils
 import os
+from io import StringIO, BytesIO
+import shutil
+import tempfile
 
 
 def setUpModule():
@@ -129,3 +132,249 @@ class TestIsaJson(unittest.TestCase):
             self.assertEqual(len(assay_gx['materials']['otherMaterials']), 29)  # 29 other materials in a_matteo-assay-Gx.txt
             self.assertEqual(len(assay_gx['dataFiles']), 29)  # 29 data files  in a_matteo-assay-Gx.txt
             self.assertEqual(len(assay_gx['processSequence']), 116)  # 116 processes in in a_matteo-assay-Gx.txt
+
+
+class TestIsaJsonLoadLinks(unittest.TestCase):
+
+    def setUp(self):
+        self._isa_json = json.loads(json.dumps(utils.create_minimal_investigation(), cls=isajson.ISAJSONEncoder))
+
+    def test_load_links_processes_to_their_inputs_outputs_and_neighbours(self):
+        ISA = isajson.load(StringIO(json.dumps(self._isa_json)))
+        study = ISA.studies[0]
+        assay = study.assays[0]
+        for process in study.process_sequence:
+            self.assertEqual(len(process.inputs), 1)
+            self.assertIn(process.inputs[0], study.sources)
+            self.assertIn(process.outputs[0], study.samples)
+        extraction, ms = assay.process_sequence[:2]
+        self.assertIs(extraction.inputs[0], study.samples[0])
+        self.assertIs(extraction.outputs[0], assay.other_material[0])
+        self.assertIs(ms.inputs[0], assay.other_material[0])
+        self.assertIs(ms.outputs[0], assay.data_files[0])
+        self.assertIs(extraction.next_process, ms)
+        self.assertIs(ms.prev_process, extraction)
+        self.assertIsNone(extraction.prev_process)
+
+    def test_load_links_processes_declared_after_their_neighbours(self):
+        self._isa_json['studies'][0]['assays'][0]['processSequence'].reverse()
+        ISA = isajson.load(StringIO(json.dumps(self._isa_json)))
+        ms, extraction = ISA.studies[0].assays[0].process_sequence[-2:]
+        self.assertIs(extraction.next_process, ms)
+        self.assertIs(ms.prev_process, extraction)
+
+    def test_load_unknown_input(self):
+        self._isa_json['studies'][0]['assays'][0]['processSequence'][0]['inputs'] = [{"@id": "#sample/unknown"}]
+        with self.assertRaises(IOError):
+            isajson.load(StringIO(json.dumps(self._isa_json)))
+
+    def test_load_study_process_with_assay_material_input(self):
+        self._isa_json['studies'][0]['processSequence'][0]['inputs'] = [
+            self._isa_json['studies'][0]['assays'][0]['materials']['otherMaterials'][0]]
+        with self.assertRaises(IOError):
+            isajson.load(StringIO(json.dumps(self._isa_json)))
+
+
+class TestIsaJsonStreamLoad(unittest.TestCase):
+
+    def setUp(self):
+        from isatools.model import Characteristic, OntologyAnnotation
+        investigation = utils.create_minimal_investigation()
+        study = investigation.studies[0]
+        organism = OntologyAnnotation(term='organism')
+        study.characteristic_categories.append(organism)
+        for source in study.sources:
+            source.characteristics.append(Characteristic(category=organism, value=OntologyAnnotation(term='human')))
+        self._isa_json = json.loads(json.dumps(investigation, cls=isajson.ISAJSONEncoder))
+
+    def stream_load(self):
+        return isajson.stream_load(BytesIO(json.dumps(self._isa_json).encode('utf-8')))
+
+    def test_stream_load_links_processes(self):
+        ISA = self.stream_load()
+        study = ISA.studies[0]
+        assay = study.assays[0]
+        self.assertEqual(len(study.sources), 2)
+        self.assertListEqual([p.inputs for p in study.process_sequence], [[s] for s in study.sources])
+        extraction, ms = assay.process_sequence[:2]
+        self.assertIs(extraction.inputs[0], study.samples[0])
+        self.assertIs(ms.outputs[0], assay.data_files[0])
+        self.assertIs(extraction.next_process, ms)
+        self.assertEqual(assay.technology_type.term, 'mass spectrometry')
+
+    def test_stream_load_same_as_load(self):
+        streamed = self.stream_load()
+        loaded = isajson.load(StringIO(json.dumps(self._isa_json)))
+        self.assertListEqual([s.name for s in streamed.studies[0].samples],
+                             [s.name for s in loaded.studies[0].samples])
+        self.assertListEqual([len(a.process_sequence) for a in streamed.studies[0].assays],
+                             [len(a.process_sequence) for a in loaded.studies[0].assays])
+
+    def test_stream_load_materials_before_their_categories(self):
+        study_json = self._isa_json['studies'][0]
+        study_json['characteristicCategories'] = study_json.pop('characteristicCategories')  # moved to the end
+        study = self.stream_load().studies[0]
+        self.assertIs(study.sources[0].characteristics[0].category, study.characteristic_categories[0])
+
+    def test_stream_load_study_material_category_declared_in_assay(self):
+        study_json = self._isa_json['studies'][0]
+        study_json['assays'][0]['characteristicCategories'] = study_json['characteristicCategories']
+        study_json['characteristicCategories'] = []
+        study = self.stream_load().studies[0]
+        self.assertIs(study.sources[0].characteristics[0].category, study.characteristic_categories[0])
+
+    def test_stream_load_unknown_input(self):
+        self._isa_json['studies'][0]['assays'][0]['processSequence'][0]['inputs'] = [{"@id": "#sample/unknown"}]
+        with self.assertRaises(IOError):
+            self.stream_load()
+
+
+class TestIsaJsonValidateRules(unittest.TestCase):
+
+    def setUp(self):
+        investigation = utils.create_minimal_investigation()
+        self._isa_json = json.loads(json.dumps(investigation, cls=isajson.ISAJSONEncoder))
+        self._study_json = self._isa_json['studies'][0]
+        self._tmp_dir = tempfile.mkdtemp()
+        isajson.errors = list()
+        isajson.warnings = list()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def validate(self):
+        json_path = os.path.join(self._tmp_dir, 'isa.json')
+        with open(json_path, 'w') as fp:
+            json.dump(self._isa_json, fp)
+        with open(json_path) as fp:
+            return isajson.validate(fp)
+
+    def assertReportCodes(self, report, error_codes, warning_codes):
+        self.assertListEqual(sorted(e['code'] for e in report['errors']), error_codes)
+        self.assertListEqual(sorted(w['code'] for w in report['warnings']), warning_codes)
+
+    def test_validate_minimal(self):
+        self.assertReportCodes(self.validate(), [], [1020])  # only #parameter/Array_Design_REF is unused
+
+    def test_validate_missing_unit_categories(self):
+        # the rules that run before the unit categories are needed still report
+        del self._study_json['assays'][0]['unitCategories']
+        report = self.validate()
+        self.assertReportCodes(report, [2], [1020])
+        self.assertIn("'unitCategories'", report['errors'][0]['supplemental'])
+
+    def test_validate_missing_material(self):
+        process = self._study_json['processSequence'][0]
+        process['inputs'].append({'@id': '#source/unknown'})
+        self.assertReportCodes(self.validate(), [1005], [1020])
+
+    def test_validate_material_not_used(self):
+        self._study_json['materials']['sources'].append({'@id': '#source/unused', 'name': 'unused',
+                                                         'characteristics': []})
+        self.assertReportCodes(self.validate(), [], [1017, 1020])
+
+    def test_validate_process_link(self):
+        self._study_json['assays'][0]['processSequence'][0]['nextProcess'] = {'@id': '#process/unknown'}
+        self.assertReportCodes(self.validate(), [1006], [1020])
+
+    def test_validate_protocol_usage(self):
+        self._study_json['processSequence'][0]['executesProtocol'] = {'@id': '#protocol/unknown'}
+        self.assertReportCodes(self.validate(), [1007], [1020])
+
+    def test_validate_protocol_not_used(self):
+        protocol = dict(self._study_json['protocols'][0], **{'@id': '#protocol/unused', 'name': 'unused'})
+        self._study_json['protocols'].append(protocol)
+        self.assertReportCodes(self.validate(), [], [1019, 1020])
+
+    def test_validate_study_factor_not_used(self):
+        self._study_json['factors'].append({
+            '@id': '#factor/unused', 'factorName': 'unused',
+            'factorType': {'annotationValue': '', 'termAccession': '', 'termSource': ''}})
+        self.assertReportCodes(self.validate(), [], [1020, 1021])
+
+    def test_validate_protocol_parameter_usage(self):
+        self._study_json['processSequence'][0]['parameterValues'] = [
+            {'category': {'@id': '#parameter/unknown'}, 'value': 1}]
+        self.assertReportCodes(self.validate(), [1009], [])
+
+    def test_validate_characteristic_category_usage(self):
+        self._study_json['materials']['sources'][0]['characteristics'] = [{
+            'category': {'@id': '#characteristic_category/unknown'},
+            'value': {'annotationValue': 'x', 'termAccession': '', 'termSource': ''}}]
+        self.assertReportCodes(self.validate(), [1013], [1020])
+
+    def test_validate_characteristic_category_not_used(self):
+        self._study_json['characteristicCategories'] = [{
+            '@id': '#characteristic_category/unused',
+            'characteristicType': {'annotationValue': 'unused', 'termAccession': '', 'termSource': ''}}]
+        self.assertReportCodes(self.validate(), [], [1020, 1022])
+
+    def test_validate_unit_category_usage(self):
+        self._study_json['characteristicCategories'] = [{
+            '@id': '#characteristic_category/weight',
+            'characteristicType': {'annotationValue': 'weight', 'termAccession': '', 'termSource': ''}}]
+        self._study_json['materials']['sources'][0]['characteristics'] = [{
+            'category': {'@id': '#characteristic_category/weight'}, 'value': 1, 'unit': {'@id': '#unit/unknown'}}]
+        with self.assertLogs('isatools.isajson', level='ERROR') as logs:
+            self.assertReportCodes(self.validate(), [], [1020])  # rule 1014 is only logged
+        self.assertTrue(any('#unit/unknown' in line for line in logs.output))
+
+    def test_validate_unit_category_not_used(self):
+        self._study_json['unitCategories'] = [{'@id': '#unit/unused', 'annotationValue': 'unused',
+                                               'termAccession': '', 'termSource': ''}]
+        self.assertReportCodes(self.validate(), [], [1020, 1022])
+
+    def test_validate_date_formats(self):
+        self._isa_json['submissionDate'] = 'not a date'
+        self._study_json['processSequence'][0]['date'] = '12/31/2020'
+        self.assertReportCodes(self.validate(), [], [1020, 3001, 3001])
+
+    def test_validate_term_source_refs(self):
+        self._study_json['protocols'][0]['protocolType']['termSource'] = 'UNKNOWN'
+        self.assertReportCodes(self.validate(), [3009], [1020])
+
+    def test_validate_term_source_ref_not_used(self):
+        self._isa_json['ontologySourceReferences'] = [
+            {'name': 'OBI', 'file': '', 'version': '', 'description': '', 'comments': []}]
+        self.assertReportCodes(self.validate(), [], [1020, 3007])
+
+    def test_validate_term_accession_no_source_ref(self):
+        self._study_json['protocols'][0]['protocolType']['termAccession'] = 'http://purl.obolibrary.org/obo/1'
+        self.assertReportCodes(self.validate(), [], [1020, 3010])
+
+    def test_rules_without_index(self):
+        self._study_json['materials']['sources'].append({'@id': '#source/unused', 'name': 'unused',
+                                                         'characteristics': []})
+        self._study_json['assays'][0]['processSequence'][0]['nextProcess'] = {'@id': '#process/unknown'}
+        self._isa_json['submissionDate'] = 'not a date'
+        isajson.check_material_ids_not_declared_used(self._study_json)
+        isajson.check_material_ids_declared_used(self._study_json, isajson.get_source_ids)
+        isajson.check_process_sequence_links(self._study_json['assays'][0]['processSequence'])
+        isajson.check_date_formats(self._isa_json)
+        isajson.check_term_source_refs(self._isa_json)
+        isajson.check_term_accession_used_no_source_ref(self._isa_json)
+        self.assertListEqual([e['code'] for e in isajson.errors], [1006])
+        self.assertListEqual([w['code'] for w in isajson.warnings], [1017, 3001])
+
+    def test_study_index_collects_once(self):
+        calls = list()
+
+        def get_ids(study_json):
+            calls.append(study_json)
+            return isajson.get_source_ids(study_json)
+
+        study_index = isajson.StudyIndex(self._study_json)
+        self.assertEqual(len(study_index.get(get_ids)), 2)
+        self.assertIs(study_index.get(get_ids), study_index.get(get_ids))
+        self.assertEqual(len(calls), 1)
+
+    def test_index_is_lazy(self):
+        index = isajson.ISAJSONIndex({})
+        with self.assertRaises(KeyError):
+            index.studies
+        del self._study_json['assays'][0]['unitCategories']
+        study_index = isajson.ISAJSONIndex(self._isa_json).studies[0]
+        self.assertListEqual(study_index.get(isajson.get_study_protocol_ids),
+                             [p['@id'] for p in self._study_json['protocols']])
+        with self.assertRaises(KeyError):
+            study_index.get(isajson.get_study_and_assay_unit_category_ids)
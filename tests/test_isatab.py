@@ -1,6 +1,10 @@
 import unittest
+from unittest import mock
 import os
+import pickle
 import shutil
+import threading
+import time
 from tests.utils import assert_tab_content_equal
 from isatools.model import *
 from tests import utils
@@ -9,6 +13,7 @@ from isatools import isatab
 from isatools.isatab import ProcessSequenceFactory
 from io import StringIO
 import pandas as pd
+import networkx as nx
 
 
 def setUpModule():
@@ -560,6 +565,31 @@ source1	sample collection	sample1"""
         self.assertIn(expected_line2, dumps_out)
         self.assertIn(expected_line3, dumps_out)
 
+    def test_source_protocol_ref_sample_rows_sorted_unique(self):
+        i = Investigation()
+        s = Study(
+            filename='s_test.txt',
+            protocols=[Protocol(name='sample collection')]
+        )
+        weight_category = OntologyAnnotation(term='weight')
+        source1 = Source(name='source1')
+        source2 = Source(name='source2')
+        source2.characteristics = [Characteristic(category=weight_category, value=2, unit='kg')]
+        sample1 = Sample(name='sample1')
+        sample2 = Sample(name='sample2')
+        # two collections of sample1 from source1 give the same row twice
+        process1 = Process(executes_protocol=s.protocols[0], inputs=[source2], outputs=[sample2])
+        process2 = Process(executes_protocol=s.protocols[0], inputs=[source1], outputs=[sample1])
+        process3 = Process(executes_protocol=s.protocols[0], inputs=[source1], outputs=[sample1])
+        s.process_sequence = [process1, process2, process3]
+        i.studies = [s]
+        isatab.write_study_table_files(i, self._tmp_dir)
+        with open(os.path.join(self._tmp_dir, 's_test.txt')) as fp:
+            self.assertEqual(fp.read(), """Source Name	Characteristics[weight]	Unit	Protocol REF	Sample Name
+source1			sample collection	sample1
+source2	2.0	kg	sample collection	sample2
+""")
+
     def test_source_protocol_ref_sample_with_characteristics(self):
         i = Investigation()
         s = Study(
@@ -878,6 +908,331 @@ sample1	extraction	extract1	scanning	datafile.raw"""
         self.assertIn(expected_line2, dumps_out)
         self.assertIn(expected_line3, dumps_out)
 
+    def test_dumps_same_as_dump(self):
+        i = Investigation(identifier='I1')
+        s = Study(
+            filename='s_test.txt',
+            protocols=[Protocol(name='sample collection'),
+                       Protocol(name='extraction', protocol_type=OntologyAnnotation(term='extraction'))]
+        )
+        source1 = Source(name='source1')
+        sample1 = Sample(name='sample1')
+        extract1 = Extract(name='extract1')
+        sample_collection_process = Process(executes_protocol=s.protocols[0], inputs=[source1], outputs=[sample1])
+        extraction_process = Process(executes_protocol=s.protocols[1], inputs=[sample1], outputs=[extract1])
+        s.process_sequence = [sample_collection_process]
+        a = Assay(filename='a_test.txt')
+        a.process_sequence = [extraction_process]
+        s.assays = [a]
+        i.studies = [s]
+        isatab.dump(i, self._tmp_dir)
+
+        dumps_out = isatab.dumps(i)
+        dataframes = isatab.dump_tables_to_dataframes(i)
+        self.assertEqual(sorted(os.listdir(self._tmp_dir)), ['a_test.txt', 'i_investigation.txt', 's_test.txt'])
+        for file_name in os.listdir(self._tmp_dir):
+            with open(os.path.join(self._tmp_dir, file_name)) as fp:
+                self.assertIn(file_name + '\n' + fp.read(), dumps_out)
+        self.assertEqual(sorted(dataframes.keys()), ['a_test.txt', 's_test.txt'])
+        for file_name, df in dataframes.items():
+            self.assertTrue(df.equals(isatab.read_tfile(os.path.join(self._tmp_dir, file_name))))
+
+    def test_dump_after_renaming_graph_nodes(self):
+        i = utils.create_minimal_investigation()
+        study = i.studies[0]
+        self.assertIsNotNone(study.graph)
+        self.assertIsNotNone(study.assays[0].graph)
+        for sample in study.samples:
+            sample.name = 'renamed_' + sample.name
+        study.assays[0].data_files[0].filename = 'renamed.mzML'
+        isatab.dump(i, self._tmp_dir)
+        with open(os.path.join(self._tmp_dir, 's_minimal.txt')) as fp:
+            s_table = fp.read()
+        with open(os.path.join(self._tmp_dir, 'a_minimal.txt')) as fp:
+            a_table = fp.read()
+        self.assertIn('renamed_sample0', s_table)
+        self.assertIn('renamed_sample1', a_table)
+        self.assertIn('renamed.mzML', a_table)
+
+    def test_dump_table_error_keeps_existing_file(self):
+        i = utils.create_minimal_investigation()
+        isatab.dump(i, self._tmp_dir)
+        with open(os.path.join(self._tmp_dir, 's_minimal.txt')) as fp:
+            expected = fp.read()
+        i.studies[0].process_sequence[1].date = '2020-01-01'  # a column the first path has not got
+        with self.assertRaises(KeyError):
+            isatab.write_study_table_files(i, self._tmp_dir)
+        with open(os.path.join(self._tmp_dir, 's_minimal.txt')) as fp:
+            self.assertEqual(fp.read(), expected)
+
+    def test_write_investigation_file(self):
+        obi = OntologySource(name='OBI', file='http://purl.obolibrary.org/obo/obi.owl', version='1',
+                             description='Ontology for Biomedical Investigations')
+        i = Investigation(identifier='i1', title='Investigation "one"', description='tab\tand\nnewline',
+                          submission_date='2020-01-01', comments=[Comment(name='Created With', value='isatools')],
+                          ontology_source_references=[obi])
+        i.contacts.append(Person(last_name='Doe', first_name='Jane', email='jane@example.com',
+                                 roles=[OntologyAnnotation(term='author', term_accession='OBI:0000001',
+                                                           term_source=obi),
+                                        OntologyAnnotation(term='curator')],
+                                 comments=[Comment(name='ORCID', value='0000-0001')]))
+        s = Study(identifier='s1', title='First study', filename='s_one.txt',
+                  comments=[Comment(name='Funder', value='none')])
+        s.design_descriptors.append(OntologyAnnotation(term='intervention design', term_source=obi))
+        s.publications.append(Publication(pubmed_id='12345678', title='A;title',
+                                          status=OntologyAnnotation(term='published')))
+        s.factors.append(StudyFactor(name='dose', factor_type=OntologyAnnotation(term='dose', term_source=obi)))
+        s.protocols.append(Protocol(name='extraction',
+                                    protocol_type=OntologyAnnotation(term='extraction', term_source=obi),
+                                    parameters=[ProtocolParameter(parameter_name=OntologyAnnotation(term='volume')),
+                                                ProtocolParameter(parameter_name=OntologyAnnotation(term='time'))]))
+        s.assays.append(Assay(filename='a_one.txt', measurement_type=OntologyAnnotation(term='metabolite profiling'),
+                              technology_type=OntologyAnnotation(term='mass spectrometry', term_source=obi),
+                              technology_platform='LC-MS'))
+        i.studies = [s, Study(identifier='s2', filename='s_two.txt')]  # every section of s2 is empty
+        expected = (
+            'i_investigation.txt\n'
+            'ONTOLOGY SOURCE REFERENCE\n'
+            'Term Source Name\tOBI\n'
+            'Term Source File\thttp://purl.obolibrary.org/obo/obi.owl\n'
+            'Term Source Version\t1\n'
+            'Term Source Description\tOntology for Biomedical Investigations\n'
+            'INVESTIGATION\n'
+            'Investigation Identifier\ti1\n'
+            'Investigation Title\t"Investigation ""one"""\n'
+            'Investigation Description\t"tab\tand\n'
+            'newline"\n'
+            'Investigation Submission Date\t2020-01-01\n'
+            'Investigation Public Release Date\t\n'
+            'Comment[Created With]\tisatools\n'
+            'INVESTIGATION PUBLICATIONS\n'
+            'Investigation PubMed ID\n'
+            'Investigation Publication DOI\n'
+            'Investigation Publication Author List\n'
+            'Investigation Publication Title\n'
+            'Investigation Publication Status\n'
+            'Investigation Publication Status Term Accession Number\n'
+            'Investigation Publication Status Term Source REF\n'
+            'INVESTIGATION CONTACTS\n'
+            'Investigation Person Last Name\tDoe\n'
+            'Investigation Person First Name\tJane\n'
+            'Investigation Person Mid Initials\t\n'
+            'Investigation Person Email\tjane@example.com\n'
+            'Investigation Person Phone\t\n'
+            'Investigation Person Fax\t\n'
+            'Investigation Person Address\t\n'
+            'Investigation Person Affiliation\t\n'
+            'Investigation Person Roles\tauthor;curator\n'
+            'Investigation Person Roles Term Accession Number\tOBI:0000001;\n'
+            'Investigation Person Roles Term Source REF\tOBI;\n'
+            'Comment[ORCID]\t0000-0001\n'
+            'STUDY\n'
+            'Study Identifier\ts1\n'
+            'Study Title\tFirst study\n'
+            'Study Description\t\n'
+            'Study Submission Date\t\n'
+            'Study Public Release Date\t\n'
+            'Study File Name\ts_one.txt\n'
+            'Comment[Funder]\tnone\n'
+            'STUDY DESIGN DESCRIPTORS\n'
+            'Study Design Type\tintervention design\n'
+            'Study Design Type Term Accession Number\t\n'
+            'Study Design Type Term Source REF\tOBI\n'
+            'STUDY PUBLICATIONS\n'
+            'Study PubMed ID\t12345678\n'
+            'Study Publication DOI\t\n'
+            'Study Publication Author List\t\n'
+            'Study Publication Title\tA;title\n'
+            'Study Publication Status\tpublished\n'
+            'Study Publication Status Term Accession Number\t\n'
+            'Study Publication Status Term Source REF\t\n'
+            'STUDY FACTORS\n'
+            'Study Factor Name\tdose\n'
+            'Study Factor Type\tdose\n'
+            'Study Factor Type Term Accession Number\t\n'
+            'Study Factor Type Term Source REF\tOBI\n'
+            'STUDY ASSAYS\n'
+            'Study Assay File Name\ta_one.txt\n'
+            'Study Assay Measurement Type\tmetabolite profiling\n'
+            'Study Assay Measurement Type Term Accession Number\t\n'
+            'Study Assay Measurement Type Term Source REF\t\n'
+            'Study Assay Technology Type\tmass spectrometry\n'
+            'Study Assay Technology Type Term Accession Number\t\n'
+            'Study Assay Technology Type Term Source REF\tOBI\n'
+            'Study Assay Technology Platform\tLC-MS\n'
+            'STUDY PROTOCOLS\n'
+            'Study Protocol Name\textraction\n'
+            'Study Protocol Type\textraction\n'
+            'Study Protocol Type Term Accession Number\t\n'
+            'Study Protocol Type Term Source REF\tOBI\n'
+            'Study Protocol Description\t\n'
+            'Study Protocol URI\t\n'
+            'Study Protocol Version\t\n'
+            'Study Protocol Parameters Name\tvolume;time\n'
+            'Study Protocol Parameters Name Term Accession Number\t;\n'
+            'Study Protocol Parameters Name Term Source REF\t;\n'
+            'Study Protocol Components Name\t\n'
+            'Study Protocol Components Type\t\n'
+            'Study Protocol Components Type Term Accession Number\t\n'
+            'Study Protocol Components Type Term Source REF\t\n'
+            'STUDY CONTACTS\n'
+            'Study Person Last Name\n'
+            'Study Person First Name\n'
+            'Study Person Mid Initials\n'
+            'Study Person Email\n'
+            'Study Person Phone\n'
+            'Study Person Fax\n'
+            'Study Person Address\n'
+            'Study Person Affiliation\n'
+            'Study Person Roles\n'
+            'Study Person Roles Term Accession Number\n'
+            'Study Person Roles Term Source REF\n'
+            'STUDY\n'
+            'Study Identifier\ts2\n'
+            'Study Title\t\n'
+            'Study Description\t\n'
+            'Study Submission Date\t\n'
+            'Study Public Release Date\t\n'
+            'Study File Name\ts_two.txt\n'
+            'STUDY DESIGN DESCRIPTORS\n'
+            'Study Design Type\n'
+            'Study Design Type Term Accession Number\n'
+            'Study Design Type Term Source REF\n'
+            'STUDY PUBLICATIONS\n'
+            'Study PubMed ID\n'
+            'Study Publication DOI\n'
+            'Study Publication Author List\n'
+            'Study Publication Title\n'
+            'Study Publication Status\n'
+            'Study Publication Status Term Accession Number\n'
+            'Study Publication Status Term Source REF\n'
+            'STUDY FACTORS\n'
+            'Study Factor Name\n'
+            'Study Factor Type\n'
+            'Study Factor Type Term Accession Number\n'
+            'Study Factor Type Term Source REF\n'
+            'STUDY ASSAYS\n'
+            'Study Assay File Name\n'
+            'Study Assay Measurement Type\n'
+            'Study Assay Measurement Type Term Accession Number\n'
+            'Study Assay Measurement Type Term Source REF\n'
+            'Study Assay Technology Type\n'
+            'Study Assay Technology Type Term Accession Number\n'
+            'Study Assay Technology Type Term Source REF\n'
+            'Study Assay Technology Platform\n'
+            'STUDY PROTOCOLS\n'
+            'Study Protocol Name\n'
+            'Study Protocol Type\n'
+            'Study Protocol Type Term Accession Number\n'
+            'Study Protocol Type Term Source REF\n'
+            'Study Protocol Description\n'
+            'Study Protocol URI\n'
+            'Study Protocol Version\n'
+            'Study Protocol Parameters Name\n'
+            'Study Protocol Parameters Name Term Accession Number\n'
+            'Study Protocol Parameters Name Term Source REF\n'
+            'Study Protocol Components Name\n'
+            'Study Protocol Components Type\n'
+            'Study Protocol Components Type Term Accession Number\n'
+            'Study Protocol Components Type Term Source REF\n'
+            'STUDY CONTACTS\n'
+            'Study Person Last Name\n'
+            'Study Person First Name\n'
+            'Study Person Mid Initials\n'
+            'Study Person Email\n'
+            'Study Person Phone\n'
+            'Study Person Fax\n'
+            'Study Person Address\n'
+            'Study Person Affiliation\n'
+            'Study Person Roles\n'
+            'Study Person Roles Term Accession Number\n'
+            'Study Person Roles Term Source REF\n'
+        )
+        self.assertEqual(isatab.dumps(i, skip_dump_tables=True), expected)
+
+    def test_write_investigation_file_mismatched_comments(self):
+        i = Investigation(identifier='i1')
+        i.contacts = [Person(last_name='Doe', comments=[Comment(name='ORCID', value='0000-0001')]),
+                      Person(last_name='Roe')]
+        with self.assertRaises(ValueError):
+            isatab.dumps(i, skip_dump_tables=True)
+
+
+class UnitTestEndToEndPaths(unittest.TestCase):
+
+    @staticmethod
+    def _all_simple_paths(G, start_nodes):
+        paths = list()
+        for start in start_nodes:
+            for end in nx.algorithms.descendants(G, start):
+                if isinstance(start, Source):
+                    is_end = isinstance(end, Sample) and len(G.out_edges(end)) == 0
+                else:
+                    is_end = isinstance(end, Process) and end.next_process is None
+                if is_end:
+                    paths.extend(tuple(path) for path in nx.algorithms.all_simple_paths(G, start, end))
+        return sorted(paths, key=lambda path: [id(x) for x in path])
+
+    def _assert_paths(self, G, start_nodes, n_paths):
+        paths = isatab.EndToEndPaths(G)
+        generated = sorted((tuple(path) for path in paths.iter(start_nodes)), key=lambda path: [id(x) for x in path])
+        self.assertEqual(generated, self._all_simple_paths(G, start_nodes))
+        self.assertEqual(len(generated), n_paths)
+        self.assertEqual(paths.count(start_nodes), n_paths)
+
+    def test_study_paths_with_splitting_and_pooling(self):
+        protocol = Protocol(name='sample collection')
+        source1, source2, source3 = Source(name='source1'), Source(name='source2'), Source(name='source3')
+        sample1, sample2, sample3 = Sample(name='sample1'), Sample(name='sample2'), Sample(name='sample3')
+        s = Study(process_sequence=[
+            Process(executes_protocol=protocol, inputs=[source1], outputs=[sample1, sample2]),
+            Process(executes_protocol=protocol, inputs=[source1, source2], outputs=[sample3]),
+        ])
+        # source3 has no sample, so no path starts from it
+        graph = nx.DiGraph(s.graph)
+        graph.add_node(source3)
+        self._assert_paths(graph, [source1, source2, source3], 4)
+
+    def test_assay_paths_end_at_every_process_without_next_process(self):
+        sample1, sample2 = Sample(name='sample1'), Sample(name='sample2')
+        extract = Extract(name='extract1')
+        extraction = Process(executes_protocol=Protocol(name='extraction'), inputs=[sample1, sample2],
+                             outputs=[extract])
+        scan1 = Process(executes_protocol=Protocol(name='scanning'), inputs=[extract],
+                        outputs=[RawDataFile(filename='datafile1.raw')])
+        scan2 = Process(executes_protocol=Protocol(name='scanning'), inputs=[extract],
+                        outputs=[RawDataFile(filename='datafile2.raw')])
+        a = Assay(process_sequence=[extraction, scan1, scan2])
+        # extraction has no next_process, so paths end at it as well as at both scans
+        self._assert_paths(a.graph, [sample1, sample2], 6)
+        plink(extraction, scan1)
+        self._assert_paths(a.graph, [sample1, sample2], 4)
+
+    def test_longest_path_is_the_first_heaviest_one(self):
+        protocol = Protocol(name='sample collection')
+        source1, source2 = Source(name='source1'), Source(name='source2')
+        sample1, sample2 = Sample(name='sample1'), Sample(name='sample2')
+        sample2.characteristics = [Characteristic(category=OntologyAnnotation(term='weight'), value=1)]
+        s = Study(process_sequence=[
+            Process(executes_protocol=protocol, inputs=[source1], outputs=[sample1]),
+            Process(executes_protocol=protocol, inputs=[source2], outputs=[sample2]),
+        ])
+        paths = isatab.EndToEndPaths(s.graph)
+        self.assertEqual(paths.longest([source1, source2])[-1], sample2)
+        self.assertEqual(paths.longest([source1, source2], weight=lambda x: 1)[0], source1)
+        self.assertEqual(paths.longest([source2, source1], weight=lambda x: 1)[0], source2)
+        self.assertIsNone(paths.longest([]))
+
+    def test_cyclic_graph_gives_simple_paths(self):
+        source, sample = Source(name='source1'), Sample(name='sample1')
+        process = Process(executes_protocol=Protocol(name='sample collection'), inputs=[source], outputs=[sample])
+        G = nx.DiGraph()
+        G.add_edges_from([(source, process), (process, sample), (process, source)])
+        paths = isatab.EndToEndPaths(G)
+        self.assertEqual(list(paths.iter([source])), [[source, process, sample]])
+        self.assertEqual(paths.count([source]), 1)
+        self.assertEqual(paths.longest([source]), [source, process, sample])
+
 
 class UnitTestIsaTabLoad(unittest.TestCase):
 
@@ -959,6 +1314,38 @@ sample1	extraction	e2	scanning	d2"""
         self.assertEqual(len(d), 2)
         self.assertEqual(len(pr), 3)
 
+    def test_sample_protocol_ref_extract_protocol_ref_data_links(self):
+        factory = ProcessSequenceFactory(
+            study_samples=[Sample(name="sample1"), Sample(name="sample2")],
+            study_protocols=[Protocol(name="extraction"), Protocol(name="scanning")])
+        table_to_load = """Sample Name	Protocol REF	Extract Name	Protocol REF	Raw Data File
+sample1	extraction	e1	scanning	d1
+sample1	extraction	e1	scanning	d2
+sample2	extraction	e2	scanning	d3"""
+        DF = pd.read_csv(StringIO(table_to_load), sep='\t')
+        DF.isatab_header = ["Sample Name", "Protocol REF", "Extract Name", "Protocol REF", "Raw Data File"]
+        so, sa, om, d, pr, _, __ = factory.create_from_df(DF)
+        self.assertEqual(len(pr), 4)
+        extraction1 = pr['sample1/extraction']
+        self.assertEqual([x.name for x in extraction1.inputs], ['sample1'])
+        self.assertEqual([x.filename for x in pr['e1/scanning'].outputs], ['d1', 'd2'])
+        self.assertEqual([x.name for x in pr['e1/scanning'].inputs], ['e1'])
+        self.assertIs(extraction1.next_process, pr['e1/scanning'])
+        self.assertIs(pr['e2/scanning'].prev_process, pr['sample2/extraction'])
+        self.assertEqual([x.name for x in d['Raw Data File:d3'].generated_from], ['sample2'])
+
+    def test_process_keygen_df_matches_process_keygen(self):
+        table_to_load = """Source Name	Protocol REF	Parameter Value[temperature]	Date	Sample Name
+source1	sample collection	4	2017-01-01	sample1
+source1	sample collection	4	2017-01-01	sample2
+source2	sample collection	20	2017-01-02	sample3"""
+        DF = pd.read_csv(StringIO(table_to_load), sep='\t', dtype=str).fillna('')
+        column_group = list(DF.columns[1:4])
+        process_keys = isatab.process_keygen_df(column_group, 1, DF.columns, DF)
+        for i, row in DF.iterrows():
+            self.assertEqual(process_keys[i],
+                             isatab.process_keygen('sample collection', column_group, 1, DF.columns, row, i, DF))
+
     def test_isatab_load_issue210_on_MTBLS30(self):
         with open(os.path.join(self._tab_data_dir, 'MTBLS30', 'i_Investigation.txt')) as fp:
             ISA = isatab.load(fp)
@@ -971,3 +1358,184 @@ sample1	extraction	e2	scanning	d2"""
             self.assertEqual(len([x for x in ISA.studies[0].assays[0].other_material
                                   if x.type == "Labeled Extract Name"]), 0)
 
+    def test_read_investigation_file_more_than_128_assays(self):
+        i = Investigation(studies=[Study(filename='s_test.txt',
+                                         assays=[Assay(filename='a_test{}.txt'.format(x)) for x in range(200)])])
+        fp = StringIO(isatab.dumps(i, skip_dump_tables=True).split('\n', 1)[1])
+        df_dict = isatab.read_investigation_file(fp)
+        self.assertEqual(len(df_dict['s_assays'][0].index), 200)
+        self.assertEqual(list(df_dict['s_assays'][0]['Study Assay File Name'])[-1], 'a_test199.txt')
+
+    def test_read_investigation_file_values_as_text(self):
+        i = Investigation(studies=[Study(filename='s_test.txt', publications=[Publication(pubmed_id='12345678')],
+                                         protocols=[Protocol(name='extraction', description='step #1',
+                                                             version='2')])])
+        fp = StringIO(isatab.dumps(i, skip_dump_tables=True).split('\n', 1)[1])
+        df_dict = isatab.read_investigation_file(fp)
+        self.assertEqual(df_dict['s_publications'][0].iloc[0]['Study PubMed ID'], '12345678')
+        self.assertEqual(df_dict['s_protocols'][0].iloc[0]['Study Protocol Description'], 'step #1')
+        self.assertEqual(df_dict['s_protocols'][0].iloc[0]['Study Protocol Version'], '2')
+
+    def test_load_lazy_load_tables(self):
+        isatab.dump(utils.create_minimal_investigation(), self._tmp_dir)
+        ISA = isatab.load(self._tmp_dir, lazy_load_tables=True)
+        study = ISA.studies[0]
+        assay = study.assays[0]
+        self.assertIsInstance(study, Study)
+        self.assertIsInstance(assay, Assay)
+        self.assertFalse(study.tables_loaded)
+        self.assertFalse(assay.tables_loaded)
+        self.assertEqual(study.identifier, 's1')
+        self.assertEqual(assay.filename, 'a_minimal.txt')
+        self.assertListEqual([p.name for p in study.protocols], ['sample collection', 'extraction',
+                                                                 'mass spectrometry'])
+        self.assertEqual(len(assay.process_sequence), 4)
+        self.assertTrue(study.tables_loaded)
+        self.assertTrue(assay.tables_loaded)
+        self.assertListEqual(sorted(x.name for x in study.samples), ['sample0', 'sample1'])
+        self.assertTrue(all(any(x is y for y in study.samples) for x in assay.samples))
+        self.assertEqual(isatab.dumps(ISA), isatab.dumps(isatab.load(self._tmp_dir)))
+
+    def test_load_lazy_load_tables_missing_table(self):
+        isatab.dump(utils.create_minimal_investigation(), self._tmp_dir)
+        os.remove(os.path.join(self._tmp_dir, 'a_minimal.txt'))
+        ISA = isatab.load(self._tmp_dir, lazy_load_tables=True)
+        self.assertEqual(len(ISA.studies[0].process_sequence), 2)
+        with self.assertRaises(FileNotFoundError):
+            ISA.studies[0].assays[0].data_files
+        self.assertFalse(ISA.studies[0].assays[0].tables_loaded)
+
+    def test_load_lazy_load_tables_assay_sample_columns(self):
+        isatab.dump(utils.create_minimal_investigation(), self._tmp_dir)
+        with open(os.path.join(self._tmp_dir, 'a_minimal.txt')) as fp:
+            rows = [line.rstrip('\n').split('\t') for line in fp]
+        with open(os.path.join(self._tmp_dir, 'a_minimal.txt'), 'w') as fp:
+            for i, row in enumerate(rows):
+                if i == 0:
+                    extra = ['"Characteristics[sex]"', '"Comment[note]"']
+                else:
+                    extra = ['"female"', '"n{}"'.format(i)]
+                fp.write('\t'.join(row[:1] + extra + row[1:]) + '\n')
+        ISA = isatab.load(self._tmp_dir, lazy_load_tables=True)
+        study = ISA.studies[0]
+        samples = sorted(study.samples, key=lambda x: x.name)
+        # the assay table has not been read, so its sample columns are not there yet
+        self.assertListEqual([(x.characteristics, x.comments) for x in samples], [([], []), ([], [])])
+        self.assertFalse(study.assays[0].tables_loaded)
+        self.assertEqual(len(study.assays[0].samples), 2)
+        self.assertListEqual([([c.value for c in x.characteristics], [c.value for c in x.comments])
+                              for x in samples], [(['female'], ['n1']), (['female'], ['n2'])])
+        self.assertEqual(isatab.dumps(ISA), isatab.dumps(isatab.load(self._tmp_dir)))
+
+    def test_load_lazy_load_tables_threads(self):
+        isatab.dump(utils.create_minimal_investigation(), self._tmp_dir)
+        ISA = isatab.load(self._tmp_dir, lazy_load_tables=True)
+        study = ISA.studies[0]
+        read_tfile = isatab.read_tfile
+        reading = threading.Event()
+
+        def slow_read_tfile(*args, **kwargs):
+            reading.set()
+            time.sleep(0.2)
+            return read_tfile(*args, **kwargs)
+
+        n_samples = []
+        with mock.patch('isatools.isatab.read_tfile', side_effect=slow_read_tfile):
+            reader = threading.Thread(target=lambda: n_samples.append(len(study.samples)))
+            reader.start()
+            try:
+                reading.wait()
+                self.assertFalse(study.tables_loaded)
+                n_samples.append(len(study.samples))  # waits for the table being read in the other thread
+            finally:
+                reader.join()
+        self.assertListEqual(n_samples, [2, 2])
+        self.assertTrue(study.tables_loaded)
+        self.assertEqual(len(pickle.loads(pickle.dumps(study)).samples), 2)
+
+    def test_load_n_workers(self):
+        investigation = utils.create_minimal_investigation()
+        investigation.studies[0].assays.append(Assay(
+            filename='a_second.txt', measurement_type=OntologyAnnotation(term='metabolite profiling'),
+            technology_type=OntologyAnnotation(term='mass spectrometry')))
+        isatab.dump(investigation, self._tmp_dir)
+        with open(os.path.join(self._tmp_dir, 'a_minimal.txt')) as fp:
+            rows = [line.rstrip('\n').split('\t') for line in fp]
+        with open(os.path.join(self._tmp_dir, 'a_second.txt'), 'w') as fp:
+            for i, row in enumerate(rows):
+                if i == 0:
+                    extra = ['"Comment[batch]"', '"Characteristics[age]"']
+                else:
+                    extra = ['"b{}"'.format(i), '"{}"'.format(i)]
+                fp.write('\t'.join(row[:1] + extra + row[1:]) + '\n')
+        ISA = isatab.load(self._tmp_dir, n_workers=2)
+        study = ISA.studies[0]
+        self.assertEqual(isatab.dumps(ISA), isatab.dumps(isatab.load(self._tmp_dir)))
+        self.assertListEqual([len(x.process_sequence) for x in study.assays], [4, 4])
+        for assay in study.assays:
+            self.assertTrue(all(any(x is y for y in study.samples) for x in assay.samples))
+            self.assertTrue(all(p.executes_protocol in study.protocols for p in assay.process_sequence))
+        self.assertListEqual(sorted((x.name, [c.value for c in x.comments], [c.value for c in x.characteristics])
+                                    for x in study.samples), [('sample0', ['b1'], ['1']), ('sample1', ['b2'], ['2'])])
+
+    def test_load_snapshot(self):
+        isatab.dump(utils.create_minimal_investigation(), self._tmp_dir)
+        snapshot_dir = os.path.join(self._tmp_dir, 'snapshots')
+        expected = isatab.dumps(isatab.load(self._tmp_dir, snapshot_dir=snapshot_dir))
+        self.assertEqual(len(os.listdir(snapshot_dir)), 1)
+        with mock.patch.object(ProcessSequenceFactory, 'create_from_df') as create_from_df:
+            ISA = isatab.load(self._tmp_dir, snapshot_dir=snapshot_dir)
+            create_from_df.assert_not_called()
+        self.assertEqual(isatab.dumps(ISA), expected)
+        study = ISA.studies[0]
+        self.assertTrue(all(any(x is y for y in study.samples) for x in study.assays[0].samples))
+        with open(os.path.join(self._tmp_dir, 'a_minimal.txt'), 'a') as fp:
+            fp.write('\n')
+        with mock.patch.object(ProcessSequenceFactory, 'create_from_df',
+                               side_effect=ProcessSequenceFactory.create_from_df, autospec=True) as create_from_df:
+            self.assertEqual(isatab.dumps(isatab.load(self._tmp_dir, snapshot_dir=snapshot_dir)), expected)
+            self.assertEqual(create_from_df.call_count, 2)
+        self.assertEqual(len(os.listdir(snapshot_dir)), 2)
+
+    def test_load_invalid_snapshot(self):
+        isatab.dump(utils.create_minimal_investigation(), self._tmp_dir)
+        snapshot_dir = os.path.join(self._tmp_dir, 'snapshots')
+        expected = isatab.dumps(isatab.load(self._tmp_dir, snapshot_dir=snapshot_dir))
+        snapshot_path = os.path.join(snapshot_dir, os.listdir(snapshot_dir)[0])
+        with open(snapshot_path, 'rb') as fp:
+            snapshot = fp.read()
+        key_end = len(isatab._SNAPSHOT_MAGIC) + 32
+        for contents in (snapshot[:-10], snapshot[:-1] + bytes([snapshot[-1] ^ 1]), b'',
+                         snapshot[:key_end - 32] + bytes(32) + snapshot[key_end:]):
+            with open(snapshot_path, 'wb') as fp:
+                fp.write(contents)
+            with self.assertLogs('isatools.isatab', level='WARNING'):
+                ISA = isatab.load(self._tmp_dir, snapshot_dir=snapshot_dir)
+            self.assertEqual(isatab.dumps(ISA), expected)
+            with open(snapshot_path, 'rb') as fp:
+                self.assertEqual(fp.read(), snapshot)
+
+    def test_load_snapshot_of_other_version(self):
+        isatab.dump(utils.create_minimal_investigation(), self._tmp_dir)
+        snapshot_dir = os.path.join(self._tmp_dir, 'snapshots')
+        isatab.load(self._tmp_dir, snapshot_dir=snapshot_dir)
+        with mock.patch('isatools.__version__', '0.0.0'), \
+                mock.patch.object(ProcessSequenceFactory, 'create_from_df',
+                                  side_effect=ProcessSequenceFactory.create_from_df, autospec=True) as create_from_df:
+            isatab.load(self._tmp_dir, snapshot_dir=snapshot_dir)
+            self.assertEqual(create_from_df.call_count, 2)
+        self.assertEqual(len(os.listdir(snapshot_dir)), 2)
+
+    def test_load_snapshot_not_written(self):
+        isatab.dump(utils.create_minimal_investigation(), self._tmp_dir)
+        snapshot_dir = os.path.join(self._tmp_dir, 'snapshots')
+        expected = isatab.dumps(isatab.load(self._tmp_dir))
+        for error in (pickle.PicklingError('cannot pickle'), RecursionError('too deep'), OSError('disk full')):
+            with mock.patch('isatools.isatab.zlib.compress', side_effect=error), \
+                    self.assertLogs('isatools.isatab', level='WARNING'):
+                self.assertEqual(isatab.dumps(isatab.load(self._tmp_dir, snapshot_dir=snapshot_dir)), expected)
+            self.assertListEqual(os.listdir(snapshot_dir) if os.path.exists(snapshot_dir) else [], [])
+        with mock.patch('isatools.isatab.os.replace', side_effect=OSError('read-only')), \
+                self.assertLogs('isatools.isatab', level='WARNING'):
+            isatab.load(self._tmp_dir, snapshot_dir=snapshot_dir)
+        self.assertListEqual(os.listdir(snapshot_dir), [])
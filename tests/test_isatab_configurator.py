@@ -1,5 +1,10 @@
 import unittest
 import os
+import shutil
+import tempfile
+from unittest import mock
+
+import isatools
 from tests import utils
 
 
@@ -53,3 +58,71 @@ class TestIsaTabConfigurator(unittest.TestCase):
                          .table_name,'metagenome_seq')
         self.assertEqual(configurator.get_config(
             config_dict, 'metagenome sequencing', 'nucleotide sequencing')[0].header, 'Sample Name')
+
+
+class TestIsaTabConfiguratorRegistry(unittest.TestCase):
+
+    def setUp(self):
+        from isatools.io import isatab_configurator as configurator
+        self._config_dir = os.path.join(tempfile.mkdtemp(), 'xml')
+        shutil.copytree(os.path.join(os.path.dirname(isatools.__file__), 'resources', 'config', 'xml'),
+                        self._config_dir)
+        self._cache_dir = tempfile.mkdtemp()
+        configurator._registry.clear()
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self._config_dir))
+        shutil.rmtree(self._cache_dir)
+
+    def test_load_parses_once_per_process(self):
+        from isatools.io import isatab_configurator as configurator
+        config_dict = configurator.load(self._config_dir, cache_dir=None)
+        with mock.patch.object(configurator, '_parse_config_dir') as parse_config_dir:
+            config_dict_again = configurator.load(self._config_dir, cache_dir=None)
+            parse_config_dir.assert_not_called()
+        self.assertEqual(config_dict.keys(), config_dict_again.keys())
+        for key in config_dict:
+            self.assertIs(config_dict[key], config_dict_again[key])
+
+    def test_load_without_cache_on_disk_by_default(self):
+        from isatools.io import isatab_configurator as configurator
+        with mock.patch.object(configurator, '_read_cache') as read_cache, \
+                mock.patch.object(configurator, '_write_cache') as write_cache:
+            configurator.load(self._config_dir)
+            read_cache.assert_not_called()
+            write_cache.assert_not_called()
+
+    def test_load_from_cache_on_disk(self):
+        from isatools.io import isatab_configurator as configurator
+        config_dict = configurator.load(self._config_dir, cache_dir=self._cache_dir)
+        configurator._registry.clear()
+        with mock.patch.object(configurator, '_parse_config_dir') as parse_config_dir:
+            config_dict_cached = configurator.load(self._config_dir, cache_dir=self._cache_dir)
+            parse_config_dir.assert_not_called()
+        self.assertEqual(sorted(config_dict.keys()), sorted(config_dict_cached.keys()))
+        self.assertEqual(config_dict[('[Sample]', '')].isatab_configuration[0].table_name,
+                         config_dict_cached[('[Sample]', '')].isatab_configuration[0].table_name)
+
+    def test_load_after_config_modified(self):
+        from isatools.io import isatab_configurator as configurator
+        configurator.load(self._config_dir, cache_dir=self._cache_dir)
+        config_path = os.path.join(self._config_dir, 'studySample.xml')
+        with open(config_path) as config_fp:
+            config_xml = config_fp.read()
+        with open(config_path, 'w') as config_fp:
+            config_fp.write(config_xml.replace('table-name="studySample"', 'table-name="mySamples"'))
+        os.utime(config_path, ns=(0, 0))
+        config_dict = configurator.load(self._config_dir, cache_dir=self._cache_dir)
+        self.assertEqual(config_dict[('[Sample]', '')].isatab_configuration[0].table_name, 'mySamples')
+        configurator._registry.clear()
+        config_dict = configurator.load(self._config_dir, cache_dir=self._cache_dir)
+        self.assertEqual(config_dict[('[Sample]', '')].isatab_configuration[0].table_name, 'mySamples')
+
+    def test_get_index(self):
+        from isatools.io import isatab_configurator as configurator
+        config_obj = configurator.load(self._config_dir, cache_dir=None)[('[Sample]', '')]
+        index = configurator.get_index(config_obj)
+        self.assertIs(index, configurator.get_index(config_obj))
+        self.assertIn('Source Name', index.required_headers)
+        self.assertEqual(index.fields_by_header['Sample Name'].header, 'Sample Name')
+        self.assertEqual([x.header for x in index.fields_by_lower_header['source name']], ['Source Name'])
@@ -6,8 +6,11 @@ import logging
 import os
 import shutil
 import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from io import StringIO
+from urllib.parse import parse_qs, urlparse
 from jsonschema.exceptions import ValidationError
 
 
@@ -101,6 +104,113 @@ class TestOlsSearch(unittest.TestCase):
         self.assertEqual(ontology_anotations[-1].term_source, ontology_source)
 
 
+class LocalOLSHandler(BaseHTTPRequestHandler):
+    """Answers the OLS API requests made by ols.OLSClient with a few EFO terms"""
+
+    ontology_json = {"ontologyId": "efo", "config": {"version": "2.90", "title": "Experimental Factor Ontology"},
+                     "_links": {"self": {"href": "http://www.ebi.ac.uk/ols/api/ontologies/efo"}}}
+    terms = {'cell type': 'http://www.ebi.ac.uk/efo/EFO_0000324',
+             'organism part': 'http://www.ebi.ac.uk/efo/EFO_0000635'}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.server.requests.append((url.path, query))
+        if url.path == '/ontologies':
+            body = {"_embedded": {"ontologies": [self.ontology_json]}}
+        elif url.path == '/ontologies/efo':
+            body = self.ontology_json
+        elif url.path == '/search':
+            term = query['q'][0]
+            docs = [{"label": term, "iri": self.terms[term]}] if term in self.terms else []
+            body = {"response": {"docs": docs}}
+        else:
+            self.send_error(404)
+            return
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestOlsClient(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._cache_path = os.path.join(self._tmp_dir, 'ols_cache.jsonl')
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), LocalOLSHandler)
+        self._server.requests = []
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.1})
+        self._thread.start()
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        shutil.rmtree(self._tmp_dir)
+        ols.set_client(None)
+
+    def _client(self, **kwargs):
+        return ols.OLSClient(base_uri='http://127.0.0.1:{}'.format(self._server.server_address[1]),
+                             cache_path=self._cache_path, **kwargs)
+
+    def test_get_ontology(self):
+        client = self._client()
+        ontology_source = client.get_ontology('efo')
+        self.assertEqual(ontology_source.name, 'efo')
+        self.assertEqual(ontology_source.file, 'http://www.ebi.ac.uk/ols/api/ontologies/efo')
+        self.assertEqual(ontology_source.version, '2.90')
+        self.assertEqual(ontology_source.description, 'Experimental Factor Ontology')
+        self.assertIsNone(client.get_ontology('obi'))
+        self.assertListEqual([path for path, _ in self._server.requests], ['/ontologies/efo', '/ontologies/obi'])
+
+    def test_search(self):
+        ontology_source = OntologySource(name='efo')
+        ontology_annotations = self._client().search('cell type', ontology_source)
+        self.assertEqual(len(ontology_annotations), 1)
+        self.assertEqual(ontology_annotations[0].term, 'cell type')
+        self.assertEqual(ontology_annotations[0].term_accession, 'http://www.ebi.ac.uk/efo/EFO_0000324')
+        self.assertIs(ontology_annotations[0].term_source, ontology_source)
+        self.assertEqual(self._server.requests[0][1], {'q': ['cell type'], 'queryFields': ['label'],
+                                                       'ontology': ['efo'], 'exact': ['True']})
+
+    def test_lookups_cached_across_clients(self):
+        self._client().search('cell type', 'efo')
+        self._client().get_ontology('efo')
+        del self._server.requests[:]
+        client = self._client()
+        self.assertEqual(client.search('cell type', 'efo')[0].term, 'cell type')
+        self.assertEqual(client.get_ontology('efo').name, 'efo')
+        self.assertListEqual(self._server.requests, [])
+
+    def test_expired_lookups_repeated(self):
+        self._client().search('cell type', 'efo')
+        del self._server.requests[:]
+        self._client(max_age=0).search('cell type', 'efo')
+        self.assertEqual(len(self._server.requests), 1)
+
+    def test_search_many(self):
+        terms = ['cell type', 'organism part', 'unknown', 'cell type']
+        results = self._client(max_connections=2).search_many(terms, 'efo')
+        self.assertListEqual(sorted(results), ['cell type', 'organism part', 'unknown'])
+        self.assertEqual(results['organism part'][0].term_accession, 'http://www.ebi.ac.uk/efo/EFO_0000635')
+        self.assertListEqual(results['unknown'], [])
+        self.assertEqual(len(self._server.requests), 3)
+
+    def test_module_functions_use_client(self):
+        ols.set_client(self._client())
+        self.assertEqual(ols.get_ols_ontologies()[0].name, 'efo')
+        self.assertEqual(ols.get_ols_ontology('efo').name, 'efo')
+        self.assertEqual(ols.search_ols('cell type', 'efo')[0].term, 'cell type')
+        self.assertListEqual(sorted(ols.search_ols_terms(['cell type'], 'efo')), ['cell type'])
+        self.assertEqual(len(self._server.requests), 3)
+
+
 class TestISArchiveExport(unittest.TestCase):
 
     def setUp(self):
@@ -0,0 +1,97 @@
+"""Tests on isatools.model module"""
+from __future__ import absolute_import
+import networkx as nx
+import pickle
+import unittest
+
+from isatools.model import *
+
+
+class TestModelHashing(unittest.TestCase):
+
+    def test_hash_unchanged_by_mutation(self):
+        sample = Sample(name='sample1')
+        h = hash(sample)
+        sample.characteristics.append(
+            Characteristic(category=OntologyAnnotation(term='organism'),
+                           value=OntologyAnnotation(term='Homo sapiens')))
+        sample.derives_from.append(Source(name='source1'))
+        self.assertEqual(h, hash(sample))
+        self.assertIn(sample, {sample})
+
+    def test_equal_objects_hash_equal(self):
+        self.assertEqual(Sample(name='sample1'), Sample(name='sample1'))
+        self.assertEqual(hash(Sample(name='sample1')),
+                         hash(Sample(name='sample1')))
+        self.assertEqual(hash(DataFile(filename='a.txt')),
+                         hash(RawDataFile(filename='a.txt')))
+
+    def test_structurally_different_objects_not_conflated(self):
+        source1 = Source(name='source1')
+        source2 = Source(name='source1', characteristics=[
+            Characteristic(category=OntologyAnnotation(term='organism'))])
+        self.assertEqual(len({source1, source2}), 2)
+
+    def test_graph_nodes(self):
+        source = Source(name='source1')
+        sample = Sample(name='sample1', derives_from=[source])
+        process = Process(executes_protocol=Protocol(name='sample collection'),
+                          inputs=[source], outputs=[sample])
+        study = Study(process_sequence=[process])
+        self.assertEqual(set(study.graph.nodes()), {source, sample, process})
+
+
+class TestStudyGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.source = Source(name='source1')
+        self.sample = Sample(name='sample1', derives_from=[self.source])
+        self.process = Process(
+            executes_protocol=Protocol(name='sample collection'),
+            inputs=[self.source], outputs=[self.sample])
+        self.study = Study(process_sequence=[self.process])
+
+    def test_graph_is_reused(self):
+        self.assertIs(self.study.graph, self.study.graph)
+
+    def test_graph_invalidated_by_process_sequence_change(self):
+        graph = self.study.graph
+        extraction = Process(executes_protocol=Protocol(name='extraction'),
+                             inputs=[self.sample])
+        self.study.process_sequence.append(extraction)
+        self.assertIsNot(graph, self.study.graph)
+        self.assertIn(extraction, self.study.graph.nodes())
+
+    def test_graph_invalidated_by_process_outputs_change(self):
+        graph = self.study.graph
+        sample2 = Sample(name='sample2')
+        self.process.outputs.append(sample2)
+        self.assertIsNot(graph, self.study.graph)
+        self.assertIn(sample2, self.study.graph.nodes())
+
+    def test_graph_invalidated_by_plink(self):
+        extraction = Process(executes_protocol=Protocol(name='extraction'))
+        self.study.process_sequence.append(extraction)
+        self.assertNotIn(extraction, self.study.graph.nodes())
+        plink(self.process, extraction)
+        self.assertIn(extraction, self.study.graph.nodes())
+
+    def test_graph_invalidated_by_node_rename(self):
+        graph = self.study.graph
+        self.sample.name = 'renamed'
+        self.assertIsNot(graph, self.study.graph)
+        self.assertIn(self.sample, self.study.graph.nodes())
+        self.assertListEqual(list(self.study.graph.successors(self.process)),
+                             [self.sample])
+
+    def test_graph_is_frozen(self):
+        with self.assertRaises(nx.NetworkXError):
+            self.study.graph.add_node(Source(name='source2'))
+        self.assertEqual(len(self.study.graph), 3)
+
+    def test_graph_not_pickled(self):
+        self.assertIsNotNone(self.study.graph)
+        study = pickle.loads(pickle.dumps(self.study))
+        self.assertIsNone(study._StudyAssayMixin__graph)
+        self.assertEqual(sorted(type(x).__name__ for x in study.graph.nodes()),
+                         ['Process', 'Sample', 'Source'])
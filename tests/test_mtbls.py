@@ -1,8 +1,16 @@
 import unittest
 from unittest.mock import patch, mock_open
 from isatools.net import mtbls as MTBLS
+from isatools import isatab
+from tests import utils
+import ftplib
 import shutil
 import os
+import tempfile
+import threading
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import FTPServer
 
 
 class TestMtblsIO(unittest.TestCase):
@@ -62,4 +70,194 @@ class TestMtblsIO(unittest.TestCase):
     def test_get_factors_summary(self):  # Test for issue #221
         factors_summary = MTBLS.get_factors_summary('MTBLS26')
         self.assertIsInstance(factors_summary, list)
-        self.assertEqual(len(factors_summary), 18)
\ No newline at end of file
+        self.assertEqual(len(factors_summary), 18)
+
+
+class LocalFTPServerTestCase(unittest.TestCase):
+    """Serves two small studies from a local FTP server laid out like the MetaboLights one"""
+
+    def setUp(self):
+        self._ftp_root = tempfile.mkdtemp()
+        self._cache_dir = tempfile.mkdtemp()
+        for study_id in ('MTBLS1', 'MTBLS2'):
+            os.makedirs(self._study_path(study_id))
+            isatab.dump(utils.create_minimal_investigation(), self._study_path(study_id),
+                        i_file_name=MTBLS.INVESTIGATION_FILENAME)
+        self.retrieved = []
+        retrbinary = ftplib.FTP.retrbinary
+
+        def record_retrbinary(ftp, cmd, *args, **kwargs):
+            self.retrieved.append(cmd[5:])
+            return retrbinary(ftp, cmd, *args, **kwargs)
+
+        patcher = patch.object(ftplib.FTP, 'retrbinary', record_retrbinary)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        authorizer = DummyAuthorizer()
+        authorizer.add_anonymous(self._ftp_root)
+        handler = type('Handler', (FTPHandler,), {'authorizer': authorizer})
+        self._server = FTPServer(('127.0.0.1', 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'timeout': 0.1})
+        self._thread.start()
+
+    def tearDown(self):
+        self._server.close_all()
+        self._thread.join()
+        shutil.rmtree(self._ftp_root)
+        shutil.rmtree(self._cache_dir)
+        MTBLS.set_cache(None)
+
+    def _study_path(self, study_id):
+        return os.path.join(self._ftp_root, MTBLS.MTBLS_BASE_DIR.lstrip('/'), study_id)
+
+
+class TestStudyCache(LocalFTPServerTestCase):
+
+    def _cache(self, **kwargs):
+        return MTBLS.StudyCache(self._cache_dir, host='127.0.0.1', port=self._server.address[1], **kwargs)
+
+    def test_downloads_changed_files_only(self):
+        cache = self._cache(max_age=0)
+        study_dir = cache.get('MTBLS1')
+        self.assertSetEqual(set(os.listdir(study_dir)), {'i_Investigation.txt', 's_minimal.txt', 'a_minimal.txt'})
+        self.assertEqual(len(self.retrieved), 3)
+        del self.retrieved[:]
+        self.assertEqual(cache.get('MTBLS1'), study_dir)
+        self.assertListEqual(self.retrieved, [])
+        with open(os.path.join(self._study_path('MTBLS1'), 'a_minimal.txt'), 'a') as fp:
+            fp.write('\n')
+        cache.get('MTBLS1')
+        self.assertListEqual(self.retrieved, ['a_minimal.txt'])
+
+    def test_does_not_check_studies_younger_than_max_age(self):
+        cache = self._cache()
+        cache.get('MTBLS1')
+        with open(os.path.join(self._study_path('MTBLS1'), 'a_minimal.txt'), 'a') as fp:
+            fp.write('\n')
+        del self.retrieved[:]
+        cache.get('MTBLS1')
+        self.assertListEqual(self.retrieved, [])
+
+    def test_offline(self):
+        self._cache().get('MTBLS1')
+        del self.retrieved[:]
+        cache = self._cache(max_age=0, offline=True)
+        self.assertTrue(os.path.isfile(os.path.join(cache.get('MTBLS1'), 's_minimal.txt')))
+        self.assertListEqual(self.retrieved, [])
+        with self.assertRaises(IOError):
+            cache.get('MTBLS2')
+
+    def test_unknown_study(self):
+        with self.assertRaises(IOError):
+            self._cache().get('MTBLS3')
+
+    def test_load_reuses_investigation_until_files_change(self):
+        cache = self._cache(max_age=0)
+        investigation = cache._load_shared('MTBLS1')
+        self.assertEqual(investigation.studies[0].filename, 's_minimal.txt')
+        with patch.object(MTBLS.isatab, 'load') as load:
+            self.assertIs(cache._load_shared('MTBLS1'), investigation)
+            load.assert_not_called()
+        with open(os.path.join(self._study_path('MTBLS1'), 's_minimal.txt'), 'a') as fp:
+            fp.write('\n')
+        self.assertIsNot(cache._load_shared('MTBLS1'), investigation)
+
+    def test_load_returns_a_copy(self):
+        cache = self._cache()
+        investigation = cache.load('MTBLS1')
+        investigation.studies[0].samples[0].name = 'changed'
+        investigation.studies.clear()
+        self.assertListEqual(sorted(x.name for x in cache.load('MTBLS1').studies[0].samples), ['sample0', 'sample1'])
+        self.assertListEqual(sorted(x.name for x in cache._load_shared('MTBLS1').studies[0].samples),
+                             ['sample0', 'sample1'])
+
+    def test_evicts_least_recently_used_study(self):
+        study_size = sum(os.path.getsize(os.path.join(self._study_path('MTBLS1'), f))
+                         for f in os.listdir(self._study_path('MTBLS1')))
+        cache = self._cache(max_size=study_size)
+        cache.get('MTBLS1')
+        cache.get('MTBLS2')
+        self.assertSetEqual(set(os.listdir(self._cache_dir)), {'MTBLS2', 'MTBLS2.json'})
+
+    def test_module_functions_use_cache(self):
+        MTBLS.set_cache(self._cache())
+        self.assertIsNot(MTBLS.load('MTBLS1'), MTBLS.load('MTBLS1'))
+        self.assertSetEqual(MTBLS.get_factor_names('MTBLS1'), set())
+        self.assertEqual(len(self.retrieved), 3)
+
+    def test_interrupted_download_leaves_no_partial_file(self):
+        cache = self._cache(max_age=0)
+        study_dir = cache.get('MTBLS1')
+        with open(os.path.join(self._study_path('MTBLS1'), 'a_minimal.txt'), 'a') as fp:
+            fp.write('\n')
+
+        def retrbinary(ftp, cmd, callback, *args, **kwargs):
+            callback(b'"Sample Name"\t"Factor Value[dose]"\n')
+            raise ftplib.error_temp('426 Connection closed; transfer aborted')
+
+        with patch.object(ftplib.FTP, 'retrbinary', autospec=True, side_effect=retrbinary):
+            with self.assertRaises(ftplib.error_temp):
+                cache.get('MTBLS1')
+        self.assertSetEqual(set(os.listdir(study_dir)), {'i_Investigation.txt', 's_minimal.txt', 'a_minimal.txt'})
+
+    def test_partial_files_not_read_as_tables(self):
+        MTBLS.set_cache(self._cache())
+        study_dir = MTBLS.get_cache().get('MTBLS1')
+        with open(os.path.join(study_dir, 'a_minimal.txt.part'), 'w') as fp:
+            fp.write('"Sample Name"\t"Factor Value[dose]"\n"sample1"\t"high"\n')
+        self.assertSetEqual(MTBLS.get_factor_names('MTBLS1'), set())
+
+
+class TestMirror(LocalFTPServerTestCase):
+
+    def _mirror(self, **kwargs):
+        return MTBLS.mirror(self._cache_dir, host='127.0.0.1', port=self._server.address[1], **kwargs)
+
+    def test_mirror_skips_unchanged_files(self):
+        stats = self._mirror(n_connections=2)
+        self.assertSetEqual(set(os.listdir(self._cache_dir)), {'MTBLS1', 'MTBLS2', 'mirror_manifest.jsonl'})
+        self.assertSetEqual(set(os.listdir(os.path.join(self._cache_dir, 'MTBLS2'))),
+                            {'i_Investigation.txt', 's_minimal.txt', 'a_minimal.txt'})
+        self.assertEqual(stats.studies_synced, 2)
+        self.assertEqual(stats.files_downloaded, 6)
+        self.assertGreater(stats.bytes_downloaded, 0)
+        with open(os.path.join(self._study_path('MTBLS2'), 's_minimal.txt'), 'a') as fp:
+            fp.write('\n')
+        del self.retrieved[:]
+        stats = self._mirror(n_connections=2)
+        self.assertEqual(stats.studies_synced, 2)
+        self.assertEqual(stats.files_skipped, 5)
+        self.assertListEqual(self.retrieved, ['s_minimal.txt'])
+
+    def test_sessions_are_reused(self):
+        with patch.object(ftplib.FTP, 'login', autospec=True, side_effect=ftplib.FTP.login) as login:
+            stats = self._mirror(n_connections=1, studies=['MTBLS1', 'MTBLS2', 'MTBLS1'])
+        self.assertEqual(login.call_count, 1)
+        self.assertEqual(stats.studies_synced, 3)
+
+    def test_failed_study_is_reported(self):
+        stats = self._mirror(studies=['MTBLS1', 'MTBLS3'])
+        self.assertEqual(stats.studies_synced, 1)
+        self.assertListEqual(stats.failed, ['MTBLS3'])
+
+    def test_resumes_interrupted_run(self):
+        sync_study = MTBLS._sync_study
+
+        def interrupt_on_mtbls2(ftp, base_dir, mtbls_study_id, *args):
+            if mtbls_study_id == 'MTBLS2':
+                raise KeyboardInterrupt
+            return sync_study(ftp, base_dir, mtbls_study_id, *args)
+
+        with patch.object(MTBLS, '_sync_study', interrupt_on_mtbls2):
+            with self.assertRaises(KeyboardInterrupt):
+                self._mirror(n_connections=1)
+        del self.retrieved[:]
+        stats = self._mirror(n_connections=1)
+        self.assertEqual(stats.studies_resumed, 1)
+        self.assertEqual(stats.studies_synced, 1)
+        self.assertSetEqual(set(self.retrieved), {'i_Investigation.txt', 's_minimal.txt', 'a_minimal.txt'})
+        self.assertEqual(len(self.retrieved), 3)
+        # the run finished, so the next one checks every study again
+        stats = self._mirror(n_connections=1)
+        self.assertEqual(stats.studies_resumed, 0)
+        self.assertEqual(stats.studies_synced, 2)
@@ -0,0 +1,149 @@
+"""Tests on isatools.io.ontology_index module"""
+from __future__ import absolute_import
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from isatools import isatab
+from isatools.io import ontology_index
+
+
+OBO = """format-version: 1.2
+ontology: ncbitaxon
+
+[Term]
+id: NCBITaxon:9606
+name: Homo sapiens
+is_a: NCBITaxon:9605 ! Homo
+
+[Term]
+id: NCBITaxon:10090
+name: Mus musculus
+
+[Typedef]
+id: has_rank
+name: has_rank
+"""
+
+OWL = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+         xmlns:owl="http://www.w3.org/2002/07/owl#">
+    <owl:Ontology rdf:about="http://www.ebi.ac.uk/efo/efo.owl"/>
+    <owl:Class rdf:about="http://www.ebi.ac.uk/efo/EFO_0000324">
+        <rdfs:label xml:lang="fr">type cellulaire</rdfs:label>
+        <rdfs:label xml:lang="en">cell type</rdfs:label>
+        <rdfs:subClassOf>
+            <owl:Class>
+                <rdfs:label>anonymous</rdfs:label>
+            </owl:Class>
+        </rdfs:subClassOf>
+    </owl:Class>
+    <owl:Class rdf:about="http://www.ebi.ac.uk/efo/EFO_0000635">
+        <rdfs:label>organism part</rdfs:label>
+    </owl:Class>
+</rdf:RDF>
+"""
+
+OLS_TERMS = [
+    {"iri": "http://purl.obolibrary.org/obo/OBI_0000070", "obo_id": "OBI:0000070", "label": "assay"},
+    {"_embedded": {"terms": [{"iri": "http://purl.obolibrary.org/obo/OBI_0000011", "label": "planned process"}]}}
+]
+
+
+class TestOntologyIndex(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._ontology_dir = os.path.join(self._tmp_dir, 'ontologies')
+        os.makedirs(self._ontology_dir)
+        with open(os.path.join(self._ontology_dir, 'NCBITAXON.obo'), 'w') as fp:
+            fp.write(OBO)
+        with gzip.open(os.path.join(self._ontology_dir, 'EFO.owl.gz'), 'wt') as fp:
+            fp.write(OWL)
+        with open(os.path.join(self._ontology_dir, 'OBI.jsonl'), 'w') as fp:
+            fp.write('\n'.join(json.dumps(x) for x in OLS_TERMS))
+        self._index_path = os.path.join(self._tmp_dir, 'terms.db')
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_normalize_accession(self):
+        for accession in ('http://purl.obolibrary.org/obo/NCBITaxon_9606', 'NCBITaxon_9606', 'NCBITaxon:9606'):
+            self.assertEqual(ontology_index.normalize_accession(accession), ('ncbitaxon:9606', '9606'))
+        self.assertEqual(ontology_index.normalize_accession('9606'), ('9606', '9606'))
+
+    def test_build_index(self):
+        index = ontology_index.build_index(self._index_path, self._ontology_dir)
+        self.assertSetEqual(index.ontologies(), {'ncbitaxon', 'efo', 'obi'})
+        self.assertListEqual(index.labels('NCBITAXON', 'http://purl.obolibrary.org/obo/NCBITaxon_9606'),
+                             ['Homo sapiens'])
+        self.assertListEqual(index.labels('ncbitaxon', '10090'), ['Mus musculus'])
+        self.assertListEqual(index.labels('NCBITAXON', 'has_rank'), [])
+        self.assertListEqual(index.labels('EFO', 'EFO:0000324'), ['cell type'])
+        self.assertListEqual(index.labels('EFO', 'EFO_0000635'), ['organism part'])
+        self.assertListEqual(index.labels('OBI', 'OBI_0000070'), ['assay'])
+        self.assertListEqual(index.labels('OBI', 'OBI:0000011'), ['planned process'])
+        self.assertListEqual(index.labels('OBI', 'EFO_0000324'), [])
+        index.close()
+
+    def test_build_index_of_named_ontologies(self):
+        index = ontology_index.build_index(self._index_path, self._ontology_dir, ontology_names=['efo', 'UO'])
+        self.assertSetEqual(index.ontologies(), {'efo'})
+        self.assertIn('EFO', index)
+        self.assertNotIn('NCBITAXON', index)
+
+    def test_unchanged_files_not_indexed_again(self):
+        ontology_index.build_index(self._index_path, self._ontology_dir).close()
+        with mock.patch.object(ontology_index.TermIndex, 'add_ontology') as add_ontology:
+            index = ontology_index.build_index(self._index_path, self._ontology_dir)
+            add_ontology.assert_not_called()
+        self.assertListEqual(index.labels('NCBITAXON', 'NCBITaxon:9606'), ['Homo sapiens'])
+        with open(os.path.join(self._ontology_dir, 'NCBITAXON.obo'), 'a') as fp:
+            fp.write('\n[Term]\nid: NCBITaxon:10116\nname: Rattus norvegicus\n')
+        self.assertEqual(index.add_file('NCBITAXON', os.path.join(self._ontology_dir, 'NCBITAXON.obo')), 3)
+        self.assertListEqual(index.labels('NCBITAXON', 'NCBITaxon:10116'), ['Rattus norvegicus'])
+        self.assertListEqual(index.labels('NCBITAXON', 'NCBITaxon:9606'), ['Homo sapiens'])
+
+    def test_read_only(self):
+        ontology_index.build_index(self._index_path, self._ontology_dir).close()
+        index = ontology_index.TermIndex(self._index_path, read_only=True)
+        self.assertListEqual(index.labels('EFO', 'EFO_0000635'), ['organism part'])
+        index.close()
+
+    def test_unsupported_file(self):
+        path = os.path.join(self._ontology_dir, 'EFO.ttl')
+        with open(path, 'w') as fp:
+            fp.write('')
+        with self.assertRaises(ValueError):
+            ontology_index.TermIndex(self._index_path).add_file('EFO', path)
+
+    def test_check_ontology_terms(self):
+        index = ontology_index.build_index(self._index_path, self._ontology_dir)
+        table = pd.DataFrame([
+            ['s1', 'Homo sapiens', 'NCBITAXON', 'http://purl.obolibrary.org/obo/NCBITaxon_9606', 'cell type', 'EFO',
+             'EFO_0000324'],
+            ['s2', 'Homo sapiens', 'NCBITAXON', 'http://purl.obolibrary.org/obo/NCBITaxon_9606', 'liver', 'UBERON',
+             'UBERON_0002107'],
+            ['s3', 'Mus musculus', 'NCBITAXON', 'NCBITaxon_9606', 'cell line', 'EFO', 'EFO_0000322'],
+            ['s4', '', '', '', 'cell type', 'EFO', ''],
+        ], columns=['Sample Name', 'Characteristics[organism]', 'Term Source REF', 'Term Accession Number',
+                    'Characteristics[cell type]', 'Term Source REF.1', 'Term Accession Number.1'])
+        table.filename = 's_study.txt'
+        isatab.warnings = list()
+        self.assertFalse(isatab.check_ontology_terms(table, index, ['NCBITAXON', 'EFO', 'UBERON']))
+        self.assertListEqual(sorted((w['code'], w['supplemental']) for w in isatab.warnings), [
+            (3004, "Accession 'EFO_0000322' of 'cell line' in column 'Characteristics[cell type]' of the file "
+                   "'s_study.txt' is not a term of EFO"),
+            (3006, "Term 'Mus musculus' in column 'Characteristics[organism]' of the file 's_study.txt' has accession "
+                   "'NCBITaxon_9606', labelled ['Homo sapiens'] in NCBITAXON")
+        ])
+        isatab.warnings = list()
+        self.assertTrue(isatab.check_ontology_terms(table.iloc[:2], index, ['NCBITAXON', 'EFO']))
+        self.assertListEqual(isatab.warnings, [])
@@ -9,6 +9,7 @@ from tests import utils
 
 from isatools import isajson
 from isatools import sra
+from isatools.model import Extract, OntologyAnnotation, Process, Protocol, Sample, Source, Study, plink
 
 
 def setUpModule():
@@ -131,3 +132,32 @@ class TestNewSraExport(unittest.TestCase):
                   'rb') as out_fp:
             self.assertTrue('<SPOT_DESCRIPTOR>' in str(out_fp.read()))
 
+
+
+class TestStudyLineageIndex(unittest.TestCase):
+
+    def setUp(self):
+        self._source = Source(name='source1')
+        self._sample = Sample(name='sample1', derives_from=[self._source])
+        self._study_process = Process(executes_protocol=Protocol(name='sample collection'),
+                                      inputs=[self._source], outputs=[self._sample])
+        self._extraction = Process(
+            executes_protocol=Protocol(protocol_type=OntologyAnnotation(term='nucleic acid extraction')),
+            inputs=[self._sample], outputs=[Extract(name='extract1')])
+        self._library_construction = Process(
+            executes_protocol=Protocol(protocol_type=OntologyAnnotation(term='library construction')))
+        self._sequencing = Process(
+            executes_protocol=Protocol(protocol_type=OntologyAnnotation(term='nucleic acid sequencing')))
+        plink(self._extraction, self._library_construction)
+        plink(self._library_construction, self._sequencing)
+
+    def test_source_of(self):
+        index = sra.StudyLineageIndex(Study(process_sequence=[self._study_process]))
+        self.assertIs(index.source_of(self._sample), self._source)
+        self.assertIsNone(index.source_of(Sample(name='sample2')))
+
+    def test_lineage(self):
+        sample, processes_by_type = sra.StudyLineageIndex.lineage(self._sequencing)
+        self.assertIs(sample, self._sample)
+        self.assertEqual(processes_by_type, {'nucleic acid sequencing': self._sequencing,
+                                             'library construction': self._library_construction})
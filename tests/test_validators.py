@@ -1,9 +1,12 @@
+import json
 import unittest
 from isatools import isajson, isatab
 import os
 from tests import utils
 import tempfile
 import shutil
+import pandas as pd
+from unittest import mock
 
 
 def setUpModule():
@@ -335,6 +338,139 @@ class TestValidateIsaTab(unittest.TestCase):
                 self.fail("Validation error and warnings are missing when should report some with BII-S-7")
 
 
+class TestValidateIsaTabTableLoading(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        isatab.dump(utils.create_minimal_investigation(), self._tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_validate_isatab_loads_each_table_once(self):
+        with mock.patch('isatools.isatab.load_table', wraps=isatab.load_table) as load_table:
+            with open(os.path.join(self._tmp_dir, 'i_investigation.txt')) as fp:
+                report = isatab.validate(fp)
+        self.assertTrue(report['validation_finished'])
+        self.assertEqual(load_table.call_count, 2)  # s_minimal.txt and a_minimal.txt
+        self.assertIsNone(isatab._table_cache)
+
+
+class TestValidateIsaTabFieldValues(unittest.TestCase):
+
+    def setUp(self):
+        configs = isatab.load_config(isatab.default_config_dir)
+        self._seq_config = configs[('transcription profiling', 'nucleotide sequencing')]
+        self._facs_config = configs[('cell counting', 'flow cytometry')]
+        del isatab.warnings[:]
+
+    def tearDown(self):
+        del isatab.warnings[:]
+
+    @staticmethod
+    def _table(columns):
+        table = pd.DataFrame(columns)
+        table.filename = 'a_test.txt'
+        return table
+
+    def test_check_field_values_list(self):
+        table = self._table({'Parameter Value[library layout]': ['SINGLE', 'paired', 'SINGLE']})
+        self.assertTrue(isatab.check_field_values(table, self._seq_config))
+        self.assertEqual(isatab.warnings, [])
+
+    def test_check_field_values_reports_invalid_list_value(self):
+        table = self._table({'Parameter Value[library layout]': ['SINGLE', 'TRIPLE', 'PAIRED']})
+        self.assertFalse(isatab.check_field_values(table, self._seq_config))
+        self.assertEqual([w['code'] for w in isatab.warnings], [4011])
+        self.assertIn("Invalid value 'TRIPLE' for type 'list'", isatab.warnings[0]['supplemental'])
+
+    def test_check_field_values_reports_missing_values_before_invalid_value(self):
+        table = self._table({'Parameter Value[library layout]': ['', ' ', 'TRIPLE', '']})
+        self.assertFalse(isatab.check_field_values(table, self._seq_config))
+        self.assertEqual([w['code'] for w in isatab.warnings], [4012, 4012, 4011])
+
+    def test_check_field_values_integer(self):
+        table = self._table({'Parameter Value[detector voltage]': ['300', ' 42 ', '', '4.5']})
+        self.assertFalse(isatab.check_field_values(table, self._facs_config))
+        self.assertEqual([w['code'] for w in isatab.warnings], [4011])
+        self.assertIn("Invalid value '4.5' for type 'integer'", isatab.warnings[0]['supplemental'])
+
+
+class TestValidateIsaJsonSchemas(unittest.TestCase):
+
+    def setUp(self):
+        self._isa_json = json.loads(json.dumps(utils.create_minimal_investigation(), cls=isajson.ISAJSONEncoder))
+        self._schema_path = os.path.join(isajson.BASE_DIR, 'resources', 'schemas', 'isa_model_version_1_0_schemas',
+                                         'core', 'investigation_schema.json')
+        del isajson.errors[:]
+
+    def tearDown(self):
+        del isajson.errors[:]
+
+    def test_get_schema_validator_is_reused(self):
+        validator = isajson.get_schema_validator(self._schema_path)
+        self.assertIs(isajson.get_schema_validator(self._schema_path), validator)
+        isajson.check_isa_schemas(self._isa_json, self._schema_path)
+        self.assertIs(isajson.get_schema_validator(self._schema_path), validator)
+
+    def test_iter_isa_schema_errors_valid(self):
+        self.assertListEqual(list(isajson.iter_isa_schema_errors(self._isa_json, self._schema_path)), [])
+
+    def test_iter_isa_schema_errors_by_section(self):
+        self._isa_json['studies'][0]['title'] = 1
+        self._isa_json['studies'][0]['assays'][0]['filename'] = 2
+        sections = [section for section, _ in isajson.iter_isa_schema_errors(self._isa_json, self._schema_path)]
+        self.assertListEqual(sections, ['studies[0]', 'studies[0].assays[0]'])
+
+    def test_check_isa_schemas_by_section_reports_every_error(self):
+        self._isa_json['studies'][0]['title'] = 1
+        self._isa_json['studies'][0]['assays'][0]['filename'] = 2
+        with self.assertRaises(SystemError):
+            isajson.check_isa_schemas(self._isa_json, self._schema_path, by_section=True)
+        self.assertEqual([e['code'] for e in isajson.errors], [3, 3])
+
+
+class TestParallelBatchValidate(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._tab_dirs = list()
+        for i in range(3):
+            tab_dir = os.path.join(self._tmp_dir, 'tab{}'.format(i))
+            os.mkdir(tab_dir)
+            isatab.dump(utils.create_minimal_investigation(), tab_dir)
+            self._tab_dirs.append(tab_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def test_isatab_parallel_batch_validate_matches_serial(self):
+        tab_dirs = self._tab_dirs + [os.path.join(self._tmp_dir, 'missing')]
+        self.assertEqual(isatab.batch_validate(tab_dirs, n_workers=2, timeout=300),
+                         isatab.batch_validate(tab_dirs))
+
+    def test_isatab_batch_validate_config_cache_dir(self):
+        config_cache_dir = os.path.join(self._tmp_dir, 'configs')
+        self.assertEqual(isatab.batch_validate(self._tab_dirs, n_workers=2, config_cache_dir=config_cache_dir),
+                         isatab.batch_validate(self._tab_dirs))
+        self.assertEqual(len(os.listdir(config_cache_dir)), 1)
+
+    def test_isatab_ibatch_validate(self):
+        filenames = [result['filename'] for result in isatab.ibatch_validate(self._tab_dirs, n_workers=2)]
+        self.assertEqual(sorted(filenames),
+                         sorted(os.path.join(tab_dir, 'i_investigation.txt') for tab_dir in self._tab_dirs))
+
+    def test_isajson_parallel_batch_validate_matches_serial(self):
+        json_files = list()
+        for i in range(3):
+            json_file = os.path.join(self._tmp_dir, 'isa{}.json'.format(i))
+            with open(json_file, 'w') as fp:
+                json.dump(utils.create_minimal_investigation(), fp, cls=isajson.ISAJSONEncoder)
+            json_files.append(json_file)
+        self.assertEqual(isajson.batch_validate(json_files, n_workers=3),
+                         isajson.batch_validate(json_files))
+
+
 class TestBatchValidateIsaTab(unittest.TestCase):
 
     def setUp(self):
@@ -220,3 +220,38 @@ def strip_ids(J):
         else:
             if k == '@id':
                 J[k] = ''
+
+
+def create_minimal_investigation():
+    """Returns a small Investigation with one study and one mass spectrometry assay, for tests that need an ISA
+    archive without depending on the test data directory"""
+    from isatools.model import Investigation, Study, Assay, Protocol, OntologyAnnotation, Source, Sample, \
+        Extract, RawDataFile, Process, plink
+    investigation = Investigation(identifier='i1', title='Minimal investigation')
+    study = Study(identifier='s1', title='Minimal study', filename='s_minimal.txt')
+    sample_collection = Protocol(name='sample collection', protocol_type=OntologyAnnotation(term='sample collection'))
+    extraction = Protocol(name='extraction', protocol_type=OntologyAnnotation(term='extraction'))
+    mass_spectrometry = Protocol(name='mass spectrometry',
+                                 protocol_type=OntologyAnnotation(term='mass spectrometry'))
+    study.protocols = [sample_collection, extraction, mass_spectrometry]
+    assay = Assay(filename='a_minimal.txt', measurement_type=OntologyAnnotation(term='metabolite profiling'),
+                  technology_type=OntologyAnnotation(term='mass spectrometry'))
+    for i in range(2):
+        source = Source(name='source{}'.format(i))
+        sample = Sample(name='sample{}'.format(i), derives_from=[source])
+        extract = Extract(name='extract{}'.format(i))
+        data_file = RawDataFile(filename='data{}.mzML'.format(i))
+        study.sources.append(source)
+        study.samples.append(sample)
+        study.process_sequence.append(Process(executes_protocol=sample_collection, inputs=[source],
+                                              outputs=[sample]))
+        extraction_process = Process(executes_protocol=extraction, inputs=[sample], outputs=[extract])
+        ms_process = Process(executes_protocol=mass_spectrometry, inputs=[extract], outputs=[data_file])
+        plink(extraction_process, ms_process)
+        assay.samples.append(sample)
+        assay.other_material.append(extract)
+        assay.data_files.append(data_file)
+        assay.process_sequence.extend([extraction_process, ms_process])
+    study.assays.append(assay)
+    investigation.studies.append(study)
+    return investigation